@@ -12,7 +12,7 @@
 3. 维护保养记录表 - 用于记录设备的维护保养情况
 """
 
-from app import app, mysql
+from extensions import mysql, script_app
 from datetime import datetime
 
 # 示例表格模板数据
@@ -67,6 +67,7 @@ sample_templates = [
 ]
 
 def add_sample_templates():
+    app = script_app()
     with app.app_context():
         cursor = mysql.connection.cursor()
         
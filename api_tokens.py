@@ -0,0 +1,59 @@
+"""
+API 访问令牌模块
+
+离线巡检设备通过 JSON 接口批量提交记录，使用令牌（Authorization: Bearer <令牌>）认证，不依赖浏览器会话。
+令牌只在签发时返回一次，数据库中只保存其 SHA-256 摘要，泄露数据库也无法还原令牌。
+每次请求都重新读取用户的角色和区队，用户权限变化后立即生效。
+"""
+
+import hashlib
+import re
+import secrets
+from datetime import datetime, timedelta
+
+# 最后使用时间的更新间隔，避免每个请求都写数据库
+LAST_USED_INTERVAL = timedelta(hours=1)
+
+# 客户端生成的幂等键格式（如 UUID）
+IDEMPOTENCY_KEY_RE = re.compile(r'^[A-Za-z0-9_.:-]{1,64}$')
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def issue_token(cursor, user_id, name):
+    """签发新令牌，返回 (令牌ID, 令牌明文)"""
+    token = secrets.token_urlsafe(32)
+    cursor.execute('INSERT INTO api_tokens (user_id, token_hash, name) VALUES (%s, %s, %s)',
+                   (user_id, hash_token(token), name[:100]))
+    return cursor.lastrowid, token
+
+
+def bearer_token(authorization):
+    if not authorization or not authorization.startswith('Bearer '):
+        return None
+    return authorization[len('Bearer '):].strip() or None
+
+
+def authenticate(cursor, token):
+    """根据令牌返回用户信息 {token_id, id, name, role, team}，令牌无效或已吊销时返回 None"""
+    cursor.execute('''
+        SELECT k.id AS token_id, k.last_used_at, u.id, u.name, u.role, u.team
+        FROM api_tokens k
+        JOIN users u ON k.user_id = u.id
+        WHERE k.token_hash = %s AND k.revoked_at IS NULL
+    ''', (hash_token(token),))
+    user = cursor.fetchone()
+    if not user:
+        return None
+
+    now = datetime.now().replace(microsecond=0)
+    if user['last_used_at'] is None or user['last_used_at'] < now - LAST_USED_INTERVAL:
+        cursor.execute('UPDATE api_tokens SET last_used_at = %s WHERE id = %s', (now, user['token_id']))
+    return user
+
+
+def revoke_token(cursor, token_id):
+    cursor.execute('UPDATE api_tokens SET revoked_at = %s WHERE id = %s AND revoked_at IS NULL',
+                   (datetime.now().replace(microsecond=0), token_id))
@@ -1,26 +1,213 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
-from flask_mysqldb import MySQL
-import bcrypt
+from flask import Flask, current_app, render_template, request, redirect, url_for, session, flash, jsonify, send_file, abort, stream_with_context, stream_template
+import json
+import mimetypes
+import os
 import re
+import time
+import uuid
+from datetime import datetime
 from functools import wraps
+from urllib.parse import quote
 
-app = Flask(__name__)
+from markupsafe import Markup
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+import api_tokens
+import archive
+import assets
+import attachments
+import cluster
+import directory
+import exporter
+import extensions
+import feed
+import field_index
+import importer
+import inspections
+import jobs
+import page_cache
+import record_codec
+import record_hooks
+import revisions
+import sessions
+import stats
+from db import QUERIES
+from passwords import HasherBusy, LoginThrottle, PasswordHasher
+from profiler import Profiler
+from template_cache import compile_structure
+
+class Routes:
+    """
+    路由、请求钩子和模板函数的登记表：导入本模块时只登记，create_app 时注册到新建的应用上。
+    与 Blueprint 不同，端点名称不加前缀（url_for('home')）。
+    """
+
+    def __init__(self):
+        self._deferred = []
+
+    def _record(self, register):
+        def decorator(f):
+            self._deferred.append(lambda app: register(app, f))
+            return f
+        return decorator
+
+    def route(self, rule, **options):
+        return self._record(lambda app, f: app.add_url_rule(rule, options.pop('endpoint', f.__name__), f, **options))
+
+    def before_request(self, f):
+        return self._record(lambda app, f: app.before_request(f))(f)
+
+    def template_filter(self, name=None):
+        return self._record(lambda app, f: app.add_template_filter(f, name))
+
+    def template_global(self, name=None):
+        return self._record(lambda app, f: app.add_template_global(f, name))
+
+    def init_app(self, app):
+        for register in self._deferred:
+            register(app)
+
+
+routes = Routes()
 
 # 用户角色常量
 SUPER_ADMIN_ROLE = 'super_admin'  # 超级管理员
 ADMIN_ROLE = 'admin'              # 系统管理员
 USER_ROLE = 'user'                # 普通用户
 
-# 配置数据库
-app.config['MYSQL_HOST'] = 'localhost'
-app.config['MYSQL_USER'] = 'root'  # 替换为你的MySQL用户名
-app.config['MYSQL_PASSWORD'] = 'abc123456'  # 替换为你的MySQL密码
-app.config['MYSQL_DB'] = 'Electromechanical_system'
-app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
-app.secret_key = 'your_secret_key_here'  # 用于session加密
+# 记录列表每页显示的条数
+RECORDS_PAGE_SIZE = 50
+
+# 统计报表最多可查询的天数
+STATS_MAX_DAYS = 366
+
+# 记录查看页面中记录内容的占位标记，页面外框渲染后在此处切开，插入流式输出的记录内容
+RECORD_FRAGMENT_MARKER = '<!--record-fragment-->'
+
+# 当前应用的扩展（create_app 时创建，见 extensions.py）
+mysql = extensions.mysql
+template_cache = extensions.template_cache
+profiler = extensions.proxy('profiler')
+password_hasher = extensions.proxy('password_hasher')
+login_throttle = extensions.proxy('login_throttle')
+record_view_cache = extensions.proxy('record_view_cache')
+user_directory = extensions.proxy('user_directory')
+record_feed = extensions.proxy('record_feed')
+asset_manifest = extensions.proxy('asset_manifest')
+user_contexts = extensions.proxy('user_contexts')
+cluster_poller = extensions.proxy('cluster_poller')
+inspection_shifts = extensions.proxy('inspection_shifts')
+
+
+def create_app(settings=None):
+    """
+    新建网页应用：加载配置（默认值见 config.py，部署时用 EMS_ 开头的环境变量覆盖，settings 优先），
+    创建数据库连接池、各项进程内缓存和会话存储，注册路由
+    """
+    app = Flask(__name__)
+    extensions.load_config(app, settings)
+
+    # 数据库连接池和模板结构缓存
+    extensions.init_data(app)
+
+    # 性能分析：开启后在 /metrics 提供按路由统计的耗时和SQL指标，慢请求写入日志
+    Profiler(app, app.extensions['mysql_pool'])
+
+    app.extensions['password_hasher'] = PasswordHasher(rounds=app.config['PASSWORD_HASH_ROUNDS'],
+                                                       max_workers=app.config['PASSWORD_HASH_WORKERS'],
+                                                       max_queue=app.config['PASSWORD_HASH_QUEUE'],
+                                                       timeout=app.config['PASSWORD_HASH_TIMEOUT'])
+    app.extensions['login_throttle'] = LoginThrottle(window=app.config['LOGIN_THROTTLE_WINDOW'])
+
+    # 进程内的记录查看页面缓存，修改记录或模板后失效
+    app.extensions['record_view_cache'] = page_cache.RecordViewCache(max_size=app.config['RECORD_VIEW_CACHE_SIZE'],
+                                                                     ttl=app.config['RECORD_VIEW_CACHE_TTL'])
+
+    # 进程内的区队与用户目录缓存，注册、修改角色、修改区队后失效
+    app.extensions['user_directory'] = directory.Directory(ttl=app.config['DIRECTORY_CACHE_TTL'])
+
+    # 服务端会话
+    app.session_interface = sessions.ServerSideSessionInterface(
+        sessions.SQLiteSessionStore(app.config['SESSION_STORE_PATH']))
+
+    # 进程内的记录推送中心，发布后台线程从 record_events 表读到的事件
+    app.extensions['record_feed'] = feed.FeedHub(history_size=app.config['FEED_HISTORY_SIZE'],
+                                                 buffer_size=app.config['FEED_CLIENT_BUFFER'])
 
-# 初始化MySQL
-mysql = MySQL(app)
+    # 静态资源构建清单，重新构建后自动重新读取
+    app.extensions['asset_manifest'] = assets.Manifest(app.config['ASSET_FOLDER'])
+
+    # 进程内的用户上下文缓存，修改角色、修改区队后失效
+    app.extensions['user_contexts'] = sessions.UserContextCache(ttl=app.config['USER_CONTEXT_CACHE_TTL'])
+
+    # 多进程同步：工作进程的后台线程定期从数据库读取其他进程的变化（见 cluster.py）
+    app.extensions['cluster_poller'] = cluster.Poller(app.extensions['mysql_pool'],
+                                                      interval=app.config['SYNC_POLL_INTERVAL'], logger=app.logger)
+    app.extensions['cluster_poller'].register(cluster.RecordEvents(app.extensions['record_feed']).poll)
+    # 其他进程修改了缓存的数据（cache_versions 中的版本变化）时清除本进程的缓存
+    cache_versions = cluster.CacheVersions()
+    cache_versions.on_change('users', app.extensions['user_directory'].invalidate)
+    cache_versions.on_change('record_views', app.extensions['record_view_cache'].clear)
+    cache_versions.on_change('users', app.extensions['user_contexts'].invalidate)
+    app.extensions['cluster_poller'].register(cache_versions.poll)
+
+    # “每班”检查周期使用的班次开始时间，格式错误时新建应用即报错
+    app.extensions['inspection_shifts'] = inspections.parse_shifts(app.config['INSPECTION_SHIFTS'])
+
+    # 部署在反向代理之后时按代理转发的请求头取客户端地址，否则按 IP 的登录限流会把所有用户算作同一个 IP
+    if app.config['PROXY_FIX_HOPS']:
+        hops = app.config['PROXY_FIX_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
+    routes.init_app(app)
+    return app
+
+def _load_user_context(user_id):
+    cursor = mysql.connection.cursor()
+    cursor.execute('SELECT employee_id, name, role, team FROM users WHERE id = %s', (user_id,))
+    user = cursor.fetchone()
+    cursor.close()
+    return user
+
+# 本进程处理第一个请求时启动多进程同步的后台线程（预加载后 fork 出的工作进程各自启动）
+@routes.before_request
+def start_cluster_poller():
+    cluster_poller.start()
+
+# 每个请求开始时用最新的角色、区队更新会话，修改角色、区队后不需要重新登录
+@routes.before_request
+def refresh_session_user():
+    # 静态资源请求不需要最新的用户信息，不查询用户上下文
+    if request.endpoint in ('static', 'asset_file'):
+        return
+    if 'loggedin' not in session:
+        return
+    context = user_contexts.get(session['id'], _load_user_context)
+    if context is None:
+        # 用户已被删除
+        session.clear()
+        return
+    sessions.sync_session(session, context)
+
+# 模板过滤器：单元格中的附件引用转换为下载地址（旧数据中的图片 data URL 原样返回），无效时返回 None
+@routes.template_filter('attachment_url')
+def attachment_url_filter(value):
+    sha256 = attachments.parse_ref(value)
+    if sha256:
+        return url_for('download_attachment', sha256=sha256)
+    if isinstance(value, str) and value.startswith('data:image/'):
+        return value
+    return None
+
+# 模板函数：资源对应的地址列表。构建后为带摘要的文件（以及 static/vendor 中缺少的第三方样式的 CDN 地址），
+# 没有构建时为 static 中的源文件
+@routes.template_global()
+def asset_urls(name):
+    entry = asset_manifest.get(name)
+    if entry is not None:
+        return entry['external'] + [url_for('asset_file', filename=entry['file'])]
+    return [url_for('static', filename=source) if local else source
+            for local, source in assets.fallback_sources(name, current_app.static_folder)]
 
 # 权限检查装饰器
 def super_admin_required(f):
@@ -32,30 +219,143 @@ def super_admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# 记录列表分页游标，格式为 "创建时间_记录ID"，如 20250101083000_123
+def _format_record_cursor(record):
+    return f"{record['created_at'].strftime('%Y%m%d%H%M%S')}_{record['id']}"
+
+def _parse_record_cursor(value):
+    try:
+        created_at, record_id = value.split('_')
+        return datetime.strptime(created_at, '%Y%m%d%H%M%S'), int(record_id)
+    except (AttributeError, ValueError):
+        return None
+
+# 将提交数据中残留的 data URL（旧版页面直接内嵌的图片/文件）转存为附件引用
+def _externalize_inline_attachments(data, created_by):
+    if 'data:' not in data:
+        return data
+    try:
+        record_data = json.loads(data)
+    except ValueError:
+        return data
+    
+    cursor = mysql.connection.cursor()
+    
+    def store(mime_type, content):
+        sha256, size, _ = attachments.save_bytes(current_app.config['ATTACHMENT_FOLDER'], content)
+        attachments.register_attachment(cursor, sha256, size, mime_type, sha256, created_by)
+        return sha256
+    
+    record_data, replaced = attachments.externalize_data_urls(record_data, store)
+    cursor.close()
+    return json.dumps(record_data, ensure_ascii=False) if replaced else data
+
+# 服务端校验提交的记录数据，返回 (行数组, 错误列表)
+def _validate_record_data(compiled, data):
+    return compiled.validate(data, 
+                             max_bytes=current_app.config['RECORD_MAX_BYTES'], 
+                             max_rows=current_app.config['RECORD_MAX_ROWS'])
+
+def _flash_errors(errors):
+    for message in errors:
+        flash(message, 'error')
+
+# 检查模板结构是否为有效的JSON列定义
+def _structure_error(structure):
+    try:
+        compile_structure(structure)
+    except ValueError as e:
+        return f'表格结构格式不正确：{e}'
+    return None
+
+# 读取表单中模板的检查周期设置（结构已校验通过），返回 (检查周期, 设备列, 错误说明)
+def _inspection_schedule_form(structure):
+    frequency = request.form.get('inspection_frequency') or None
+    key_column = request.form.get('inspection_key_column', '').strip() or None
+    column_names = [column['name'] for column in compile_structure(structure)['columns']]
+    return frequency, key_column, inspections.validate_schedule(frequency, key_column, column_names)
+
+# 登录限流：返回需要等待的秒数（0 表示可以尝试登录）
+def _login_retry_after(employee_id):
+    return max(login_throttle.retry_after(('employee_id', employee_id), current_app.config['LOGIN_MAX_FAILURES_PER_USER']),
+               login_throttle.retry_after(('ip', request.remote_addr), current_app.config['LOGIN_MAX_FAILURES_PER_IP']))
+
+def _record_login_failure(employee_id):
+    login_throttle.record_failure(('employee_id', employee_id))
+    login_throttle.record_failure(('ip', request.remote_addr))
+
+# 离线设备API的当前用户（Authorization: Bearer <令牌>），令牌无效时返回 None
+def _api_user():
+    token = api_tokens.bearer_token(request.headers.get('Authorization'))
+    if not token:
+        return None
+    cursor = mysql.connection.cursor()
+    user = api_tokens.authenticate(cursor, token)
+    mysql.connection.commit()
+    cursor.close()
+    return user
+
 # 首页
-@app.route('/')
+@routes.route('/')
 def home():
     if 'loggedin' in session:
+        # 最近7天的记录数（读取统计汇总表）
+        cursor = mysql.connection.cursor()
+        summary = stats.dashboard(cursor, 
+                                  team=None if session.get('role') == SUPER_ADMIN_ROLE else session.get('team') or '', 
+                                  days=7)
+        cursor.close()
         return render_template('home.html', 
                              name=session['name'], 
                              role=session.get('role', USER_ROLE),
-                             team=session.get('team'))  # 传递team到模板
+                             team=session.get('team'),  # 传递team到模板
+                             summary=summary)
     return redirect(url_for('login'))
 
 # 登录页面
-@app.route('/login', methods=['GET', 'POST'])
+@routes.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST' and 'employee_id' in request.form and 'password' in request.form:
         employee_id = request.form['employee_id']
         password = request.form['password'].encode('utf-8')
         
+        # 同一工号或同一IP失败次数过多时暂时拒绝，不再计算 bcrypt
+        retry_after = _login_retry_after(employee_id)
+        if retry_after:
+            flash(f'登录失败次数过多，请{(retry_after + 59) // 60}分钟后再试', 'error')
+            return render_template('login.html'), 429, {'Retry-After': str(retry_after)}
+        
         # 检查用户是否存在
         cursor = mysql.connection.cursor()
-        cursor.execute('SELECT * FROM users WHERE employee_id = %s', (employee_id,))
+        cursor.execute(QUERIES['user_by_employee_id'], (employee_id,))
         user = cursor.fetchone()
+        cursor.close()
         
-        if user and bcrypt.checkpw(password, user['password_hash'].encode('utf-8')):
-            # 登录成功，创建session
+        try:
+            with profiler.timed('bcrypt_check'):
+                password_ok = bool(user) and password_hasher.check(password, user['password_hash'])
+        except HasherBusy:
+            flash('系统繁忙，请稍后再试', 'error')
+            return render_template('login.html'), 503, {'Retry-After': '5'}
+        
+        if password_ok:
+            login_throttle.reset(('employee_id', employee_id))
+            
+            # 成本因子已调整：用本次提交的密码重新哈希（系统繁忙时留到下次登录）
+            if password_hasher.needs_rehash(user['password_hash']):
+                try:
+                    with profiler.timed('bcrypt_hash'):
+                        new_hash = password_hasher.hash(password)
+                except HasherBusy:
+                    new_hash = None
+                if new_hash:
+                    cursor = mysql.connection.cursor()
+                    cursor.execute('UPDATE users SET password_hash = %s WHERE id = %s', (new_hash, user['id']))
+                    mysql.connection.commit()
+                    cursor.close()
+            
+            # 登录成功，更换会话ID后创建session
+            session.regenerate()
             session['loggedin'] = True
             session['id'] = user['id']
             session['employee_id'] = user['employee_id']
@@ -64,12 +364,13 @@ def login():
             session['team'] = user.get('team')  # 添加队伍信息到session
             return redirect(url_for('home'))
         else:
+            _record_login_failure(employee_id)
             flash('工号或密码不正确', 'error')
     
     return render_template('login.html')
 
 # 注册页面
-@app.route('/register', methods=['GET', 'POST'])
+@routes.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         name = request.form['name']
@@ -81,7 +382,7 @@ def register():
         
         # 验证表单数据
         cursor = mysql.connection.cursor()
-        cursor.execute('SELECT * FROM users WHERE employee_id = %s', (employee_id,))
+        cursor.execute(QUERIES['user_exists_by_employee_id'], (employee_id,))
         account = cursor.fetchone()
         
         # 检查输入是否符合要求
@@ -97,30 +398,34 @@ def register():
             flash('请输入有效的手机号', 'error')
         else:
             # 密码加密
-            hash_password = bcrypt.hashpw(password, bcrypt.gensalt())
+            try:
+                with profiler.timed('bcrypt_hash'):
+                    hash_password = password_hasher.hash(password)
+            except HasherBusy:
+                cursor.close()
+                flash('系统繁忙，请稍后再试', 'error')
+                return render_template('register.html'), 503, {'Retry-After': '5'}
             
             # 插入新用户，包含队伍信息
             cursor.execute('INSERT INTO users (name, employee_id, phone, password_hash, role, team) VALUES (%s, %s, %s, %s, %s, %s)', 
-                          (name, employee_id, phone, hash_password.decode('utf-8'), USER_ROLE, team))
+                          (name, employee_id, phone, hash_password, USER_ROLE, team))
+            cluster.bump_version(cursor, 'users')
             mysql.connection.commit()
+            user_directory.invalidate()
             flash('注册成功，请登录', 'success')
             return redirect(url_for('login'))
     
     return render_template('register.html')
 
 # 登出
-@app.route('/logout')
+@routes.route('/logout')
 def logout():
-    session.pop('loggedin', None)
-    session.pop('id', None)
-    session.pop('employee_id', None)
-    session.pop('name', None)
-    session.pop('role', None)
-    session.pop('team', None)  # 清除区队信息
+    # 清空整个会话（包括提示消息、读主库标记等），会话接口随之删除服务端会话和 Cookie
+    session.clear()
     return redirect(url_for('login'))
 
 # 管理员专用路由 - 用户管理
-@app.route('/admin/users')
+@routes.route('/admin/users')
 def admin_users():
     if 'loggedin' not in session:
         return redirect(url_for('login'))
@@ -129,16 +434,57 @@ def admin_users():
         flash('您没有权限访问此页面', 'error')
         return redirect(url_for('home'))
     
-    # 获取所有用户信息
+    # 服务端分页搜索，不再一次输出全部用户
+    filters = _user_search_filters()
     cursor = mysql.connection.cursor()
-    cursor.execute('SELECT id, name, employee_id, phone, role, team, created_at FROM users ORDER BY created_at DESC')
-    users = cursor.fetchall()
+    users, total = directory.search_users(cursor, per_page=current_app.config['USERS_PER_PAGE'], **filters)
+    role_counts = user_directory.role_counts(cursor)
+    teams = user_directory.teams(cursor)
     cursor.close()
     
-    return render_template('admin_users.html', users=users)
+    pages = max(1, -(-total // current_app.config['USERS_PER_PAGE']))
+    session_counts = {}
+    if session.get('role') == SUPER_ADMIN_ROLE:
+        session_counts = current_app.session_interface.store.count_users(user['id'] for user in users)
+    return render_template('admin_users.html', users=users, total=total, pages=pages,
+                           role_counts=role_counts, teams=teams, filters=filters,
+                           session_counts=session_counts)
+
+# 用户搜索参数：q（工号、姓名、手机号前缀）、role、team、page
+def _user_search_filters():
+    role = request.args.get('role', '').strip()
+    return {
+        'query': request.args.get('q', '').strip(),
+        'role': role if role in (SUPER_ADMIN_ROLE, ADMIN_ROLE, USER_ROLE) else None,
+        'team': request.args.get('team', '').strip() or None,
+        'page': max(1, request.args.get('page', 1, type=int)),
+    }
+
+# 用户搜索（JSON），供用户管理页面和其他需要选择用户的页面使用
+@routes.route('/api/users')
+def search_users_api():
+    if 'loggedin' not in session:
+        return jsonify({'error': '请先登录'}), 401
+    if session.get('role') not in [SUPER_ADMIN_ROLE, ADMIN_ROLE]:
+        return jsonify({'error': '您没有权限访问此接口'}), 403
+    
+    filters = _user_search_filters()
+    per_page = request.args.get('per_page', current_app.config['USERS_PER_PAGE'], type=int)
+    cursor = mysql.connection.cursor()
+    try:
+        users, total = directory.search_users(cursor, per_page=per_page, **filters)
+    finally:
+        cursor.close()
+    
+    return jsonify({
+        'users': [dict(user, created_at=user['created_at'].isoformat() if user['created_at'] else None)
+                  for user in users],
+        'total': total,
+        'page': filters['page'],
+    })
 
 # 管理员专用路由 - 修改用户角色
-@app.route('/admin/change_role/<int:user_id>', methods=['POST'])
+@routes.route('/admin/change_role/<int:user_id>', methods=['POST'])
 @super_admin_required
 def change_user_role(user_id):
     new_role = request.form.get('role')
@@ -172,8 +518,11 @@ def change_user_role(user_id):
     
     # 更新用户角色
     cursor.execute('UPDATE users SET role = %s WHERE id = %s', (new_role, user_id))
+    cluster.bump_version(cursor, 'users')
     mysql.connection.commit()
     cursor.close()
+    user_directory.invalidate()
+    user_contexts.invalidate(user_id)
     
     role_names = {
         'super_admin': '超级管理员',
@@ -185,7 +534,7 @@ def change_user_role(user_id):
     return redirect(url_for('admin_users'))
 
 # 管理员专用路由 - 修改用户区队
-@app.route('/admin/change_team/<int:user_id>', methods=['POST'])
+@routes.route('/admin/change_team/<int:user_id>', methods=['POST'])
 @super_admin_required
 def change_user_team(user_id):
     new_team = request.form.get('team')
@@ -209,21 +558,48 @@ def change_user_team(user_id):
     
     # 更新用户区队
     cursor.execute('UPDATE users SET team = %s WHERE id = %s', (new_team, user_id))
+    cluster.bump_version(cursor, 'users')
     mysql.connection.commit()
     cursor.close()
+    user_directory.invalidate()
+    user_contexts.invalidate(user_id)
     
     flash(f'用户 {target_user["name"]} 的区队已更新为 {new_team}', 'success')
     return redirect(url_for('admin_users'))
 
+# 管理员专用路由 - 强制用户下线（吊销该用户的全部会话，下一个请求即需要重新登录）
+@routes.route('/admin/revoke_sessions/<int:user_id>', methods=['POST'])
+@super_admin_required
+def revoke_user_sessions(user_id):
+    if session.get('id') == user_id:
+        flash('不能强制自己下线，请使用退出登录', 'error')
+        return redirect(url_for('admin_users'))
+    
+    cursor = mysql.connection.cursor()
+    cursor.execute('SELECT name FROM users WHERE id = %s', (user_id,))
+    target_user = cursor.fetchone()
+    cursor.close()
+    
+    if not target_user:
+        flash('用户不存在', 'error')
+        return redirect(url_for('admin_users'))
+    
+    revoked = current_app.session_interface.store.delete_user(user_id)
+    user_contexts.invalidate(user_id)
+    
+    flash(f'已强制用户 {target_user["name"]} 下线（结束 {revoked} 个会话）', 'success')
+    return redirect(url_for('admin_users'))
+
 # 表格模板相关路由
 # 查看表格模板列表
 # 修改 check_templates 路由，传递role和team变量
-@app.route('/check/templates')
+@routes.route('/check/templates')
 def check_templates():
     if 'loggedin' not in session:
         return redirect(url_for('login'))
     
-    cursor = mysql.connection.cursor()
+    # 只读查询，配置了只读副本时从副本读取
+    cursor = mysql.read_connection.cursor()
     
     # 根据用户角色过滤模板
     if session.get('role') == SUPER_ADMIN_ROLE:
@@ -243,7 +619,7 @@ def check_templates():
     return render_template('check_templates.html', templates=templates, role=session.get('role', USER_ROLE), team=session.get('team'))
 
 # 修改 create_check_template 路由
-@app.route('/check/create_template', methods=['GET', 'POST'])
+@routes.route('/check/create_template', methods=['GET', 'POST'])
 def create_check_template():
     if 'loggedin' not in session:
         return redirect(url_for('login'))
@@ -253,10 +629,9 @@ def create_check_template():
         flash('您没有权限创建表格模板', 'error')
         return redirect(url_for('check_templates'))
     
-    # 获取所有区队列表（用于超级管理员）
+    # 获取所有区队列表（用于超级管理员），来自进程内缓存
     cursor = mysql.connection.cursor()
-    cursor.execute('SELECT DISTINCT team FROM users WHERE team IS NOT NULL AND team != ""')
-    teams = [row['team'] for row in cursor.fetchall()]
+    teams = user_directory.teams(cursor)
     cursor.close()
     
     if request.method == 'POST':
@@ -269,10 +644,22 @@ def create_check_template():
             flash('请填写所有必填字段', 'error')
             return redirect(url_for('create_check_template'))
         
+        structure_error = _structure_error(structure)
+        if structure_error:
+            flash(structure_error, 'error')
+            return redirect(url_for('create_check_template'))
+        
+        frequency, key_column, schedule_error = _inspection_schedule_form(structure)
+        if schedule_error:
+            flash(schedule_error, 'error')
+            return redirect(url_for('create_check_template'))
+        
         # 插入新模板
         cursor = mysql.connection.cursor()
-        cursor.execute('INSERT INTO check_templates (name, team, structure, created_by) VALUES (%s, %s, %s, %s)', 
-                      (template_name, team, structure, session['id']))
+        cursor.execute('''
+            INSERT INTO check_templates (name, team, structure, inspection_frequency, inspection_key_column, created_by)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        ''', (template_name, team, structure, frequency, key_column, session['id']))
         mysql.connection.commit()
         cursor.close()
         
@@ -280,16 +667,17 @@ def create_check_template():
         return redirect(url_for('check_templates'))
     
     # 修改这一行，将模板从 create_check_template.html 改为 new_create_check_template.html
-    return render_template('new_create_check_template.html', teams=teams, role=session.get('role', USER_ROLE), team=session.get('team'))
+    return render_template('new_create_check_template.html', teams=teams, role=session.get('role', USER_ROLE), team=session.get('team'),
+                           inspection_frequencies=inspections.FREQUENCIES)
 
 # 编辑表格模板
-@app.route('/check/edit_template/<int:template_id>', methods=['GET', 'POST'])
+@routes.route('/check/edit_template/<int:template_id>', methods=['GET', 'POST'])
 def edit_check_template(template_id):
     if 'loggedin' not in session:
         return redirect(url_for('login'))
     
     cursor = mysql.connection.cursor()
-    cursor.execute('SELECT * FROM check_templates WHERE id = %s', (template_id,))
+    cursor.execute(QUERIES['template_by_id'], (template_id,))
     template = cursor.fetchone()
     
     if not template:
@@ -301,9 +689,8 @@ def edit_check_template(template_id):
         flash('您没有权限编辑此模板', 'error')
         return redirect(url_for('check_templates'))
     
-    # 获取所有区队列表（用于超级管理员）
-    cursor.execute('SELECT DISTINCT team FROM users WHERE team IS NOT NULL AND team != ""')
-    teams = [row['team'] for row in cursor.fetchall()]
+    # 获取所有区队列表（用于超级管理员），来自进程内缓存
+    teams = user_directory.teams(cursor)
     cursor.close()
     
     if request.method == 'POST':
@@ -316,70 +703,208 @@ def edit_check_template(template_id):
             flash('请填写所有必填字段', 'error')
             return redirect(url_for('edit_check_template', template_id=template_id))
         
+        structure_error = _structure_error(structure)
+        if structure_error:
+            flash(structure_error, 'error')
+            return redirect(url_for('edit_check_template', template_id=template_id))
+        
+        frequency, key_column, schedule_error = _inspection_schedule_form(structure)
+        if schedule_error:
+            flash(schedule_error, 'error')
+            return redirect(url_for('edit_check_template', template_id=template_id))
+        
         # 更新模板
         cursor = mysql.connection.cursor()
-        cursor.execute('UPDATE check_templates SET name = %s, team = %s, structure = %s WHERE id = %s', 
-                      (template_name, team, structure, template_id))
+        cursor.execute('''
+            UPDATE check_templates SET name = %s, team = %s, structure = %s, inspection_frequency = %s, inspection_key_column = %s
+            WHERE id = %s
+        ''', (template_name, team, structure, frequency, key_column, template_id))
+        if team != template['team']:
+            # 模板改到其他区队，记录、统计汇总和检查状态随之归入新区队
+            for table in archive.record_tables(include_archive=True):
+                cursor.execute(f'UPDATE {table} SET team = %s WHERE template_id = %s', (team, template_id))
+            stats.move_template(cursor, template_id, team)
+            inspections.move_template(cursor, template_id, team)
+        # 检查状态只与完成时间和设备有关：只改检查周期时保留；开始跟踪或更换设备列时清除，由后台任务从最近的记录重建
+        rebuild_job_id = None
+        if not frequency:
+            inspections.reset_template(cursor, template_id)
+        elif not template['inspection_frequency'] or key_column != template['inspection_key_column']:
+            inspections.reset_template(cursor, template_id)
+            rebuild_job_id = jobs.enqueue(cursor, 'rebuild_inspections', {'template_id': template_id}, session['id'])
+        cluster.bump_version(cursor, 'record_views')
         mysql.connection.commit()
         cursor.close()
         
-        flash('表格模板更新成功', 'success')
+        # 模板结构已变化，清除缓存的编译结果和按此模板渲染的记录页面
+        template_cache.invalidate(template_id)
+        record_view_cache.invalidate_template(template_id)
+        
+        if rebuild_job_id:
+            flash(f'表格模板更新成功，检查状态正在后台重建（任务编号 {rebuild_job_id}）', 'success')
+        else:
+            flash('表格模板更新成功', 'success')
         return redirect(url_for('check_templates'))
     
-    return render_template('edit_check_template.html', template=template, teams=teams)
+    return render_template('edit_check_template.html', template=template, teams=teams,
+                           inspection_frequencies=inspections.FREQUENCIES)
+
+# 保存记录后推送给打开着记录列表的页面（提交事务之后调用）：事件写入 record_events 表并立即提交，
+# 各工作进程的后台线程读到后推送（见 cluster.py）
+def _publish_record_event(action, record_id, template_id, template_name, team, creator_name, created_at, updated_at):
+    cursor = mysql.connection.cursor()
+    cluster.publish_record_event(cursor, team, {
+        'action': action,
+        'id': record_id,
+        'template_id': template_id,
+        'template_name': template_name,
+        'team': team,
+        'creator_name': creator_name,
+        'created_at': created_at.strftime('%Y-%m-%d %H:%M'),
+        'updated_at': updated_at.strftime('%Y-%m-%d %H:%M'),
+    })
+    mysql.connection.commit()
+    cursor.close()
 
 # 查看表格记录列表
-@app.route('/check/records')
+@routes.route('/check/records')
 def check_records():
     if 'loggedin' not in session:
         return redirect(url_for('login'))
     
-    cursor = mysql.connection.cursor()
+    # 读取筛选条件
+    filters = {
+        'template_id': request.args.get('template_id', type=int),
+        'creator': request.args.get('creator', type=int),
+        'date_from': request.args.get('date_from', ''),
+        'date_to': request.args.get('date_to', ''),
+        # 包含已归档的历史记录
+        'history': 1 if request.args.get('history') == '1' else None,
+    }
+    
+    # 只查询列表需要的列，不读取 data 大字段
+    select = '''
+        SELECT r.id, r.template_id, r.created_by, r.created_at, r.updated_at, {archived} AS archived,
+               t.name AS template_name, t.team AS template_team, u.name AS creator_name 
+        FROM {table} r 
+        LEFT JOIN check_templates t ON r.template_id = t.id 
+        LEFT JOIN users u ON r.created_by = u.id 
+    '''
+    conditions = []
+    params = []
+    
+    # 根据用户角色过滤记录：超级管理员可以查看所有记录，管理员和普通用户只能查看自己区队的记录
+    # 按记录自身的 team 列过滤，走 (team, created_at, id) 索引，不需要先关联模板表
+    if session.get('role') != SUPER_ADMIN_ROLE:
+        conditions.append('r.team = %s')
+        params.append(session['team'])
+    
+    if filters['template_id']:
+        conditions.append('r.template_id = %s')
+        params.append(filters['template_id'])
+    if filters['creator']:
+        conditions.append('r.created_by = %s')
+        params.append(filters['creator'])
+    
+    date_conditions, date_params = exporter.date_range_conditions(filters['date_from'], filters['date_to'])
+    conditions.extend(date_conditions)
+    params.extend(date_params)
+    
+    # 游标分页：从上一页最后一条记录的 (created_at, id) 之后继续读取
+    cursor_value = _parse_record_cursor(request.args.get('cursor', ''))
+    if cursor_value:
+        conditions.append('(r.created_at < %s OR (r.created_at = %s AND r.id < %s))')
+        params.extend([cursor_value[0], cursor_value[0], cursor_value[1]])
+    
+    where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+    # 多取一条用于判断是否还有下一页
+    order = ' ORDER BY r.created_at DESC, r.id DESC LIMIT %s'
+    params.append(RECORDS_PAGE_SIZE + 1)
+    
+    if filters['history']:
+        # 在线表和归档表各取一页，合并后再取一页
+        sql = ' UNION ALL '.join(
+            f"SELECT * FROM ({select.format(table=table, archived=int(table == archive.ARCHIVE_TABLE))}{where}{order}) AS page_{index}"
+            for index, table in enumerate(archive.record_tables(include_archive=True)))
+        sql += ' ORDER BY created_at DESC, id DESC LIMIT %s'
+        params = params * 2 + [RECORDS_PAGE_SIZE + 1]
+    else:
+        sql = select.format(table=archive.LIVE_TABLE, archived=0) + where + order
+    
+    # 只读查询，配置了只读副本时从副本读取
+    cursor = mysql.read_connection.cursor()
+    cursor.execute(sql, params)
+    records = list(cursor.fetchall())
     
-    # 根据用户角色过滤记录
+    next_cursor = None
+    if len(records) > RECORDS_PAGE_SIZE:
+        records = records[:RECORDS_PAGE_SIZE]
+        next_cursor = _format_record_cursor(records[-1])
+    
+    # 筛选下拉框的选项（模板和创建者）
     if session.get('role') == SUPER_ADMIN_ROLE:
-        # 超级管理员可以查看所有记录
-        cursor.execute('''
-            SELECT r.*, t.name AS template_name, t.team AS template_team, u.name AS creator_name 
-            FROM check_records r 
-            LEFT JOIN check_templates t ON r.template_id = t.id 
-            LEFT JOIN users u ON r.created_by = u.id 
-            ORDER BY r.created_at DESC
-        ''')
-    elif session.get('role') == ADMIN_ROLE:
-        # 管理员只能查看自己区队的记录
-        cursor.execute('''
-            SELECT r.*, t.name AS template_name, t.team AS template_team, u.name AS creator_name 
-            FROM check_records r 
-            LEFT JOIN check_templates t ON r.template_id = t.id 
-            LEFT JOIN users u ON r.created_by = u.id 
-            WHERE t.team = %s 
-            ORDER BY r.created_at DESC
-        ''', (session['team'],))
+        cursor.execute('SELECT id, name FROM check_templates ORDER BY name')
+        filter_templates = cursor.fetchall()
+        filter_creators = user_directory.members(cursor)
     else:
-        # 普通用户可以查看自己区队的记录
-        cursor.execute('''
-            SELECT r.*, t.name AS template_name, t.team AS template_team, u.name AS creator_name 
-            FROM check_records r 
-            LEFT JOIN check_templates t ON r.template_id = t.id 
-            LEFT JOIN users u ON r.created_by = u.id 
-            WHERE t.team = %s 
-            ORDER BY r.created_at DESC
-        ''', (session['team'],))
-    
-    records = cursor.fetchall()
+        cursor.execute('SELECT id, name FROM check_templates WHERE team = %s ORDER BY name', (session['team'],))
+        filter_templates = cursor.fetchall()
+        filter_creators = user_directory.members(cursor, session['team'])
     cursor.close()
     
-    return render_template('check_records.html', records=records)
+    # 翻页链接需要保留当前的筛选条件
+    page_args = {key: value for key, value in filters.items() if value}
+    
+    return render_template('check_records.html', 
+                         records=records, 
+                         role=session.get('role', USER_ROLE),
+                         filters=filters,
+                         filter_templates=filter_templates,
+                         filter_creators=filter_creators,
+                         page_args=page_args,
+                         is_first_page=cursor_value is None,
+                         next_cursor=next_cursor)
+
+# 记录实时推送（Server-Sent Events），权限与记录列表相同：超级管理员接收全部区队，其他用户只接收自己区队
+# 浏览器断线后带 Last-Event-ID 自动重连并补发错过的事件，无法补发时发送 reset 事件，页面提示刷新
+@routes.route('/check/records/feed')
+def check_records_feed():
+    if 'loggedin' not in session:
+        return jsonify({'error': '请先登录'}), 401
+    
+    team = None if session.get('role') == SUPER_ADMIN_ROLE else session['team']
+    subscription = record_feed.subscribe(team, request.headers.get('Last-Event-ID'))
+    keepalive = current_app.config['FEED_KEEPALIVE_SECONDS']
+    deadline = time.monotonic() + current_app.config['FEED_MAX_CONNECTION_SECONDS']
+    
+    def generate():
+        try:
+            # 重连间隔（毫秒）
+            yield 'retry: 3000\n\n'
+            while time.monotonic() < deadline and not record_feed.closed:
+                events, reset = record_feed.wait(subscription, min(keepalive, max(0, deadline - time.monotonic())))
+                if reset:
+                    yield record_feed.format_reset()
+                for event in events:
+                    yield record_feed.format_event(event)
+                if not events and not reset and not record_feed.closed:
+                    yield ': keepalive\n\n'
+        finally:
+            record_feed.unsubscribe(subscription)
+    
+    return current_app.response_class(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
 
 # 创建表格记录
-@app.route('/check/create_record/<int:template_id>', methods=['GET', 'POST'])
+@routes.route('/check/create_record/<int:template_id>', methods=['GET', 'POST'])
 def create_check_record(template_id):
     if 'loggedin' not in session:
         return redirect(url_for('login'))
     
     cursor = mysql.connection.cursor()
-    cursor.execute('SELECT * FROM check_templates WHERE id = %s', (template_id,))
+    cursor.execute(QUERIES['template_by_id'], (template_id,))
     template = cursor.fetchone()
     
     if not template:
@@ -391,6 +916,9 @@ def create_check_record(template_id):
         flash('您没有权限填写此模板', 'error')
         return redirect(url_for('check_templates'))
     
+    cursor.close()
+    compiled = template_cache.get(template['id'], template['updated_at'], template['structure'])
+    
     if request.method == 'POST':
         data = request.form['data']
         
@@ -399,70 +927,105 @@ def create_check_record(template_id):
             flash('请填写表格数据', 'error')
             return redirect(url_for('create_check_record', template_id=template_id))
         
+        data = _externalize_inline_attachments(data, session['id'])
+        rows, errors = _validate_record_data(compiled, data)
+        if errors:
+            # 校验失败时保留已填写的内容
+            _flash_errors(errors)
+            return render_template('create_check_record.html', template=template, 
+                                   template_structure=compiled.structure, record_data=rows or [{}])
+        
         # 插入新记录
+        created_at = datetime.now().replace(microsecond=0)
         cursor = mysql.connection.cursor()
-        cursor.execute('INSERT INTO check_records (template_id, data, created_by) VALUES (%s, %s, %s)', 
-                      (template_id, data, session['id']))
+        cursor.execute('INSERT INTO check_records (template_id, team, data, created_by, created_at) VALUES (%s, %s, %s, %s, %s)', 
+                      (template_id, template['team'], record_codec.encode_rows(rows, compiled.column_names), session['id'], created_at))
+        record_id = cursor.lastrowid
+        record_hooks.after_record_created(cursor, record_id, template, created_at, compiled, rows)
         mysql.connection.commit()
         cursor.close()
+        _publish_record_event('created', record_id, template_id, template['name'], template['team'], 
+                              session['name'], created_at, created_at)
         
         flash('表格记录创建成功', 'success')
         return redirect(url_for('check_records'))
     
-    # 将JSON字符串转换为Python对象以便在模板中使用
-    import json
-    template_structure = json.loads(template['structure'])
-    
-    cursor.close()
-    
-    return render_template('create_check_record.html', template=template, template_structure=template_structure)
+    return render_template('create_check_record.html', template=template, template_structure=compiled.structure)
 
 # 查看表格记录
-@app.route('/check/view_record/<int:record_id>')
+@routes.route('/check/view_record/<int:record_id>')
 def view_check_record(record_id):
     if 'loggedin' not in session:
         return redirect(url_for('login'))
     
-    cursor = mysql.connection.cursor()
-    cursor.execute('''
-        SELECT r.*, t.* 
-        FROM check_records r 
-        LEFT JOIN check_templates t ON r.template_id = t.id 
-        WHERE r.id = %s
-    ''', (record_id,))
-    record = cursor.fetchone()
-    
-    if not record:
-        flash('记录不存在', 'error')
-        return redirect(url_for('check_records'))
-    
-    # 查询创建者信息
-    cursor.execute('SELECT name FROM users WHERE id = %s', (record['created_by'],))
-    creator = cursor.fetchone()
-    name = creator['name'] if creator else '未知'
-    
-    # 将JSON字符串转换为Python对象以便在模板中使用
-    import json
-    template_structure = json.loads(record['structure'])
-    record_data = json.loads(record['data'])
-    
-    cursor.close()
+    # 最近查看过且未修改的记录直接使用缓存的片段，不查询数据库
+    cached = record_view_cache.get(record_id)
+    if cached is not None:
+        etag, last_modified, title = cached.etag, cached.last_modified, cached.title
+    else:
+        generation = record_view_cache.generation
+        read_connection = mysql.read_connection
+        # 从副本读到的记录可能还没有同步刚才的修改，最近有过失效时不写入缓存
+        settle = mysql.replicas.max_lag if read_connection.replica else 0
+        cursor = read_connection.cursor()
+        # archived=1 时查看归档记录（从包含历史记录的列表中打开）
+        cursor.execute(QUERIES['archived_record_by_id' if request.args.get('archived') == '1' else 'record_by_id'], 
+                       (record_id,))
+        record = cursor.fetchone()
+        cursor.close()
+        
+        if not record:
+            flash('记录不存在', 'error')
+            return redirect(url_for('check_records'))
+        
+        etag, last_modified = page_cache.record_version(record_id, record['updated_at'], record['template_updated_at'])
+        title = record['name']
     
-    return render_template('view_check_record.html', record=record, template_structure=template_structure, record_data=record_data, name=name)
+    # 有待显示的提示消息时不返回 304，以免消息被浏览器缓存的页面吞掉
+    if '_flashes' not in session and page_cache.not_modified(request, etag, last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        # 页面外框（含提示消息）先渲染好，记录内容在其后分块输出
+        page = render_template('view_check_record.html', title=title, fragment=Markup(RECORD_FRAGMENT_MARKER))
+        head, tail = page.split(RECORD_FRAGMENT_MARKER, 1)
+        
+        def generate():
+            yield head
+            if cached is not None:
+                yield from page_cache.split_chunks(cached.html)
+            else:
+                # 创建者姓名已随记录一起查出，不再单独查询 users 表
+                name = record['creator_name'] or '未知'
+                
+                # 表格在服务端按模板结构逐行渲染，渲染完成后存入片段缓存
+                compiled = template_cache.get(record['template_id'], record['template_updated_at'], record['structure'])
+                record_data = record_codec.decode_rows(record['data'])
+                parts = []
+                for chunk in page_cache.buffered(stream_template('view_check_record_fragment.html', record=record, 
+                                                                 template_structure=compiled.structure, 
+                                                                 record_data=record_data, name=name)):
+                    parts.append(chunk)
+                    yield chunk
+                record_view_cache.put(page_cache.CachedView(record_id, record['template_id'], etag, last_modified, 
+                                                            title, ''.join(parts)), generation, settle)
+            yield tail
+        
+        response = current_app.response_class(stream_with_context(generate()), mimetype='text/html')
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # 浏览器可以缓存，但每次使用前都要重新验证
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 # 编辑表格记录
-@app.route('/check/edit_record/<int:record_id>', methods=['GET', 'POST'])
+@routes.route('/check/edit_record/<int:record_id>', methods=['GET', 'POST'])
 def edit_check_record(record_id):
     if 'loggedin' not in session:
         return redirect(url_for('login'))
     
     cursor = mysql.connection.cursor()
-    cursor.execute('''
-        SELECT r.*, t.* 
-        FROM check_records r 
-        LEFT JOIN check_templates t ON r.template_id = t.id 
-        WHERE r.id = %s
-    ''', (record_id,))
+    cursor.execute(QUERIES['record_by_id'], (record_id,))
     record = cursor.fetchone()
     
     if not record:
@@ -474,6 +1037,8 @@ def edit_check_record(record_id):
         flash('只有超级管理员才能修改记录', 'error')
         return redirect(url_for('check_records'))
     
+    compiled = template_cache.get(record['template_id'], record['template_updated_at'], record['structure'])
+    
     if request.method == 'POST':
         data = request.form['data']
         
@@ -482,22 +1047,810 @@ def edit_check_record(record_id):
             flash('请填写表格数据', 'error')
             return redirect(url_for('edit_check_record', record_id=record_id))
         
-        # 更新记录
-        cursor.execute('UPDATE check_records SET data = %s WHERE id = %s', (data, record_id))
+        data = _externalize_inline_attachments(data, session['id'])
+        rows, errors = _validate_record_data(compiled, data)
+        if errors:
+            _flash_errors(errors)
+            cursor.close()
+            return render_template('edit_check_record.html', record=record, 
+                                   template_structure=compiled.structure, record_data=rows or [{}])
+        
+        # 锁定记录并重新读取修改前的数据，同时修改同一条记录时修订历史不会错乱
+        cursor.execute('SELECT data FROM check_records WHERE id = %s FOR UPDATE', (record_id,))
+        old_rows = record_codec.decode_rows(cursor.fetchone()['data'])
+        
+        # 更新记录，修改内容以差异形式保存到修订历史
+        cursor.execute('UPDATE check_records SET data = %s WHERE id = %s', 
+                      (record_codec.encode_rows(rows, compiled.column_names), record_id))
+        revisions.record_edit(cursor, record_id, old_rows, rows, session['id'], datetime.now().replace(microsecond=0), 
+                              record['created_by'], record['created_at'])
+        record_hooks.after_record_saved(cursor, record_id, record['template_id'], record['team'], record['created_at'], 
+                                        compiled, rows, old_rows=old_rows)
+        cluster.bump_version(cursor, 'record_views')
         mysql.connection.commit()
         cursor.close()
+        record_view_cache.invalidate_record(record_id)
+        _publish_record_event('updated', record_id, record['template_id'], record['name'], record['team'], 
+                              record['creator_name'], record['created_at'], datetime.now())
         
         flash('表格记录更新成功', 'success')
         return redirect(url_for('check_records'))
     
     # 将JSON字符串转换为Python对象以便在模板中使用
-    import json
-    template_structure = json.loads(record['structure'])
-    record_data = json.loads(record['data'])
+    template_structure = compiled.structure
+    record_data = record_codec.decode_rows(record['data'])
     
     cursor.close()
     
     return render_template('edit_check_record.html', record=record, template_structure=template_structure, record_data=record_data)
 
+# 查看修订历史需要管理员权限：超级管理员可查看全部，管理员只能查看本区队的记录
+def _can_view_revisions(record):
+    if session.get('role') == SUPER_ADMIN_ROLE:
+        return True
+    return session.get('role') == ADMIN_ROLE and session.get('team') == record['team']
+
+# 记录修订历史页面，rev 参数指定要查看的版本（显示该版本的数据以及与上一版的差别）
+@routes.route('/check/record_history/<int:record_id>')
+def check_record_history(record_id):
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    cursor = mysql.connection.cursor()
+    cursor.execute(QUERIES['record_by_id'], (record_id,))
+    record = cursor.fetchone()
+    
+    if not record:
+        cursor.close()
+        flash('记录不存在', 'error')
+        return redirect(url_for('check_records'))
+    
+    if not _can_view_revisions(record):
+        cursor.close()
+        flash('您没有权限查看此记录的修改历史', 'error')
+        return redirect(url_for('check_records'))
+    
+    history = revisions.history(cursor, record_id)
+    selected = request.args.get('rev', type=int)
+    if selected is None and history:
+        selected = history[-1]['revision_no']
+    
+    selected_rows = changes = None
+    if selected is not None:
+        selected_rows = revisions.rebuild(cursor, record_id, selected)
+        if selected_rows is not None and selected > 0:
+            previous_rows = revisions.rebuild(cursor, record_id, selected - 1)
+            changes = revisions.describe(previous_rows or [], selected_rows)
+    cursor.close()
+    
+    compiled = template_cache.get(record['template_id'], record['template_updated_at'], record['structure'])
+    return render_template('check_record_history.html', record=record, history=history, selected=selected, 
+                           selected_rows=selected_rows, changes=changes, columns=compiled.columns)
+
+# 两个版本之间的差异（JSON）
+# 参数：to（默认最新版本）、from（默认 to 的上一版）
+@routes.route('/api/records/<int:record_id>/diff')
+def check_record_diff(record_id):
+    if 'loggedin' not in session:
+        return jsonify({'error': '请先登录'}), 401
+    
+    cursor = mysql.connection.cursor()
+    try:
+        cursor.execute('''
+            SELECT r.id, t.team FROM check_records r
+            LEFT JOIN check_templates t ON r.template_id = t.id
+            WHERE r.id = %s
+        ''', (record_id,))
+        record = cursor.fetchone()
+        if not record:
+            return jsonify({'error': '记录不存在'}), 404
+        if not _can_view_revisions(record):
+            return jsonify({'error': '您没有权限查看此记录的修改历史'}), 403
+        
+        history = revisions.history(cursor, record_id)
+        if not history:
+            return jsonify({'error': '此记录没有修改过'}), 404
+        to_no = request.args.get('to', history[-1]['revision_no'], type=int)
+        from_no = request.args.get('from', to_no - 1, type=int)
+        to_rows = revisions.rebuild(cursor, record_id, to_no)
+        from_rows = revisions.rebuild(cursor, record_id, from_no)
+    finally:
+        cursor.close()
+    
+    if to_rows is None or from_rows is None:
+        return jsonify({'error': '版本不存在'}), 404
+    return jsonify({
+        'record_id': record_id,
+        'from': from_no,
+        'to': to_no,
+        'changes': revisions.describe(from_rows, to_rows),
+    })
+
+# 按字段和全文搜索记录（基于字段索引表）
+# 参数：template_id、filter（可重复，格式 列名=值 / 列名^=值 / 列名>=值 / 列名<=值）、q（全文关键词）、
+#       date_from、date_to、cursor（上一页返回的 next_cursor）
+@routes.route('/api/records/search')
+def search_check_records():
+    if 'loggedin' not in session:
+        return jsonify({'error': '请先登录'}), 401
+    
+    try:
+        filters = field_index.parse_filters(request.args.getlist('filter'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    text = request.args.get('q', '').strip()
+    if not filters and not text:
+        return jsonify({'error': '请提供筛选条件或搜索关键词'}), 400
+    
+    date_conditions, date_params = exporter.date_range_conditions(request.args.get('date_from', ''), request.args.get('date_to', ''))
+    cursor = mysql.read_connection.cursor()
+    try:
+        records, has_more = field_index.search_records(
+            cursor,
+            team=None if session.get('role') == SUPER_ADMIN_ROLE else session['team'],
+            template_id=request.args.get('template_id', type=int),
+            filters=filters,
+            text=text,
+            date_conditions=date_conditions,
+            date_params=date_params,
+            after=_parse_record_cursor(request.args.get('cursor', '')),
+            limit=RECORDS_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        cursor.close()
+    
+    return jsonify({
+        'records': [{
+            'id': record['id'],
+            'template_id': record['template_id'],
+            'template_name': record['template_name'],
+            'team': record['template_team'],
+            'creator_name': record['creator_name'],
+            'created_at': record['created_at'].strftime('%Y-%m-%d %H:%M:%S'),
+            'url': url_for('view_check_record', record_id=record['id']),
+        } for record in records],
+        'next_cursor': _format_record_cursor(records[-1]) if has_more else None,
+    })
+
+# 导出表格记录（CSV / XLSX），按模板或整个区队，支持日期范围
+# 带 background=1 时提交为后台任务，完成后在“后台任务”页面下载
+@routes.route('/check/export')
+def export_check_records():
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'xlsx'):
+        abort(400)
+    
+    template_id = request.args.get('template_id', type=int)
+    # 超级管理员可以导出任意区队，其他用户只能导出自己区队
+    if session.get('role') == SUPER_ADMIN_ROLE:
+        team = request.args.get('team') or None
+    else:
+        team = session['team']
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+    include_archive = request.args.get('history') == '1'
+    
+    cursor = mysql.connection.cursor()
+    plan = exporter.prepare_plan(cursor, template_cache, template_id, team, date_from, date_to, include_archive)
+    if plan is None:
+        cursor.close()
+        flash('模板不存在或没有权限导出', 'error')
+        return redirect(url_for('check_records'))
+    
+    if request.args.get('background'):
+        job_id = jobs.enqueue(cursor, 'export', {
+            'format': export_format,
+            'template_id': template_id,
+            'team': team,
+            'date_from': date_from,
+            'date_to': date_to,
+            'history': include_archive,
+            # 工作进程生成附件下载地址时使用
+            'base_url': request.url_root,
+        }, session['id'], team=team)
+        mysql.connection.commit()
+        cursor.close()
+        flash(f'导出任务（编号 {job_id}）已提交，完成后可在本页面下载', 'success')
+        return redirect(url_for('job_list'))
+    cursor.close()
+    
+    filename = f"{plan['title']}_{datetime.now().strftime('%Y%m%d')}.{export_format}"
+    body, mimetype = exporter.export_body(mysql.connection, plan, export_format, current_app.config['EXPORT_BATCH_SIZE'],
+                                          lambda sha256: url_for('download_attachment', sha256=sha256, _external=True))
+    return current_app.response_class(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f"attachment; filename*=UTF-8''{quote(filename)}",
+        # 关闭反向代理缓冲，让数据边生成边发送
+        'X-Accel-Buffering': 'no',
+    })
+
+# 后台任务列表：超级管理员看到全部任务，其他用户看到自己提交的任务
+@routes.route('/jobs')
+def job_list():
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    cursor = mysql.connection.cursor()
+    job_rows = jobs.list_jobs(cursor, created_by=None if session.get('role') == SUPER_ADMIN_ROLE else session['id'])
+    cursor.close()
+    
+    return render_template('jobs.html', jobs=job_rows, job_kinds=jobs.JOB_KINDS,
+                           status_labels=jobs.STATUS_LABELS, active_statuses=jobs.ACTIVE_STATUSES,
+                           maintenance_kinds=jobs.MAINTENANCE_KINDS)
+
+# 读取当前用户可以查看的任务（自己提交的，或超级管理员），否则返回 None
+def _visible_job(job_id):
+    cursor = mysql.connection.cursor()
+    job = jobs.get_job(cursor, job_id)
+    cursor.close()
+    if not job or (session.get('role') != SUPER_ADMIN_ROLE and job['created_by'] != session['id']):
+        return None
+    return job
+
+# 任务状态（JSON），任务列表页面轮询进度
+@routes.route('/api/jobs/<int:job_id>')
+def job_status(job_id):
+    if 'loggedin' not in session:
+        return jsonify({'error': '请先登录'}), 401
+    
+    job = _visible_job(job_id)
+    if not job:
+        return jsonify({'error': '任务不存在'}), 404
+    
+    return jsonify({
+        'id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'status_label': jobs.STATUS_LABELS.get(job['status'], job['status']),
+        'progress': job['progress'],
+        'message': job['message'],
+        'error': job['error'],
+        'download_url': url_for('download_job_result', job_id=job['id'])
+                        if job['status'] == jobs.STATUS_SUCCEEDED and job['result_name'] else None,
+    })
+
+# 取消任务
+@routes.route('/jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    job = _visible_job(job_id)
+    if not job:
+        flash('任务不存在', 'error')
+        return redirect(url_for('job_list'))
+    
+    cursor = mysql.connection.cursor()
+    cancelled = jobs.request_cancel(cursor, job_id)
+    mysql.connection.commit()
+    cursor.close()
+    
+    if cancelled:
+        flash(f'任务 {job_id} 已取消' if job['status'] == jobs.STATUS_QUEUED else f'已通知任务 {job_id} 停止执行', 'success')
+    else:
+        flash('任务已经结束，无法取消', 'error')
+    return redirect(url_for('job_list'))
+
+# 下载任务结果文件
+@routes.route('/jobs/<int:job_id>/download')
+def download_job_result(job_id):
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    job = _visible_job(job_id)
+    path = jobs.result_file(current_app.config['JOB_RESULT_FOLDER'], job_id) if job else None
+    if not job or job['status'] != jobs.STATUS_SUCCEEDED or not job['result_name'] or not os.path.exists(path):
+        flash('任务结果不存在或已过期', 'error')
+        return redirect(url_for('job_list'))
+    
+    return send_file(path, as_attachment=True, download_name=job['result_name'])
+
+# 超级管理员启动维护任务（重建统计、补建字段索引、迁移内嵌附件、重建检查状态等）
+@routes.route('/jobs/maintenance', methods=['POST'])
+@super_admin_required
+def start_maintenance_job():
+    kind = request.form.get('kind')
+    if kind not in jobs.MAINTENANCE_KINDS:
+        flash('无效的任务类型', 'error')
+        return redirect(url_for('job_list'))
+    
+    params = {}
+    template_id = request.form.get('template_id', type=int)
+    if template_id and kind in ('rebuild_stats', 'backfill_field_index', 'rebuild_inspections'):
+        params['template_id'] = template_id
+    
+    cursor = mysql.connection.cursor()
+    job_id = jobs.enqueue(cursor, kind, params, session['id'])
+    mysql.connection.commit()
+    cursor.close()
+    
+    flash(f'{jobs.JOB_KINDS[kind]}任务（编号 {job_id}）已提交', 'success')
+    return redirect(url_for('job_list'))
+
+# 批量导入表格记录（管理员上传 CSV / XLSX）
+@routes.route('/check/import', methods=['GET', 'POST'])
+def import_check_records():
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    if session.get('role') not in [SUPER_ADMIN_ROLE, ADMIN_ROLE]:
+        flash('您没有权限导入记录', 'error')
+        return redirect(url_for('check_records'))
+    
+    cursor = mysql.connection.cursor()
+    if session.get('role') == SUPER_ADMIN_ROLE:
+        cursor.execute('SELECT id, name, team FROM check_templates ORDER BY team, name')
+    else:
+        cursor.execute('SELECT id, name, team FROM check_templates WHERE team = %s ORDER BY name', (session['team'],))
+    templates = cursor.fetchall()
+    cursor.close()
+    
+    result = None
+    if request.method == 'POST':
+        template_id = request.form.get('template_id', type=int)
+        batch_size = request.form.get('batch_size', type=int) or current_app.config['IMPORT_BATCH_SIZE']
+        upload = request.files.get('file')
+        
+        template = None
+        if template_id in [item['id'] for item in templates]:
+            cursor = mysql.connection.cursor()
+            cursor.execute(QUERIES['template_by_id'], (template_id,))
+            template = cursor.fetchone()
+            cursor.close()
+        
+        if not template:
+            flash('请选择有效的模板', 'error')
+        elif not upload or not upload.filename:
+            flash('请选择要导入的文件', 'error')
+        else:
+            compiled = template_cache.get(template['id'], template['updated_at'], template['structure'])
+            
+            # 错误报告保存到磁盘，导入完成后提供下载
+            os.makedirs(current_app.config['IMPORT_REPORT_FOLDER'], exist_ok=True)
+            report_id = uuid.uuid4().hex
+            report_path = os.path.join(current_app.config['IMPORT_REPORT_FOLDER'], report_id + '.csv')
+            try:
+                with open(report_path, 'w', encoding='utf-8-sig', newline='') as report_file:
+                    result_counts = importer.import_records(
+                        mysql.connection, compiled, template_id, template['team'], session['id'],
+                        importer.iter_file_rows(upload.stream, upload.filename),
+                        importer.ErrorReport(report_file),
+                        batch_size=max(1, min(batch_size, 10000)),
+                        max_bytes=current_app.config['RECORD_MAX_BYTES'],
+                        max_rows=current_app.config['RECORD_MAX_ROWS'],
+                        after_insert=lambda cursor, floor_id: record_hooks.after_records_imported(
+                            cursor, template, session['id'], compiled, floor_id))
+            except importer.ImportFormatError as e:
+                os.remove(report_path)
+                flash(f'文件格式错误：{e}', 'error')
+            else:
+                if not result_counts['failed']:
+                    os.remove(report_path)
+                    report_id = None
+                result = dict(result_counts, template_name=template['name'], report_id=report_id)
+                flash(f"导入完成：成功 {result_counts['imported']} 条记录，失败 {result_counts['failed']} 行", 
+                      'success' if not result_counts['failed'] else 'error')
+    
+    return render_template('import_check_records.html', templates=templates, result=result,
+                           batch_size=current_app.config['IMPORT_BATCH_SIZE'])
+
+# 下载导入错误报告
+@routes.route('/check/import/errors/<report_id>')
+def download_import_errors(report_id):
+    if session.get('role') not in [SUPER_ADMIN_ROLE, ADMIN_ROLE]:
+        return redirect(url_for('login'))
+    if not re.match(r'^[0-9a-f]{32}$', report_id):
+        abort(404)
+    path = os.path.join(current_app.config['IMPORT_REPORT_FOLDER'], report_id + '.csv')
+    if not os.path.exists(path):
+        abort(404)
+    return send_file(path, mimetype='text/csv', as_attachment=True, download_name='导入错误报告.csv')
+
+# 签发API令牌：离线设备用工号和密码换取令牌（与登录页面共用失败次数限制）
+# 请求体：{"employee_id": "...", "password": "...", "name": "设备名称"}，令牌只返回这一次
+@routes.route('/api/tokens', methods=['POST'])
+def create_api_token():
+    payload = request.get_json(silent=True) or {}
+    employee_id = str(payload.get('employee_id') or '')
+    password = str(payload.get('password') or '').encode('utf-8')
+    if not employee_id or not password:
+        return jsonify({'error': '请提供工号和密码'}), 400
+    
+    retry_after = _login_retry_after(employee_id)
+    if retry_after:
+        return jsonify({'error': '登录失败次数过多，请稍后再试'}), 429, {'Retry-After': str(retry_after)}
+    
+    cursor = mysql.connection.cursor()
+    cursor.execute(QUERIES['user_by_employee_id'], (employee_id,))
+    user = cursor.fetchone()
+    try:
+        with profiler.timed('bcrypt_check'):
+            password_ok = bool(user) and password_hasher.check(password, user['password_hash'])
+    except HasherBusy:
+        cursor.close()
+        return jsonify({'error': '系统繁忙，请稍后再试'}), 503, {'Retry-After': '5'}
+    if not password_ok:
+        cursor.close()
+        _record_login_failure(employee_id)
+        return jsonify({'error': '工号或密码不正确'}), 401
+    
+    login_throttle.reset(('employee_id', employee_id))
+    token_id, token = api_tokens.issue_token(cursor, user['id'], str(payload.get('name') or '离线设备'))
+    mysql.connection.commit()
+    cursor.close()
+    
+    return jsonify({
+        'token': token,
+        'token_id': token_id,
+        'user': {'id': user['id'], 'name': user['name'], 'role': user['role'], 'team': user['team']},
+    }), 201
+
+# 吊销当前使用的API令牌（设备注销时调用）
+@routes.route('/api/tokens/current', methods=['DELETE'])
+def revoke_api_token():
+    user = _api_user()
+    if not user:
+        return jsonify({'error': '令牌无效或已吊销'}), 401
+    cursor = mysql.connection.cursor()
+    api_tokens.revoke_token(cursor, user['token_id'])
+    mysql.connection.commit()
+    cursor.close()
+    return jsonify({'revoked': True})
+
+# 离线设备批量提交记录，每条记录带客户端生成的幂等键，网络中断后重试不会重复创建
+# 请求体：{"records": [{"idempotency_key": "...", "template_id": 1, "data": [{...}], "created_at": "2025-06-01T08:30:00"}]}
+# 通过校验的记录在同一个事务内写入；响应中按提交顺序返回每条记录的状态：
+#   created（已创建）、duplicate（该幂等键已提交过）、invalid（数据不正确）、forbidden（无权填写该模板）
+@routes.route('/api/records/batch', methods=['POST'])
+def submit_record_batch():
+    user = _api_user()
+    if not user:
+        return jsonify({'error': '令牌无效或已吊销'}), 401
+    
+    payload = request.get_json(silent=True)
+    items = payload.get('records') if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': '请求体应为 {"records": [...]}'}), 400
+    if len(items) > current_app.config['API_BATCH_MAX_RECORDS']:
+        return jsonify({'error': f"每次最多提交{current_app.config['API_BATCH_MAX_RECORDS']}条记录"}), 413
+    
+    results = []
+    for index, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        key = item.get('idempotency_key')
+        result = {'index': index, 'idempotency_key': key if isinstance(key, str) else None,
+                  'status': None, 'record_id': None, 'errors': []}
+        if not isinstance(key, str) or not api_tokens.IDEMPOTENCY_KEY_RE.match(key):
+            result.update(status='invalid', errors=['缺少有效的 idempotency_key'])
+        elif not isinstance(item.get('template_id'), int):
+            result.update(status='invalid', errors=['缺少 template_id'])
+        results.append(result)
+    
+    cursor = mysql.connection.cursor()
+    
+    # 已经提交过的幂等键直接返回原记录ID
+    keys = list({result['idempotency_key'] for result in results if result['status'] is None})
+    submitted = {}
+    if keys:
+        cursor.execute(f'''
+            SELECT idempotency_key, record_id FROM check_record_submissions
+            WHERE user_id = %s AND idempotency_key IN ({', '.join(['%s'] * len(keys))})
+        ''', [user['id']] + keys)
+        submitted = {row['idempotency_key']: row['record_id'] for row in cursor.fetchall()}
+    
+    template_ids = list({item['template_id'] for item, result in zip(items, results) if result['status'] is None})
+    templates = {}
+    if template_ids:
+        cursor.execute(f'''
+            SELECT id, name, team, structure, inspection_frequency, inspection_key_column, updated_at
+            FROM check_templates WHERE id IN ({', '.join(['%s'] * len(template_ids))})
+        ''', template_ids)
+        templates = {row['id']: row for row in cursor.fetchall()}
+    
+    # 逐条校验，通过的记录暂存等待写入
+    now = datetime.now().replace(microsecond=0)
+    pending = []
+    seen_keys = set()
+    for item, result in zip(items, results):
+        if result['status'] is not None:
+            continue
+        key = result['idempotency_key']
+        if key in submitted or key in seen_keys:
+            result.update(status='duplicate', record_id=submitted.get(key))
+            continue
+        seen_keys.add(key)
+    
+        template = templates.get(item['template_id'])
+        if not template:
+            result.update(status='invalid', errors=['模板不存在'])
+            continue
+        # 与网页填写相同的权限：普通用户只能填写自己区队的模板
+        if user['role'] == USER_ROLE and user['team'] != template['team']:
+            result.update(status='forbidden', errors=['您没有权限填写此模板'])
+            continue
+    
+        data = item.get('data')
+        if not isinstance(data, str):
+            data = json.dumps(data, ensure_ascii=False)
+        data = _externalize_inline_attachments(data, user['id'])
+        compiled = template_cache.get(template['id'], template['updated_at'], template['structure'])
+        rows, errors = _validate_record_data(compiled, data)
+        if errors:
+            result.update(status='invalid', errors=errors)
+            continue
+    
+        # 离线填写的时间以设备为准，晚于服务器当前时间的按当前时间保存
+        created_at = field_index.parse_datetime(item.get('created_at')) or now
+        pending.append((result, template, compiled, rows, min(created_at.replace(microsecond=0), now)))
+    
+    # 同一批记录在一个事务内写入
+    try:
+        for result, template, compiled, rows, created_at in pending:
+            # 先占用幂等键：另一个请求正在提交同一个键时，这里会等待其事务结束后忽略
+            cursor.execute('''
+                INSERT IGNORE INTO check_record_submissions (user_id, idempotency_key, created_at)
+                VALUES (%s, %s, %s)
+            ''', (user['id'], result['idempotency_key'], now))
+            if cursor.rowcount == 0:
+                result.update(status='duplicate')
+                continue
+    
+            cursor.execute('INSERT INTO check_records (template_id, team, data, created_by, created_at) VALUES (%s, %s, %s, %s, %s)',
+                          (template['id'], template['team'], record_codec.encode_rows(rows, compiled.column_names), user['id'], created_at))
+            record_id = cursor.lastrowid
+            cursor.execute('UPDATE check_record_submissions SET record_id = %s WHERE user_id = %s AND idempotency_key = %s',
+                          (record_id, user['id'], result['idempotency_key']))
+            record_hooks.after_record_created(cursor, record_id, template, created_at, compiled, rows)
+            result.update(status='created', record_id=record_id)
+        mysql.connection.commit()
+    except Exception:
+        mysql.connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    
+    for result, template, compiled, rows, created_at in pending:
+        if result['status'] == 'created':
+            _publish_record_event('created', result['record_id'], template['id'], template['name'], template['team'], 
+                                  user['name'], created_at, created_at)
+    
+    summary = {status: sum(1 for result in results if result['status'] == status)
+               for status in ('created', 'duplicate', 'invalid', 'forbidden')}
+    return jsonify({'results': results, 'summary': summary})
+
+# 上传附件：流式写入磁盘并按内容去重，返回记录中保存的短引用
+@routes.route('/attachments/upload', methods=['POST'])
+def upload_attachment():
+    # 网页使用登录会话，离线设备同步时使用API令牌
+    if 'loggedin' in session:
+        created_by = session['id']
+    else:
+        api_user = _api_user()
+        if not api_user:
+            return jsonify({'error': '请先登录'}), 401
+        created_by = api_user['id']
+    
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'error': '请选择要上传的文件'}), 400
+    
+    sha256, size, _ = attachments.save_stream(current_app.config['ATTACHMENT_FOLDER'], upload.stream)
+    
+    cursor = mysql.connection.cursor()
+    attachments.register_attachment(cursor, sha256, size, 
+                                    upload.mimetype or 'application/octet-stream', 
+                                    upload.filename, created_by)
+    mysql.connection.commit()
+    cursor.close()
+    
+    return jsonify({
+        'ref': attachments.make_ref(sha256),
+        'url': url_for('download_attachment', sha256=sha256),
+        'size': size,
+    })
+
+# 下载附件：内容不可变，支持 ETag 协商缓存和 Range 断点续传
+@routes.route(attachments.DOWNLOAD_PATH + '<sha256>')
+def download_attachment(sha256):
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    if not attachments.SHA256_RE.match(sha256):
+        abort(404)
+    
+    # 内容寻址的附件不会变化，摘要本身就是 ETag，命中时无需查询数据库
+    if request.if_none_match.contains(sha256):
+        response = current_app.response_class(status=304)
+        response.set_etag(sha256)
+        return response
+    
+    path = attachments.attachment_path(current_app.config['ATTACHMENT_FOLDER'], sha256)
+    if not os.path.exists(path):
+        abort(404)
+    
+    cursor = mysql.connection.cursor()
+    cursor.execute('SELECT mime_type, original_name FROM check_attachments WHERE sha256 = %s', (sha256,))
+    meta = cursor.fetchone()
+    cursor.close()
+    
+    response = send_file(path,
+                         mimetype=meta['mime_type'] if meta else None,
+                         download_name=meta['original_name'] if meta else sha256,
+                         etag=sha256,
+                         conditional=True,
+                         max_age=365 * 24 * 3600)
+    # 附件需要登录后访问，只允许浏览器缓存，不允许共享代理缓存
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
+
+# 构建后的静态资源：文件名带内容摘要，内容变化后地址随之变化，浏览器可以长期缓存且不需要重新验证
+# 按 Accept-Encoding 返回 build_assets.py 预先压缩好的 .br 或 .gz 文件
+@routes.route('/assets/<filename>')
+def asset_file(filename):
+    path, encoding = assets.select_variant(current_app.config['ASSET_FOLDER'], filename, 
+                                           request.headers.get('Accept-Encoding', ''))
+    if path is None:
+        abort(404)
+    
+    response = send_file(path, 
+                         mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream', 
+                         conditional=True, 
+                         max_age=current_app.config['ASSET_MAX_AGE'])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+# 统计汇总的查询范围：超级管理员可查看全部或指定区队，其他用户只能查看本区队
+def _stats_scope():
+    if session.get('role') == SUPER_ADMIN_ROLE:
+        team = request.args.get('team', '').strip() or None
+    else:
+        team = session.get('team') or ''
+    days = max(1, min(request.args.get('days', 30, type=int), STATS_MAX_DAYS))
+    return team, request.args.get('template_id', type=int), days
+
+# 统计数据（JSON），只查询统计汇总表，不扫描 check_records
+# 参数：days（最近天数，默认30）、template_id、team（仅超级管理员）
+@routes.route('/api/stats')
+def stats_api():
+    if 'loggedin' not in session:
+        return jsonify({'error': '请先登录'}), 401
+    
+    team, template_id, days = _stats_scope()
+    cursor = mysql.read_connection.cursor()
+    try:
+        result = stats.dashboard(cursor, team=team, template_id=template_id, days=days)
+    finally:
+        cursor.close()
+    return jsonify(dict(result, team=team, days=days))
+
+# 统计报表页面
+@routes.route('/stats')
+def stats_dashboard():
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    team, template_id, days = _stats_scope()
+    cursor = mysql.read_connection.cursor()
+    result = stats.dashboard(cursor, team=team, template_id=template_id, days=days)
+    
+    # 筛选下拉框：模板和区队列表
+    if session.get('role') == SUPER_ADMIN_ROLE:
+        cursor.execute('SELECT id, name, team FROM check_templates ORDER BY team, name')
+    else:
+        cursor.execute('SELECT id, name, team FROM check_templates WHERE team = %s ORDER BY name', (session['team'],))
+    templates = cursor.fetchall()
+    teams = sorted({item['team'] for item in templates if item['team']})
+    cursor.close()
+    
+    max_daily = max([item['record_count'] for item in result['daily']] + [1])
+    return render_template('stats_dashboard.html', stats=result, templates=templates, teams=teams,
+                           role=session.get('role'), selected_team=team, selected_template_id=template_id,
+                           days=days, max_daily=max_daily)
+
+# 逾期检查的查询范围：超级管理员可以选择区队（为空时查询全部区队），其他用户只能查询自己的区队
+def _inspection_scope():
+    if session.get('role') == SUPER_ADMIN_ROLE:
+        team = request.args.get('team', '').strip() or None
+    else:
+        team = session.get('team') or ''
+    return team, request.args.get('template_id', type=int)
+
+# 当前周期内还没有完成的检查（JSON），只读取检查状态表，不扫描 check_records
+@routes.route('/api/inspections/overdue')
+def overdue_inspections_api():
+    if 'loggedin' not in session:
+        return jsonify({'error': '请先登录'}), 401
+    
+    team, template_id = _inspection_scope()
+    now = datetime.now().replace(microsecond=0)
+    cursor = mysql.read_connection.cursor()
+    try:
+        items = inspections.overdue(cursor, team=team, template_id=template_id, now=now, shifts=inspection_shifts)
+    finally:
+        cursor.close()
+    
+    return jsonify({
+        'now': now.strftime('%Y-%m-%d %H:%M:%S'),
+        'team': team,
+        'count': len(items),
+        'items': [{
+            'template_id': item['template_id'],
+            'template_name': item['template_name'],
+            'team': item['team'],
+            'equipment': item['equipment_key'] or None,
+            'frequency': item['frequency'],
+            'period_start': item['period_start'].strftime('%Y-%m-%d %H:%M:%S'),
+            'last_completed_at': item['last_completed_at'].strftime('%Y-%m-%d %H:%M:%S') if item['last_completed_at'] else None,
+            'last_record_url': url_for('view_check_record', record_id=item['last_record_id']) if item['last_record_id'] else None,
+            'create_url': url_for('create_check_record', template_id=item['template_id']),
+        } for item in items],
+    })
+
+# 逾期检查页面，按区队分组
+@routes.route('/inspections')
+def overdue_inspections():
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    team, template_id = _inspection_scope()
+    now = datetime.now().replace(microsecond=0)
+    cursor = mysql.read_connection.cursor()
+    items = inspections.overdue(cursor, team=team, template_id=template_id, now=now, shifts=inspection_shifts)
+    teams = user_directory.teams(cursor) if session.get('role') == SUPER_ADMIN_ROLE else []
+    cursor.close()
+    
+    groups = {}
+    for item in items:
+        groups.setdefault(item['team'] or '', []).append(item)
+    return render_template('inspections.html', groups=groups, total=len(items), teams=teams, now=now,
+                           role=session.get('role'), selected_team=team,
+                           frequencies=inspections.FREQUENCIES)
+
+# 管理员把不再使用的设备从逾期列表中移除（之后再填写该设备的记录时重新开始跟踪）
+@routes.route('/inspections/dismiss', methods=['POST'])
+def dismiss_inspection():
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    template_id = request.form.get('template_id', type=int)
+    equipment_key = request.form.get('equipment_key', '')
+    cursor = mysql.connection.cursor()
+    cursor.execute('SELECT id, team FROM check_templates WHERE id = %s', (template_id,))
+    template = cursor.fetchone()
+    
+    if not template or not equipment_key:
+        cursor.close()
+        flash('检查项不存在', 'error')
+        return redirect(url_for('overdue_inspections'))
+    
+    # 与编辑模板相同的权限
+    if session.get('role') != SUPER_ADMIN_ROLE and (session.get('role') != ADMIN_ROLE or session['team'] != template['team']):
+        cursor.close()
+        flash('您没有权限移除此检查项', 'error')
+        return redirect(url_for('overdue_inspections'))
+    
+    cursor.execute('DELETE FROM inspection_status WHERE template_id = %s AND equipment_key = %s', (template_id, equipment_key))
+    mysql.connection.commit()
+    cursor.close()
+    
+    flash(f'已移除设备“{equipment_key}”', 'success')
+    return redirect(url_for('overdue_inspections', team=request.form.get('team') or None))
+
+# 连接池运行指标，用于根据 MySQL max_connections 规划 worker 数量
+@routes.route('/admin/db_pool')
+def db_pool_stats():
+    if session.get('role') not in [SUPER_ADMIN_ROLE, ADMIN_ROLE]:
+        return jsonify({'error': '权限不足'}), 403
+    return jsonify(mysql.stats())
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""
+记录归档模块
+
+check_records 只增不减，记录列表、导出等按区队查询时要在越来越大的表上排序。
+超过保留期（ARCHIVE_RETENTION_DAYS）的记录由 archive_records.py 移到 check_records_archive：
+
+- 归档表按 created_at 每月一个分区（MySQL RANGE 分区，分区名 pYYYYMM），按时间查询只扫描相关月份；
+  归档前由 ensure_partitions 从 p_future 中拆出需要的月份分区
+- data 原样搬移，已压缩的数据不再解压、重新编码
+- 分批搬移：每批在一个短事务内锁定、复制、删除 batch_size 条记录，不会长时间锁住在线表，中断后重新运行即可继续
+- 修订历史保留；字段索引和全文索引随在线记录删除，字段搜索只覆盖在线记录；统计汇总不受影响
+- 记录列表、查看、导出默认只查询在线表，用户选择"包含历史记录"时才同时查询归档表
+
+归档记录只读，不能再修改。
+"""
+
+from datetime import date, datetime, timedelta
+
+LIVE_TABLE = 'check_records'
+ARCHIVE_TABLE = 'check_records_archive'
+
+
+def record_tables(include_archive=False):
+    """需要查询的记录表，归档表（较早的记录）在前"""
+    return (ARCHIVE_TABLE, LIVE_TABLE) if include_archive else (LIVE_TABLE,)
+
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value):
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def cutoff(retention_days, today=None):
+    """归档截止时间：早于该时间的记录需要归档。按整月归档，取保留期起点所在月份的第一天"""
+    today = today or date.today()
+    start = _month_start(today - timedelta(days=retention_days))
+    return datetime(start.year, start.month, start.day)
+
+
+def ensure_partitions(cursor, before):
+    """
+    确保归档表中 before 之前需要的每个月都有单独的分区，返回新增的分区数。
+    只支持 MySQL 的 RANGE 分区；归档表没有分区时不做任何事。
+    """
+    cursor.execute('''
+        SELECT PARTITION_NAME AS name FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+    ''', (ARCHIVE_TABLE,))
+    names = {row['name'] for row in cursor.fetchall()}
+    if 'p_future' not in names:
+        return 0
+
+    cursor.execute(f'SELECT MIN(created_at) AS oldest FROM {LIVE_TABLE} WHERE created_at < %s', (before,))
+    oldest = cursor.fetchone()['oldest']
+    if oldest is None:
+        return 0
+
+    # 已有的月份分区之前的记录落在已有分区中（如 p_history），只在最后一个月份分区之后拆分
+    months = sorted(name for name in names if name[1:].isdigit())
+    month = _month_start(oldest)
+    if months:
+        last = months[-1]
+        month = max(month, _next_month(date(int(last[1:5]), int(last[5:7]), 1)))
+
+    partitions = []
+    while month < before.date():
+        partitions.append(f"PARTITION p{month:%Y%m} VALUES LESS THAN (TO_DAYS('{_next_month(month):%Y-%m-%d}'))")
+        month = _next_month(month)
+    if not partitions:
+        return 0
+
+    # p_future 中没有数据（只归档到 before 为止），拆分只修改表定义
+    cursor.execute(f'''
+        ALTER TABLE {ARCHIVE_TABLE} REORGANIZE PARTITION p_future INTO (
+            {', '.join(partitions)},
+            PARTITION p_future VALUES LESS THAN MAXVALUE
+        )
+    ''')
+    return len(partitions)
+
+
+def pending_count(cursor, before):
+    cursor.execute(f'SELECT COUNT(*) AS total FROM {LIVE_TABLE} WHERE created_at < %s', (before,))
+    return cursor.fetchone()['total']
+
+
+def archive_batch(cursor, before, batch_size, archived_at=None):
+    """
+    把最早的 batch_size 条早于 before 的记录移到归档表，返回移动的条数。
+    调用方在同一个事务内提交；锁定的只是这一批记录。
+    """
+    cursor.execute(f'''
+        SELECT id FROM {LIVE_TABLE}
+        WHERE created_at < %s
+        ORDER BY created_at, id
+        LIMIT %s
+        FOR UPDATE
+    ''', (before, batch_size))
+    ids = [row['id'] for row in cursor.fetchall()]
+    if not ids:
+        return 0
+
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor.execute(f'''
+        INSERT INTO {ARCHIVE_TABLE} (id, template_id, team, data, created_by, created_at, updated_at, archived_at)
+        SELECT id, template_id, team, data, created_by, created_at, updated_at, %s
+        FROM {LIVE_TABLE} WHERE id IN ({placeholders})
+    ''', [archived_at or datetime.now().replace(microsecond=0)] + ids)
+    cursor.execute(f'DELETE FROM {LIVE_TABLE} WHERE id IN ({placeholders})', ids)
+    return len(ids)
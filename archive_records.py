@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+把超过保留期的检查记录移到归档表的脚本
+
+使用方法：
+1. 确保已执行 check_module_database.sql 中 check_records_archive 表的建表语句
+2. 在命令行中运行：python archive_records.py [--retention-days 730] [--batch-size 500] [--max-batches 0] [--pause 0.2] [--dry-run]
+   也可以由超级管理员在“后台任务”页面启动（见 job_tasks.py）
+
+早于保留期起点所在月份第一天的记录按创建时间从早到晚分批移到 check_records_archive（见 archive.py），
+每批一个短事务，批与批之间暂停 --pause 秒，让在线请求有机会获得锁。中途中断后重新运行即可继续。
+"""
+
+import argparse
+import time
+
+from extensions import mysql, script_app
+import archive
+
+
+def archive_records(retention_days=None, batch_size=500, max_batches=0, pause=0.2, dry_run=False, progress=None):
+    app = script_app()
+    with app.app_context():
+        before = archive.cutoff(retention_days or app.config['ARCHIVE_RETENTION_DAYS'])
+        cursor = mysql.connection.cursor()
+        moved = 0
+
+        try:
+            total = archive.pending_count(cursor, before)
+            print(f"{before:%Y-%m-%d} 之前的记录共 {total} 条需要归档")
+            if dry_run:
+                print("当前为试运行模式，数据库未修改。")
+                return {'pending': total}
+
+            if app.config['ARCHIVE_MONTHLY_PARTITIONS']:
+                added = archive.ensure_partitions(cursor, before)
+                if added:
+                    print(f"归档表新增 {added} 个月份分区")
+
+            batches = 0
+            while True:
+                count = archive.archive_batch(cursor, before, batch_size)
+                # 每批提交一次，避免长时间锁住在线表
+                mysql.connection.commit()
+                if not count:
+                    break
+                moved += count
+                batches += 1
+                print(f"已归档 {moved} / {total} 条记录")
+                if progress:
+                    progress(min(99, moved * 100 // max(total, 1)), f"已归档 {moved} / {total} 条记录")
+                if max_batches and batches >= max_batches:
+                    print(f"已达到本次运行的批数上限（{max_batches} 批），重新运行即可继续")
+                    break
+                if pause:
+                    time.sleep(pause)
+
+            print(f"\n归档完成：共移动 {moved} 条记录。")
+            return {'records': moved}
+
+        except Exception as e:
+            print(f"归档记录时出错: {str(e)}")
+            mysql.connection.rollback()
+            # 作为后台任务运行时把错误交给任务队列处理（重试或标记失败）
+            if progress:
+                raise
+        finally:
+            cursor.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='把超过保留期的检查记录分批移到归档表')
+    parser.add_argument('--retention-days', type=int, help='在线表保留的天数（默认使用 ARCHIVE_RETENTION_DAYS）')
+    parser.add_argument('--batch-size', type=int, default=500, help='每批移动的记录数')
+    parser.add_argument('--max-batches', type=int, default=0, help='本次最多处理的批数，0 表示不限')
+    parser.add_argument('--pause', type=float, default=0.2, help='每批之间暂停的秒数')
+    parser.add_argument('--dry-run', action='store_true', help='只统计不修改')
+    args = parser.parse_args()
+
+    print("正在归档检查记录...\n")
+    archive_records(args.retention_days, args.batch_size, args.max_batches, args.pause, args.dry_run)
@@ -0,0 +1,510 @@
+"""
+静态资源构建模块
+
+页面原来从 CDN 加载 Tailwind 和 Font Awesome，并逐个加载未压缩的 styles.css 和脚本文件，
+矿区网络访问 CDN 很慢或无法访问，文件名不变也不能让浏览器长期缓存。build_assets.py 调用这里的 build：
+
+- 样式：static/vendor 中的 Tailwind、Font Awesome 和 styles.css 合并为一个文件，
+  只保留模板、脚本中出现过的类名对应的规则（未用到的图标字体和动画一并去掉），再压缩空白
+- 脚本：按页面分组合并，去掉注释和缩进
+- 输出文件名带内容摘要（如 site.3f2a9c1e0b7d.css），同时生成 .gz（以及安装了 brotli 时的 .br）预压缩版本，
+  样式中引用的字体等文件同样复制并改为带摘要的文件名
+- manifest.json 记录每个资源对应的文件，由 Manifest 读取；/assets/ 路由按 Accept-Encoding 返回预压缩版本，
+  并设置长期不变的缓存头，再次打开页面时浏览器不再请求这些文件
+
+没有运行构建时，asset_urls 回退为 static 目录中的源文件，static/vendor 中没有的第三方样式使用 CDN 地址。
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # brotli 是可选的，未安装时只生成 .gz
+    brotli = None
+
+# 资源名 -> 源文件（相对 static 目录，按顺序合并）
+BUNDLES = {
+    # 所有页面共用的样式
+    'site.css': ['vendor/tailwind.min.css', 'vendor/fontawesome/css/all.min.css', 'styles.css'],
+    # 所有页面共用的脚本
+    'site.js': ['script.js'],
+    # 填写、修改记录页面的表格表单
+    'record_form.js': ['excel_style_form.js'],
+    # 新建、修改模板页面的表格编辑器
+    'template_editor.js': ['table_editor.js'],
+}
+
+# static/vendor 中没有第三方样式时使用的 CDN 地址
+VENDOR_CDN = {
+    'vendor/tailwind.min.css': 'https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css',
+    'vendor/fontawesome/css/all.min.css': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+}
+
+MANIFEST_NAME = 'manifest.json'
+
+# 小于该字节数的文件不生成预压缩版本
+COMPRESS_MIN_SIZE = 512
+
+# 已经压缩过的格式不再生成预压缩版本
+PRECOMPRESSED_TYPES = ('.woff', '.woff2', '.png', '.jpg', '.jpeg', '.gif')
+
+# 模板、脚本中可能是类名的片段（包括 md:grid-cols-5、w-1/2、py-0.5 这样的 Tailwind 类名）
+CLASS_TOKEN_RE = re.compile(r'[A-Za-z0-9_\-:/.%]+')
+# 选择器中的类名（反斜杠转义的字符按原字符处理）
+SELECTOR_CLASS_RE = re.compile(r'\.((?:\\.|[A-Za-z0-9_\-])+)')
+SELECTOR_NOT_RE = re.compile(r':not\([^()]*\)')
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def used_classes(paths):
+    """读取模板、脚本等文件，返回其中出现过的所有片段（类名的超集）"""
+    tokens = set()
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            tokens.update(CLASS_TOKEN_RE.findall(f.read()))
+    # 选择器字符串（如 '.record-updated-at'）和属性访问中的片段按 . 再拆一次
+    tokens.update(part for token in list(tokens) if '.' in token for part in token.split('.'))
+    return tokens
+
+
+def _skip_string(text, i):
+    """text[i] 为引号，返回字符串结束后的位置"""
+    quote = text[i]
+    i += 1
+    while i < len(text):
+        if text[i] == '\\':
+            i += 2
+            continue
+        if text[i] == quote:
+            return i + 1
+        i += 1
+    return i
+
+
+def _strip_css_comments(text):
+    parts = []
+    i = 0
+    start = 0
+    while i < len(text):
+        ch = text[i]
+        if ch in '"\'':
+            i = _skip_string(text, i)
+        elif text.startswith('/*', i):
+            parts.append(text[start:i])
+            end = text.find('*/', i + 2)
+            i = len(text) if end < 0 else end + 2
+            start = i
+        else:
+            i += 1
+    parts.append(text[start:])
+    return ''.join(parts)
+
+
+_CSS_SPECIAL_RE = re.compile(r'[{};"\']')
+
+
+def _parse_css(text, i=0):
+    """
+    解析样式表，返回 (节点列表, 结束位置)。节点为：
+    ('rule', 选择器, 声明)、('at', 规则头, 子节点列表或 None)、('block', 规则头, 原样保留的内容)
+    """
+    nodes = []
+    start = i
+    while i < len(text):
+        match = _CSS_SPECIAL_RE.search(text, i)
+        if match is None:
+            break
+        i = match.start()
+        ch = text[i]
+        if ch in '"\'':
+            i = _skip_string(text, i)
+        elif ch == ';':
+            # 没有块的语句，如 @charset、@import
+            statement = text[start:i].strip()
+            if statement:
+                nodes.append(('at', statement, None))
+            i += 1
+            start = i
+        elif ch == '}':
+            return nodes, i + 1
+        else:
+            head = text[start:i].strip()
+            if head.startswith('@') and head.split(None, 1)[0] in ('@media', '@supports', '@document'):
+                children, i = _parse_css(text, i + 1)
+                nodes.append(('at', head, children))
+            else:
+                body_start = i + 1
+                depth = 1
+                i += 1
+                while i < len(text) and depth:
+                    match = _CSS_SPECIAL_RE.search(text, i)
+                    if match is None:
+                        i = len(text)
+                        break
+                    i = match.start()
+                    if text[i] in '"\'':
+                        i = _skip_string(text, i)
+                        continue
+                    if text[i] == '{':
+                        depth += 1
+                    elif text[i] == '}':
+                        depth -= 1
+                    i += 1
+                body = text[body_start:i - 1]
+                nodes.append(('block' if head.startswith('@') else 'rule', head, body))
+            start = i
+    return nodes, len(text)
+
+
+def _split_selectors(selector):
+    """按不在括号内的逗号拆分选择器列表"""
+    parts = []
+    depth = 0
+    start = 0
+    for i, ch in enumerate(selector):
+        if ch in '([':
+            depth += 1
+        elif ch in ')]':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            parts.append(selector[start:i])
+            start = i + 1
+    parts.append(selector[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _selector_used(selector, used):
+    names = SELECTOR_CLASS_RE.findall(SELECTOR_NOT_RE.sub('', selector))
+    return all(re.sub(r'\\(.)', r'\1', name) in used for name in names)
+
+
+def _purge_nodes(nodes, used):
+    kept = []
+    for node in nodes:
+        kind, head, body = node
+        if kind == 'rule':
+            selectors = [s for s in _split_selectors(head) if _selector_used(s, used)]
+            if selectors:
+                kept.append(('rule', ','.join(selectors), body))
+        elif kind == 'at' and body is not None:
+            children = _purge_nodes(body, used)
+            if children:
+                kept.append(('at', head, children))
+        else:
+            kept.append(node)
+    return kept
+
+
+def _render_css(nodes):
+    parts = []
+    for kind, head, body in nodes:
+        if kind == 'at' and body is None:
+            parts.append(head + ';')
+        elif kind == 'at':
+            parts.append(head + '{' + _render_css(body) + '}')
+        else:
+            parts.append(head + '{' + body + '}')
+    return ''.join(parts)
+
+
+def _drop_unused_blocks(nodes, css):
+    """去掉没有被引用的 @font-face 和 @keyframes（css 为保留下来的规则）"""
+    kept = []
+    for node in nodes:
+        kind, head, body = node
+        if kind == 'block' and head == '@font-face':
+            family = re.search(r'font-family\s*:\s*([^;]+)', body)
+            if family and family.group(1).strip().strip('"\'') not in css:
+                continue
+        elif kind == 'block' and 'keyframes' in head:
+            name = head.split(None, 1)[-1].strip().strip('"\'')
+            if not re.search(r'(?<![\w-])' + re.escape(name) + r'(?![\w-])', css):
+                continue
+        elif kind == 'at' and body is not None:
+            body = _drop_unused_blocks(body, css)
+            if not body:
+                continue
+            node = (kind, head, body)
+        kept.append(node)
+    return kept
+
+
+def purge_css(text, used):
+    """只保留所有类名都在 used 中的选择器"""
+    nodes, _ = _parse_css(_strip_css_comments(text))
+    nodes = _purge_nodes(nodes, used)
+    rules = _render_css([node for node in nodes if node[0] != 'block'])
+    return _render_css(_drop_unused_blocks(nodes, rules))
+
+
+def minify_css(text):
+    """去掉注释和多余的空白，字符串原样保留"""
+    text = _strip_css_comments(text)
+    parts = []
+    i = 0
+    start = 0
+    while i < len(text):
+        if text[i] in '"\'':
+            parts.append(('code', text[start:i]))
+            end = _skip_string(text, i)
+            parts.append(('string', text[i:end]))
+            i = start = end
+        else:
+            i += 1
+    parts.append(('code', text[start:]))
+
+    output = []
+    for kind, part in parts:
+        if kind == 'code':
+            part = re.sub(r'\s+', ' ', part)
+            part = re.sub(r' ?([{};,>]) ?', r'\1', part)
+            # 冒号前的空格可能是后代选择器（如 "a :hover"），只去掉冒号后的空格
+            part = part.replace(': ', ':')
+            part = part.replace(';}', '}')
+        output.append(part)
+    return ''.join(output).strip()
+
+
+# 出现在这些字符或关键字之后的 / 是正则表达式的开始，而不是除号
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = ('return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'void', 'new', 'delete', 'throw')
+
+
+def _regex_allowed(code):
+    stripped = code.rstrip()
+    if not stripped:
+        return True
+    if stripped[-1] in _REGEX_PRECEDERS:
+        return True
+    word = re.search(r'[A-Za-z_$]+$', stripped)
+    return bool(word) and word.group(0) in _REGEX_KEYWORDS
+
+
+def minify_js(text):
+    """
+    去掉注释、缩进和空行。只做不改变语义的处理：保留换行（不依赖自动插入分号的规则），
+    字符串、模板字符串和正则表达式原样保留
+    """
+    segments = []
+    code = []
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch in '"\'`':
+            segments.append(('code', ''.join(code)))
+            code = []
+            end = _skip_string(text, i)
+            segments.append(('string', text[i:end]))
+            i = end
+        elif text.startswith('//', i):
+            end = text.find('\n', i)
+            i = len(text) if end < 0 else end
+        elif text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            comment = text[i:len(text) if end < 0 else end + 2]
+            code.append('\n' if '\n' in comment else ' ')
+            i += len(comment)
+        elif ch == '/' and _regex_allowed(''.join(code).strip() or (segments[-1][1] if segments else '')):
+            # 正则表达式，跳到结尾的 /（字符类中的 / 不算）
+            j = i + 1
+            in_class = False
+            while j < len(text) and text[j] != '\n':
+                if text[j] == '\\':
+                    j += 2
+                    continue
+                if text[j] == '[':
+                    in_class = True
+                elif text[j] == ']':
+                    in_class = False
+                elif text[j] == '/' and not in_class:
+                    break
+                j += 1
+            j += 1
+            while j < len(text) and text[j].isalpha():
+                j += 1
+            segments.append(('code', ''.join(code)))
+            code = []
+            segments.append(('string', text[i:j]))
+            i = j
+        else:
+            code.append(ch)
+            i += 1
+    segments.append(('code', ''.join(code)))
+
+    output = []
+    for kind, segment in segments:
+        if kind == 'code':
+            segment = re.sub(r'[ \t]+', ' ', segment)
+            segment = re.sub(r' ?\n[\s]*', '\n', segment)
+        output.append(segment)
+    return ''.join(output).strip() + '\n'
+
+
+def fingerprint(name, content):
+    """带内容摘要的文件名：site.css -> site.3f2a9c1e0b7d.css"""
+    base, ext = os.path.splitext(name)
+    return f'{base}.{hashlib.sha256(content).hexdigest()[:12]}{ext}'
+
+
+def _write_output(output_folder, name, content):
+    """写入带摘要的文件和预压缩版本，返回文件名"""
+    filename = fingerprint(name, content)
+    path = os.path.join(output_folder, filename)
+    with open(path, 'wb') as f:
+        f.write(content)
+    if len(content) >= COMPRESS_MIN_SIZE and not filename.lower().endswith(PRECOMPRESSED_TYPES):
+        # mtime 固定为 0，相同内容每次构建得到相同的文件
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) < len(content):
+            with open(path + '.gz', 'wb') as f:
+                f.write(compressed)
+        if brotli is not None:
+            compressed = brotli.compress(content, quality=11)
+            if len(compressed) < len(content):
+                with open(path + '.br', 'wb') as f:
+                    f.write(compressed)
+    return filename
+
+
+def _rewrite_urls(css, source_path, output_folder, outputs):
+    """样式中引用的相对路径文件（字体等）复制到输出目录，改为带摘要的文件名"""
+    source_dir = os.path.dirname(source_path)
+
+    def replace(match):
+        url = match.group(2).strip()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        path = re.split(r'[?#]', url, maxsplit=1)[0]
+        suffix = url[len(path):]
+        target = os.path.normpath(os.path.join(source_dir, path))
+        if not os.path.isfile(target):
+            return match.group(0)
+        if target not in outputs:
+            with open(target, 'rb') as f:
+                outputs[target] = _write_output(output_folder, os.path.basename(target), f.read())
+        return f'url({outputs[target]}{suffix})'
+
+    return CSS_URL_RE.sub(replace, css)
+
+
+def build(static_folder, template_folder, output_folder, scan_paths=(), log=print):
+    """
+    构建 BUNDLES 中的所有资源，写入 output_folder 并更新 manifest.json，返回新的清单。
+    scan_paths 为额外需要扫描类名的文件（模板和 static 中的脚本总会扫描）。
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    scan = [os.path.join(template_folder, name) for name in sorted(os.listdir(template_folder))
+            if name.endswith('.html')]
+    scan += [os.path.join(static_folder, name) for name in sorted(os.listdir(static_folder)) if name.endswith('.js')]
+    used = used_classes(scan + list(scan_paths))
+
+    manifest = {}
+    # 字体等被样式引用的文件：源路径 -> 输出文件名
+    outputs = {}
+    for name, sources in BUNDLES.items():
+        parts = []
+        external = []
+        for source in sources:
+            path = os.path.join(static_folder, source)
+            if not os.path.isfile(path):
+                if source in VENDOR_CDN:
+                    log(f"未找到 {source}，页面将继续从 CDN 加载：{VENDOR_CDN[source]}")
+                    external.append(VENDOR_CDN[source])
+                    continue
+                raise FileNotFoundError(f'资源 {name} 的源文件不存在：{path}')
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+            if name.endswith('.css'):
+                text = minify_css(_rewrite_urls(purge_css(text, used), path, output_folder, outputs))
+            else:
+                text = minify_js(text)
+            parts.append(text)
+
+        content = '\n'.join(parts).encode('utf-8')
+        filename = _write_output(output_folder, name, content)
+        manifest[name] = {'file': filename, 'external': external}
+        original = sum(os.path.getsize(os.path.join(static_folder, s)) for s in sources
+                       if os.path.isfile(os.path.join(static_folder, s)))
+        log(f"{name} -> {filename}（{original} 字节 -> {len(content)} 字节）")
+
+    manifest_path = os.path.join(output_folder, MANIFEST_NAME)
+    previous = load_manifest(output_folder)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'bundles': manifest, 'files': sorted(outputs.values())}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+    # 删除旧文件，保留上一次构建的文件，已打开的页面和正在滚动更新的进程仍然可以加载
+    keep = {MANIFEST_NAME}
+    for data in (previous, {'bundles': manifest, 'files': list(outputs.values())}):
+        for entry in data.get('bundles', {}).values():
+            keep.add(entry['file'])
+        keep.update(data.get('files', []))
+    for filename in os.listdir(output_folder):
+        base = filename[:-3] if filename.endswith(('.gz', '.br')) else filename
+        if base not in keep:
+            os.remove(os.path.join(output_folder, filename))
+    return manifest
+
+
+def load_manifest(output_folder):
+    try:
+        with open(os.path.join(output_folder, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class Manifest:
+    """读取构建清单；manifest.json 被重新生成（修改时间变化）后自动重新读取"""
+
+    def __init__(self, output_folder):
+        self.output_folder = output_folder
+        self._mtime = None
+        self._bundles = {}
+
+    def bundles(self):
+        try:
+            mtime = os.stat(os.path.join(self.output_folder, MANIFEST_NAME)).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self._bundles = load_manifest(self.output_folder).get('bundles', {}) if mtime else {}
+            self._mtime = mtime
+        return self._bundles
+
+    def get(self, name):
+        """资源对应的 {'file': 带摘要的文件名, 'external': CDN 地址列表}，没有构建时返回 None"""
+        return self.bundles().get(name)
+
+
+def fallback_sources(name, static_folder):
+    """没有构建时使用的源文件：(是否为 static 中的文件, static 文件名或 CDN 地址) 列表"""
+    sources = []
+    for source in BUNDLES[name]:
+        if os.path.isfile(os.path.join(static_folder, source)):
+            sources.append((True, source))
+        elif source in VENDOR_CDN:
+            sources.append((False, VENDOR_CDN[source]))
+    return sources
+
+
+def select_variant(output_folder, filename, accept_encoding):
+    """
+    按 Accept-Encoding 选择要返回的文件，返回 (路径, Content-Encoding)；文件不存在时返回 (None, None)。
+    优先 brotli，其次 gzip
+    """
+    if '/' in filename or '\\' in filename or filename.startswith('.') or filename == MANIFEST_NAME:
+        return None, None
+    path = os.path.join(output_folder, filename)
+    if not os.path.isfile(path):
+        return None, None
+    accepted = {part.split(';')[0].strip().lower() for part in accept_encoding.split(',')}
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if encoding in accepted and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
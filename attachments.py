@@ -0,0 +1,176 @@
+"""
+附件存储模块
+
+按文件内容的 SHA-256 摘要保存上传的图片和文件（内容寻址），相同内容只保存一份。
+表格记录中只保存形如 "att:<sha256>" 的短引用，不再把 base64 数据直接写入 check_records.data。
+
+文件在磁盘上的布局：
+    <ATTACHMENT_FOLDER>/ab/cd/abcdef0123...  （前两级目录取摘要的前4个字符，避免单个目录文件过多）
+"""
+
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from io import BytesIO
+from urllib.parse import unquote_to_bytes
+
+# 记录数据中附件引用的前缀
+ATTACHMENT_REF_PREFIX = 'att:'
+
+# 附件下载地址的路径前缀（网页应用的下载路由为 DOWNLOAD_PATH + <sha256>）
+DOWNLOAD_PATH = '/attachments/'
+
+# 导出文件中的附件下载地址（任意站点地址和路径前缀，后跟 DOWNLOAD_PATH 和摘要），导入时还原为附件引用
+_DOWNLOAD_URL_RE = re.compile(r'^(?:https?://[^/?#]+)?(?:/[^?#]*)?' + re.escape(DOWNLOAD_PATH) + r'([0-9a-f]{64})$')
+
+# 流式读写时每次处理的字节数
+CHUNK_SIZE = 64 * 1024
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+DATA_URL_RE = re.compile(r'^data:(?P<mime>[\w.+-]+/[\w.+-]+)?(?P<params>(;[^,;]*)*?)(?P<base64>;base64)?,', re.IGNORECASE)
+
+
+def make_ref(sha256):
+    return ATTACHMENT_REF_PREFIX + sha256
+
+
+def parse_ref(value):
+    """从 "att:<sha256>" 引用中取出摘要，不是附件引用时返回 None"""
+    if isinstance(value, str) and value.startswith(ATTACHMENT_REF_PREFIX):
+        sha256 = value[len(ATTACHMENT_REF_PREFIX):]
+        if SHA256_RE.match(sha256):
+            return sha256
+    return None
+
+
+def download_url(base_url, sha256):
+    """站点地址 base_url（如 https://ems.example.com/）下的附件下载地址，在没有请求上下文的后台任务中使用"""
+    return base_url.rstrip('/') + DOWNLOAD_PATH + sha256
+
+
+def ref_from_download_url(value):
+    """把导出文件中的附件下载地址还原为 "att:<sha256>" 引用，不是下载地址时返回 None"""
+    if not isinstance(value, str):
+        return None
+    match = _DOWNLOAD_URL_RE.match(value.strip())
+    return make_ref(match.group(1)) if match else None
+
+
+def attachment_path(root, sha256):
+    return os.path.join(root, sha256[:2], sha256[2:4], sha256)
+
+
+def save_stream(root, stream):
+    """
+    将文件流写入附件目录，边写边计算摘要，返回 (sha256, size, 是否新文件)。
+    先写入临时文件，摘要计算完成后再原子地移动到最终位置；内容已存在时直接丢弃临时文件。
+    """
+    tmp_dir = os.path.join(root, 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                tmp_file.write(chunk)
+                size += len(chunk)
+
+        sha256 = digest.hexdigest()
+        final_path = attachment_path(root, sha256)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+            return sha256, size, False
+
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)
+        return sha256, size, True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_bytes(root, data):
+    """保存内存中的字节数据，返回值同 save_stream"""
+    return save_stream(root, BytesIO(data))
+
+
+def decode_data_url(value):
+    """
+    解析 FileReader.readAsDataURL 生成的 data URL，返回 (mime_type, 字节数据)。
+    不是 data URL 或无法解码时返回 None。
+    """
+    if not isinstance(value, str):
+        return None
+    match = DATA_URL_RE.match(value)
+    if not match:
+        return None
+
+    payload = value[match.end():]
+    mime_type = match.group('mime') or 'application/octet-stream'
+    try:
+        if match.group('base64'):
+            data = base64.b64decode(payload, validate=False)
+        else:
+            data = unquote_to_bytes(payload)
+    except (binascii.Error, ValueError):
+        return None
+    return mime_type, data
+
+
+def externalize_data_urls(record_data, store):
+    """
+    把记录数据（行数组）里所有 data URL 单元格替换为附件引用。
+    store(mime_type, data) 负责保存附件并返回 sha256。
+    返回 (新的记录数据, 替换的单元格数量)。
+    """
+    rows = record_data if isinstance(record_data, list) else [record_data]
+    replaced = 0
+    new_rows = []
+    for row in rows:
+        if not isinstance(row, dict):
+            new_rows.append(row)
+            continue
+        new_row = {}
+        for key, value in row.items():
+            decoded = decode_data_url(value)
+            if decoded:
+                value = make_ref(store(*decoded))
+                replaced += 1
+            new_row[key] = value
+        new_rows.append(new_row)
+
+    if not isinstance(record_data, list):
+        return new_rows[0], replaced
+    return new_rows, replaced
+
+
+def data_url_store(cursor, root, created_by, dry_run=False):
+    """
+    供 externalize_data_urls 使用的 store：保存附件文件并登记元数据（created_by 为原记录的创建者）。
+    dry_run 时只计算摘要，不写文件和数据库。迁移和压缩历史记录的脚本使用。
+    """
+    def store(mime_type, data):
+        if dry_run:
+            return hashlib.sha256(data).hexdigest()
+        sha256, size, _ = save_bytes(root, data)
+        register_attachment(cursor, sha256, size, mime_type, sha256, created_by)
+        return sha256
+    return store
+
+
+def register_attachment(cursor, sha256, size, mime_type, original_name, created_by):
+    """登记附件元数据；相同内容已登记过时保留第一次上传的信息"""
+    cursor.execute('''
+        INSERT IGNORE INTO check_attachments (sha256, size, mime_type, original_name, created_by)
+        VALUES (%s, %s, %s, %s, %s)
+    ''', (sha256, size, mime_type, original_name, created_by))
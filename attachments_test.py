@@ -0,0 +1,89 @@
+# 附件存储测试：按内容去重保存、附件引用和下载地址、data URL 解析与转存，以及历史记录的附件迁移脚本
+# 运行：python -m pytest attachments_test.py
+
+import base64
+import hashlib
+import io
+import os
+
+import attachments
+import migrate_attachments
+import record_codec
+from conftest import add_template, add_user
+
+IMAGE = b'\x89PNG fake image'
+SHA256 = hashlib.sha256(IMAGE).hexdigest()
+DATA_URL = 'data:image/png;base64,' + base64.b64encode(IMAGE).decode('ascii')
+
+
+def test_save_stream_deduplicates_by_content(tmp_path):
+    root = str(tmp_path)
+    assert attachments.save_stream(root, io.BytesIO(IMAGE)) == (SHA256, len(IMAGE), True)
+    assert attachments.save_bytes(root, IMAGE) == (SHA256, len(IMAGE), False)
+    with open(attachments.attachment_path(root, SHA256), 'rb') as f:
+        assert f.read() == IMAGE
+    assert os.listdir(os.path.join(root, 'tmp')) == []
+
+
+def test_parse_ref():
+    assert attachments.parse_ref(attachments.make_ref(SHA256)) == SHA256
+    assert attachments.parse_ref('att:not-a-digest') is None
+    assert attachments.parse_ref(SHA256) is None
+    assert attachments.parse_ref(None) is None
+
+
+def test_download_url_round_trip():
+    url = attachments.download_url('https://ems.example.com/', SHA256)
+    assert url == f'https://ems.example.com/attachments/{SHA256}'
+    assert attachments.ref_from_download_url(url) == attachments.make_ref(SHA256)
+    assert attachments.ref_from_download_url(f'/ems/attachments/{SHA256}') == attachments.make_ref(SHA256)
+    assert attachments.ref_from_download_url('https://ems.example.com/attachments/abc') is None
+    assert attachments.ref_from_download_url(12) is None
+
+
+def test_decode_data_url():
+    assert attachments.decode_data_url(DATA_URL) == ('image/png', IMAGE)
+    assert attachments.decode_data_url('data:,hello%20world') == ('application/octet-stream', b'hello world')
+    assert attachments.decode_data_url('data:image/png;base64,abc') is None
+    assert attachments.decode_data_url('正常') is None
+    assert attachments.decode_data_url(None) is None
+
+
+def test_externalize_data_urls():
+    saved = []
+
+    def store(mime_type, data):
+        saved.append((mime_type, data))
+        return SHA256
+
+    rows, replaced = attachments.externalize_data_urls([{'设备': '1号泵', '照片': DATA_URL}, {'设备': '2号泵'}], store)
+    assert replaced == 1
+    assert rows == [{'设备': '1号泵', '照片': attachments.make_ref(SHA256)}, {'设备': '2号泵'}]
+    assert saved == [('image/png', IMAGE)]
+
+    row, replaced = attachments.externalize_data_urls({'照片': DATA_URL}, store)
+    assert (row, replaced) == ({'照片': attachments.make_ref(SHA256)}, 1)
+
+
+def test_migrate_attachments_handles_compressed_records(script_app, conn):
+    user_id = add_user(conn)
+    columns = [{'name': '设备', 'type': 'text'}, {'name': '照片', 'type': 'image'}]
+    template_id = add_template(conn, user_id, columns)
+    cursor = conn.cursor()
+    rows = [{'设备': '1号泵', '照片': DATA_URL}]
+    cursor.execute('INSERT INTO check_records (template_id, team, data, created_by) VALUES (%s, %s, %s, %s)',
+                   (template_id, '一区队', record_codec.encode_rows(rows, ['设备', '照片']), user_id))
+    record_id = cursor.lastrowid
+    conn.commit()
+
+    result = migrate_attachments.migrate_attachments()
+
+    assert result == {'records': 1, 'attachments': 1}
+    cursor.execute('SELECT data FROM check_records WHERE id = %s', (record_id,))
+    assert record_codec.decode_rows(cursor.fetchone()['data']) == [{'设备': '1号泵', '照片': attachments.make_ref(SHA256)}]
+    assert os.path.exists(attachments.attachment_path(script_app.config['ATTACHMENT_FOLDER'], SHA256))
+    cursor.execute('SELECT created_by FROM check_attachments WHERE sha256 = %s', (SHA256,))
+    assert cursor.fetchone()['created_by'] == user_id
+
+    # 再次运行时没有需要迁移的附件
+    assert migrate_attachments.migrate_attachments() == {'records': 0, 'attachments': 0}
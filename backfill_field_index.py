@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+为已有记录补建字段索引的脚本
+
+使用方法：
+1. 确保已执行 check_module_database.sql 中 check_record_fields、check_record_texts 两张表的建表语句
+2. 在命令行中运行：python backfill_field_index.py [--template-id 1] [--start-id 0] [--batch-size 500]
+   也可以由超级管理员在“后台任务”页面启动（见 job_tasks.py）
+
+按记录ID分批处理，每批单独提交；中断后可用 --start-id 从上次输出的位置继续。
+索引按"先删后插"重建，重复运行不会产生重复数据。
+"""
+
+import argparse
+
+from extensions import mysql, script_app, template_cache
+from db import QUERIES
+import field_index
+import record_codec
+
+
+def backfill_field_index(template_id=None, start_id=0, batch_size=500, progress=None):
+    app = script_app()
+    with app.app_context():
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute('SELECT id, structure, updated_at FROM check_templates')
+            templates = {row['id']: row for row in cursor.fetchall()}
+
+            last_id = start_id
+            indexed = 0
+            max_id = 0
+            if progress:
+                cursor.execute(QUERIES['max_record_id'])
+                max_id = cursor.fetchone()['max_id'] or 0
+            while True:
+                sql = 'SELECT id, template_id, data, created_at FROM check_records WHERE id > %s'
+                params = [last_id]
+                if template_id:
+                    sql += ' AND template_id = %s'
+                    params.append(template_id)
+                sql += ' ORDER BY id LIMIT %s'
+                params.append(batch_size)
+                cursor.execute(sql, params)
+                records = cursor.fetchall()
+                if not records:
+                    break
+
+                for record in records:
+                    template = templates.get(record['template_id'])
+                    if not template:
+                        continue
+                    try:
+                        rows = record_codec.decode_rows(record['data'])
+                    except ValueError:
+                        print(f"记录 {record['id']} 的数据无法解析，已跳过")
+                        continue
+                    compiled = template_cache.get(template['id'], template['updated_at'], template['structure'])
+                    field_index.index_record(cursor, record['id'], record['template_id'],
+                                             record['created_at'], compiled.columns, rows)
+                    indexed += 1
+
+                mysql.connection.commit()
+                last_id = records[-1]['id']
+                print(f"已处理到记录ID {last_id}，累计建立索引 {indexed} 条")
+                if progress:
+                    progress(min(99, last_id * 100 // max(max_id, 1)), f"已处理到记录ID {last_id}，累计建立索引 {indexed} 条")
+
+            print(f"\n补建完成：共为 {indexed} 条记录建立字段索引。")
+            return {'indexed': indexed, 'last_id': last_id}
+
+        except Exception as e:
+            print(f"补建字段索引时出错: {str(e)}")
+            mysql.connection.rollback()
+            # 作为后台任务运行时把错误交给任务队列处理（重试或标记失败）
+            if progress:
+                raise
+        finally:
+            cursor.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='为已有记录补建字段索引和全文索引')
+    parser.add_argument('--template-id', type=int, help='只处理指定模板的记录')
+    parser.add_argument('--start-id', type=int, default=0, help='从该记录ID之后开始处理')
+    parser.add_argument('--batch-size', type=int, default=500, help='每批处理的记录数')
+    args = parser.parse_args()
+
+    print("正在补建记录字段索引...\n")
+    backfill_field_index(args.template_id, args.start_id, args.batch_size)
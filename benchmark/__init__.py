@@ -0,0 +1,9 @@
+"""
+机电管理系统基准测试
+
+生成可重复的合成数据，用 Flask 测试客户端或 HTTP 请求驱动登录、模板列表、记录列表、
+查看、创建、编辑等主要页面，输出吞吐量和 p50/p95/p99 延迟，可与基线结果比较。
+完全离线运行，数据库可以是本机 MySQL，也可以是 SQLite 替身（sqlite_backend）。
+
+用法见 python -m benchmark --help。
+"""
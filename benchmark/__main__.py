@@ -0,0 +1,301 @@
+"""
+基准测试命令行
+
+生成数据：
+    python -m benchmark seed --backend sqlite --records 100000
+运行测试（进程内测试客户端 / HTTP）：
+    python -m benchmark run --backend sqlite --mode client --concurrency 8 --requests 200
+    python -m benchmark run --backend sqlite --mode http --json result.json --baseline baseline.json
+
+使用 MySQL 时用 --backend mysql --mysql-db <库名> 指定一个专门用于测试的空数据库
+（先执行 complete_database_setup.sql 和 check_module_database.sql 建表，并删除示例用户）。
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+
+from app import create_app
+from db import ConnectionPool, ReplicaSet
+from extensions import mysql
+from benchmark import dataset, loadgen, sqlite_backend
+
+SCENARIOS = ('login', 'templates', 'records', 'view', 'create', 'edit')
+
+
+def configure(args):
+    """按命令行参数新建测试用的应用，返回 (应用, 测试的数据库)"""
+    os.makedirs(args.workdir, exist_ok=True)
+    settings = {
+        'ATTACHMENT_FOLDER': os.path.join(args.workdir, 'attachments'),
+        'SESSION_STORE_PATH': os.path.join(args.workdir, 'sessions.sqlite3'),
+    }
+
+    if args.backend == 'sqlite':
+        app = create_app(settings)
+        path = args.sqlite_path or os.path.join(args.workdir, 'bench.sqlite3')
+        pool = app.extensions['mysql_pool']
+        pool.pool = _pool(app.config, lambda: sqlite_backend.connect(path))
+        # 只读副本的替身：同一个数据库文件的独立连接池，用于测试读写分离的路由
+        if args.sqlite_replicas:
+            pool.replicas = ReplicaSet([(f'sqlite-replica-{index}', _pool(app.config, lambda: sqlite_backend.connect(path)))
+                                        for index in range(args.sqlite_replicas)],
+                                       max_lag=app.config['MYSQL_REPLICA_MAX_LAG'],
+                                       check_interval=app.config['MYSQL_REPLICA_CHECK_INTERVAL'])
+        return app, path
+
+    if not args.mysql_db:
+        sys.exit('使用 MySQL 时必须通过 --mysql-db 指定专门的测试数据库')
+    settings['MYSQL_DB'] = args.mysql_db
+    if args.mysql_host:
+        settings['MYSQL_HOST'] = args.mysql_host
+    if args.mysql_user:
+        settings['MYSQL_USER'] = args.mysql_user
+    if args.mysql_password is not None:
+        settings['MYSQL_PASSWORD'] = args.mysql_password
+    if args.mysql_replicas:
+        settings['MYSQL_REPLICAS'] = args.mysql_replicas
+    return create_app(settings), args.mysql_db
+
+
+def _pool(config, connect):
+    return ConnectionPool(connect,
+                          max_size=config['MYSQL_POOL_SIZE'],
+                          max_lifetime=config['MYSQL_POOL_RECYCLE'],
+                          timeout=config['MYSQL_POOL_TIMEOUT'],
+                          ping_interval=config['MYSQL_POOL_PING_INTERVAL'])
+
+
+def cmd_seed(args):
+    if args.backend == 'sqlite' and args.reset:
+        path = args.sqlite_path or os.path.join(args.workdir, 'bench.sqlite3')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        shutil.rmtree(os.path.join(args.workdir, 'attachments'), ignore_errors=True)
+    app, target = configure(args)
+
+    with app.app_context():
+        cursor = mysql.connection.cursor()
+        cursor.execute('SELECT id FROM users WHERE employee_id = %s', (dataset.SUPER_ADMIN_EMPLOYEE_ID,))
+        exists = cursor.fetchone()
+        cursor.close()
+        if exists:
+            sys.exit(f'{target} 中已有基准测试数据；SQLite 可加 --reset 重新生成')
+
+        print(f'正在生成基准测试数据到 {target} ...')
+        result = dataset.seed(mysql.connection, app.config['ATTACHMENT_FOLDER'],
+                              teams=args.teams, users_per_team=args.users_per_team,
+                              templates_per_team=args.templates_per_team, records=args.records,
+                              rows_per_record=args.rows_per_record, image_ratio=args.image_ratio,
+                              days=args.days, batch_size=args.batch_size, with_index=not args.no_index)
+    print(f"\n生成完成：{result['teams']} 个区队，{result['users']} 个用户，{result['templates']} 个模板，"
+          f"{result['records']} 条记录（平均 {result['avg_record_bytes']} 字节），耗时 {result['seconds']} 秒")
+
+
+class Session:
+    """一个已登录的客户端及其所属区队、可填写的模板"""
+
+    def __init__(self, client, employee_id, team, templates):
+        self.client = client
+        self.employee_id = employee_id
+        self.team = team
+        self.templates = templates
+
+    def login(self):
+        return self.client.post('/login', {'employee_id': self.employee_id,
+                                           'password': dataset.BENCH_PASSWORD})
+
+
+def load_fixture(sample_size=500):
+    """从数据库读取测试需要的用户、模板和记录样本"""
+    cursor = mysql.connection.cursor()
+    try:
+        cursor.execute("SELECT employee_id, team FROM users WHERE employee_id LIKE %s AND role = 'user' ORDER BY id",
+                       ('b%',))
+        users = cursor.fetchall()
+        cursor.execute('SELECT id, team, structure FROM check_templates ORDER BY id')
+        templates = {}
+        for row in cursor.fetchall():
+            templates.setdefault(row['team'], []).append((row['id'], json.loads(row['structure'])['columns']))
+        columns_by_id = {template_id: columns for items in templates.values() for template_id, columns in items}
+
+        cursor.execute('SELECT MIN(id) AS min_id, MAX(id) AS max_id FROM check_records')
+        bounds = cursor.fetchone()
+        if not users or bounds['max_id'] is None:
+            sys.exit('数据库中没有基准测试数据，请先运行 python -m benchmark seed')
+        rng = random.Random(7)
+        ids = [rng.randint(bounds['min_id'], bounds['max_id']) for _ in range(sample_size)]
+        cursor.execute('SELECT id, template_id FROM check_records WHERE id IN (%s)' % ', '.join(['%s'] * len(ids)), ids)
+        records = [(row['id'], row['template_id']) for row in cursor.fetchall()]
+        cursor.execute("SELECT sha256 FROM check_attachments WHERE original_name LIKE %s", ('bench%',))
+        refs = ['att:' + row['sha256'] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+    return users, templates, columns_by_id, records, refs
+
+
+def start_server(app):
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def build_scenarios(columns_by_id, records, refs):
+    def generator(index):
+        return dataset.RecordGenerator(random.Random(index), refs)
+
+    def login(session, index):
+        return session.login() == 302
+
+    def templates(session, index):
+        return session.client.get('/check/templates') == 200
+
+    def record_list(session, index):
+        return session.client.get('/check/records') == 200
+
+    def view(session, index):
+        record_id, _ = records[index % len(records)]
+        return session.client.get(f'/check/view_record/{record_id}') == 200
+
+    def create(session, index):
+        template_id, columns = session.templates[index % len(session.templates)]
+        rows = generator(index).rows(columns, datetime.now())
+        return session.client.post(f'/check/create_record/{template_id}',
+                                   {'data': json.dumps(rows, ensure_ascii=False)}) == 302
+
+    def edit(session, index):
+        record_id, template_id = records[index % len(records)]
+        rows = generator(index).rows(columns_by_id[template_id], datetime.now())
+        return session.client.post(f'/check/edit_record/{record_id}',
+                                   {'data': json.dumps(rows, ensure_ascii=False)}) == 302
+
+    return {'login': login, 'templates': templates, 'records': record_list,
+            'view': view, 'create': create, 'edit': edit}
+
+
+def cmd_run(args):
+    app, target = configure(args)
+    with app.app_context():
+        users, templates, columns_by_id, records, refs = load_fixture()
+
+    server = None
+    if args.mode == 'http':
+        base_url = args.url
+        if not base_url:
+            server, base_url = start_server(app)
+        make_client = lambda: loadgen.HttpClient(base_url)
+    else:
+        make_client = lambda: loadgen.TestClient(app)
+
+    # 每个并发线程一个普通用户会话和一个超级管理员会话（编辑记录需要超级管理员）
+    user_sessions = []
+    admin_sessions = []
+    for index in range(args.concurrency):
+        user = users[index % len(users)]
+        user_sessions.append(Session(make_client(), user['employee_id'], user['team'], templates[user['team']]))
+        admin_sessions.append(Session(make_client(), dataset.SUPER_ADMIN_EMPLOYEE_ID, None, []))
+    for session in user_sessions + admin_sessions:
+        if session.login() != 302:
+            sys.exit(f'用户 {session.employee_id} 登录失败')
+
+    scenarios = build_scenarios(columns_by_id, records, refs)
+    selected = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    results = {}
+    for name in selected:
+        if name not in scenarios:
+            sys.exit(f'未知场景：{name}，可选：{", ".join(SCENARIOS)}')
+        sessions = admin_sessions if name == 'edit' else user_sessions
+        # 登录场景使用 bcrypt，单次耗时长，请求数减少到十分之一
+        total = max(args.concurrency, args.requests // 10) if name == 'login' else args.requests
+        print(f'运行场景 {name}（{total} 次请求，{args.concurrency} 并发）...')
+        results[name] = loadgen.run_scenario(scenarios[name], sessions, total)
+
+    if server is not None:
+        server.shutdown()
+
+    print()
+    print(loadgen.format_report(results))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as output:
+            json.dump({
+                'meta': {
+                    'backend': args.backend,
+                    'target': target,
+                    'mode': args.mode,
+                    'concurrency': args.concurrency,
+                    'requests': args.requests,
+                    'started_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                },
+                'results': results,
+            }, output, ensure_ascii=False, indent=2)
+        print(f'\n结果已写入 {args.json}')
+
+    exit_code = 0
+    if any(result['errors'] for result in results.values()):
+        print('\n存在失败的请求，请检查应用日志')
+        exit_code = 1
+    if args.baseline:
+        regressions = loadgen.compare_with_baseline(results, args.baseline, args.max_regression)
+        if regressions:
+            print('\n与基线相比性能退化：')
+            for line in regressions:
+                print('  ' + line)
+            exit_code = 1
+    sys.exit(exit_code)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description='机电管理系统基准测试')
+    parser.add_argument('--backend', choices=['sqlite', 'mysql'], default='sqlite', help='数据库后端')
+    parser.add_argument('--workdir', default='benchmark_data', help='SQLite 数据库和附件的存放目录')
+    parser.add_argument('--sqlite-path', help='SQLite 数据库文件（默认 <workdir>/bench.sqlite3）')
+    parser.add_argument('--mysql-db', help='MySQL 测试数据库名')
+    parser.add_argument('--mysql-host')
+    parser.add_argument('--mysql-user')
+    parser.add_argument('--mysql-password')
+    parser.add_argument('--mysql-replicas', help='MySQL 只读副本地址，逗号分隔的 host 或 host:port（测试读写分离）')
+    parser.add_argument('--sqlite-replicas', type=int, default=0,
+                        help='SQLite 后端模拟的只读副本数（与主库是同一个文件，测试读写分离的路由）')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser('seed', help='生成合成数据')
+    seed_parser.add_argument('--teams', type=int, default=3, help='区队数')
+    seed_parser.add_argument('--users-per-team', type=int, default=20, help='每个区队的用户数（第一个为管理员）')
+    seed_parser.add_argument('--templates-per-team', type=int, default=3, help='每个区队的模板数')
+    seed_parser.add_argument('--records', type=int, default=10000, help='记录总数')
+    seed_parser.add_argument('--rows-per-record', type=int, default=3, help='每条记录的平均行数')
+    seed_parser.add_argument('--image-ratio', type=float, default=0.2, help='包含图片的记录比例')
+    seed_parser.add_argument('--days', type=int, default=180, help='记录创建时间分布的天数')
+    seed_parser.add_argument('--batch-size', type=int, default=1000, help='每批写入的记录数')
+    seed_parser.add_argument('--no-index', action='store_true', help='不生成字段索引（加快生成速度）')
+    seed_parser.add_argument('--reset', action='store_true', help='删除已有的 SQLite 数据库后重新生成')
+    seed_parser.set_defaults(func=cmd_seed)
+
+    run_parser = commands.add_parser('run', help='运行基准测试')
+    run_parser.add_argument('--mode', choices=['client', 'http'], default='client',
+                            help='client：Flask 测试客户端；http：HTTP 请求')
+    run_parser.add_argument('--url', help='HTTP 模式下的服务地址（默认在本进程内启动服务）')
+    run_parser.add_argument('--concurrency', type=int, default=4, help='并发线程数')
+    run_parser.add_argument('--requests', type=int, default=200, help='每个场景的请求数')
+    run_parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='要运行的场景，逗号分隔')
+    run_parser.add_argument('--json', help='把结果写入 JSON 文件')
+    run_parser.add_argument('--baseline', help='基线结果 JSON 文件，p95 退化超过阈值时返回非零退出码')
+    run_parser.add_argument('--max-regression', type=float, default=0.2, help='允许的 p95 退化比例')
+    run_parser.set_defaults(func=cmd_run)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+"""
+基准测试数据生成
+
+按参数生成可重复的合成数据：若干区队，每个区队一名管理员和若干普通用户，
+模板结构取自 add_sample_templates.py 的示例模板（另加一个图片列），
+记录的行数、文本长度和图片单元格比例接近实际使用情况。
+
+字段索引和统计汇总与应用保存记录时写入的内容一致（使用相同的 field_index / stats 函数），
+但按批次 executemany 写入，生成几百万条记录也不需要逐条走保存流程。
+"""
+
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+import bcrypt
+
+import attachments
+import field_index
+import record_codec
+import stats
+from add_sample_templates import sample_templates
+
+# 所有基准测试用户的密码
+BENCH_PASSWORD = 'bench123456'
+SUPER_ADMIN_EMPLOYEE_ID = 'benchadmin'
+
+# 附加到每个示例模板的图片列
+IMAGE_COLUMN = {'name': '现场照片', 'type': 'image'}
+
+_DEVICES = ['主排水泵', '局部通风机', '带式输送机', '提升绞车', '空气压缩机', '变电所开关柜', '乳化液泵站', '采煤机']
+_PLACES = ['一水平', '二水平', '中央泵房', '主井', '副井', '运输大巷', '采区变电所', '工作面']
+_PEOPLE = ['张伟', '王芳', '李强', '刘洋', '陈静', '杨磊', '赵军', '黄敏']
+_SENTENCES = [
+    '设备运行声音正常，温度在允许范围内。',
+    '发现轴承有轻微异响，已安排下一班复查。',
+    '电缆吊挂整齐，无挤压破损现象。',
+    '保护装置动作试验合格，记录已签字确认。',
+    '油位低于标线，已补充润滑油至规定位置。',
+    '现场清理干净，无积水积煤。',
+    '紧固件有松动，已现场紧固处理。',
+    '巡检中未发现明显隐患，继续观察运行情况。',
+]
+
+
+def team_name(team_no):
+    return f'第{team_no}区队'
+
+
+def build_templates(templates_per_team):
+    """返回模板定义列表 [(名称, 结构)]，结构为示例模板加上图片列"""
+    shapes = []
+    for sample in sample_templates:
+        structure = json.loads(sample['structure'])
+        structure['columns'].append(dict(IMAGE_COLUMN))
+        shapes.append((sample['name'], structure))
+
+    templates = []
+    for index in range(templates_per_team):
+        name, structure = shapes[index % len(shapes)]
+        round_no = index // len(shapes)
+        templates.append((name if round_no == 0 else f'{name}（{round_no + 1}）', structure))
+    return templates
+
+
+class RecordGenerator:
+    """按模板结构生成记录数据"""
+
+    def __init__(self, rng, attachment_refs, rows_per_record=3, image_ratio=0.2, anomaly_ratio=0.05):
+        self.rng = rng
+        self.attachment_refs = attachment_refs
+        self.rows_per_record = rows_per_record
+        self.image_ratio = image_ratio
+        self.anomaly_ratio = anomaly_ratio
+
+    def _value(self, column, created_at, with_image):
+        rng = self.rng
+        column_type = column.get('type', 'text')
+        if column_type == 'datetime':
+            return (created_at - timedelta(minutes=rng.randint(0, 600))).strftime('%Y-%m-%dT%H:%M')
+        if column_type == 'select':
+            options = column.get('options') or ['']
+            # 第一个选项（"正常"、"一般"、"合格"）占绝大多数
+            if len(options) == 1 or rng.random() >= self.anomaly_ratio:
+                return options[0]
+            return rng.choice(options[1:])
+        if column_type == 'textarea':
+            if not column.get('required') and rng.random() < 0.5:
+                return ''
+            return ''.join(rng.choice(_SENTENCES) for _ in range(rng.randint(1, 3)))
+        if column_type == 'number':
+            return str(round(rng.uniform(0, 100), 2))
+        if column_type == 'checkbox':
+            return rng.random() < 0.9
+        if column_type in ('image', 'file'):
+            return rng.choice(self.attachment_refs) if with_image and self.attachment_refs else ''
+        name = column['name']
+        if '人' in name:
+            return rng.choice(_PEOPLE)
+        if '区域' in name or '地点' in name:
+            return rng.choice(_PLACES)
+        if '编号' in name:
+            return f'JD-{rng.randint(1, 999):03d}'
+        if not column.get('required') and rng.random() < 0.6:
+            return ''
+        return f'{rng.choice(_PLACES)}{rng.choice(_DEVICES)}'
+
+    def rows(self, columns, created_at):
+        count = self.rng.randint(1, max(1, self.rows_per_record * 2 - 1))
+        with_image = self.rng.random() < self.image_ratio
+        return [{column['name']: self._value(column, created_at, with_image) for column in columns}
+                for _ in range(count)]
+
+
+def _seed_attachments(cursor, folder, rng, count, created_by):
+    """生成若干图片附件（随机内容，大小 20KB～200KB），返回附件引用列表"""
+    refs = []
+    for index in range(count):
+        content = b'\x89PNG\r\n\x1a\n' + rng.randbytes(rng.randint(20 * 1024, 200 * 1024))
+        sha256, size, _ = attachments.save_bytes(folder, content)
+        attachments.register_attachment(cursor, sha256, size, 'image/png', f'bench_{index}.png', created_by)
+        refs.append(attachments.make_ref(sha256))
+    return refs
+
+
+def seed(conn, attachment_folder, teams=3, users_per_team=20, templates_per_team=3, records=10000,
+         rows_per_record=3, image_ratio=0.2, days=180, batch_size=1000, with_index=True, random_seed=42):
+    """生成基准测试数据，返回统计信息"""
+    rng = random.Random(random_seed)
+    started = time.monotonic()
+    cursor = conn.cursor()
+    try:
+        # bcrypt 很慢，所有用户共用同一个密码哈希
+        password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+        cursor.execute('''
+            INSERT INTO users (name, employee_id, phone, password_hash, role, team)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        ''', ('基准测试超级管理员', SUPER_ADMIN_EMPLOYEE_ID, '19900000000', password_hash, 'super_admin', None))
+        super_admin_id = cursor.lastrowid
+
+        users = [(f'测试用户{team_no}-{index}', f'b{team_no:03d}{index:05d}', f'13{team_no:03d}{index:06d}',
+                  password_hash, 'admin' if index == 0 else 'user', team_name(team_no))
+                 for team_no in range(1, teams + 1) for index in range(users_per_team)]
+        cursor.executemany('''
+            INSERT INTO users (name, employee_id, phone, password_hash, role, team)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        ''', users)
+        cursor.execute('SELECT id, team FROM users WHERE employee_id LIKE %s AND team IS NOT NULL', ('b%',))
+        team_users = {}
+        for row in cursor.fetchall():
+            team_users.setdefault(row['team'], []).append(row['id'])
+
+        templates = []
+        for team_no in range(1, teams + 1):
+            team = team_name(team_no)
+            for name, structure in build_templates(templates_per_team):
+                cursor.execute('''
+                    INSERT INTO check_templates (name, team, structure, created_by) VALUES (%s, %s, %s, %s)
+                ''', (name, team, json.dumps(structure, ensure_ascii=False), team_users[team][0]))
+                templates.append((cursor.lastrowid, team, structure['columns']))
+
+        refs = _seed_attachments(cursor, attachment_folder, rng, 20, super_admin_id)
+        conn.commit()
+
+        generator = RecordGenerator(rng, refs, rows_per_record, image_ratio)
+        builder = stats.RollupBuilder()
+        cursor.execute('SELECT COALESCE(MAX(id), 0) AS max_id FROM check_records')
+        next_id = cursor.fetchone()['max_id'] + 1
+        span = timedelta(days=days).total_seconds()
+        begin = datetime.now().replace(microsecond=0) - timedelta(days=days)
+
+        total_bytes = 0
+        for batch_start in range(0, records, batch_size):
+            batch = []
+            fields = []
+            texts = []
+            for index in range(batch_start, min(batch_start + batch_size, records)):
+                template_id, team, columns = templates[rng.randrange(len(templates))]
+                created_at = begin + timedelta(seconds=int(span * index / records) + rng.randint(0, 60))
+                rows = generator.rows(columns, created_at)
+                data = record_codec.encode_rows(rows, [column['name'] for column in columns])
+                total_bytes += len(data)
+                record_id = next_id + index
+                batch.append((record_id, template_id, team, data, rng.choice(team_users[team]), created_at, created_at))
+                builder.add(team, template_id, created_at, columns, rows)
+                if with_index:
+                    record_fields, content = field_index.extract_fields(columns, rows)
+                    fields.extend((record_id, template_id, created_at) + field for field in record_fields)
+                    if content:
+                        texts.append((record_id, template_id, content))
+
+            cursor.executemany('''
+                INSERT INTO check_records (id, template_id, team, data, created_by, created_at, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ''', batch)
+            if fields:
+                cursor.executemany('''
+                    INSERT INTO check_record_fields
+                        (record_id, template_id, created_at, row_no, field_name, value_text, value_num, value_time)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ''', fields)
+            if texts:
+                cursor.executemany('INSERT INTO check_record_texts (record_id, template_id, content) VALUES (%s, %s, %s)',
+                                   texts)
+            conn.commit()
+            done = batch_start + len(batch)
+            if done % (batch_size * 20) == 0 or done == records:
+                print(f'  已生成 {done} / {records} 条记录')
+
+        builder.write(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return {
+        'teams': teams,
+        'users': len(users) + 1,
+        'templates': len(templates),
+        'records': records,
+        'avg_record_bytes': total_bytes // records if records else 0,
+        'seconds': round(time.monotonic() - started, 1),
+    }
@@ -0,0 +1,163 @@
+"""
+负载生成与结果统计
+
+两种客户端使用相同的接口（get / post 返回状态码，自动保存登录 Cookie）：
+- TestClient：通过 Flask 测试客户端在进程内调用，测量的是应用本身的处理耗时
+- HttpClient：通过 HTTP 请求本机或指定地址的服务，包含网络和 WSGI 服务器的开销
+
+run_scenario 用多个线程并发执行同一个场景，统计吞吐量和 p50/p95/p99 延迟。
+"""
+
+import http.client
+import json
+import math
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+
+class TestClient:
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def _finish(self, response):
+        status = response.status_code
+        response.get_data()
+        response.close()
+        return status
+
+    def get(self, path):
+        return self._finish(self._client.get(path))
+
+    def post(self, path, data):
+        return self._finish(self._client.post(path, data=data))
+
+
+class HttpClient:
+    """基于 http.client 的长连接客户端，每个线程一个"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self._host = parts.hostname
+        self._port = parts.port or 80
+        self._prefix = parts.path.rstrip('/')
+        self._cookies = {}
+        self._conn = None
+
+    def _request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self._cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self._cookies.items())
+        for attempt in range(2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self._host, self._port, timeout=60)
+            try:
+                self._conn.request(method, self._prefix + path, body=body, headers=headers)
+                response = self._conn.getresponse()
+                response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # 服务端关闭了长连接，重新连接后重试一次
+                self._conn.close()
+                self._conn = None
+                if attempt:
+                    raise
+        for header in response.msg.get_all('Set-Cookie') or []:
+            cookie = SimpleCookie()
+            cookie.load(header)
+            for name, morsel in cookie.items():
+                self._cookies[name] = morsel.value
+        return response.status
+
+    def get(self, path):
+        return self._request('GET', path)
+
+    def post(self, path, data):
+        return self._request('POST', path, urlencode(data),
+                             {'Content-Type': 'application/x-www-form-urlencoded'})
+
+
+def percentile(sorted_values, fraction):
+    """最近秩法求分位数"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        'requests': count,
+        'errors': errors,
+        'throughput': round(count / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / count * 1000, 2) if count else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def run_scenario(scenario, clients, total_requests):
+    """
+    用 len(clients) 个线程并发执行 scenario(client, index)，共 total_requests 次。
+    scenario 返回 True 表示结果符合预期。
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+
+    def worker(client):
+        local = []
+        local_errors = 0
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                break
+            started = time.perf_counter()
+            try:
+                ok = scenario(client, index)
+            except Exception:
+                ok = False
+            local.append(time.perf_counter() - started)
+            if not ok:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker, args=(client,)) for client in clients]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], time.perf_counter() - started)
+
+
+def format_report(results):
+    lines = [f"{'场景':<10}{'请求数':>8}{'错误':>6}{'吞吐(次/秒)':>13}{'平均(ms)':>10}"
+             f"{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}"]
+    for name, result in results.items():
+        lines.append(f"{name:<10}{result['requests']:>8}{result['errors']:>6}{result['throughput']:>13}"
+                     f"{result['mean_ms']:>10}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}")
+    return '\n'.join(lines)
+
+
+def compare_with_baseline(results, baseline_path, max_regression):
+    """与基线结果比较 p95，返回退化超过 max_regression（比例）的场景说明列表"""
+    with open(baseline_path, encoding='utf-8') as source:
+        baseline = json.load(source)['results']
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous['p95_ms']:
+            continue
+        ratio = result['p95_ms'] / previous['p95_ms'] - 1
+        if ratio > max_regression:
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {result['p95_ms']}ms（+{ratio:.0%}）")
+    return regressions
@@ -0,0 +1,244 @@
+-- 基准测试用 SQLite 表结构
+-- 与 complete_database_setup.sql（users）和 check_module_database.sql 中的表一一对应，
+-- 修改 MySQL 表结构时需要同步修改这里
+
+CREATE TABLE users (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  employee_id varchar(20) NOT NULL UNIQUE,
+  name varchar(50) NOT NULL,
+  phone varchar(20) NOT NULL UNIQUE,
+  password_hash varchar(255) NOT NULL,
+  role varchar(20) NOT NULL DEFAULT 'user',
+  team varchar(50) DEFAULT NULL,
+  created_at timestamp DEFAULT (datetime('now', 'localtime')),
+  updated_at timestamp DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX idx_users_role ON users (role);
+CREATE INDEX idx_users_team_role ON users (team, role);
+CREATE INDEX idx_users_name ON users (name);
+
+CREATE TABLE check_templates (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name varchar(100) NOT NULL,
+  team varchar(50) NOT NULL,
+  structure text NOT NULL,
+  inspection_frequency varchar(10) DEFAULT NULL,
+  inspection_key_column varchar(100) DEFAULT NULL,
+  created_by int NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+  created_at timestamp DEFAULT (datetime('now', 'localtime')),
+  updated_at timestamp DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX idx_check_templates_team ON check_templates (team);
+CREATE INDEX idx_check_templates_created_by ON check_templates (created_by);
+
+CREATE TABLE check_records (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  template_id int NOT NULL REFERENCES check_templates (id) ON DELETE CASCADE,
+  team varchar(50) DEFAULT NULL,
+  data blob NOT NULL,
+  created_by int NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+  created_at timestamp DEFAULT (datetime('now', 'localtime')),
+  updated_at timestamp DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX idx_check_records_created_at_id ON check_records (created_at DESC, id DESC);
+CREATE INDEX idx_check_records_team_created_at_id ON check_records (team, created_at DESC, id DESC);
+CREATE INDEX idx_check_records_template_created_at_id ON check_records (template_id, created_at DESC, id DESC);
+CREATE INDEX idx_check_records_created_by_created_at_id ON check_records (created_by, created_at DESC, id DESC);
+
+-- MySQL 中 updated_at 为 ON UPDATE CURRENT_TIMESTAMP，这里用触发器实现
+CREATE TRIGGER trg_users_updated_at AFTER UPDATE ON users
+FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+  UPDATE users SET updated_at = datetime('now', 'localtime') WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER trg_check_templates_updated_at AFTER UPDATE ON check_templates
+FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+  UPDATE check_templates SET updated_at = datetime('now', 'localtime') WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER trg_check_records_updated_at AFTER UPDATE ON check_records
+FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+  UPDATE check_records SET updated_at = datetime('now', 'localtime') WHERE id = NEW.id;
+END;
+
+CREATE TABLE check_attachments (
+  sha256 char(64) PRIMARY KEY,
+  size bigint NOT NULL,
+  mime_type varchar(100) NOT NULL,
+  original_name varchar(255) NOT NULL,
+  created_by int DEFAULT NULL,
+  created_at timestamp DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE check_record_fields (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  record_id int NOT NULL REFERENCES check_records (id) ON DELETE CASCADE,
+  template_id int NOT NULL,
+  created_at timestamp DEFAULT NULL,
+  row_no smallint NOT NULL,
+  field_name varchar(100) NOT NULL,
+  value_text varchar(255) DEFAULT NULL,
+  value_num decimal(20, 6) DEFAULT NULL,
+  value_time datetime DEFAULT NULL
+);
+CREATE INDEX idx_check_record_fields_record_id ON check_record_fields (record_id);
+CREATE INDEX idx_check_record_fields_template_field_text ON check_record_fields (template_id, field_name, value_text, created_at);
+CREATE INDEX idx_check_record_fields_template_field_num ON check_record_fields (template_id, field_name, value_num);
+CREATE INDEX idx_check_record_fields_template_field_time ON check_record_fields (template_id, field_name, value_time);
+
+-- 全文索引在 SQLite 中以 bench_match() 函数逐行匹配代替
+CREATE TABLE check_record_texts (
+  record_id int PRIMARY KEY REFERENCES check_records (id) ON DELETE CASCADE,
+  template_id int NOT NULL,
+  content text NOT NULL
+);
+
+CREATE TABLE stat_daily_templates (
+  team varchar(50) NOT NULL,
+  template_id int NOT NULL,
+  stat_date date NOT NULL,
+  record_count int NOT NULL DEFAULT 0,
+  row_count int NOT NULL DEFAULT 0,
+  required_total int NOT NULL DEFAULT 0,
+  required_filled int NOT NULL DEFAULT 0,
+  PRIMARY KEY (team, template_id, stat_date)
+);
+CREATE INDEX idx_stat_daily_templates_team_date ON stat_daily_templates (team, stat_date);
+CREATE INDEX idx_stat_daily_templates_stat_date ON stat_daily_templates (stat_date);
+
+CREATE TABLE stat_daily_options (
+  team varchar(50) NOT NULL,
+  template_id int NOT NULL,
+  stat_date date NOT NULL,
+  field_name varchar(100) NOT NULL,
+  option_value varchar(100) NOT NULL,
+  value_count int NOT NULL DEFAULT 0,
+  PRIMARY KEY (team, template_id, stat_date, field_name, option_value)
+);
+CREATE INDEX idx_stat_daily_options_stat_date ON stat_daily_options (stat_date);
+
+CREATE TABLE api_tokens (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id int NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+  token_hash char(64) NOT NULL UNIQUE,
+  name varchar(100) NOT NULL,
+  created_at timestamp DEFAULT (datetime('now', 'localtime')),
+  last_used_at timestamp DEFAULT NULL,
+  revoked_at timestamp DEFAULT NULL
+);
+CREATE INDEX idx_api_tokens_user_id ON api_tokens (user_id);
+
+CREATE TABLE check_record_submissions (
+  user_id int NOT NULL,
+  idempotency_key varchar(64) NOT NULL,
+  record_id int DEFAULT NULL,
+  created_at timestamp DEFAULT (datetime('now', 'localtime')),
+  PRIMARY KEY (user_id, idempotency_key)
+);
+CREATE INDEX idx_check_record_submissions_record_id ON check_record_submissions (record_id);
+
+CREATE TABLE check_record_revisions (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  record_id int NOT NULL,
+  revision_no int NOT NULL,
+  kind varchar(10) NOT NULL,
+  data text NOT NULL,
+  cells_changed int NOT NULL DEFAULT 0,
+  edited_by int DEFAULT NULL,
+  created_at timestamp DEFAULT (datetime('now', 'localtime')),
+  UNIQUE (record_id, revision_no)
+);
+
+CREATE TABLE background_jobs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  kind varchar(50) NOT NULL,
+  params text,
+  status varchar(20) NOT NULL DEFAULT 'queued',
+  progress int NOT NULL DEFAULT 0,
+  message varchar(255) DEFAULT NULL,
+  attempts int NOT NULL DEFAULT 0,
+  max_attempts int NOT NULL DEFAULT 3,
+  cancel_requested int NOT NULL DEFAULT 0,
+  created_by int DEFAULT NULL,
+  team varchar(50) DEFAULT NULL,
+  result_name varchar(255) DEFAULT NULL,
+  summary text,
+  error text,
+  locked_by varchar(100) DEFAULT NULL,
+  run_after datetime NOT NULL,
+  heartbeat_at datetime DEFAULT NULL,
+  created_at datetime NOT NULL,
+  started_at datetime DEFAULT NULL,
+  finished_at datetime DEFAULT NULL
+);
+CREATE INDEX idx_background_jobs_status_run_after ON background_jobs (status, run_after);
+CREATE INDEX idx_background_jobs_created_by ON background_jobs (created_by, id);
+
+-- SQLite 不支持分区，归档表为普通表
+CREATE TABLE check_records_archive (
+  id int NOT NULL,
+  template_id int NOT NULL,
+  team varchar(50) DEFAULT NULL,
+  data blob NOT NULL,
+  created_by int NOT NULL,
+  created_at datetime NOT NULL,
+  updated_at datetime DEFAULT NULL,
+  archived_at datetime NOT NULL,
+  PRIMARY KEY (id, created_at)
+);
+CREATE INDEX idx_check_records_archive_created_at_id ON check_records_archive (created_at DESC, id DESC);
+CREATE INDEX idx_check_records_archive_team_created_at_id ON check_records_archive (team, created_at DESC, id DESC);
+CREATE INDEX idx_check_records_archive_template_created_at_id ON check_records_archive (template_id, created_at DESC, id DESC);
+CREATE INDEX idx_check_records_archive_created_by_created_at_id ON check_records_archive (created_by, created_at DESC, id DESC);
+
+CREATE TABLE inspection_status (
+  template_id int NOT NULL REFERENCES check_templates (id) ON DELETE CASCADE,
+  equipment_key varchar(100) NOT NULL DEFAULT '',
+  team varchar(50) DEFAULT NULL,
+  last_completed_at datetime NOT NULL,
+  last_record_id int NOT NULL,
+  PRIMARY KEY (template_id, equipment_key)
+);
+CREATE INDEX idx_inspection_status_team_template ON inspection_status (team, template_id);
+
+CREATE TABLE record_events (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  team varchar(50) DEFAULT NULL,
+  data text NOT NULL,
+  created_at datetime NOT NULL
+);
+CREATE INDEX idx_record_events_created_at ON record_events (created_at);
+
+CREATE TABLE cache_versions (
+  name varchar(50) PRIMARY KEY,
+  version bigint NOT NULL
+);
+
+-- 本文件为最新结构，全部迁移版本记为已执行（见 migrations.py）
+CREATE TABLE schema_migrations (
+  version int PRIMARY KEY,
+  name varchar(255) NOT NULL,
+  applied_at datetime NOT NULL
+);
+INSERT INTO schema_migrations (version, name, applied_at) VALUES
+  (1, '检查记录表增加 (created_at, id) 分页索引', datetime('now', 'localtime')),
+  (2, '创建附件表 check_attachments', datetime('now', 'localtime')),
+  (3, '创建记录字段索引表和全文索引表', datetime('now', 'localtime')),
+  (4, '创建统计汇总表 stat_daily_templates 和 stat_daily_options', datetime('now', 'localtime')),
+  (5, '创建API令牌表和批量提交幂等键表', datetime('now', 'localtime')),
+  (6, '用户表增加区队角色和姓名索引', datetime('now', 'localtime')),
+  (7, '创建记录修订历史表 check_record_revisions', datetime('now', 'localtime')),
+  (8, '检查记录数据列改为 mediumblob', datetime('now', 'localtime')),
+  (9, '创建后台任务表 background_jobs', datetime('now', 'localtime')),
+  (10, '创建归档记录表 check_records_archive', datetime('now', 'localtime')),
+  (11, '检查记录表增加 team 列', datetime('now', 'localtime')),
+  (12, '按模板区队回填检查记录的 team 列', datetime('now', 'localtime')),
+  (13, '检查记录表增加 (team, created_at, id) 索引', datetime('now', 'localtime')),
+  (14, '删除 users 和 check_records 的重复索引', datetime('now', 'localtime')),
+  (15, '检查模板增加检查周期和设备列', datetime('now', 'localtime')),
+  (16, '创建检查状态表 inspection_status', datetime('now', 'localtime')),
+  (17, '创建记录事件表 record_events', datetime('now', 'localtime')),
+  (18, '创建缓存版本表 cache_versions', datetime('now', 'localtime'));
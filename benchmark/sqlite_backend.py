@@ -0,0 +1,155 @@
+"""
+SQLite 替身数据库
+
+在没有 MySQL 的环境（开发机、CI）中运行基准测试：提供与 MySQLdb DictCursor 相同的接口
+（%s 占位符、fetchone/fetchall 返回字典、lastrowid、commit/rollback/ping），
+并把应用中用到的 MySQL 专有语法翻译成 SQLite 的等价写法。
+
+表结构见 schema_sqlite.sql，需要与 check_module_database.sql 保持一致。
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema_sqlite.sql')
+
+_DUPLICATE_KEY_RE = re.compile(r'ON\s+DUPLICATE\s+KEY\s+UPDATE', re.IGNORECASE)
+_VALUES_FUNC_RE = re.compile(r'VALUES\((\w+)\)', re.IGNORECASE)
+_MATCH_RE = re.compile(r'MATCH\((\w+)\)\s+AGAINST\s+\(\?\s+IN\s+BOOLEAN\s+MODE\)', re.IGNORECASE)
+_LIKE_RE = re.compile(r'LIKE\s+\?', re.IGNORECASE)
+_FOR_UPDATE_RE = re.compile(r'\s+FOR\s+UPDATE(\s+SKIP\s+LOCKED)?', re.IGNORECASE)
+_INSERT_IGNORE_RE = re.compile(r'INSERT\s+IGNORE', re.IGNORECASE)
+_NOW_RE = re.compile(r'\bNOW\(\)', re.IGNORECASE)
+_CURDATE_RE = re.compile(r'\bCURDATE\(\)', re.IGNORECASE)
+# 作为只读副本的替身时（与主库是同一个文件），复制延迟始终为 0
+_REPLICA_STATUS_RE = re.compile(r'^\s*SHOW\s+REPLICA\s+STATUS\s*$', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def translate(sql):
+    """把应用中的 MySQL 语句翻译为 SQLite 语句"""
+    if _REPLICA_STATUS_RE.match(sql):
+        return 'SELECT 0 AS Seconds_Behind_Source'
+    sql = sql.replace('%s', '?')
+    sql = _INSERT_IGNORE_RE.sub('INSERT OR IGNORE', sql)
+    match = _DUPLICATE_KEY_RE.search(sql)
+    if match:
+        head, tail = sql[:match.start()], sql[match.end():]
+        sql = head + 'ON CONFLICT DO UPDATE SET' + _VALUES_FUNC_RE.sub(r'excluded.\1', tail)
+    sql = _MATCH_RE.sub(r'bench_match(\1, ?)', sql)
+    # MySQL 的 LIKE 默认以反斜杠转义，SQLite 需要显式声明
+    sql = _LIKE_RE.sub(r"LIKE ? ESCAPE '\\'", sql)
+    sql = _FOR_UPDATE_RE.sub('', sql)
+    sql = _NOW_RE.sub("datetime('now', 'localtime')", sql)
+    sql = _CURDATE_RE.sub("date('now', 'localtime')", sql)
+    return sql
+
+
+def _match(content, query):
+    """全文搜索的替代实现：短语包含即匹配"""
+    if content is None or query is None:
+        return 0
+    return 1 if query.strip().strip('"') in content else 0
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def _register_types():
+    sqlite3.register_adapter(datetime, lambda value: value.strftime('%Y-%m-%d %H:%M:%S'))
+    sqlite3.register_adapter(date, lambda value: value.isoformat())
+    sqlite3.register_adapter(Decimal, float)
+    sqlite3.register_adapter(bool, int)
+    sqlite3.register_converter('timestamp', lambda value: datetime.fromisoformat(value.decode()))
+    sqlite3.register_converter('datetime', lambda value: datetime.fromisoformat(value.decode()))
+    sqlite3.register_converter('date', lambda value: date.fromisoformat(value.decode()))
+
+
+_register_types()
+
+
+class Cursor:
+    """MySQLdb DictCursor 风格的游标"""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def execute(self, query, args=None):
+        self._raw.execute(translate(query), tuple(args or ()))
+        return self._raw.rowcount
+
+    def executemany(self, query, args):
+        self._raw.executemany(translate(query), [tuple(row) for row in args])
+        return self._raw.rowcount
+
+    def fetchone(self):
+        return self._raw.fetchone()
+
+    def fetchall(self):
+        return self._raw.fetchall()
+
+    def fetchmany(self, size=None):
+        return self._raw.fetchmany(size or self._raw.arraysize)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    def close(self):
+        self._raw.close()
+
+
+class Connection:
+    """MySQLdb 连接的替身，供 db.ConnectionPool 使用"""
+
+    def __init__(self, path):
+        self._raw = sqlite3.connect(path, timeout=30, check_same_thread=False,
+                                    detect_types=sqlite3.PARSE_DECLTYPES)
+        self._raw.row_factory = _dict_row
+        self._raw.create_function('bench_match', 2, _match, deterministic=True)
+        self._raw.execute('PRAGMA foreign_keys = ON')
+        self._raw.execute('PRAGMA journal_mode = WAL')
+        self._raw.execute('PRAGMA synchronous = NORMAL')
+
+    def cursor(self):
+        return Cursor(self._raw.cursor())
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self._raw.close()
+
+
+_schema_lock = threading.Lock()
+
+
+def connect(path):
+    """打开 SQLite 数据库，首次使用时按 schema_sqlite.sql 建表"""
+    with _schema_lock:
+        conn = Connection(path)
+        exists = conn._raw.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'check_records'").fetchone()
+        if not exists:
+            with open(SCHEMA_PATH, encoding='utf-8') as schema:
+                conn._raw.executescript(schema.read())
+    return conn
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+构建静态资源的脚本
+
+使用方法：
+1. 把第三方样式放到 static/vendor 中（见 README“静态资源”一节）；缺少时页面继续从 CDN 加载对应样式
+2. 在命令行中运行：python build_assets.py [--output static/dist]
+3. 每次修改模板、styles.css 或脚本后重新运行，部署时在启动应用之前运行
+
+样式按模板和脚本中用到的类名裁剪后合并，脚本按页面合并，输出带内容摘要的文件名和预压缩版本（见 assets.py）。
+应用自动读取新的 manifest.json，不需要重启。
+"""
+
+import argparse
+import glob
+import os
+
+import assets
+import config
+
+
+def build_assets(output_folder=None):
+    output_folder = output_folder or config.load()['ASSET_FOLDER']
+    # 应用代码中也可能拼出类名（如提示消息的样式），一并扫描
+    scan_paths = glob.glob(os.path.join(config.ROOT_PATH, '*.py'))
+    try:
+        manifest = assets.build(os.path.join(config.ROOT_PATH, 'static'), os.path.join(config.ROOT_PATH, 'templates'),
+                                output_folder, scan_paths)
+        print(f"\n构建完成：共 {len(manifest)} 个资源，输出目录 {output_folder}")
+        if assets.brotli is None:
+            print("未安装 brotli，只生成了 .gz 预压缩文件（pip install brotli 后重新构建可生成 .br）")
+        return manifest
+    except Exception as e:
+        print(f"构建静态资源时出错: {str(e)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='裁剪、合并、压缩静态资源并生成带内容摘要的文件名')
+    parser.add_argument('--output', help='输出目录（默认使用 ASSET_FOLDER）')
+    args = parser.parse_args()
+
+    print("正在构建静态资源...\n")
+    build_assets(args.output)
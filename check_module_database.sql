@@ -17,6 +17,8 @@ CREATE TABLE `check_templates` (
   `name` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '模板名称',
   `team` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '所属区队',
   `structure` text CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '表格结构（JSON格式）',
+  `inspection_frequency` varchar(10) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '检查周期：daily 每天、shift 每班、weekly 每周，NULL 不跟踪',
+  `inspection_key_column` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '区分设备的列名，NULL 时按整个模板跟踪',
   `created_by` int NOT NULL COMMENT '创建者ID',
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
   `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
@@ -34,20 +36,312 @@ DROP TABLE IF EXISTS `check_records`;
 CREATE TABLE `check_records` (
   `id` int NOT NULL AUTO_INCREMENT COMMENT '自增ID',
   `template_id` int NOT NULL COMMENT '模板ID',
-  `data` text CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '表格数据（JSON格式）',
+  `team` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '所属区队（与模板的区队相同，模板改到其他区队时随之更新）',
+  `data` mediumblob NOT NULL COMMENT '表格数据（record_codec 按列编码并压缩，旧数据为JSON文本）',
   `created_by` int NOT NULL COMMENT '创建者ID',
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
   `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
   PRIMARY KEY (`id`) USING BTREE,
-  INDEX `idx_template_id`(`template_id` ASC) USING BTREE,
-  INDEX `idx_created_by`(`created_by` ASC) USING BTREE,
+  -- 记录列表按 (created_at, id) 游标分页，以下复合索引保证翻到任意深度的代价一致
+  -- template_id、created_by 的外键使用对应复合索引的最左前缀，不再单独建索引
+  INDEX `idx_created_at_id`(`created_at` DESC, `id` DESC) USING BTREE,
+  INDEX `idx_team_created_at_id`(`team` ASC, `created_at` DESC, `id` DESC) USING BTREE,
+  INDEX `idx_template_created_at_id`(`template_id` ASC, `created_at` DESC, `id` DESC) USING BTREE,
+  INDEX `idx_created_by_created_at_id`(`created_by` ASC, `created_at` DESC, `id` DESC) USING BTREE,
   CONSTRAINT `fk_check_records_template_id` FOREIGN KEY (`template_id`) REFERENCES `check_templates` (`id`) ON DELETE CASCADE ON UPDATE CASCADE,
   CONSTRAINT `fk_check_records_created_by` FOREIGN KEY (`created_by`) REFERENCES `users` (`id`) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE = InnoDB AUTO_INCREMENT = 1 CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci ROW_FORMAT = Dynamic;
 
+-- ----------------------------
+-- Table structure for check_attachments
+-- 存储附件元数据（文件内容按 SHA-256 保存在 ATTACHMENT_FOLDER 目录下）
+-- ----------------------------
+DROP TABLE IF EXISTS `check_attachments`;
+CREATE TABLE `check_attachments` (
+  `sha256` char(64) CHARACTER SET ascii COLLATE ascii_bin NOT NULL COMMENT '文件内容SHA-256摘要',
+  `size` bigint NOT NULL COMMENT '文件大小（字节）',
+  `mime_type` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '文件类型',
+  `original_name` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '首次上传时的文件名',
+  `created_by` int NULL DEFAULT NULL COMMENT '首次上传者ID',
+  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+  PRIMARY KEY (`sha256`) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci ROW_FORMAT = Dynamic;
+
+-- ----------------------------
+-- Table structure for check_record_fields
+-- 记录字段索引：把 check_records.data 中的单元格拆成类型化取值，支持按字段筛选
+-- ----------------------------
+DROP TABLE IF EXISTS `check_record_fields`;
+CREATE TABLE `check_record_fields` (
+  `id` bigint NOT NULL AUTO_INCREMENT COMMENT '自增ID',
+  `record_id` int NOT NULL COMMENT '记录ID',
+  `template_id` int NOT NULL COMMENT '模板ID',
+  `created_at` timestamp NULL DEFAULT NULL COMMENT '记录创建时间（冗余，便于按时间范围筛选）',
+  `row_no` smallint NOT NULL COMMENT '行号（从1开始）',
+  `field_name` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '列名',
+  `value_text` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '文本值',
+  `value_num` decimal(20, 6) NULL DEFAULT NULL COMMENT '数值（number类型列）',
+  `value_time` datetime NULL DEFAULT NULL COMMENT '时间值（datetime类型列）',
+  PRIMARY KEY (`id`) USING BTREE,
+  INDEX `idx_record_id`(`record_id` ASC) USING BTREE,
+  INDEX `idx_field_text`(`field_name` ASC, `value_text` ASC, `created_at` ASC) USING BTREE,
+  INDEX `idx_template_field_text`(`template_id` ASC, `field_name` ASC, `value_text` ASC, `created_at` ASC) USING BTREE,
+  INDEX `idx_template_field_num`(`template_id` ASC, `field_name` ASC, `value_num` ASC) USING BTREE,
+  INDEX `idx_template_field_time`(`template_id` ASC, `field_name` ASC, `value_time` ASC) USING BTREE,
+  CONSTRAINT `fk_check_record_fields_record_id` FOREIGN KEY (`record_id`) REFERENCES `check_records` (`id`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci ROW_FORMAT = Dynamic;
+
+-- ----------------------------
+-- Table structure for check_record_texts
+-- 记录全文索引：汇总 text / textarea 列内容，ngram 分词支持中文搜索（MySQL 5.7.6+）
+-- ----------------------------
+DROP TABLE IF EXISTS `check_record_texts`;
+CREATE TABLE `check_record_texts` (
+  `record_id` int NOT NULL COMMENT '记录ID',
+  `template_id` int NOT NULL COMMENT '模板ID',
+  `content` mediumtext CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '文本内容',
+  PRIMARY KEY (`record_id`) USING BTREE,
+  INDEX `idx_template_id`(`template_id` ASC) USING BTREE,
+  FULLTEXT INDEX `ft_content`(`content`) WITH PARSER `ngram`,
+  CONSTRAINT `fk_check_record_texts_record_id` FOREIGN KEY (`record_id`) REFERENCES `check_records` (`id`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci ROW_FORMAT = Dynamic;
+
+-- ----------------------------
+-- Table structure for stat_daily_templates
+-- 统计汇总：按区队、模板、日期累计的记录数和必填项完成情况，保存记录时增量更新
+-- ----------------------------
+DROP TABLE IF EXISTS `stat_daily_templates`;
+CREATE TABLE `stat_daily_templates` (
+  `team` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '所属区队',
+  `template_id` int NOT NULL COMMENT '模板ID',
+  `stat_date` date NOT NULL COMMENT '记录创建日期',
+  `record_count` int NOT NULL DEFAULT 0 COMMENT '记录数',
+  `row_count` int NOT NULL DEFAULT 0 COMMENT '数据行数',
+  `required_total` int NOT NULL DEFAULT 0 COMMENT '必填单元格总数',
+  `required_filled` int NOT NULL DEFAULT 0 COMMENT '已填写的必填单元格数',
+  PRIMARY KEY (`team`, `template_id`, `stat_date`) USING BTREE,
+  INDEX `idx_team_date`(`team` ASC, `stat_date` ASC) USING BTREE,
+  INDEX `idx_template_date`(`template_id` ASC, `stat_date` ASC) USING BTREE,
+  INDEX `idx_stat_date`(`stat_date` ASC) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci ROW_FORMAT = Dynamic;
+
+-- ----------------------------
+-- Table structure for stat_daily_options
+-- 统计汇总：按区队、模板、日期累计的 select 列各选项值出现次数
+-- ----------------------------
+DROP TABLE IF EXISTS `stat_daily_options`;
+CREATE TABLE `stat_daily_options` (
+  `team` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '所属区队',
+  `template_id` int NOT NULL COMMENT '模板ID',
+  `stat_date` date NOT NULL COMMENT '记录创建日期',
+  `field_name` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '列名',
+  `option_value` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '选项值',
+  `value_count` int NOT NULL DEFAULT 0 COMMENT '出现次数',
+  PRIMARY KEY (`team`, `template_id`, `stat_date`, `field_name`, `option_value`) USING BTREE,
+  INDEX `idx_template_date`(`template_id` ASC, `stat_date` ASC) USING BTREE,
+  INDEX `idx_stat_date`(`stat_date` ASC) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci ROW_FORMAT = Dynamic;
+
+-- ----------------------------
+-- Table structure for api_tokens
+-- 离线设备API令牌（只保存SHA-256摘要）
+-- ----------------------------
+DROP TABLE IF EXISTS `api_tokens`;
+CREATE TABLE `api_tokens` (
+  `id` int NOT NULL AUTO_INCREMENT COMMENT '自增ID',
+  `user_id` int NOT NULL COMMENT '用户ID',
+  `token_hash` char(64) CHARACTER SET ascii COLLATE ascii_bin NOT NULL COMMENT '令牌SHA-256摘要',
+  `name` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '设备名称',
+  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP COMMENT '签发时间',
+  `last_used_at` timestamp NULL DEFAULT NULL COMMENT '最后使用时间',
+  `revoked_at` timestamp NULL DEFAULT NULL COMMENT '吊销时间',
+  PRIMARY KEY (`id`) USING BTREE,
+  UNIQUE INDEX `uk_token_hash`(`token_hash` ASC) USING BTREE,
+  INDEX `idx_user_id`(`user_id` ASC) USING BTREE,
+  CONSTRAINT `fk_api_tokens_user_id` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci ROW_FORMAT = Dynamic;
+
+-- ----------------------------
+-- Table structure for check_record_submissions
+-- 离线设备批量提交的幂等键：同一用户的同一个键只创建一条记录
+-- ----------------------------
+DROP TABLE IF EXISTS `check_record_submissions`;
+CREATE TABLE `check_record_submissions` (
+  `user_id` int NOT NULL COMMENT '提交用户ID',
+  `idempotency_key` varchar(64) CHARACTER SET ascii COLLATE ascii_bin NOT NULL COMMENT '客户端生成的幂等键',
+  `record_id` int NULL DEFAULT NULL COMMENT '创建的记录ID',
+  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP COMMENT '提交时间',
+  PRIMARY KEY (`user_id`, `idempotency_key`) USING BTREE,
+  INDEX `idx_record_id`(`record_id` ASC) USING BTREE,
+  INDEX `idx_created_at`(`created_at` ASC) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci ROW_FORMAT = Dynamic;
+
+-- ----------------------------
+-- Table structure for check_record_revisions
+-- 记录修订历史：第0版为提交时的数据，之后每次修改保存差异，定期保存完整快照
+-- ----------------------------
+DROP TABLE IF EXISTS `check_record_revisions`;
+CREATE TABLE `check_record_revisions` (
+  `id` int NOT NULL AUTO_INCREMENT COMMENT '自增ID',
+  `record_id` int NOT NULL COMMENT '记录ID',
+  `revision_no` int NOT NULL COMMENT '修订号，0为原始提交',
+  `kind` varchar(10) CHARACTER SET ascii COLLATE ascii_bin NOT NULL COMMENT 'snapshot-完整快照，delta-与上一版的差异',
+  `data` mediumtext CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '快照或差异（JSON）',
+  `cells_changed` int NOT NULL DEFAULT 0 COMMENT '改动的单元格数',
+  `edited_by` int NULL DEFAULT NULL COMMENT '修改人ID',
+  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP COMMENT '修改时间',
+  PRIMARY KEY (`id`) USING BTREE,
+  -- 不设外键：记录归档（移到 check_records_archive）后修订历史仍然保留
+  UNIQUE INDEX `uk_record_revision`(`record_id` ASC, `revision_no` ASC) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci ROW_FORMAT = Dynamic;
+
+-- ----------------------------
+-- Table structure for background_jobs
+-- 后台任务队列：导出、重建统计、补建索引等耗时任务，由 run_jobs.py 的工作进程执行
+-- ----------------------------
+DROP TABLE IF EXISTS `background_jobs`;
+CREATE TABLE `background_jobs` (
+  `id` int NOT NULL AUTO_INCREMENT COMMENT '任务ID',
+  `kind` varchar(50) CHARACTER SET ascii COLLATE ascii_bin NOT NULL COMMENT '任务类型',
+  `params` text CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL COMMENT '任务参数（JSON）',
+  `status` varchar(20) CHARACTER SET ascii COLLATE ascii_bin NOT NULL DEFAULT 'queued' COMMENT 'queued/running/succeeded/failed/cancelled',
+  `progress` int NOT NULL DEFAULT 0 COMMENT '进度（0-100）',
+  `message` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '进度说明',
+  `attempts` int NOT NULL DEFAULT 0 COMMENT '已执行次数',
+  `max_attempts` int NOT NULL DEFAULT 3 COMMENT '最多执行次数',
+  `cancel_requested` tinyint(1) NOT NULL DEFAULT 0 COMMENT '执行中被要求取消',
+  `created_by` int NULL DEFAULT NULL COMMENT '提交人ID',
+  `team` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '相关区队',
+  `result_name` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '结果文件的下载文件名',
+  `summary` text CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL COMMENT '结果摘要（JSON）',
+  `error` text CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL COMMENT '最近一次的错误信息',
+  `locked_by` varchar(100) CHARACTER SET ascii COLLATE ascii_bin NULL DEFAULT NULL COMMENT '执行中的工作进程',
+  `run_after` datetime NOT NULL COMMENT '最早执行时间（重试时推后）',
+  `heartbeat_at` datetime NULL DEFAULT NULL COMMENT '最近一次报告进度的时间',
+  `created_at` datetime NOT NULL COMMENT '提交时间',
+  `started_at` datetime NULL DEFAULT NULL COMMENT '最近一次开始执行的时间',
+  `finished_at` datetime NULL DEFAULT NULL COMMENT '结束时间',
+  PRIMARY KEY (`id`) USING BTREE,
+  INDEX `idx_status_run_after`(`status` ASC, `run_after` ASC) USING BTREE,
+  INDEX `idx_created_by`(`created_by` ASC, `id` ASC) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci ROW_FORMAT = Dynamic;
+
+-- ----------------------------
+-- Table structure for check_records_archive
+-- 归档记录：超过保留期的记录由 archive_records.py 从 check_records 移入，按创建时间每月一个分区
+-- 分区表不能有外键，且分区列必须包含在主键中；新的月份分区由归档脚本从 p_future 中拆出
+-- ----------------------------
+DROP TABLE IF EXISTS `check_records_archive`;
+CREATE TABLE `check_records_archive` (
+  `id` int NOT NULL COMMENT '记录ID（与归档前相同）',
+  `template_id` int NOT NULL COMMENT '模板ID',
+  `team` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '所属区队（同 check_records.team）',
+  `data` mediumblob NOT NULL COMMENT '表格数据（原样搬移，格式同 check_records.data）',
+  `created_by` int NOT NULL COMMENT '创建者ID',
+  `created_at` datetime NOT NULL COMMENT '创建时间',
+  `updated_at` datetime NULL DEFAULT NULL COMMENT '归档前最后更新时间',
+  `archived_at` datetime NOT NULL COMMENT '归档时间',
+  PRIMARY KEY (`id`, `created_at`) USING BTREE,
+  INDEX `idx_created_at_id`(`created_at` DESC, `id` DESC) USING BTREE,
+  INDEX `idx_team_created_at_id`(`team` ASC, `created_at` DESC, `id` DESC) USING BTREE,
+  INDEX `idx_template_created_at_id`(`template_id` ASC, `created_at` DESC, `id` DESC) USING BTREE,
+  INDEX `idx_created_by_created_at_id`(`created_by` ASC, `created_at` DESC, `id` DESC) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci ROW_FORMAT = Dynamic
+PARTITION BY RANGE (TO_DAYS(`created_at`)) (
+  PARTITION p_history VALUES LESS THAN (TO_DAYS('2025-01-01')),
+  PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+-- ----------------------------
+-- Table structure for inspection_status
+-- 每个模板、设备最近一次完成检查的时间（见 inspections.py），保存记录时更新，逾期列表只读这张表
+-- ----------------------------
+DROP TABLE IF EXISTS `inspection_status`;
+CREATE TABLE `inspection_status` (
+  `template_id` int NOT NULL COMMENT '模板ID',
+  `equipment_key` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL DEFAULT '' COMMENT '设备（设备列的值，按整个模板跟踪时为空）',
+  `team` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '所属区队（与模板的区队相同）',
+  `last_completed_at` datetime NOT NULL COMMENT '最近一次完成检查的时间（记录的创建时间）',
+  `last_record_id` int NOT NULL COMMENT '最近一次完成检查的记录ID',
+  PRIMARY KEY (`template_id`, `equipment_key`) USING BTREE,
+  INDEX `idx_team_template`(`team` ASC, `template_id` ASC) USING BTREE,
+  CONSTRAINT `fk_inspection_status_template_id` FOREIGN KEY (`template_id`) REFERENCES `check_templates` (`id`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci ROW_FORMAT = Dynamic;
+
+-- ----------------------------
+-- Table structure for record_events
+-- 新保存的记录事件，各工作进程按自增ID读取后推送给记录列表页面（见 cluster.py），保留一天
+-- ----------------------------
+DROP TABLE IF EXISTS `record_events`;
+CREATE TABLE `record_events` (
+  `id` bigint NOT NULL AUTO_INCREMENT COMMENT '自增ID（推送的事件ID）',
+  `team` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '所属区队',
+  `data` text CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '事件内容（JSON格式）',
+  `created_at` datetime NOT NULL COMMENT '创建时间',
+  PRIMARY KEY (`id`) USING BTREE,
+  INDEX `idx_created_at`(`created_at` ASC) USING BTREE
+) ENGINE = InnoDB AUTO_INCREMENT = 1 CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci ROW_FORMAT = Dynamic;
+
+-- ----------------------------
+-- Table structure for cache_versions
+-- 共享缓存的版本，修改缓存的数据时加一，各工作进程读到版本变化后清除本进程的缓存（见 cluster.py）
+-- ----------------------------
+DROP TABLE IF EXISTS `cache_versions`;
+CREATE TABLE `cache_versions` (
+  `name` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '缓存名称',
+  `version` bigint NOT NULL COMMENT '版本，缓存的数据每次修改加一',
+  PRIMARY KEY (`name`) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci ROW_FORMAT = Dynamic;
+
+-- ----------------------------
+-- Table structure for schema_migrations
+-- 已执行的数据库结构迁移（见 migrations.py），本脚本建立的是最新结构，全部版本记为已执行
+-- ----------------------------
+DROP TABLE IF EXISTS `schema_migrations`;
+CREATE TABLE `schema_migrations` (
+  `version` int NOT NULL COMMENT '迁移版本号',
+  `name` varchar(255) NOT NULL COMMENT '迁移说明',
+  `applied_at` datetime NOT NULL COMMENT '执行完成时间',
+  PRIMARY KEY (`version`)
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+
+INSERT INTO `schema_migrations` (`version`, `name`, `applied_at`) VALUES
+(1, '检查记录表增加 (created_at, id) 分页索引', NOW()),
+(2, '创建附件表 check_attachments', NOW()),
+(3, '创建记录字段索引表和全文索引表', NOW()),
+(4, '创建统计汇总表 stat_daily_templates 和 stat_daily_options', NOW()),
+(5, '创建API令牌表和批量提交幂等键表', NOW()),
+(6, '用户表增加区队角色和姓名索引', NOW()),
+(7, '创建记录修订历史表 check_record_revisions', NOW()),
+(8, '检查记录数据列改为 mediumblob', NOW()),
+(9, '创建后台任务表 background_jobs', NOW()),
+(10, '创建归档记录表 check_records_archive', NOW()),
+(11, '检查记录表增加 team 列', NOW()),
+(12, '按模板区队回填检查记录的 team 列', NOW()),
+(13, '检查记录表增加 (team, created_at, id) 索引', NOW()),
+(14, '删除 users 和 check_records 的重复索引', NOW()),
+(15, '检查模板增加检查周期和设备列', NOW()),
+(16, '创建检查状态表 inspection_status', NOW()),
+(17, '创建记录事件表 record_events', NOW()),
+(18, '创建缓存版本表 cache_versions', NOW());
+
 SET FOREIGN_KEY_CHECKS = 1;
 
 -- 显示创建结果
 SELECT '日常检查模块表格创建完成！' AS message;
 SELECT '表名：' AS info, 'check_templates' AS value;
-SELECT '表名：' AS info, 'check_records' AS value;
\ No newline at end of file
+SELECT '表名：' AS info, 'check_records' AS value;
+SELECT '表名：' AS info, 'check_attachments' AS value;
+SELECT '表名：' AS info, 'check_record_fields' AS value;
+SELECT '表名：' AS info, 'check_record_texts' AS value;
+SELECT '表名：' AS info, 'stat_daily_templates' AS value;
+SELECT '表名：' AS info, 'stat_daily_options' AS value;
+SELECT '表名：' AS info, 'api_tokens' AS value;
+SELECT '表名：' AS info, 'check_record_submissions' AS value;
+SELECT '表名：' AS info, 'check_record_revisions' AS value;
+SELECT '表名：' AS info, 'background_jobs' AS value;
+SELECT '表名：' AS info, 'check_records_archive' AS value;
+SELECT '表名：' AS info, 'inspection_status' AS value;
+SELECT '表名：' AS info, 'record_events' AS value;
+SELECT '表名：' AS info, 'cache_versions' AS value;
+SELECT '表名：' AS info, 'schema_migrations' AS value;
\ No newline at end of file
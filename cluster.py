@@ -0,0 +1,178 @@
+"""
+多进程同步模块
+
+serve.py 以多个工作进程运行应用（也可以部署在多台服务器上），每个进程的推送中心和缓存各自独立。
+一个进程中发生的变化通过共享的数据库传给其他进程：每个工作进程运行一个后台线程（Poller），
+每 SYNC_POLL_INTERVAL 秒借用一个数据库连接，依次执行登记的读取函数：
+
+- 记录事件：保存记录后 publish_record_event 把事件写入 record_events 表，RecordEvents 按自增ID读取新事件，
+  交给本进程的推送中心（feed.py）发给浏览器。事件ID就是表中的自增ID，断线后重连到任何进程都能补发错过的事件
+- 缓存版本：修改缓存数据的写入在同一个事务中调用 bump_version 把 cache_versions 中的版本加一，
+  CacheVersions 读到版本变化后调用登记的失效函数，其他进程的缓存在一两秒内失效，不用等到缓存过期
+
+后台线程在本进程处理第一个请求时启动：预加载应用后 fork 出的工作进程各自启动自己的线程，主进程不启动。
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from db import PooledConnection
+
+# 每次最多读取的事件数
+EVENT_BATCH_SIZE = 500
+# 事件ID不连续时，等待较小ID的事务提交的最长时间（秒），超过后认为该事务已回滚
+EVENT_GAP_WAIT = 5
+# record_events 中的事件保留时间，以及删除过期事件的间隔（秒）
+EVENT_RETENTION = timedelta(days=1)
+EVENT_PURGE_INTERVAL = 600
+
+
+class Poller:
+    """工作进程的后台线程：定期借用一个数据库连接，执行登记的读取函数"""
+
+    def __init__(self, mysql, interval=1, logger=None):
+        self.mysql = mysql
+        self.interval = interval
+        self.logger = logger
+        self._listeners = []
+        self._reset()
+        # fork 出的子进程中没有父进程的线程，需要重新启动
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def register(self, listener):
+        """登记读取函数 listener(cursor)，每轮按登记顺序调用"""
+        self._listeners.append(listener)
+
+    def start(self):
+        """启动后台线程（已启动时直接返回）"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='cluster-poller', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def poll(self, conn):
+        """执行一轮读取；每轮一个新事务，能读到其他进程刚提交的数据"""
+        cursor = conn.cursor()
+        try:
+            for listener in self._listeners:
+                listener(cursor)
+            conn.commit()
+        finally:
+            cursor.close()
+
+    def _run(self):
+        while True:
+            # 连接池在应用创建后可能被替换（如性能测试），每轮重新读取
+            pool = self.mysql.pool
+            conn = None
+            discard = False
+            try:
+                conn = PooledConnection(pool, pool.acquire())
+                self.poll(conn)
+            except Exception as e:
+                discard = True
+                if self.logger is not None:
+                    self.logger.warning('多进程同步读取失败: %s', e)
+            finally:
+                if conn is not None:
+                    conn.release(discard=discard)
+            if self._stop.wait(self.interval):
+                break
+
+
+def bump_version(cursor, name):
+    """共享缓存 name 的版本加一，与修改缓存数据的写入在同一个事务中调用（由调用方提交）"""
+    cursor.execute('INSERT INTO cache_versions (name, version) VALUES (%s, 1) ON DUPLICATE KEY UPDATE version = version + 1',
+                   (name,))
+
+
+class CacheVersions:
+    """读取 cache_versions，版本变化时调用登记的失效函数"""
+
+    def __init__(self):
+        # 缓存名称 -> [失效函数]
+        self._callbacks = {}
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # 缓存名称 -> 上次读到的版本，None 表示还没有读取过
+        self._versions = None
+
+    def on_change(self, name, callback):
+        """登记失效函数 callback()，name 的版本变化时调用"""
+        self._callbacks.setdefault(name, []).append(callback)
+
+    def poll(self, cursor):
+        cursor.execute('SELECT name, version FROM cache_versions')
+        versions = {row['name']: row['version'] for row in cursor.fetchall()}
+        for name, callbacks in self._callbacks.items():
+            # 第一次读取时同样失效：进程启动后到第一次读取之间缓存的数据可能已经过时
+            if self._versions is None or versions.get(name) != self._versions.get(name):
+                for callback in callbacks:
+                    callback()
+        self._versions = versions
+
+
+def publish_record_event(cursor, team, data):
+    """写入一个记录事件（data 为可 JSON 序列化的字典），由调用方提交事务"""
+    cursor.execute('INSERT INTO record_events (team, data, created_at) VALUES (%s, %s, %s)',
+                   (team, json.dumps(data, ensure_ascii=False), datetime.now().replace(microsecond=0)))
+
+
+class RecordEvents:
+    """按自增ID读取 record_events 中的新事件，发布到本进程的推送中心"""
+
+    def __init__(self, feed_hub):
+        self.feed_hub = feed_hub
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # 已发布的最大事件ID，None 表示还没有读取过
+        self._last_id = None
+        # 开始等待不连续ID的时间
+        self._gap_since = None
+        self._purged_at = time.monotonic()
+
+    def poll(self, cursor):
+        if self._last_id is None:
+            # 第一次读取：最近的事件只放入历史（断线重连时补发），不推送给已有的连接
+            cursor.execute('SELECT id, team, data FROM record_events ORDER BY id DESC LIMIT %s',
+                           (self.feed_hub.history_size,))
+            rows = cursor.fetchall()
+            self.feed_hub.load_history([(row['id'], row['team'], json.loads(row['data'])) for row in reversed(rows)])
+            self._last_id = rows[0]['id'] if rows else 0
+            return
+
+        cursor.execute('SELECT id, team, data FROM record_events WHERE id > %s ORDER BY id LIMIT %s',
+                       (self._last_id, EVENT_BATCH_SIZE))
+        for row in cursor.fetchall():
+            if self._last_id and row['id'] != self._last_id + 1:
+                # 自增ID在插入时分配、提交后才可见：较小ID的事务可能还没提交，稍后再读，避免漏掉事件
+                now = time.monotonic()
+                if self._gap_since is None:
+                    self._gap_since = now
+                if now - self._gap_since < EVENT_GAP_WAIT:
+                    break
+            self._gap_since = None
+            self.feed_hub.publish(row['team'], json.loads(row['data']), row['id'])
+            self._last_id = row['id']
+
+        if time.monotonic() - self._purged_at >= EVENT_PURGE_INTERVAL:
+            cursor.execute('DELETE FROM record_events WHERE created_at < %s',
+                           (datetime.now().replace(microsecond=0) - EVENT_RETENTION,))
+            self._purged_at = time.monotonic()
@@ -0,0 +1,113 @@
+# 多进程同步测试：两个应用（相当于两个工作进程）共用一个数据库，记录事件和缓存失效经数据库传到另一个进程
+# 运行：python -m pytest cluster_test.py
+
+import time
+from datetime import datetime
+
+import pytest
+
+import cluster
+import feed
+from app import _publish_record_event, create_app
+from benchmark import sqlite_backend
+from db import ConnectionPool
+
+
+@pytest.fixture
+def workers(tmp_path):
+    path = str(tmp_path / 'test.sqlite3')
+    apps = []
+    for n in range(2):
+        app = create_app({'SESSION_STORE_PATH': str(tmp_path / f'sessions{n}.sqlite3'), 'SYNC_POLL_INTERVAL': 0.05})
+        app.extensions['mysql_pool'].pool = ConnectionPool(lambda: sqlite_backend.connect(path), max_size=2)
+        apps.append(app)
+    yield apps
+    for app in apps:
+        app.extensions['cluster_poller'].stop()
+
+
+def _wait_until(condition, timeout=3):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, '等待超时'
+        time.sleep(0.02)
+
+
+def _publish(app, record_id, team='一区队'):
+    with app.test_request_context():
+        now = datetime.now()
+        _publish_record_event('created', record_id, 1, '设备检查表', team, '张三', now, now)
+
+
+def test_events_reach_other_workers_and_replay_after_reconnect(workers):
+    first, second = workers
+    for app in workers:
+        app.extensions['cluster_poller'].start()
+    feed_hub = second.extensions['record_feed']
+    _wait_until(lambda: feed_hub.loaded)
+    subscription = feed_hub.subscribe('一区队')
+    other_team = feed_hub.subscribe('二区队')
+
+    for record_id in (11, 12, 13):
+        _publish(first, record_id)
+    received = []
+    _wait_until(lambda: received.extend(feed_hub.wait(subscription, 0.05)[0]) or len(received) == 3)
+    assert [event[2]['id'] for event in received] == [11, 12, 13]
+    assert feed_hub.wait(other_team, 0) == ([], False)
+
+    # 断线后重连到发布事件的进程，按事件ID补发
+    event_ids = [event[0] for event in received]
+    first_hub = first.extensions['record_feed']
+    _wait_until(lambda: first_hub._seq == event_ids[-1])
+    events, reset = first_hub.wait(first_hub.subscribe('一区队', str(event_ids[0])), 0)
+    assert ([event[0] for event in events], reset) == (event_ids[1:], False)
+
+
+def test_new_worker_loads_history(workers):
+    first, second = workers
+    _publish(first, 11)
+    _publish(first, 12)
+    feed_hub = second.extensions['record_feed']
+    # 还没有读取历史时无法补发，通知页面刷新
+    assert feed_hub.subscribe('一区队', '1').reset
+
+    second.extensions['cluster_poller'].start()
+    _wait_until(lambda: feed_hub.loaded)
+    events, reset = feed_hub.wait(feed_hub.subscribe('一区队', '1'), 0)
+    assert ([event[2]['id'] for event in events], reset) == ([12], False)
+
+
+def test_waits_for_uncommitted_event_ids(tmp_path, monkeypatch):
+    conn = sqlite_backend.connect(str(tmp_path / 'test.sqlite3'))
+    cursor = conn.cursor()
+    feed_hub = feed.FeedHub()
+    events = cluster.RecordEvents(feed_hub)
+    events.poll(cursor)
+    subscription = feed_hub.subscribe(None)
+
+    for event_id in (1, 3):
+        cursor.execute("INSERT INTO record_events (id, team, data, created_at) VALUES (%s, '一区队', '{}', '2025-03-01')",
+                       (event_id,))
+    conn.commit()
+    events.poll(cursor)
+    assert [event[0] for event in feed_hub.wait(subscription, 0)[0]] == [1]
+
+    # 第 2 个事件的事务一直没有提交（已回滚），等待超时后继续
+    monkeypatch.setattr(cluster, 'EVENT_GAP_WAIT', 0)
+    events.poll(cursor)
+    assert [event[0] for event in feed_hub.wait(subscription, 0)[0]] == [3]
+
+
+def test_cache_versions_invalidate_other_workers(workers):
+    first, second = workers
+    second.extensions['cluster_poller'].start()
+    directory = second.extensions['user_directory']
+    view_cache = second.extensions['record_view_cache']
+    _wait_until(lambda: directory._generation == 1 and view_cache.generation == 1)
+
+    with first.app_context():
+        conn = first.extensions['mysql_pool'].connection
+        cluster.bump_version(conn.cursor(), 'users')
+        conn.commit()
+    _wait_until(lambda: directory._generation == 2)
+    assert view_cache.generation == 1
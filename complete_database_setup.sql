@@ -30,9 +30,9 @@ CREATE TABLE `users` (
   PRIMARY KEY (`id`) USING BTREE,
   UNIQUE INDEX `employee_id`(`employee_id` ASC) USING BTREE,
   UNIQUE INDEX `phone`(`phone` ASC) USING BTREE,
-  INDEX `idx_employee_id`(`employee_id` ASC) USING BTREE,
-  INDEX `idx_phone`(`phone` ASC) USING BTREE,
-  INDEX `idx_role`(`role` ASC) USING BTREE
+  INDEX `idx_role`(`role` ASC) USING BTREE,
+  INDEX `idx_team_role`(`team` ASC, `role` ASC) USING BTREE,
+  INDEX `idx_name`(`name` ASC) USING BTREE
 ) ENGINE = InnoDB AUTO_INCREMENT = 2 CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci ROW_FORMAT = Dynamic;
 
 -- ----------------------------
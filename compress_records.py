@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+把历史记录的数据转换为压缩存储格式的脚本
+
+使用方法：
+1. 先把 check_records.data 改为二进制类型（已有数据原样保留）：
+   ALTER TABLE check_records MODIFY `data` mediumblob NOT NULL;
+2. 在命令行中运行：python compress_records.py [--batch-size 500] [--dry-run]
+
+脚本按记录ID分批扫描 check_records，把仍是 JSON 文本的数据按模板的列顺序编码并压缩（见 record_codec），
+已转换的记录会跳过。数据中残留的内嵌 base64 图片/文件（data URL）先转存为附件引用再编码（同 migrate_attachments.py），
+附件文件保存到 ATTACHMENT_FOLDER。每批单独提交，中途中断后重新运行即可继续。
+"""
+
+import argparse
+
+from extensions import mysql, script_app, template_cache
+import attachments
+import record_codec
+
+
+def compress_records(batch_size=500, dry_run=False):
+    app = script_app()
+    with app.app_context():
+        folder = app.config['ATTACHMENT_FOLDER']
+        cursor = mysql.connection.cursor()
+        last_id = 0
+        converted = 0
+        migrated_cells = 0
+        bytes_before = 0
+        bytes_after = 0
+
+        try:
+            while True:
+                cursor.execute('''
+                    SELECT r.id, r.template_id, r.data, r.created_by, t.structure, t.updated_at AS template_updated_at
+                    FROM check_records r
+                    LEFT JOIN check_templates t ON r.template_id = t.id
+                    WHERE r.id > %s
+                    ORDER BY r.id LIMIT %s
+                ''', (last_id, batch_size))
+                records = cursor.fetchall()
+                if not records:
+                    break
+
+                for record in records:
+                    last_id = record['id']
+                    if record_codec.is_encoded(record['data']):
+                        continue
+                    try:
+                        rows = record_codec.decode_rows(record['data'])
+                    except ValueError:
+                        print(f"记录 {record['id']} 的数据无法解析，已跳过")
+                        continue
+
+                    # 编码后无法再按内容找出内嵌附件，编码前先转存
+                    store = attachments.data_url_store(cursor, folder, record['created_by'], dry_run)
+                    rows, replaced = attachments.externalize_data_urls(rows, store)
+                    migrated_cells += replaced
+
+                    column_names = ()
+                    if record['structure']:
+                        column_names = template_cache.get(record['template_id'], record['template_updated_at'],
+                                                          record['structure']).column_names
+                    new_value = record_codec.encode_rows(rows, column_names)
+                    old_size = len(record['data'].encode('utf-8') if isinstance(record['data'], str) else record['data'])
+                    bytes_before += old_size
+                    bytes_after += len(new_value)
+                    if not dry_run:
+                        # 保持 updated_at 不变，数据内容没有变化
+                        cursor.execute('UPDATE check_records SET data = %s, updated_at = updated_at WHERE id = %s',
+                                       (new_value, record['id']))
+                    converted += 1
+
+                # 每批提交一次，避免长事务
+                if not dry_run:
+                    mysql.connection.commit()
+                print(f"已处理到记录ID {last_id}，累计转换 {converted} 条")
+
+            ratio = bytes_before / bytes_after if bytes_after else 0
+            print(f"\n转换完成：共转换 {converted} 条记录，转存 {migrated_cells} 个内嵌附件，"
+                  f"数据大小 {bytes_before} -> {bytes_after} 字节（压缩比 {ratio:.1f}）。")
+            if dry_run:
+                print("当前为试运行模式，数据库和附件目录均未修改。")
+
+        except Exception as e:
+            print(f"转换记录数据时出错: {str(e)}")
+            mysql.connection.rollback()
+        finally:
+            cursor.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='把历史记录的数据转换为按列编码并压缩的存储格式')
+    parser.add_argument('--batch-size', type=int, default=500, help='每批处理的记录数')
+    parser.add_argument('--dry-run', action='store_true', help='只统计不修改')
+    args = parser.parse_args()
+
+    print("正在转换记录数据...\n")
+    compress_records(args.batch_size, args.dry_run)
@@ -0,0 +1,70 @@
+# 历史记录压缩脚本测试：JSON 文本转换为压缩格式，内嵌的 data URL 先转存为附件
+# 运行：python -m pytest compress_records_test.py
+
+import base64
+import hashlib
+import json
+import os
+
+import attachments
+import compress_records
+import record_codec
+from conftest import add_template, add_user
+
+IMAGE = b'\x89PNG fake image'
+DATA_URL = 'data:image/png;base64,' + base64.b64encode(IMAGE).decode('ascii')
+
+
+def _add_legacy_record(conn, rows):
+    user_id = add_user(conn)
+    template_id = add_template(conn, user_id, [{'name': '设备', 'type': 'text'}, {'name': '现场照片', 'type': 'image'}])
+    cursor = conn.cursor()
+    cursor.execute('INSERT INTO check_records (template_id, team, data, created_by) VALUES (%s, %s, %s, %s)',
+                   (template_id, '一区队', json.dumps(rows, ensure_ascii=False), user_id))
+    record_id = cursor.lastrowid
+    conn.commit()
+    cursor.close()
+    return record_id
+
+
+def _stored_data(conn, record_id):
+    cursor = conn.cursor()
+    cursor.execute('SELECT data FROM check_records WHERE id = %s', (record_id,))
+    data = cursor.fetchone()['data']
+    cursor.close()
+    return data
+
+
+def test_compress_moves_data_urls_to_attachments(script_app, conn):
+    record_id = _add_legacy_record(conn, [{'设备': '1号泵', '现场照片': DATA_URL}])
+
+    compress_records.compress_records()
+
+    data = _stored_data(conn, record_id)
+    assert record_codec.is_encoded(data)
+    rows = record_codec.decode_rows(data)
+    sha256 = hashlib.sha256(IMAGE).hexdigest()
+    assert rows == [{'设备': '1号泵', '现场照片': attachments.make_ref(sha256)}]
+    assert os.path.exists(attachments.attachment_path(script_app.config['ATTACHMENT_FOLDER'], sha256))
+
+    cursor = conn.cursor()
+    cursor.execute('SELECT mime_type, size FROM check_attachments WHERE sha256 = %s', (sha256,))
+    assert cursor.fetchone() == {'mime_type': 'image/png', 'size': len(IMAGE)}
+
+
+def test_compress_skips_encoded_records(conn):
+    record_id = _add_legacy_record(conn, [{'设备': '1号泵'}])
+    compress_records.compress_records()
+    first = bytes(_stored_data(conn, record_id))
+
+    compress_records.compress_records()
+    assert bytes(_stored_data(conn, record_id)) == first
+
+
+def test_dry_run_changes_nothing(script_app, conn):
+    record_id = _add_legacy_record(conn, [{'设备': '1号泵', '现场照片': DATA_URL}])
+
+    compress_records.compress_records(dry_run=True)
+
+    assert not record_codec.is_encoded(_stored_data(conn, record_id))
+    assert not os.path.exists(script_app.config['ATTACHMENT_FOLDER'])
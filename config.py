@@ -0,0 +1,189 @@
+"""
+应用配置模块
+
+所有配置项的默认值集中在 defaults 中，部署时用环境变量覆盖，不需要修改代码：
+
+    EMS_<配置名>=值，例如 EMS_MYSQL_PASSWORD=...、EMS_SECRET_KEY=...、EMS_MYSQL_POOL_SIZE=20
+
+环境变量的值按默认值的类型转换：整数、小数、布尔（1/true/yes/on 为真）、时间长度（秒）；
+没有默认值的配置（包括 Flask 自身的配置项，如 EMS_SESSION_COOKIE_SECURE=1）按相同规则或字符串处理。
+
+本模块只依赖标准库：build_assets.py 等不访问数据库的脚本直接读取配置，不需要导入 Flask 应用。
+"""
+
+import os
+from datetime import timedelta
+
+ENV_PREFIX = 'EMS_'
+
+# 开发环境的占位密钥，生产环境必须通过 EMS_SECRET_KEY 设置（serve.py 检查）
+DEFAULT_SECRET_KEY = 'your_secret_key_here'
+
+ROOT_PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+def defaults(root_path=ROOT_PATH, instance_path=None):
+    instance_path = instance_path or os.path.join(root_path, 'instance')
+    return {
+        # 数据库：用户名和密码没有默认值，通过 EMS_MYSQL_USER、EMS_MYSQL_PASSWORD 设置
+        'MYSQL_HOST': 'localhost',
+        'MYSQL_USER': '',
+        'MYSQL_PASSWORD': '',
+        'MYSQL_DB': 'Electromechanical_system',
+        'MYSQL_CURSORCLASS': 'DictCursor',
+        # 用于 session 加密
+        'SECRET_KEY': DEFAULT_SECRET_KEY,
+
+        # 附件（图片、文件）存储目录和单次上传大小上限
+        'ATTACHMENT_FOLDER': os.path.join(root_path, 'uploads', 'attachments'),
+        'MAX_CONTENT_LENGTH': 20 * 1024 * 1024,
+
+        # 数据库连接池
+        'MYSQL_POOL_SIZE': 10,         # 每个进程的最大连接数
+        'MYSQL_POOL_RECYCLE': 1800,    # 连接最长使用时间（秒）
+        'MYSQL_POOL_TIMEOUT': 10,      # 等待空闲连接的最长时间（秒）
+
+        # 只读副本：列表和报表查询使用的副本地址（逗号分隔的 host 或 host:port，为空时全部查询主库），
+        # 复制延迟上限和检查间隔（秒），以及用户提交写入后继续从主库读取的时间（秒，保证能马上看到自己的修改）
+        'MYSQL_REPLICAS': '',
+        'MYSQL_REPLICA_MAX_LAG': 5,
+        'MYSQL_REPLICA_CHECK_INTERVAL': 5,
+        'MYSQL_PRIMARY_STICKY_SECONDS': 10,
+
+        # 性能分析：开启后在 /metrics 提供按路由统计的耗时和SQL指标，慢请求写入日志
+        'PROFILING_ENABLED': False,
+        'PROFILING_SLOW_REQUEST': 1.0,      # 慢请求阈值（秒）
+        'PROFILING_REPEAT_THRESHOLD': 3,    # 同一SQL在一个请求中执行达到该次数视为N+1查询
+
+        # 密码哈希：bcrypt 成本因子、计算线程数和排队上限（超过上限时提示系统繁忙）
+        # 修改成本因子后，用户下次登录成功时自动按新成本因子重新哈希
+        'PASSWORD_HASH_ROUNDS': 12,
+        'PASSWORD_HASH_WORKERS': os.cpu_count() or 2,
+        'PASSWORD_HASH_QUEUE': 32,
+        'PASSWORD_HASH_TIMEOUT': 10,       # 等待计算结果的最长时间（秒）
+
+        # 登录限流：时间窗口内同一工号、同一IP的登录失败次数上限
+        'LOGIN_THROTTLE_WINDOW': 900,      # 秒
+        'LOGIN_MAX_FAILURES_PER_USER': 5,
+        'LOGIN_MAX_FAILURES_PER_IP': 30,
+
+        # 应用前面的反向代理（如 nginx）层数，按 X-Forwarded-For / X-Forwarded-Proto 取客户端地址和协议；
+        # 0 表示直接对外服务，不信任这些请求头（客户端可以伪造）
+        'PROXY_FIX_HOPS': 0,
+
+        # 离线设备批量提交接口每次最多提交的记录数
+        'API_BATCH_MAX_RECORDS': 200,
+
+        # 记录数据校验上限和模板缓存大小
+        'RECORD_MAX_BYTES': 65535,     # 按 JSON 文本计算，保存时由 record_codec 压缩
+        'RECORD_MAX_ROWS': 500,
+        'TEMPLATE_CACHE_SIZE': 256,
+
+        # 导出时每批从数据库读取的记录数
+        'EXPORT_BATCH_SIZE': 500,
+
+        # 批量导入每批写入的记录数，以及导入错误报告的保存目录
+        'IMPORT_BATCH_SIZE': 1000,
+        'IMPORT_REPORT_FOLDER': os.path.join(root_path, 'uploads', 'import_reports'),
+
+        # 后台任务：结果文件的保存目录和保留天数，工作进程数，空闲时查询新任务的间隔（秒），
+        # 以及超过多少秒没有报告进度视为工作进程已退出
+        'JOB_RESULT_FOLDER': os.path.join(root_path, 'uploads', 'job_results'),
+        'JOB_RESULT_RETENTION_DAYS': 7,
+        'JOB_WORKERS': 2,
+        'JOB_POLL_INTERVAL': 2,
+        'JOB_STALE_TIMEOUT': 600,
+
+        # 记录查看页面的片段缓存：最多缓存的记录数和缓存时间（秒）
+        'RECORD_VIEW_CACHE_SIZE': 500,
+        'RECORD_VIEW_CACHE_TTL': 120,
+
+        # 区队列表和各角色人数的缓存时间（秒），以及用户管理页面每页显示的用户数
+        'DIRECTORY_CACHE_TTL': 300,
+        'USERS_PER_PAGE': 50,
+
+        # 服务端会话：会话存储文件、会话有效期，以及用户上下文（工号、姓名、角色、区队）的缓存时间（秒）
+        'SESSION_STORE_PATH': os.path.join(instance_path, 'sessions.sqlite3'),
+        'PERMANENT_SESSION_LIFETIME': timedelta(days=7),
+        'USER_CONTEXT_CACHE_TTL': 30,
+
+        # 记录归档：在线表保留的天数（更早的记录由 archive_records.py 移到归档表），
+        # 以及归档表使用 MySQL 分区时是否在归档前自动增加月份分区
+        'ARCHIVE_RETENTION_DAYS': 730,
+        'ARCHIVE_MONTHLY_PARTITIONS': True,
+
+        # 逾期检查：各班次的开始时间（时:分，逗号分隔，用于“每班”检查周期），
+        # 以及修改模板检查周期后重建检查状态时读取最近多少天的记录
+        'INSPECTION_SHIFTS': '08:00,16:00,00:00',
+        'INSPECTION_REBUILD_DAYS': 35,
+
+        # 记录实时推送：保留用于断线补发的事件数、每个连接最多积压的事件数、
+        # 心跳间隔（秒）和单个连接的最长时间（秒，到期后浏览器自动重连，重新检查登录状态和权限）
+        'FEED_HISTORY_SIZE': 1000,
+        'FEED_CLIENT_BUFFER': 100,
+        'FEED_KEEPALIVE_SECONDS': 15,
+        'FEED_MAX_CONNECTION_SECONDS': 300,
+
+        # 多进程同步：工作进程从数据库读取其他进程的变化（新的记录事件等）的间隔（秒）
+        'SYNC_POLL_INTERVAL': 1,
+
+        # 静态资源：build_assets.py 的输出目录，以及带摘要的资源文件的缓存时间（秒）
+        'ASSET_FOLDER': os.path.join(root_path, 'static', 'dist'),
+        'ASSET_MAX_AGE': 365 * 24 * 3600,
+
+        # 生产环境多进程服务（serve.py）：监听地址、工作进程数、每个工作进程处理请求的线程数、
+        # 停止或重新加载时等待进行中请求的最长时间（秒），以及每个工作进程启动时预先建立的数据库连接数
+        'SERVER_BIND': '127.0.0.1:5000',
+        'SERVER_WORKERS': os.cpu_count() or 2,
+        'SERVER_THREADS': 32,
+        'SERVER_GRACEFUL_TIMEOUT': 30,
+        'SERVER_WARM_CONNECTIONS': 2,
+    }
+
+
+def _convert(value, default):
+    if isinstance(default, bool):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
+    if isinstance(default, timedelta):
+        return timedelta(seconds=float(value))
+    return value
+
+
+def from_environment(base, environ=None):
+    """环境变量中 EMS_ 开头的配置，按 base 中同名配置的类型转换"""
+    environ = os.environ if environ is None else environ
+    settings = {}
+    for name, value in environ.items():
+        if not name.startswith(ENV_PREFIX) or len(name) == len(ENV_PREFIX):
+            continue
+        key = name[len(ENV_PREFIX):]
+        try:
+            settings[key] = _convert(value, base.get(key))
+        except ValueError:
+            raise ValueError(f'环境变量 {name} 的值无效：{value!r}')
+    return settings
+
+
+def load(root_path=ROOT_PATH, instance_path=None, base=None, environ=None):
+    """默认配置加上环境变量中的覆盖值；base 为已有的配置（如 Flask 自身的默认配置），用于确定类型"""
+    settings = defaults(root_path, instance_path)
+    merged = dict(base or {})
+    merged.update(settings)
+    settings.update(from_environment(merged, environ))
+    return settings
+
+
+def production_problems(settings):
+    """生产环境不能使用的配置，返回问题说明列表"""
+    problems = []
+    if settings.get('SECRET_KEY') in (None, '', DEFAULT_SECRET_KEY):
+        problems.append('未设置 SECRET_KEY（EMS_SECRET_KEY），仍在使用开发环境的占位密钥')
+    if not settings.get('MYSQL_USER'):
+        problems.append('未设置数据库用户（EMS_MYSQL_USER）')
+    if settings.get('DEBUG'):
+        problems.append('DEBUG 已开启，生产环境中会暴露调试信息')
+    return problems
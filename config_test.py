@@ -0,0 +1,63 @@
+# 应用配置测试：EMS_ 环境变量按默认值的类型转换并覆盖默认值，以及生产环境配置检查
+# 运行：python -m pytest config_test.py
+
+from datetime import timedelta
+
+import pytest
+
+import config
+
+
+def test_values_follow_default_types():
+    base = {'MYSQL_POOL_SIZE': 10, 'PROFILING_SLOW_REQUEST': 1.0, 'PROFILING_ENABLED': False,
+            'PERMANENT_SESSION_LIFETIME': timedelta(days=7), 'MYSQL_HOST': 'localhost'}
+    environ = {
+        'EMS_MYSQL_POOL_SIZE': '20',
+        'EMS_PROFILING_SLOW_REQUEST': '0.5',
+        'EMS_PROFILING_ENABLED': 'Yes',
+        'EMS_PERMANENT_SESSION_LIFETIME': '3600',
+        'EMS_MYSQL_HOST': 'db.internal',
+        'EMS_NEW_SETTING': 'value',
+    }
+    assert config.from_environment(base, environ) == {
+        'MYSQL_POOL_SIZE': 20,
+        'PROFILING_SLOW_REQUEST': 0.5,
+        'PROFILING_ENABLED': True,
+        'PERMANENT_SESSION_LIFETIME': timedelta(hours=1),
+        'MYSQL_HOST': 'db.internal',
+        'NEW_SETTING': 'value',
+    }
+
+
+@pytest.mark.parametrize('value, expected', [('1', True), ('on', True), ('0', False), ('false', False), ('', False)])
+def test_boolean_values(value, expected):
+    assert config.from_environment({'DEBUG': False}, {'EMS_DEBUG': value}) == {'DEBUG': expected}
+
+
+def test_only_prefixed_variables_are_read():
+    environ = {'PROFILING_ENABLED': '1', 'MYSQL_PASSWORD': 'secret', 'EMS_': 'x', 'PATH': '/usr/bin'}
+    assert config.from_environment({'PROFILING_ENABLED': False}, environ) == {}
+
+
+def test_invalid_value_names_the_variable():
+    with pytest.raises(ValueError, match='EMS_MYSQL_POOL_SIZE'):
+        config.from_environment({'MYSQL_POOL_SIZE': 10}, {'EMS_MYSQL_POOL_SIZE': 'many'})
+
+
+def test_load_merges_defaults_and_environment(tmp_path):
+    settings = config.load(str(tmp_path), base={'SESSION_COOKIE_SECURE': False},
+                           environ={'EMS_SERVER_THREADS': '8', 'EMS_SESSION_COOKIE_SECURE': '1'})
+    assert settings['SERVER_THREADS'] == 8
+    assert settings['SESSION_COOKIE_SECURE'] is True
+    assert settings['MYSQL_USER'] == '' and settings['MYSQL_PASSWORD'] == ''
+    assert settings['ATTACHMENT_FOLDER'].startswith(str(tmp_path))
+    assert settings['SESSION_STORE_PATH'] == str(tmp_path / 'instance' / 'sessions.sqlite3')
+
+
+def test_production_problems():
+    settings = config.load(environ={})
+    assert len(config.production_problems(settings)) == 2
+    settings.update(SECRET_KEY='a-real-secret', MYSQL_USER='ems')
+    assert config.production_problems(settings) == []
+    settings['DEBUG'] = True
+    assert len(config.production_problems(settings)) == 1
@@ -0,0 +1,48 @@
+# pytest 公共夹具：命令行脚本和后台任务使用的轻量应用（见 extensions.py），数据库为 SQLite 替身（benchmark/sqlite_backend.py）
+
+import json
+
+import pytest
+
+import extensions
+from benchmark import sqlite_backend
+from db import ConnectionPool
+
+
+@pytest.fixture
+def script_app(tmp_path, monkeypatch):
+    """每个测试一个新的空数据库；脚本中的 script_app() 返回这个应用"""
+    path = str(tmp_path / 'test.sqlite3')
+    app = extensions.create_script_app({
+        'ATTACHMENT_FOLDER': str(tmp_path / 'attachments'),
+        'JOB_RESULT_FOLDER': str(tmp_path / 'job_results'),
+    })
+    app.extensions['mysql_pool'].pool = ConnectionPool(lambda: sqlite_backend.connect(path), max_size=4)
+    monkeypatch.setattr(extensions, '_script_app', app)
+    return app
+
+
+@pytest.fixture
+def conn(script_app):
+    """应用上下文中的数据库连接（mysql.connection）"""
+    with script_app.app_context():
+        yield extensions.mysql.connection
+
+
+def add_user(conn, employee_id='u1', team='一区队', role='user'):
+    cursor = conn.cursor()
+    cursor.execute('INSERT INTO users (name, employee_id, phone, password_hash, role, team) VALUES (%s, %s, %s, %s, %s, %s)',
+                   (f'用户{employee_id}', employee_id, f'phone-{employee_id}', '-', role, team))
+    user_id = cursor.lastrowid
+    cursor.close()
+    return user_id
+
+
+def add_template(conn, created_by, columns, team='一区队', name='设备检查表', **fields):
+    cursor = conn.cursor()
+    names = ['name', 'team', 'structure', 'created_by'] + list(fields)
+    values = [name, team, json.dumps({'columns': columns}, ensure_ascii=False), created_by] + list(fields.values())
+    cursor.execute(f"INSERT INTO check_templates ({', '.join(names)}) VALUES ({', '.join(['%s'] * len(names))})", values)
+    template_id = cursor.lastrowid
+    cursor.close()
+    return template_id
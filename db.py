@@ -0,0 +1,627 @@
+"""
+数据库访问模块
+
+提供一个有上限、线程安全的 MySQL 连接池，替代 flask_mysqldb 每个请求新建连接的做法。
+用法与 flask_mysqldb 保持一致：
+
+    mysql = MySQLPool(app)
+    cursor = mysql.connection.cursor()
+
+每个请求（应用上下文）第一次访问 mysql.connection 时从池中借出一个连接，
+请求结束时自动关闭该请求打开的游标、回滚未提交的事务并归还连接。
+
+只读的列表和报表查询可以改用只读副本（配置了 MYSQL_REPLICAS 时）：
+
+    cursor = mysql.read_connection.cursor()
+
+以下情况 read_connection 返回主库连接：没有配置副本、所有副本的复制延迟都超过上限或无法连接、
+本请求已在主库提交过写入、当前用户最近 MYSQL_PRIMARY_STICKY_SECONDS 秒内提交过写入
+（保证用户保存后马上能看到自己的修改）。
+
+相关配置：
+    MYSQL_POOL_SIZE           连接池最大连接数（默认 10，每个副本各自一个同样大小的连接池）
+    MYSQL_POOL_RECYCLE        连接最长使用时间，超过后重建（秒，默认 1800）
+    MYSQL_POOL_TIMEOUT        借出连接的最长等待时间（秒，默认 10）
+    MYSQL_POOL_PING_INTERVAL  连接空闲超过该时间后，借出前先 ping 检查（秒，默认 30）
+    MYSQL_REPLICAS                只读副本地址，逗号分隔的 host 或 host:port（默认为空，不使用副本）
+    MYSQL_REPLICA_MAX_LAG         复制延迟超过该秒数的副本不使用（默认 5）
+    MYSQL_REPLICA_CHECK_INTERVAL  检查复制延迟的间隔（秒，默认 5）
+    MYSQL_PRIMARY_STICKY_SECONDS  用户提交写入后该秒数内的读取使用主库（默认 10）
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from flask import g, has_request_context, session
+
+# 热点语句：统一在这里定义，各路由复用同一条 SQL 文本，只查询需要的列
+QUERIES = {
+    'user_by_employee_id': 'SELECT id, employee_id, name, role, team, password_hash FROM users WHERE employee_id = %s',
+    'user_exists_by_employee_id': 'SELECT id FROM users WHERE employee_id = %s',
+    'template_by_id': ('SELECT id, name, team, structure, inspection_frequency, inspection_key_column, '
+                       'created_by, created_at, updated_at FROM check_templates WHERE id = %s'),
+    'record_by_id': '''
+        SELECT r.id, r.template_id, r.data, r.created_by, r.created_at, r.updated_at,
+               t.name, t.team, t.structure, t.updated_at AS template_updated_at,
+               u.name AS creator_name
+        FROM check_records r
+        LEFT JOIN check_templates t ON r.template_id = t.id
+        LEFT JOIN users u ON r.created_by = u.id
+        WHERE r.id = %s
+    ''',
+    # 归档记录（只读），字段与 record_by_id 相同
+    'archived_record_by_id': '''
+        SELECT r.id, r.template_id, r.data, r.created_by, r.created_at, r.updated_at,
+               t.name, t.team, t.structure, t.updated_at AS template_updated_at,
+               u.name AS creator_name
+        FROM check_records_archive r
+        LEFT JOIN check_templates t ON r.template_id = t.id
+        LEFT JOIN users u ON r.created_by = u.id
+        WHERE r.id = %s
+    ''',
+    # 分批处理记录的脚本和后台任务用来估算进度
+    'max_record_id': 'SELECT MAX(id) AS max_id FROM check_records',
+}
+
+
+# 会话中记录“该时间（时间戳）之前读取使用主库”的键
+PRIMARY_STICKY_KEY = '_db_primary_until'
+
+
+class PoolTimeout(Exception):
+    """在 MYSQL_POOL_TIMEOUT 内没有借到连接"""
+
+
+class _PoolEntry:
+    __slots__ = ('raw', 'created_at', 'last_used')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """有上限的线程安全连接池，连接在首次需要时才创建"""
+
+    def __init__(self, connect, max_size=10, max_lifetime=1800, timeout=10, ping_interval=30):
+        self._connect = connect
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._pid = os.getpid()
+
+        # 统计指标
+        self._checkouts = 0
+        self._checkout_seconds = 0.0
+        self._checkout_max_seconds = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._ping_failures = 0
+
+    def _check_fork(self):
+        # gunicorn 等预加载后 fork 的场景：子进程不能复用父进程的连接，直接丢弃（不关闭）
+        if self._pid != os.getpid():
+            self._idle.clear()
+            self._size = 0
+            self._in_use = 0
+            self._waiting = 0
+            self._pid = os.getpid()
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        entry = None
+
+        with self._cond:
+            self._check_fork()
+            self._waiting += 1
+            try:
+                while True:
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        # 先占住名额，在锁外建立连接
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f'等待数据库连接超时（{self.timeout}秒）')
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+        try:
+            entry = self._prepare(entry)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        elapsed = time.monotonic() - start
+        with self._cond:
+            self._in_use += 1
+            self._checkouts += 1
+            self._checkout_seconds += elapsed
+            self._checkout_max_seconds = max(self._checkout_max_seconds, elapsed)
+        return entry
+
+    def _prepare(self, entry):
+        """新建连接，或对空闲连接做寿命检查和健康检查"""
+        if entry is None:
+            entry = _PoolEntry(self._connect())
+            with self._cond:
+                self._created += 1
+            return entry
+
+        now = time.monotonic()
+        if now - entry.created_at > self.max_lifetime:
+            self._close_raw(entry.raw)
+            with self._cond:
+                self._recycled += 1
+                self._created += 1
+            return _PoolEntry(self._connect())
+
+        if now - entry.last_used > self.ping_interval:
+            try:
+                entry.raw.ping()
+            except Exception:
+                self._close_raw(entry.raw)
+                with self._cond:
+                    self._ping_failures += 1
+                    self._created += 1
+                return _PoolEntry(self._connect())
+        return entry
+
+    def release(self, entry, discard=False):
+        if not discard:
+            try:
+                # 清理未提交的事务，保证下一个使用者拿到干净的连接
+                entry.raw.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            self._in_use -= 1
+            if discard:
+                self._size -= 1
+            else:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            self._cond.notify()
+
+        if discard:
+            self._close_raw(entry.raw)
+
+    @staticmethod
+    def _close_raw(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def warm(self, count):
+        """预先建立 count 个连接（不超过连接池上限）放入空闲队列，返回实际建立的个数"""
+        entries = []
+        try:
+            for _ in range(min(count, self.max_size)):
+                entries.append(self.acquire())
+        finally:
+            for entry in entries:
+                self.release(entry)
+        return len(entries)
+
+    def close_idle(self):
+        """关闭所有空闲连接（进程退出或重新加载时调用）"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for entry in idle:
+            self._close_raw(entry.raw)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'checkout_seconds_total': round(self._checkout_seconds, 6),
+                'checkout_seconds_avg': round(self._checkout_seconds / self._checkouts, 6) if self._checkouts else 0.0,
+                'checkout_seconds_max': round(self._checkout_max_seconds, 6),
+                'timeouts': self._timeouts,
+                'connections_created': self._created,
+                'connections_recycled': self._recycled,
+                'ping_failures': self._ping_failures,
+            }
+
+
+class TimedCursor:
+    """包装游标，统计每次 execute / executemany 的耗时并通知监听函数（用于性能分析）"""
+
+    def __init__(self, cursor, listeners):
+        self._cursor = cursor
+        self._listeners = listeners
+
+    def _notify(self, query, started, rows):
+        elapsed = time.perf_counter() - started
+        for listener in self._listeners:
+            listener(query, elapsed, rows)
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            self._notify(query, started, 1)
+
+    def executemany(self, query, args):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            self._notify(query, started, len(args) if hasattr(args, '__len__') else 1)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class PooledConnection:
+    """借出的连接：记录本次请求打开的游标，归还时统一关闭"""
+
+    def __init__(self, pool, entry, query_listeners=(), on_commit=None, replica=False):
+        self._pool = pool
+        self._entry = entry
+        self._cursors = []
+        self._query_listeners = query_listeners
+        self._on_commit = on_commit
+        # 是否为只读副本的连接
+        self.replica = replica
+        # 本次借出期间是否提交过事务
+        self.committed = False
+
+    @property
+    def raw(self):
+        return self._entry.raw
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._entry.raw.cursor(*args, **kwargs)
+        if self._query_listeners:
+            cursor = TimedCursor(cursor, self._query_listeners)
+        self._cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        self._entry.raw.commit()
+        self.committed = True
+        if self._on_commit is not None:
+            self._on_commit()
+
+    def rollback(self):
+        self._entry.raw.rollback()
+
+    def __getattr__(self, name):
+        return getattr(self._entry.raw, name)
+
+    def release(self, discard=False):
+        for cursor in self._cursors:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self._cursors = []
+        self._pool.release(self._entry, discard=discard)
+
+
+def parse_replicas(value):
+    """MYSQL_REPLICAS 配置（逗号分隔的 host 或 host:port，或它们的列表）转换为 [(host, port 或 None)]"""
+    if isinstance(value, str):
+        value = value.split(',')
+    replicas = []
+    for address in value or ():
+        address = address.strip()
+        if not address:
+            continue
+        host, sep, port = address.rpartition(':')
+        if sep and port.isdigit() and ']' not in port:
+            replicas.append((host.strip('[]'), int(port)))
+        else:
+            replicas.append((address.strip('[]'), None))
+    return replicas
+
+
+def replica_lag(conn):
+    """副本的复制延迟（秒）；复制线程未运行时返回 None，该服务器不是副本时抛出 ValueError"""
+    cursor = conn.cursor()
+    try:
+        # MySQL 8.0.22 起为 SHOW REPLICA STATUS，旧版本为 SHOW SLAVE STATUS
+        statements = (('SHOW REPLICA STATUS', 'Seconds_Behind_Source'),
+                      ('SHOW SLAVE STATUS', 'Seconds_Behind_Master'))
+        for index, (sql, column) in enumerate(statements):
+            try:
+                cursor.execute(sql)
+            except Exception:
+                if index == len(statements) - 1:
+                    raise
+                continue
+            row = cursor.fetchone()
+            if row is None:
+                raise ValueError('该服务器没有配置复制')
+            return row.get(column)
+    finally:
+        cursor.close()
+
+
+class ReplicaSet:
+    """只读副本：定期检查复制延迟，在延迟未超过上限的副本之间轮流分配读取"""
+
+    def __init__(self, pools, max_lag=5, check_interval=5):
+        # [(名称, ConnectionPool)]
+        self.pools = pools
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._checking = False
+        self._checked_at = None
+        # 名称 -> 最近一次检查的延迟（秒），None 表示不可用
+        self._lag = {name: None for name, _ in pools}
+        self._errors = {}
+        self._next = 0
+
+        # 统计指标
+        self._reads = {name: 0 for name, _ in pools}
+        self._fallbacks = 0
+
+    def _check(self):
+        for name, pool in self.pools:
+            lag, error = None, None
+            try:
+                entry = pool.acquire()
+            except Exception as e:
+                error = f'无法连接: {str(e)}'
+            else:
+                discard = False
+                try:
+                    lag = replica_lag(entry.raw)
+                    if lag is None:
+                        error = '复制线程未运行'
+                except Exception as e:
+                    discard = True
+                    error = str(e)
+                finally:
+                    pool.release(entry, discard=discard)
+            with self._lock:
+                self._lag[name] = lag
+                if error:
+                    self._errors[name] = error
+                else:
+                    self._errors.pop(name, None)
+
+    def _maybe_check(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._checking or (self._checked_at is not None and now - self._checked_at < self.check_interval):
+                return
+            self._checking = True
+            first = self._checked_at is None
+        if first:
+            # 首次使用时还没有延迟数据，由当前请求同步检查
+            self._run_check()
+        else:
+            # 之后在后台线程中检查，不阻塞请求
+            threading.Thread(target=self._run_check, daemon=True).start()
+
+    def _run_check(self):
+        try:
+            self._check()
+        finally:
+            with self._lock:
+                self._checked_at = time.monotonic()
+                self._checking = False
+
+    def choose(self):
+        """返回一个可用副本的 (名称, 连接池)，没有可用副本时返回 None"""
+        self._maybe_check()
+        with self._lock:
+            healthy = [(name, pool) for name, pool in self.pools
+                       if self._lag[name] is not None and self._lag[name] <= self.max_lag]
+            if not healthy:
+                self._fallbacks += 1
+                return None
+            name, pool = healthy[self._next % len(healthy)]
+            self._next += 1
+            self._reads[name] += 1
+            return name, pool
+
+    def mark_unavailable(self, name, error):
+        """借出连接失败的副本在下一次检查前不再使用，本次读取改读主库"""
+        with self._lock:
+            self._lag[name] = None
+            self._errors[name] = f'无法连接: {error}'
+            self._reads[name] -= 1
+            self._fallbacks += 1
+
+    def fallback(self, name):
+        """副本连接池已满（等待超时），本次读取改读主库，副本仍然可用"""
+        with self._lock:
+            self._reads[name] -= 1
+            self._fallbacks += 1
+
+    def close_idle(self):
+        for _, pool in self.pools:
+            pool.close_idle()
+
+    def stats(self):
+        with self._lock:
+            replicas = [dict(pool.stats(), name=name, lag_seconds=self._lag[name], reads=self._reads[name],
+                             error=self._errors.get(name))
+                        for name, pool in self.pools]
+            return {
+                'max_lag': self.max_lag,
+                'fallbacks_to_primary': self._fallbacks,
+                'replicas': replicas,
+            }
+
+
+class MySQLPool:
+    """Flask 扩展：与 flask_mysqldb.MySQL 相同的 mysql.connection 接口，底层使用连接池"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.pool = None
+        # 每条 SQL 执行后调用的函数 listener(sql, 耗时, 行数)，由性能分析模块注册
+        self.query_listeners = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MYSQL_HOST', 'localhost')
+        app.config.setdefault('MYSQL_PORT', 3306)
+        app.config.setdefault('MYSQL_USER', None)
+        app.config.setdefault('MYSQL_PASSWORD', None)
+        app.config.setdefault('MYSQL_DB', None)
+        app.config.setdefault('MYSQL_CHARSET', 'utf8mb4')
+        app.config.setdefault('MYSQL_CURSORCLASS', None)
+        app.config.setdefault('MYSQL_CONNECT_TIMEOUT', 10)
+        app.config.setdefault('MYSQL_POOL_SIZE', 10)
+        app.config.setdefault('MYSQL_POOL_RECYCLE', 1800)
+        app.config.setdefault('MYSQL_POOL_TIMEOUT', 10)
+        app.config.setdefault('MYSQL_POOL_PING_INTERVAL', 30)
+        app.config.setdefault('MYSQL_REPLICAS', '')
+        app.config.setdefault('MYSQL_REPLICA_MAX_LAG', 5)
+        app.config.setdefault('MYSQL_REPLICA_CHECK_INTERVAL', 5)
+        app.config.setdefault('MYSQL_PRIMARY_STICKY_SECONDS', 10)
+
+        self.pool = self._create_pool(app.config, lambda: self._connect(app.config))
+        self.primary_sticky_seconds = app.config['MYSQL_PRIMARY_STICKY_SECONDS']
+        self.replicas = None
+        replicas = parse_replicas(app.config['MYSQL_REPLICAS'])
+        if replicas:
+            pools = []
+            for host, port in replicas:
+                name = f'{host}:{port}' if port else host
+                connect = lambda host=host, port=port: self._connect(app.config, host, port)
+                pools.append((name, self._create_pool(app.config, connect)))
+            self.replicas = ReplicaSet(pools, max_lag=app.config['MYSQL_REPLICA_MAX_LAG'],
+                                       check_interval=app.config['MYSQL_REPLICA_CHECK_INTERVAL'])
+        app.extensions['mysql_pool'] = self
+        app.teardown_appcontext(self.teardown)
+
+    @staticmethod
+    def _create_pool(config, connect):
+        return ConnectionPool(
+            connect,
+            max_size=config['MYSQL_POOL_SIZE'],
+            max_lifetime=config['MYSQL_POOL_RECYCLE'],
+            timeout=config['MYSQL_POOL_TIMEOUT'],
+            ping_interval=config['MYSQL_POOL_PING_INTERVAL'],
+        )
+
+    @staticmethod
+    def _connect(config, host=None, port=None):
+        # 延迟导入，只有真正建立连接时才需要 MySQLdb
+        import MySQLdb
+        import MySQLdb.cursors
+
+        kwargs = {
+            'host': host or config['MYSQL_HOST'],
+            'port': port or config['MYSQL_PORT'],
+            'charset': config['MYSQL_CHARSET'],
+            'use_unicode': True,
+            'connect_timeout': config['MYSQL_CONNECT_TIMEOUT'],
+            'autocommit': False,
+        }
+        if config['MYSQL_USER']:
+            kwargs['user'] = config['MYSQL_USER']
+        if config['MYSQL_PASSWORD']:
+            kwargs['passwd'] = config['MYSQL_PASSWORD']
+        if config['MYSQL_DB']:
+            kwargs['db'] = config['MYSQL_DB']
+        if config['MYSQL_CURSORCLASS']:
+            kwargs['cursorclass'] = getattr(MySQLdb.cursors, config['MYSQL_CURSORCLASS'])
+        return MySQLdb.connect(**kwargs)
+
+    @property
+    def connection(self):
+        """当前应用上下文使用的连接，首次访问时从池中借出"""
+        conn = g.get('_mysql_pool_connection')
+        if conn is None:
+            conn = PooledConnection(self.pool, self.pool.acquire(), self.query_listeners, self._after_commit)
+            g._mysql_pool_connection = conn
+        return conn
+
+    @property
+    def read_connection(self):
+        """只读查询使用的连接：可用时借出副本连接，否则与 mysql.connection 相同"""
+        conn = g.get('_mysql_read_connection')
+        if conn is not None:
+            return conn
+        if self.replicas is None or self._primary_required():
+            return self.connection
+        chosen = self.replicas.choose()
+        if chosen is None:
+            return self.connection
+        name, pool = chosen
+        try:
+            entry = pool.acquire()
+        except PoolTimeout:
+            self.replicas.fallback(name)
+            return self.connection
+        except Exception as e:
+            # 副本在两次延迟检查之间停止服务时不等下一次检查，立即改读主库
+            self.replicas.mark_unavailable(name, str(e))
+            return self.connection
+        conn = PooledConnection(pool, entry, self.query_listeners, replica=True)
+        g._mysql_read_connection = conn
+        return conn
+
+    def _primary_required(self):
+        primary = g.get('_mysql_pool_connection')
+        if primary is not None and primary.committed:
+            return True
+        return has_request_context() and session.get(PRIMARY_STICKY_KEY, 0) > time.time()
+
+    def _after_commit(self):
+        # 只记录已登录用户的写入，匿名请求（如离线设备 API）不为此创建会话
+        if self.replicas is not None and self.primary_sticky_seconds and has_request_context() \
+                and session.get('loggedin'):
+            session[PRIMARY_STICKY_KEY] = time.time() + self.primary_sticky_seconds
+
+    def close_idle(self):
+        """关闭主库和副本连接池中的空闲连接"""
+        self.pool.close_idle()
+        if self.replicas is not None:
+            self.replicas.close_idle()
+
+    def teardown(self, exception):
+        for key in ('_mysql_read_connection', '_mysql_pool_connection'):
+            conn = g.pop(key, None)
+            if conn is not None:
+                conn.release()
+
+    def stats(self):
+        stats = self.pool.stats()
+        if self.replicas is not None:
+            stats['replicas'] = self.replicas.stats()
+        return stats
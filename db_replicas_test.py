@@ -0,0 +1,133 @@
+# 读写分离测试：只读查询使用副本，写入后和读主库时间窗口内使用主库，副本延迟过大或无法连接时回退到主库
+# 主库和副本使用 SQLite 替身数据库（benchmark/sqlite_backend.py），运行：python -m pytest db_replicas_test.py
+
+import time
+
+import pytest
+from flask import Flask, session
+
+import db
+from benchmark import sqlite_backend
+from db import PRIMARY_STICKY_KEY, ConnectionPool, MySQLPool, ReplicaSet
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', MYSQL_PRIMARY_STICKY_SECONDS=10)
+    mysql = MySQLPool(app)
+    mysql.pool = ConnectionPool(lambda: sqlite_backend.connect(str(tmp_path / 'primary.sqlite3')), max_size=2)
+    replica = ConnectionPool(lambda: sqlite_backend.connect(str(tmp_path / 'replica.sqlite3')), max_size=2)
+    mysql.replicas = ReplicaSet([('replica', replica)], max_lag=5, check_interval=60)
+    return app
+
+
+def test_reads_use_replica(app):
+    mysql = app.extensions['mysql_pool']
+    with app.test_request_context():
+        assert mysql.read_connection.replica
+        assert not mysql.connection.replica
+        assert mysql.read_connection is not mysql.connection
+    assert mysql.replicas.stats()['replicas'][0]['reads'] == 1
+
+
+def test_reads_after_commit_in_same_request_use_primary(app):
+    mysql = app.extensions['mysql_pool']
+    with app.test_request_context():
+        mysql.connection.commit()
+        assert mysql.read_connection is mysql.connection
+
+
+def test_commit_starts_sticky_window_for_logged_in_user(app):
+    mysql = app.extensions['mysql_pool']
+    with app.test_request_context():
+        session['loggedin'] = True
+        mysql.connection.commit()
+        sticky_until = session[PRIMARY_STICKY_KEY]
+    assert sticky_until > time.time()
+
+    # 之后的请求在时间窗口内读主库
+    with app.test_request_context():
+        session[PRIMARY_STICKY_KEY] = sticky_until
+        assert not mysql.read_connection.replica
+
+    # 时间窗口过后恢复读副本
+    with app.test_request_context():
+        session[PRIMARY_STICKY_KEY] = time.time() - 1
+        assert mysql.read_connection.replica
+
+
+def test_anonymous_commit_does_not_start_sticky_window(app):
+    mysql = app.extensions['mysql_pool']
+    with app.test_request_context():
+        mysql.connection.commit()
+        assert PRIMARY_STICKY_KEY not in session
+
+
+def test_lagging_replica_falls_back_to_primary(app, monkeypatch):
+    monkeypatch.setattr(db, 'replica_lag', lambda conn: 30)
+    mysql = app.extensions['mysql_pool']
+    with app.test_request_context():
+        assert mysql.read_connection is mysql.connection
+    stats = mysql.replicas.stats()
+    assert stats['fallbacks_to_primary'] == 1
+    assert stats['replicas'][0]['lag_seconds'] == 30
+
+
+def test_stopped_replication_falls_back_to_primary(app, monkeypatch):
+    monkeypatch.setattr(db, 'replica_lag', lambda conn: None)
+    mysql = app.extensions['mysql_pool']
+    with app.test_request_context():
+        assert mysql.read_connection is mysql.connection
+    assert mysql.replicas.stats()['replicas'][0]['error'] == '复制线程未运行'
+
+
+def test_unreachable_replica_falls_back_to_primary(app):
+    def refuse():
+        raise OSError('connection refused')
+
+    mysql = app.extensions['mysql_pool']
+    mysql.replicas = ReplicaSet([('replica', ConnectionPool(refuse, max_size=2))])
+    with app.test_request_context():
+        assert mysql.read_connection is mysql.connection
+    assert mysql.replicas.stats()['replicas'][0]['error'].startswith('无法连接')
+
+
+def test_replica_failing_between_checks_falls_back_to_primary(app, monkeypatch):
+    mysql = app.extensions['mysql_pool']
+    with app.test_request_context():
+        assert mysql.read_connection.replica
+
+    # 副本在两次延迟检查之间停止服务：改读主库，下一次检查前不再使用
+    def refuse():
+        raise OSError('connection refused')
+
+    replica = mysql.replicas.pools[0][1]
+    monkeypatch.setattr(replica, 'acquire', refuse)
+    with app.test_request_context():
+        assert mysql.read_connection is mysql.connection
+    monkeypatch.undo()
+    with app.test_request_context():
+        assert mysql.read_connection is mysql.connection
+    stats = mysql.replicas.stats()
+    assert (stats['fallbacks_to_primary'], stats['replicas'][0]['reads']) == (2, 1)
+    assert stats['replicas'][0]['error'] == '无法连接: connection refused'
+
+
+def test_busy_replica_falls_back_without_marking_unavailable(app, monkeypatch):
+    mysql = app.extensions['mysql_pool']
+    with app.test_request_context():
+        assert mysql.read_connection.replica
+
+    def busy():
+        raise db.PoolTimeout('等待数据库连接超时')
+
+    replica = mysql.replicas.pools[0][1]
+    monkeypatch.setattr(replica, 'acquire', busy)
+    with app.test_request_context():
+        assert mysql.read_connection is mysql.connection
+    monkeypatch.undo()
+    with app.test_request_context():
+        assert mysql.read_connection.replica
+    stats = mysql.replicas.stats()
+    assert (stats['fallbacks_to_primary'], stats['replicas'][0]['reads'], stats['replicas'][0]['error']) == (1, 2, None)
@@ -0,0 +1,128 @@
+"""
+区队与用户目录模块
+
+创建、编辑模板时需要区队列表，用户管理页面需要各角色的人数，记录列表的筛选框需要区队成员，
+原来每次请求都扫描 users 表。这里把这些数据缓存在进程内，注册、修改角色、修改区队后主动调用 invalidate，
+同时把共享的 users 缓存版本加一，其他工作进程读到新版本后同样调用 invalidate（见 cluster.py）。
+
+用户管理页面不再一次输出全部用户，改为服务端分页搜索：
+按工号、姓名、手机号前缀匹配（可以使用索引），按角色、区队筛选。
+"""
+
+import threading
+import time
+
+# 每页用户数的上限
+MAX_PER_PAGE = 100
+
+
+class Directory:
+    """进程内缓存的区队列表、各角色人数和区队成员"""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._teams = None
+        self._role_counts = None
+        self._loaded_at = 0
+        # 区队 -> (加载时间, 成员列表)，None 表示全部用户
+        self._members = {}
+        # 每次 invalidate 加一，查询期间发生过失效的结果不写入缓存
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _load(self, cursor):
+        with self._lock:
+            if self._teams is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._teams, self._role_counts
+            generation = self._generation
+
+        cursor.execute('''
+            SELECT team, role, COUNT(*) AS user_count FROM users
+            GROUP BY team, role
+        ''')
+        teams = set()
+        role_counts = {}
+        for row in cursor.fetchall():
+            if row['team']:
+                teams.add(row['team'])
+            role_counts[row['role']] = role_counts.get(row['role'], 0) + row['user_count']
+
+        teams = sorted(teams)
+        with self._lock:
+            if generation == self._generation:
+                self._teams = teams
+                self._role_counts = role_counts
+                self._loaded_at = time.monotonic()
+        return teams, role_counts
+
+    def teams(self, cursor):
+        """有用户的区队名称列表（已排序）"""
+        return list(self._load(cursor)[0])
+
+    def role_counts(self, cursor):
+        """{角色: 人数}"""
+        return dict(self._load(cursor)[1])
+
+    def members(self, cursor, team=None):
+        """区队成员 [{'id', 'name'}]，按姓名排序；team 为 None 时返回全部用户"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._members.get(team)
+            if entry is not None and now - entry[0] < self.ttl:
+                return list(entry[1])
+            generation = self._generation
+
+        if team is None:
+            cursor.execute('SELECT id, name FROM users ORDER BY name')
+        else:
+            cursor.execute('SELECT id, name FROM users WHERE team = %s ORDER BY name', (team,))
+        members = [{'id': row['id'], 'name': row['name']} for row in cursor.fetchall()]
+        with self._lock:
+            if generation == self._generation:
+                self._members[team] = (now, members)
+        return list(members)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._teams = None
+            self._role_counts = None
+            self._members.clear()
+
+
+def _prefix_pattern(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def search_users(cursor, query='', role=None, team=None, page=1, per_page=50):
+    """
+    分页搜索用户，返回 (用户列表, 总数)。
+    query 按工号、姓名、手机号前缀匹配；结果按注册先后倒序。
+    """
+    conditions = []
+    params = []
+    query = (query or '').strip()
+    if query:
+        pattern = _prefix_pattern(query[:50])
+        conditions.append('(employee_id LIKE %s OR name LIKE %s OR phone LIKE %s)')
+        params.extend([pattern, pattern, pattern])
+    if role:
+        conditions.append('role = %s')
+        params.append(role)
+    if team:
+        conditions.append('team = %s')
+        params.append(team)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    cursor.execute(f'SELECT COUNT(*) AS total FROM users {where}', params)
+    total = cursor.fetchone()['total']
+
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    page = max(1, page)
+    cursor.execute(f'''
+        SELECT id, name, employee_id, phone, role, team, created_at FROM users
+        {where}
+        ORDER BY id DESC
+        LIMIT %s OFFSET %s
+    ''', params + [per_page, (page - 1) * per_page])
+    return cursor.fetchall(), total
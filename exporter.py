@@ -0,0 +1,336 @@
+"""
+表格记录导出模块
+
+按模板或区队把记录导出为 CSV / XLSX，供月度设备报表使用。
+记录按创建时间分批从数据库读取，每批展开成行后立即写出，通过生成器交给 Flask 流式响应，
+导出几十万行时内存占用保持平稳，第一批数据写出后浏览器即可开始下载。
+
+XLSX 直接按 SpreadsheetML 格式边生成边压缩（zipfile 写入不可 seek 的流），不依赖第三方库。
+"""
+
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape
+
+import archive
+import attachments
+import record_codec
+from db import QUERIES
+
+# 每批读取的记录数
+DEFAULT_BATCH_SIZE = 500
+
+# 导出文件固定的前几列
+BASE_HEADERS = ['记录ID', '模板名称', '所属区队', '创建者', '创建时间', '行号']
+
+# XML 1.0 不允许出现的控制字符
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def parse_date(value):
+    """解析 YYYY-MM-DD 格式的日期，无效时返回 None"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+
+def date_range_conditions(date_from, date_to):
+    """按创建日期范围（YYYY-MM-DD，结束日期包含当天）筛选记录的查询条件，字段别名 r=记录表"""
+    conditions = []
+    params = []
+    date_from = parse_date(date_from)
+    date_to = parse_date(date_to)
+    if date_from:
+        conditions.append('r.created_at >= %s')
+        params.append(date_from)
+    if date_to:
+        conditions.append('r.created_at < %s')
+        params.append(date_to + timedelta(days=1))
+    return conditions, params
+
+
+def prepare_plan(cursor, template_cache, template_id, team, date_from, date_to, include_archive=False):
+    """
+    确定导出的模板、列、查询条件和记录表，网页导出和后台导出任务（job_tasks.py）共用。
+    include_archive 为真时同时导出已归档的历史记录；模板不存在或不属于 team 时返回 None。
+    """
+    if template_id:
+        cursor.execute(QUERIES['template_by_id'], (template_id,))
+        template = cursor.fetchone()
+        if not template or (team and template['team'] != team):
+            return None
+        templates = [template]
+    elif team:
+        cursor.execute('SELECT id, name, team, structure, updated_at FROM check_templates WHERE team = %s ORDER BY id', (team,))
+        templates = cursor.fetchall()
+    else:
+        cursor.execute('SELECT id, name, team, structure, updated_at FROM check_templates ORDER BY id')
+        templates = cursor.fetchall()
+
+    # 按模板结构确定导出列；导出多个模板时合并所有模板的列
+    column_names = []
+    for template in templates:
+        for name in template_cache.get(template['id'], template['updated_at'], template['structure']).column_names:
+            if name not in column_names:
+                column_names.append(name)
+
+    conditions = []
+    params = []
+    if template_id:
+        conditions.append('r.template_id = %s')
+        params.append(template_id)
+    elif team:
+        conditions.append('r.team = %s')
+        params.append(team)
+    date_conditions, date_params = date_range_conditions(date_from, date_to)
+    conditions.extend(date_conditions)
+    params.extend(date_params)
+
+    return {
+        'title': templates[0]['name'] if template_id else (team or '全部区队'),
+        'column_names': column_names,
+        'conditions': conditions,
+        'params': params,
+        'tables': archive.record_tables(include_archive),
+    }
+
+
+def export_body(conn, plan, export_format, batch_size, attachment_url, on_batch=None):
+    """
+    导出文件内容（字节块生成器）和 MIME 类型。
+    附件导出为可直接访问的下载地址 attachment_url(sha256)；on_batch 见 iter_records。
+    """
+    headers = build_headers(plan['column_names'])
+
+    def format_value(value):
+        sha256 = attachments.parse_ref(value)
+        if sha256:
+            return attachment_url(sha256)
+        return default_format_value(value)
+
+    rows = (row
+            for record in iter_records(conn, plan['conditions'], plan['params'], batch_size, on_batch, plan['tables'])
+            for row in flatten_record(record, plan['column_names'], format_value))
+
+    if export_format == 'csv':
+        return stream_csv(headers, rows), 'text/csv'
+    return (stream_xlsx(headers, rows, sheet_name=plan['title']),
+            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+
+def iter_records(conn, conditions, params, batch_size=DEFAULT_BATCH_SIZE, on_batch=None, tables=('check_records',)):
+    """
+    按 (创建时间, 记录ID) 递增分批读取记录（键集分页，每批代价相同），逐条返回。
+    按模板、区队或全部记录导出时分别使用 (template_id, created_at, id)、(team, created_at, id)、
+    (created_at, id) 复合索引，按日期范围导出时只扫描范围内的记录。
+    conditions / params 为额外的 WHERE 条件，字段别名：r=check_records, t=check_templates。
+    on_batch(已返回的记录数) 在每批记录返回完后调用，后台导出任务用来报告进度。
+    tables 为依次读取的记录表，包含历史记录时先读归档表（见 archive.record_tables）。
+    """
+    count = 0
+    cursor = conn.cursor()
+    try:
+        for table in tables:
+            sql = f'''
+                SELECT r.id, r.template_id, r.data, r.created_at,
+                       t.name AS template_name, t.team AS template_team, u.name AS creator_name
+                FROM {table} r
+                LEFT JOIN check_templates t ON r.template_id = t.id
+                LEFT JOIN users u ON r.created_by = u.id
+            '''
+
+            last = None
+            while True:
+                batch_conditions = list(conditions)
+                batch_params = list(params)
+                if last is not None:
+                    batch_conditions.append('(r.created_at > %s OR (r.created_at = %s AND r.id > %s))')
+                    batch_params.extend([last['created_at'], last['created_at'], last['id']])
+                batch_sql = sql
+                if batch_conditions:
+                    batch_sql += ' WHERE ' + ' AND '.join(batch_conditions)
+                batch_sql += ' ORDER BY r.created_at, r.id LIMIT %s'
+
+                cursor.execute(batch_sql, batch_params + [batch_size])
+                batch = cursor.fetchall()
+                if not batch:
+                    break
+                for record in batch:
+                    yield record
+                count += len(batch)
+                if on_batch:
+                    on_batch(count)
+                last = batch[-1]
+                if len(batch) < batch_size:
+                    break
+    finally:
+        cursor.close()
+
+
+def build_headers(column_names):
+    return BASE_HEADERS + list(column_names)
+
+
+def flatten_record(record, column_names, format_value=None):
+    """把一条记录的行数组展开为导出行，每个数据行对应一行"""
+    try:
+        rows = record_codec.decode_rows(record['data'])
+    except (TypeError, ValueError):
+        rows = []
+
+    created_at = record['created_at'].strftime('%Y-%m-%d %H:%M:%S') if record['created_at'] else ''
+    base = [record['id'], record['template_name'] or '', record['template_team'] or '',
+            record['creator_name'] or '', created_at]
+    for index, row in enumerate(rows or [{}], start=1):
+        if not isinstance(row, dict):
+            continue
+        values = []
+        for name in column_names:
+            value = row.get(name, '')
+            if format_value:
+                value = format_value(value)
+            values.append(value)
+        yield base + [index] + values
+
+
+def default_format_value(value):
+    if value is True:
+        return '是'
+    if value is False:
+        return '否'
+    if value is None:
+        return ''
+    return value
+
+
+def stream_csv(headers, rows, flush_every=200):
+    """生成 CSV 文本块；带 BOM，Excel 打开中文不乱码"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= flush_every:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkBuffer:
+    """zipfile 的输出目标：只追加不回退，写入的数据由生成器取走"""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_cell(ref, value):
+    if isinstance(value, bool):
+        value = '是' if value else '否'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    text = _ILLEGAL_XML_CHARS.sub('', str(value))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _xlsx_row(row_number, values):
+    cells = ''.join(_xlsx_cell(f'{_column_letter(i)}{row_number}', value)
+                    for i, value in enumerate(values) if value != '')
+    return f'<row r="{row_number}">{cells}</row>'
+
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def stream_xlsx(headers, rows, sheet_name='记录', flush_every=200):
+    """生成 XLSX 文件的字节块（单个工作表，字符串使用内联方式，无需共享字符串表）"""
+    buffer = _ChunkBuffer()
+    # Excel 工作表名最长31个字符，且不能包含 []:*?/\
+    sheet_name = re.sub(r'[\[\]:*?/\\]', '_', sheet_name)[:31] or '记录'
+
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _XLSX_ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _XLSX_WORKBOOK.format(sheet_name=escape(sheet_name, {'"': '&quot;'})))
+        archive.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS)
+        yield buffer.take()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            sheet.write(_xlsx_row(1, headers).encode('utf-8'))
+
+            pending = []
+            for row_number, row in enumerate(rows, start=2):
+                pending.append(_xlsx_row(row_number, row))
+                if len(pending) >= flush_every:
+                    sheet.write(''.join(pending).encode('utf-8'))
+                    pending = []
+                    chunk = buffer.take()
+                    if chunk:
+                        yield chunk
+            sheet.write(''.join(pending).encode('utf-8'))
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.take()
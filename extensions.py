@@ -0,0 +1,69 @@
+"""
+应用扩展的访问入口
+
+连接池、缓存等扩展在新建应用时创建，保存在 app.extensions 中（每个应用一份）。
+代码通过本模块的代理访问当前应用上下文中的实例，导入时不创建任何对象：
+
+    from extensions import mysql, template_cache
+    cursor = mysql.connection.cursor()
+
+命令行脚本和后台任务不需要网页应用（路由、会话存储、密码哈希线程池、记录推送等），
+使用 script_app() 得到只加载配置、数据库连接池和模板缓存的轻量应用：
+
+    app = script_app()
+    with app.app_context():
+        ...
+"""
+
+from flask import Flask, current_app, has_app_context
+from werkzeug.local import LocalProxy
+
+import config
+from db import MySQLPool
+from template_cache import TemplateCache
+
+
+def proxy(name):
+    """当前应用的扩展 app.extensions[name]"""
+    return LocalProxy(lambda: current_app.extensions[name])
+
+
+mysql = proxy('mysql_pool')
+template_cache = proxy('template_cache')
+
+
+def load_config(app, settings=None):
+    """默认配置和 EMS_ 环境变量（见 config.py），settings 中的配置优先"""
+    app.config.update(config.load(app.root_path, app.instance_path, base=app.config))
+    if settings:
+        app.config.update(settings)
+
+
+def init_data(app):
+    """网页应用和命令行脚本共用的扩展：数据库连接池和模板结构缓存"""
+    MySQLPool(app)
+    app.extensions['template_cache'] = TemplateCache(app.config['TEMPLATE_CACHE_SIZE'])
+
+
+def create_script_app(settings=None):
+    """新建命令行脚本使用的轻量应用：只有配置、数据库连接池和模板缓存，没有路由"""
+    app = Flask('ems_script', root_path=config.ROOT_PATH)
+    load_config(app, settings)
+    init_data(app)
+    return app
+
+
+_script_app = None
+
+
+def script_app():
+    """
+    命令行脚本使用的应用：已在应用上下文中（如后台任务调用脚本函数）时为当前应用，
+    否则为本进程的轻量应用（首次调用时创建）
+    """
+    global _script_app
+    if has_app_context():
+        return current_app._get_current_object()
+    if _script_app is None:
+        _script_app = create_script_app()
+    return _script_app
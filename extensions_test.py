@@ -0,0 +1,34 @@
+# 应用工厂测试：每次新建的应用有各自的配置和扩展，命令行脚本使用不带路由的轻量应用
+# 运行：python -m pytest extensions_test.py
+
+import extensions
+from app import create_app
+
+
+def test_create_app_builds_independent_apps(tmp_path):
+    first = create_app({'SESSION_STORE_PATH': str(tmp_path / 'a.sqlite3'), 'MYSQL_POOL_SIZE': 3})
+    second = create_app({'SESSION_STORE_PATH': str(tmp_path / 'b.sqlite3')})
+    assert first.config['MYSQL_POOL_SIZE'] == 3
+    assert second.config['MYSQL_POOL_SIZE'] == 10
+    for name in ('mysql_pool', 'template_cache', 'record_feed', 'user_contexts', 'cluster_poller'):
+        assert first.extensions[name] is not second.extensions[name]
+    assert 'home' in first.view_functions and 'home' in second.view_functions
+
+
+def test_script_app_has_no_routes():
+    app = extensions.create_script_app({'MYSQL_POOL_SIZE': 2})
+    assert app.config['MYSQL_POOL_SIZE'] == 2
+    assert set(app.extensions) >= {'mysql_pool', 'template_cache'}
+    assert 'record_feed' not in app.extensions
+    assert list(app.view_functions) == ['static']
+
+
+def test_script_app_prefers_current_app(monkeypatch):
+    monkeypatch.setattr(extensions, '_script_app', None)
+    app = extensions.script_app()
+    assert extensions.script_app() is app
+
+    other = extensions.create_script_app()
+    with other.app_context():
+        assert extensions.script_app() is other
+        assert extensions.template_cache._get_current_object() is other.extensions['template_cache']
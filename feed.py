@@ -0,0 +1,143 @@
+"""
+记录实时推送模块
+
+值班人员一直开着记录列表页面，靠手动刷新查看新提交的检查表，每次刷新都要重新查询列表。
+这里在进程内维护一个发布/订阅中心：create_check_record、edit_check_record 和离线批量提交保存记录后把事件写入
+record_events 表，各工作进程的后台线程读取新事件后发布到本进程的推送中心（见 cluster.py）；
+记录列表页面通过 Server-Sent Events 连接订阅本区队（超级管理员为全部区队）的事件，新记录在一两秒内出现在页面上。
+
+- 每个连接的待发送事件有上限（buffer_size），客户端太慢、积压超过上限时丢弃积压的事件，改为通知页面刷新
+- 最近 history_size 个事件保留在内存中，断线重连时浏览器带上 Last-Event-ID，补发错过的事件；
+  错过的事件已不在历史中时同样通知页面刷新
+- 事件ID为 record_events 的自增ID，所有进程相同，重连到其他工作进程也能补发
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+class Subscription:
+    """一个推送连接：区队（None 表示全部区队）和待发送的事件"""
+
+    __slots__ = ('team', 'events', 'reset', 'after')
+
+    def __init__(self, team, after=0):
+        self.team = team
+        self.events = deque()
+        # 有事件被丢弃，页面需要刷新
+        self.reset = False
+        # 浏览器已收到的最大事件ID（可能来自其他进程，本进程还没有读到）
+        self.after = after
+
+
+class FeedHub:
+    """进程内的发布/订阅中心"""
+
+    def __init__(self, history_size=1000, buffer_size=100):
+        self.history_size = history_size
+        self.buffer_size = buffer_size
+        self._reset()
+        # 预加载应用后 fork 出的工作进程各自独立，不继承主进程的连接
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # 历史事件：(事件ID, 区队, 事件数据)
+        self._history = deque(maxlen=self.history_size)
+        self._seq = 0
+        # 是否已从数据库读取过最近的事件（见 load_history）
+        self.loaded = False
+        self._subscribers = set()
+        self._cond = threading.Condition()
+        # 进程准备退出，推送连接应尽快结束（浏览器随后重连到其他进程）
+        self.closed = False
+
+    @staticmethod
+    def _parse_event_id(value):
+        value = (value or '').strip()
+        return int(value) if value.isdigit() else None
+
+    def _deliver(self, subscription, event):
+        if subscription.team is not None and subscription.team != event[1]:
+            return
+        if event[0] <= subscription.after:
+            return
+        if len(subscription.events) >= self.buffer_size:
+            # 积压超过上限：丢弃积压的事件，通知页面刷新
+            subscription.events.clear()
+            subscription.reset = True
+        elif not subscription.reset:
+            subscription.events.append(event)
+
+    def load_history(self, events):
+        """放入最近的事件 [(事件ID, 区队, 事件数据)]（按ID从小到大），只用于断线补发"""
+        with self._cond:
+            for event in events:
+                self._history.append(event)
+                self._seq = max(self._seq, event[0])
+            self.loaded = True
+
+    def publish(self, team, data, event_id):
+        """发布事件，data 为可 JSON 序列化的字典，event_id 为 record_events 的自增ID"""
+        with self._cond:
+            self._seq = max(self._seq, event_id)
+            event = (event_id, team, data)
+            self._history.append(event)
+            for subscription in self._subscribers:
+                self._deliver(subscription, event)
+            self._cond.notify_all()
+
+    def subscribe(self, team, last_event_id=None):
+        """订阅 team 的事件；带 last_event_id 时先补发之后的历史事件"""
+        subscription = Subscription(team)
+        with self._cond:
+            if last_event_id:
+                seq = self._parse_event_id(last_event_id)
+                oldest = self._history[0][0] if self._history else self._seq + 1
+                if seq is None or not self.loaded or seq < oldest - 1:
+                    # 本进程刚启动还没有读取历史，或错过的事件已不在历史中
+                    subscription.reset = True
+                else:
+                    # 浏览器已收到 seq 及之前的事件（seq 可能大于本进程已读到的ID：其他进程先读到了）
+                    subscription.after = seq
+                    for event in self._history:
+                        if event[0] > seq:
+                            self._deliver(subscription, event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._cond:
+            self._subscribers.discard(subscription)
+
+    def wait(self, subscription, timeout):
+        """等待事件，返回 (事件列表, 是否需要刷新)；timeout 秒内没有事件时返回 ([], False)"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not subscription.events and not subscription.reset and not self.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            events = list(subscription.events)
+            subscription.events.clear()
+            reset = subscription.reset
+            subscription.reset = False
+        return events, reset
+
+    def close(self):
+        """唤醒所有等待中的连接并让它们结束（进程平滑退出时调用）"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def format_event(self, event):
+        """按 Server-Sent Events 格式输出一个事件"""
+        seq, _, data = event
+        return f'id: {seq}\nevent: record\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+    def format_reset(self):
+        """通知页面刷新；带上最新的事件ID，之后重连时从这里继续"""
+        return f'id: {self._seq}\nevent: reset\ndata: {{}}\n\n'
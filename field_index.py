@@ -0,0 +1,194 @@
+"""
+记录字段索引模块
+
+记录内容以 JSON 文本保存在 check_records.data 中，无法直接按字段筛选。
+这里把每个单元格拆成 (记录ID, 模板ID, 行号, 列名, 类型化取值) 写入 check_record_fields 表，
+文本类列的内容另外汇总到 check_record_texts 表做全文索引（ngram 分词，支持中文）。
+
+- 创建、编辑、导入记录时在同一事务内调用 index_record 更新索引
+- backfill_field_index.py 为已有记录补建索引
+- search_records 基于索引表做筛选和全文搜索，结果按 (created_at, id) 游标分页
+"""
+
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+# 索引中保存的文本最大长度（与 value_text 列长度一致）
+MAX_VALUE_LENGTH = 255
+
+# value_num 列可保存的数值上限
+MAX_NUMBER = Decimal(10) ** 14
+
+# 不建立索引的列类型
+SKIPPED_TYPES = ('image', 'file')
+# 参与全文索引的列类型
+FULLTEXT_TYPES = ('text', 'textarea')
+
+_DATETIME_FORMATS = ('%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d')
+
+# 筛选条件格式：列名=值、列名^=值（前缀）、列名>=值、列名<=值
+FILTER_RE = re.compile(r'^(?P<field>.+?)(?P<op>>=|<=|\^=|=)(?P<value>.*)$')
+
+
+def parse_datetime(value):
+    if not isinstance(value, str):
+        return None
+    for fmt in _DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_number(value):
+    if isinstance(value, bool) or value is None or value == '':
+        return None
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        return None
+    # value_num 列为 DECIMAL(20,6)，超出范围的数值只按文本索引
+    if not number.is_finite() or abs(number) >= MAX_NUMBER:
+        return None
+    return number
+
+
+def _text_value(value):
+    if value is True:
+        return '是'
+    if value is False:
+        return '否'
+    return str(value)[:MAX_VALUE_LENGTH]
+
+
+def extract_fields(columns, rows):
+    """返回 (字段列表, 全文内容)；字段为 (行号, 列名, 文本值, 数值, 时间值)"""
+    fields = []
+    texts = []
+    for row_no, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            continue
+        for column in columns:
+            column_type = column.get('type', 'text')
+            if column_type in SKIPPED_TYPES:
+                continue
+            value = row.get(column['name'])
+            if value is None or value == '':
+                continue
+            value_num = parse_number(value) if column_type == 'number' else None
+            value_time = parse_datetime(value) if column_type == 'datetime' else None
+            fields.append((row_no, column['name'], _text_value(value), value_num, value_time))
+            if column_type in FULLTEXT_TYPES:
+                texts.append(str(value))
+    return fields, '\n'.join(texts)
+
+
+def index_record(cursor, record_id, template_id, created_at, columns, rows):
+    """重建一条记录的字段索引（先删后插，可重复执行）"""
+    fields, content = extract_fields(columns, rows)
+    cursor.execute('DELETE FROM check_record_fields WHERE record_id = %s', (record_id,))
+    if fields:
+        cursor.executemany('''
+            INSERT INTO check_record_fields
+                (record_id, template_id, created_at, row_no, field_name, value_text, value_num, value_time)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ''', [(record_id, template_id, created_at) + field for field in fields])
+    if content:
+        cursor.execute('''
+            REPLACE INTO check_record_texts (record_id, template_id, content) VALUES (%s, %s, %s)
+        ''', (record_id, template_id, content))
+    else:
+        cursor.execute('DELETE FROM check_record_texts WHERE record_id = %s', (record_id,))
+
+
+def parse_filters(raw_filters):
+    """解析 "列名=值" 形式的筛选条件，返回 [(列名, 运算符, 值)]；格式不正确时抛出 ValueError"""
+    filters = []
+    for raw in raw_filters:
+        match = FILTER_RE.match(raw)
+        if not match or not match.group('field').strip():
+            raise ValueError(f'筛选条件格式不正确：{raw}')
+        filters.append((match.group('field').strip(), match.group('op'), match.group('value').strip()))
+    return filters
+
+
+def _filter_condition(template_id, field, op, value):
+    """把一个筛选条件转换为 r.id IN (子查询)，返回 (SQL, 参数)"""
+    sql = 'SELECT record_id FROM check_record_fields WHERE field_name = %s'
+    params = [field]
+    if template_id:
+        sql += ' AND template_id = %s'
+        params.append(template_id)
+
+    if op == '=':
+        sql += ' AND value_text = %s'
+        params.append(value[:MAX_VALUE_LENGTH])
+    elif op == '^=':
+        escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        sql += ' AND value_text LIKE %s'
+        params.append(escaped[:MAX_VALUE_LENGTH] + '%')
+    else:
+        comparison = '>=' if op == '>=' else '<='
+        time_value = parse_datetime(value)
+        number_value = parse_number(value)
+        if time_value is not None:
+            sql += f' AND value_time {comparison} %s'
+            params.append(time_value)
+        elif number_value is not None:
+            sql += f' AND value_num {comparison} %s'
+            params.append(number_value)
+        else:
+            raise ValueError(f'比较条件需要数字或日期：{field}{op}{value}')
+    return f'r.id IN ({sql})', params
+
+
+def fulltext_query(text):
+    """把用户输入转换为 BOOLEAN MODE 短语查询，避免 P-12 之类的字符被当作运算符"""
+    return '"' + text.replace('"', ' ').strip() + '"'
+
+
+def search_records(cursor, team=None, template_id=None, filters=(), text=None,
+                   date_conditions=(), date_params=(), after=None, limit=50):
+    """
+    按字段索引和全文索引查找记录，返回 (记录列表, 是否还有下一页)。
+    after 为上一页最后一条记录的 (created_at, id)。
+    """
+    sql = '''
+        SELECT r.id, r.template_id, r.created_by, r.created_at, r.updated_at,
+               t.name AS template_name, t.team AS template_team, u.name AS creator_name
+        FROM check_records r
+        LEFT JOIN check_templates t ON r.template_id = t.id
+        LEFT JOIN users u ON r.created_by = u.id
+    '''
+    conditions = []
+    params = []
+    if team:
+        conditions.append('r.team = %s')
+        params.append(team)
+    if template_id:
+        conditions.append('r.template_id = %s')
+        params.append(template_id)
+    for field, op, value in filters:
+        condition, condition_params = _filter_condition(template_id, field, op, value)
+        conditions.append(condition)
+        params.extend(condition_params)
+    if text:
+        conditions.append('r.id IN (SELECT record_id FROM check_record_texts '
+                          'WHERE MATCH(content) AGAINST (%s IN BOOLEAN MODE))')
+        params.append(fulltext_query(text))
+    conditions.extend(date_conditions)
+    params.extend(date_params)
+    if after:
+        conditions.append('(r.created_at < %s OR (r.created_at = %s AND r.id < %s))')
+        params.extend([after[0], after[0], after[1]])
+
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += ' ORDER BY r.created_at DESC, r.id DESC LIMIT %s'
+    params.append(limit + 1)
+
+    cursor.execute(sql, params)
+    records = list(cursor.fetchall())
+    return records[:limit], len(records) > limit
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+批量导入历史检查记录的脚本
+
+使用方法：
+1. 确保Flask应用已经正确配置数据库连接
+2. 在命令行中运行：
+   python import_records.py --template-id 1 --user-id 1 --file 历史记录.xlsx [--batch-size 1000] [--errors 错误报告.csv]
+
+文件第一行为表头，列名需与模板列名一致；支持 .csv（UTF-8）和 .xlsx。
+未通过校验的行会写入错误报告，修改后可以只重新导入错误报告中的行。
+"""
+
+import argparse
+import time
+
+from extensions import mysql, script_app, template_cache
+from record_hooks import after_records_imported
+from db import QUERIES
+import importer
+
+
+def import_file(template_id, user_id, path, batch_size, errors_path):
+    app = script_app()
+    with app.app_context():
+        cursor = mysql.connection.cursor()
+        cursor.execute(QUERIES['template_by_id'], (template_id,))
+        template = cursor.fetchone()
+        cursor.close()
+        if not template:
+            print(f"模板不存在: {template_id}")
+            return
+
+        compiled = template_cache.get(template['id'], template['updated_at'], template['structure'])
+        print(f"导入模板: {template['name']} (区队: {template['team']})")
+
+        started = time.monotonic()
+
+        def report_progress(stats):
+            print(f"  已导入 {stats['imported']} 条记录，失败 {stats['failed']} 行")
+
+        with open(path, 'rb') as source, open(errors_path, 'w', encoding='utf-8-sig', newline='') as errors_file:
+            try:
+                stats = importer.import_records(
+                    mysql.connection, compiled, template_id, template['team'], user_id,
+                    importer.iter_file_rows(source, path),
+                    importer.ErrorReport(errors_file),
+                    batch_size=batch_size,
+                    max_bytes=app.config['RECORD_MAX_BYTES'],
+                    max_rows=app.config['RECORD_MAX_ROWS'],
+                    after_insert=lambda cursor, floor_id: after_records_imported(
+                        cursor, template, user_id, compiled, floor_id),
+                    on_batch=report_progress)
+            except importer.ImportFormatError as e:
+                print(f"文件格式错误: {e}")
+                return
+
+        elapsed = time.monotonic() - started
+        print(f"\n导入完成：成功 {stats['imported']} 条记录，失败 {stats['failed']} 行，"
+              f"共 {stats['batches']} 批，耗时 {elapsed:.1f} 秒")
+        if stats['failed']:
+            print(f"错误报告已写入: {errors_path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='按模板批量导入历史检查记录（CSV / XLSX）')
+    parser.add_argument('--template-id', type=int, required=True, help='导入到的模板ID')
+    parser.add_argument('--user-id', type=int, required=True, help='记录的创建者用户ID')
+    parser.add_argument('--file', required=True, help='要导入的 .csv 或 .xlsx 文件')
+    parser.add_argument('--batch-size', type=int, default=importer.DEFAULT_BATCH_SIZE, help='每批写入的记录数')
+    parser.add_argument('--errors', default='import_errors.csv', help='错误报告输出路径')
+    args = parser.parse_args()
+
+    import_file(args.template_id, args.user_id, args.file, args.batch_size, args.errors)
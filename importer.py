@@ -0,0 +1,289 @@
+"""
+表格记录批量导入模块
+
+把历史纸质/Excel 检查记录按选定模板导入数据库，命令行（import_records.py）和管理员上传页面共用。
+
+- 支持 CSV 和 XLSX，两种格式都逐行流式读取，不会把整个文件读入内存
+- 表头按模板列名匹配；含"记录ID"列时（例如本系统导出的文件），ID 相同的连续行合并为一条记录，
+  否则每一行作为一条记录；含"创建时间"列时保留原始时间
+- 图片/文件列中本系统导出的附件下载地址还原为附件引用，导出的文件可以直接重新导入
+- 每条记录用模板的校验函数检查，通过的记录按批次用 executemany 写入，每批一个事务
+- 未通过校验的行连同原因写入错误报告（CSV），便于修改后重新导入
+"""
+
+import csv
+import io
+import json
+import re
+import zipfile
+from datetime import datetime, timedelta
+from xml.etree.ElementTree import iterparse
+
+import attachments
+import record_codec
+from template_cache import DEFAULT_MAX_BYTES, DEFAULT_MAX_ROWS
+
+# 每批写入的记录数
+DEFAULT_BATCH_SIZE = 1000
+
+# 与 exporter.BASE_HEADERS 对应的特殊列
+RECORD_ID_HEADER = '记录ID'
+CREATED_AT_HEADER = '创建时间'
+
+# 勾选框列可识别的取值
+TRUE_VALUES = {'是', '1', 'true', 'TRUE', 'True', 'y', 'Y', '√'}
+FALSE_VALUES = {'否', '0', 'false', 'FALSE', 'False', 'n', 'N', ''}
+
+_SHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_CELL_REF_RE = re.compile(r'^([A-Z]+)')
+# Excel 日期序列号的起点
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+
+
+class ImportFormatError(Exception):
+    """文件格式无法识别或缺少表头"""
+
+
+def iter_csv_rows(binary_stream):
+    """逐行读取 CSV（兼容带 BOM 的 UTF-8 文件），返回单元格字符串列表"""
+    text_stream = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text_stream)
+    finally:
+        text_stream.detach()
+
+
+def _column_index(cell_ref):
+    match = _CELL_REF_RE.match(cell_ref or '')
+    if not match:
+        return None
+    index = 0
+    for char in match.group(1):
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+def _read_shared_strings(archive):
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+    strings = []
+    with archive.open('xl/sharedStrings.xml') as source:
+        for _, element in iterparse(source):
+            if element.tag == _SHEET_NS + 'si':
+                strings.append(''.join(text.text or '' for text in element.iter(_SHEET_NS + 't')))
+                element.clear()
+    return strings
+
+
+def _first_sheet_name(archive):
+    names = sorted(name for name in archive.namelist()
+                   if name.startswith('xl/worksheets/') and name.endswith('.xml'))
+    if 'xl/worksheets/sheet1.xml' in names:
+        return 'xl/worksheets/sheet1.xml'
+    if not names:
+        raise ImportFormatError('Excel 文件中没有工作表')
+    return names[0]
+
+
+def iter_xlsx_rows(binary_stream):
+    """逐行读取 XLSX 第一个工作表，返回单元格字符串列表（空单元格为空字符串）"""
+    try:
+        archive = zipfile.ZipFile(binary_stream)
+    except zipfile.BadZipFile:
+        raise ImportFormatError('不是有效的 Excel（.xlsx）文件')
+
+    with archive:
+        shared_strings = _read_shared_strings(archive)
+        with archive.open(_first_sheet_name(archive)) as source:
+            for _, element in iterparse(source):
+                if element.tag != _SHEET_NS + 'row':
+                    continue
+                values = []
+                for cell in element.iter(_SHEET_NS + 'c'):
+                    index = _column_index(cell.get('r'))
+                    if index is None:
+                        index = len(values)
+                    cell_type = cell.get('t')
+                    if cell_type == 'inlineStr':
+                        value = ''.join(text.text or '' for text in cell.iter(_SHEET_NS + 't'))
+                    else:
+                        raw = cell.findtext(_SHEET_NS + 'v') or ''
+                        if cell_type == 's' and raw:
+                            value = shared_strings[int(raw)]
+                        elif cell_type == 'b':
+                            value = '是' if raw == '1' else '否'
+                        else:
+                            value = raw
+                    if index >= len(values):
+                        values.extend([''] * (index + 1 - len(values)))
+                    values[index] = value
+                element.clear()
+                yield values
+
+
+def iter_file_rows(binary_stream, filename):
+    if filename.lower().endswith('.xlsx'):
+        return iter_xlsx_rows(binary_stream)
+    if filename.lower().endswith('.csv'):
+        return iter_csv_rows(binary_stream)
+    raise ImportFormatError('只支持 .csv 和 .xlsx 文件')
+
+
+def _convert_value(column, value):
+    """把文件中的文本转换为与网页填写一致的取值"""
+    value = value.strip() if isinstance(value, str) else value
+    column_type = column.get('type', 'text')
+    if column_type == 'checkbox':
+        if value in TRUE_VALUES:
+            return True
+        if value in FALSE_VALUES:
+            return False
+        return value
+    if column_type == 'datetime' and value:
+        # Excel 中的日期单元格以序列号保存
+        try:
+            serial = float(value)
+        except ValueError:
+            return value
+        return (_EXCEL_EPOCH + timedelta(days=serial)).strftime('%Y-%m-%dT%H:%M')
+    if column_type in ('image', 'file') and value:
+        # 导出文件中的附件为下载地址
+        return attachments.ref_from_download_url(value) or value
+    return value
+
+
+def _parse_created_at(value):
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M', '%Y-%m-%d', '%Y/%m/%d %H:%M', '%Y/%m/%d'):
+        try:
+            return datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def iter_source_records(rows, columns):
+    """
+    把文件行按记录分组，逐条返回 (行号列表, 原始行列表, 数据行数组, 创建时间)。
+    行号从 2 开始（第 1 行为表头）。
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if not header:
+        raise ImportFormatError('文件为空或缺少表头')
+    header = [name.strip() for name in header]
+
+    positions = {name: index for index, name in enumerate(header)}
+    matched = [(column, positions[column['name']]) for column in columns if column['name'] in positions]
+    if not matched:
+        raise ImportFormatError('表头与模板列名不匹配，请使用模板列名作为表头')
+    record_id_index = positions.get(RECORD_ID_HEADER)
+    created_at_index = positions.get(CREATED_AT_HEADER)
+
+    def cell(raw, index):
+        return raw[index] if index is not None and index < len(raw) else ''
+
+    group_key = None
+    group = None
+    for line_number, raw in enumerate(rows, start=2):
+        if not any(value.strip() for value in raw if isinstance(value, str)):
+            continue
+        data_row = {column['name']: _convert_value(column, cell(raw, index)) for column, index in matched}
+
+        key = cell(raw, record_id_index) if record_id_index is not None else None
+        if group is not None and key and key == group_key:
+            group[0].append(line_number)
+            group[1].append(raw)
+            group[2].append(data_row)
+            continue
+
+        if group is not None:
+            yield group
+        group_key = key
+        group = ([line_number], [raw], [data_row], _parse_created_at(cell(raw, created_at_index)))
+
+    if group is not None:
+        yield group
+
+
+class ErrorReport:
+    """错误报告：原始行加上行号和错误原因"""
+
+    def __init__(self, stream):
+        self.writer = csv.writer(stream)
+        self.count = 0
+
+    def write_header(self, header):
+        self.writer.writerow(['行号', '错误原因'] + list(header))
+
+    def write(self, line_numbers, raw_rows, errors):
+        reason = '；'.join(errors)
+        for line_number, raw in zip(line_numbers, raw_rows):
+            self.writer.writerow([line_number, reason] + list(raw))
+            self.count += 1
+
+
+def import_records(conn, compiled, template_id, team, created_by, rows, error_report,
+                   batch_size=DEFAULT_BATCH_SIZE, max_bytes=DEFAULT_MAX_BYTES, max_rows=DEFAULT_MAX_ROWS,
+                   after_insert=None, on_batch=None):
+    """
+    导入记录，返回统计信息 {'imported', 'failed', 'batches'}。
+    team 为模板所属区队（写入记录的 team 列），rows 为文件行迭代器（第一行为表头）。
+    after_insert(cursor, floor_id) 在每批写入后、提交前调用，本批新记录的ID都大于 floor_id，
+    用于在同一事务内更新字段索引等派生数据；on_batch(stats) 在每批提交后调用，可用于报告进度。
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise ImportFormatError('文件为空或缺少表头')
+    error_report.write_header(header)
+
+    def with_header():
+        yield header
+        yield from rows
+
+    stats = {'imported': 0, 'failed': 0, 'batches': 0}
+    pending = []
+    cursor = conn.cursor()
+
+    def flush():
+        if after_insert:
+            # executemany 可能拆成多条语句执行，lastrowid 不可靠；
+            # 改为记下写入前的最大ID，之后分配的自增ID一定大于它
+            cursor.execute('SELECT COALESCE(MAX(id), 0) AS max_id FROM check_records')
+            floor_id = cursor.fetchone()['max_id']
+        cursor.executemany(
+            'INSERT INTO check_records (template_id, team, data, created_by, created_at) VALUES (%s, %s, %s, %s, %s)',
+            pending)
+        if after_insert:
+            after_insert(cursor, floor_id)
+        conn.commit()
+        stats['imported'] += len(pending)
+        stats['batches'] += 1
+        pending.clear()
+        if on_batch:
+            on_batch(stats)
+
+    try:
+        for line_numbers, raw_rows, data_rows, created_at in iter_source_records(with_header(), compiled.columns):
+            valid_rows, errors = compiled.validate_rows(data_rows, max_rows)
+            if not errors and len(json.dumps(valid_rows, ensure_ascii=False).encode('utf-8')) > max_bytes:
+                errors = [f'表格数据过大（超过{max_bytes // 1024}KB）']
+            if errors:
+                error_report.write(line_numbers, raw_rows, errors)
+                stats['failed'] += len(line_numbers)
+                continue
+
+            pending.append((template_id, team, record_codec.encode_rows(valid_rows, compiled.column_names), created_by,
+                            created_at or datetime.now()))
+            if len(pending) >= batch_size:
+                flush()
+
+        if pending:
+            flush()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return stats
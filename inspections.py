@@ -0,0 +1,203 @@
+"""
+逾期检查跟踪模块
+
+模板可以设置检查周期（每天、每班、每周）和区分设备的列（如“设备名称”）。
+inspection_status 表按 (模板, 设备) 保存最近一次完成检查的时间，每保存一条新记录时在同一事务内更新，
+逾期列表只读这张小表，每个设备的判断是一次时间比较，不扫描历史记录：
+
+- 当前周期（今天、当前班次、本周）开始后还没有完成检查的设备视为逾期
+- 没有设置设备列的模板按整个模板跟踪，从未填写过的模板同样列为逾期
+- 设置了设备列的模板，设备在第一次被检查后才出现在列表中；不再使用的设备由管理员从列表中移除
+- 编辑已有记录不算新的检查，不更新检查状态
+
+修改模板的检查周期或设备列后，由 rebuild_inspections.py（或“后台任务”中的维护任务）从最近的记录重建该模板的状态。
+"""
+
+from datetime import datetime, time, timedelta
+
+# 检查周期 -> 显示名称
+FREQUENCIES = {
+    'daily': '每天',
+    'shift': '每班',
+    'weekly': '每周',
+}
+
+# 设备标识的最大长度（与 equipment_key 列长度一致）
+MAX_KEY_LENGTH = 100
+
+# 按整个模板跟踪时使用的设备标识
+TEMPLATE_KEY = ''
+
+
+def parse_shifts(value):
+    """班次开始时间配置（如 '08:00,16:00,00:00'）转换为排好序的 time 列表"""
+    shifts = set()
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            hour, minute = item.split(':')
+            shifts.add(time(int(hour), int(minute)))
+        except ValueError:
+            raise ValueError(f'班次开始时间格式不正确：{item}（应为 时:分）')
+    if not shifts:
+        raise ValueError('至少需要设置一个班次开始时间')
+    return sorted(shifts)
+
+
+def period_start(frequency, now, shifts):
+    """now 所在检查周期的开始时间"""
+    if frequency == 'daily':
+        return datetime.combine(now.date(), time())
+    if frequency == 'weekly':
+        return datetime.combine(now.date() - timedelta(days=now.weekday()), time())
+    if frequency == 'shift':
+        started = [shift for shift in shifts if shift <= now.time()]
+        if started:
+            return datetime.combine(now.date(), started[-1])
+        # 早于当天第一个班次时，属于前一天的最后一个班次
+        return datetime.combine(now.date() - timedelta(days=1), shifts[-1])
+    raise ValueError(f'未知的检查周期：{frequency}')
+
+
+def validate_schedule(frequency, key_column, column_names):
+    """检查模板的检查周期设置，返回错误说明（没有错误时返回 None）"""
+    if not frequency:
+        return '设置了设备列时必须选择检查周期' if key_column else None
+    if frequency not in FREQUENCIES:
+        return '检查周期无效'
+    if key_column and key_column not in column_names:
+        return f'设备列“{key_column}”不在表格结构中'
+    return None
+
+
+def equipment_keys(key_column, rows):
+    """一条记录检查过的设备：设备列中出现的全部非空值；没有设置设备列时为整个模板"""
+    if not key_column:
+        return {TEMPLATE_KEY}
+    keys = set()
+    for row in rows or ():
+        if not isinstance(row, dict):
+            continue
+        value = row.get(key_column)
+        if value is None:
+            continue
+        value = str(value).strip()[:MAX_KEY_LENGTH]
+        if value:
+            keys.add(value)
+    return keys
+
+
+def record_completed(cursor, template, record_id, created_at, rows):
+    """
+    新记录保存后更新检查状态，与记录写入在同一事务内执行。
+    template 需要包含 id、team、inspection_frequency、inspection_key_column；没有设置检查周期时不处理。
+    离线提交的记录可能早于已保存的完成时间，只保留最晚的一次。
+    """
+    if not template.get('inspection_frequency'):
+        return
+    params = [(template['id'], key, template['team'], created_at, record_id)
+              for key in equipment_keys(template.get('inspection_key_column'), rows)]
+    if not params:
+        return
+    cursor.executemany('''
+        INSERT INTO inspection_status (template_id, equipment_key, team, last_completed_at, last_record_id)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            last_record_id = CASE WHEN VALUES(last_completed_at) >= last_completed_at
+                                  THEN VALUES(last_record_id) ELSE last_record_id END,
+            last_completed_at = CASE WHEN VALUES(last_completed_at) > last_completed_at
+                                     THEN VALUES(last_completed_at) ELSE last_completed_at END,
+            team = VALUES(team)
+    ''', params)
+
+
+def move_template(cursor, template_id, team):
+    """模板改到其他区队时，检查状态随之归入新区队"""
+    cursor.execute('UPDATE inspection_status SET team = %s WHERE template_id = %s', (team, template_id))
+
+
+def reset_template(cursor, template_id):
+    """清除模板的检查状态（修改了检查周期或设备列，需要重建）"""
+    cursor.execute('DELETE FROM inspection_status WHERE template_id = %s', (template_id,))
+
+
+def rebuild_template(cursor, template, records):
+    """
+    用 records（可迭代，每项含 id、解码后的 rows、created_at）重建一个模板的检查状态，调用方负责提交。
+    records 在清除旧状态之前读完，可以是使用同一个 cursor 分批读取的生成器。
+    """
+    latest = {}
+    for record in records:
+        for key in equipment_keys(template.get('inspection_key_column'), record['rows']):
+            current = latest.get(key)
+            if current is None or record['created_at'] >= current[0]:
+                latest[key] = (record['created_at'], record['id'])
+    reset_template(cursor, template['id'])
+    if template.get('inspection_frequency') and latest:
+        cursor.executemany('''
+            INSERT INTO inspection_status (template_id, equipment_key, team, last_completed_at, last_record_id)
+            VALUES (%s, %s, %s, %s, %s)
+        ''', [(template['id'], key, template['team'], completed_at, record_id)
+              for key, (completed_at, record_id) in latest.items()])
+    return len(latest)
+
+
+def overdue(cursor, team=None, template_id=None, now=None, shifts=None):
+    """
+    当前周期内还没有完成检查的设备，按区队、模板、设备排序。
+    team 为 None 时查询全部区队。每项包含模板、设备、检查周期、当前周期开始时间、最近完成时间和对应记录。
+    """
+    now = now or datetime.now()
+    shifts = shifts or [time()]
+
+    sql = '''
+        SELECT id, name, team, inspection_frequency, inspection_key_column
+        FROM check_templates WHERE inspection_frequency IS NOT NULL
+    '''
+    params = []
+    if team is not None:
+        sql += ' AND team = %s'
+        params.append(team)
+    if template_id:
+        sql += ' AND id = %s'
+        params.append(template_id)
+    cursor.execute(sql, params)
+    templates = {row['id']: row for row in cursor.fetchall()}
+    if not templates:
+        return []
+
+    sql = 'SELECT template_id, equipment_key, last_completed_at, last_record_id FROM inspection_status'
+    if team is not None:
+        sql += ' WHERE team = %s'
+    elif template_id:
+        sql += ' WHERE template_id = %s'
+    cursor.execute(sql, params[:1])
+    statuses = {}
+    for row in cursor.fetchall():
+        statuses.setdefault(row['template_id'], []).append(row)
+
+    items = []
+    for template in templates.values():
+        start = period_start(template['inspection_frequency'], now, shifts)
+        rows = statuses.get(template['id'], [])
+        if not template['inspection_key_column'] and not any(row['equipment_key'] == TEMPLATE_KEY for row in rows):
+            # 按整个模板跟踪且从未填写过
+            rows = rows + [{'template_id': template['id'], 'equipment_key': TEMPLATE_KEY,
+                            'last_completed_at': None, 'last_record_id': None}]
+        for row in rows:
+            if row['last_completed_at'] is not None and row['last_completed_at'] >= start:
+                continue
+            items.append({
+                'template_id': template['id'],
+                'template_name': template['name'],
+                'team': template['team'],
+                'equipment_key': row['equipment_key'],
+                'frequency': template['inspection_frequency'],
+                'period_start': start,
+                'last_completed_at': row['last_completed_at'],
+                'last_record_id': row['last_record_id'],
+            })
+    items.sort(key=lambda item: (item['team'] or '', item['template_name'], item['equipment_key']))
+    return items
@@ -0,0 +1,107 @@
+# 逾期检查测试：各检查周期的开始时间（含跨午夜的班次），以及按检查状态列出逾期的设备
+# 运行：python -m pytest inspections_test.py
+
+from datetime import datetime, time
+
+import pytest
+
+import inspections
+from conftest import add_template, add_user
+
+SHIFTS = inspections.parse_shifts('08:00,16:00,00:00')
+
+
+def test_parse_shifts():
+    assert SHIFTS == [time(0, 0), time(8, 0), time(16, 0)]
+    with pytest.raises(ValueError):
+        inspections.parse_shifts('8点')
+    with pytest.raises(ValueError):
+        inspections.parse_shifts(' , ')
+
+
+@pytest.mark.parametrize('frequency, now, expected', [
+    ('daily', datetime(2025, 3, 5, 0, 0), datetime(2025, 3, 5, 0, 0)),
+    ('daily', datetime(2025, 3, 5, 23, 59), datetime(2025, 3, 5, 0, 0)),
+    # 2025-03-05 是星期三，每周从星期一开始
+    ('weekly', datetime(2025, 3, 5, 10, 0), datetime(2025, 3, 3, 0, 0)),
+    ('weekly', datetime(2025, 3, 3, 0, 0), datetime(2025, 3, 3, 0, 0)),
+    ('weekly', datetime(2025, 3, 9, 23, 59), datetime(2025, 3, 3, 0, 0)),
+    ('shift', datetime(2025, 3, 5, 7, 59), datetime(2025, 3, 5, 0, 0)),
+    ('shift', datetime(2025, 3, 5, 8, 0), datetime(2025, 3, 5, 8, 0)),
+    ('shift', datetime(2025, 3, 5, 23, 0), datetime(2025, 3, 5, 16, 0)),
+])
+def test_period_start(frequency, now, expected):
+    assert inspections.period_start(frequency, now, SHIFTS) == expected
+
+
+def test_shift_before_first_shift_belongs_to_previous_day():
+    shifts = inspections.parse_shifts('08:00,20:00')
+    assert inspections.period_start('shift', datetime(2025, 3, 5, 6, 0), shifts) == datetime(2025, 3, 4, 20, 0)
+
+
+def test_period_start_rejects_unknown_frequency():
+    with pytest.raises(ValueError):
+        inspections.period_start('monthly', datetime(2025, 3, 5), SHIFTS)
+
+
+def test_equipment_keys():
+    rows = [{'设备': ' 1号泵 '}, {'设备': '2号泵'}, {'设备': ''}, {'设备': None}, {}, '无效行']
+    assert inspections.equipment_keys('设备', rows) == {'1号泵', '2号泵'}
+    assert inspections.equipment_keys(None, rows) == {inspections.TEMPLATE_KEY}
+
+
+def _template(conn, **fields):
+    user_id = add_user(conn, employee_id=f"u{fields.get('name', '')}")
+    columns = [{'name': '设备', 'type': 'text'}]
+    template_id = add_template(conn, user_id, columns, **fields)
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, team, inspection_frequency, inspection_key_column FROM check_templates WHERE id = %s',
+                   (template_id,))
+    template = cursor.fetchone()
+    cursor.close()
+    return template
+
+
+def test_overdue_by_equipment(conn):
+    template = _template(conn, name='泵房巡检', inspection_frequency='daily', inspection_key_column='设备')
+    cursor = conn.cursor()
+    inspections.record_completed(cursor, template, 1, datetime(2025, 3, 4, 9, 0), [{'设备': '1号泵'}, {'设备': '2号泵'}])
+    inspections.record_completed(cursor, template, 2, datetime(2025, 3, 5, 9, 0), [{'设备': '1号泵'}])
+    # 离线提交的较早记录不覆盖更晚的完成时间
+    inspections.record_completed(cursor, template, 3, datetime(2025, 3, 3, 9, 0), [{'设备': '1号泵'}])
+
+    items = inspections.overdue(cursor, team='一区队', now=datetime(2025, 3, 5, 12, 0), shifts=SHIFTS)
+    assert [(item['equipment_key'], item['last_record_id']) for item in items] == [('2号泵', 1)]
+    assert items[0]['period_start'] == datetime(2025, 3, 5, 0, 0)
+
+    # 第二天两台设备都逾期
+    items = inspections.overdue(cursor, now=datetime(2025, 3, 6, 8, 0), shifts=SHIFTS)
+    assert [item['equipment_key'] for item in items] == ['1号泵', '2号泵']
+
+
+def test_template_never_filled_is_overdue(conn):
+    template = _template(conn, name='配电室巡检', inspection_frequency='shift')
+    _template(conn, name='不跟踪的模板')
+    cursor = conn.cursor()
+    now = datetime(2025, 3, 5, 12, 0)
+
+    items = inspections.overdue(cursor, now=now, shifts=SHIFTS)
+    assert [(item['template_id'], item['last_completed_at']) for item in items] == [(template['id'], None)]
+
+    inspections.record_completed(cursor, template, 1, datetime(2025, 3, 5, 7, 0), [])
+    assert len(inspections.overdue(cursor, now=now, shifts=SHIFTS)) == 1
+    inspections.record_completed(cursor, template, 2, datetime(2025, 3, 5, 8, 30), [])
+    assert inspections.overdue(cursor, now=now, shifts=SHIFTS) == []
+
+
+def test_rebuild_keeps_latest_record_per_equipment(conn):
+    template = _template(conn, name='泵房巡检', inspection_frequency='weekly', inspection_key_column='设备')
+    cursor = conn.cursor()
+    records = [
+        {'id': 1, 'created_at': datetime(2025, 3, 3, 9, 0), 'rows': [{'设备': '1号泵'}, {'设备': '2号泵'}]},
+        {'id': 2, 'created_at': datetime(2025, 3, 4, 9, 0), 'rows': [{'设备': '2号泵'}]},
+    ]
+    assert inspections.rebuild_template(cursor, template, iter(records)) == 2
+    cursor.execute('SELECT equipment_key, last_record_id FROM inspection_status ORDER BY equipment_key')
+    assert cursor.fetchall() == [{'equipment_key': '1号泵', 'last_record_id': 1},
+                                 {'equipment_key': '2号泵', 'last_record_id': 2}]
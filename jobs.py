@@ -0,0 +1,279 @@
+"""
+后台任务队列模块
+
+大批量导出、补建索引、重建统计、迁移附件、归档记录等耗时几分钟的工作不适合在网页请求中执行。
+这里用 background_jobs 表做一个轻量的任务队列：网页路由调用 enqueue 登记任务后立即返回，
+由 run_jobs.py 启动的工作进程领取并执行，执行代码见 job_tasks.py。
+
+- 领取：按ID顺序挑选到期的排队任务，用带状态条件的 UPDATE 抢占，多个工作进程不会领到同一个任务
+- 进度：任务执行时调用 JobContext.progress 更新进度和心跳；超过 stale_timeout 没有心跳的任务视为工作进程已退出，重新排队
+- 重试：出错后按 RETRY_DELAYS 延迟重新排队，达到 max_attempts 次后标记为失败
+- 取消：排队中的任务直接取消；执行中的任务设置取消标记，在下一次报告进度时停止
+- 结果：任务可以把结果文件写到 JobContext.result_path 给出的路径，完成后供创建者下载
+
+任务队列的状态更新使用单独的数据库连接（queue_conn），不会提交任务本身未完成的事务。
+"""
+
+import json
+import os
+import shutil
+import traceback
+from datetime import datetime, timedelta
+
+# 任务状态
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+STATUS_LABELS = {
+    STATUS_QUEUED: '排队中',
+    STATUS_RUNNING: '执行中',
+    STATUS_SUCCEEDED: '已完成',
+    STATUS_FAILED: '失败',
+    STATUS_CANCELLED: '已取消',
+}
+
+# 任务类型 -> 名称；执行代码在 job_tasks.py 中用 handler 注册
+JOB_KINDS = {
+    'export': '导出记录',
+    'rebuild_stats': '重建统计数据',
+    'backfill_field_index': '补建字段索引',
+    'migrate_attachments': '迁移内嵌附件',
+    'archive_records': '归档历史记录',
+    'rebuild_inspections': '重建检查状态',
+}
+
+# 只有超级管理员可以启动的维护任务
+MAINTENANCE_KINDS = ('rebuild_stats', 'backfill_field_index', 'migrate_attachments', 'archive_records',
+                     'rebuild_inspections')
+
+# 第 n 次失败后等待多少秒再重试
+RETRY_DELAYS = (30, 120, 600)
+
+_handlers = {}
+
+
+class JobCancelled(Exception):
+    """任务执行中被取消"""
+
+
+def handler(kind):
+    """注册任务的执行函数：func(ctx, params)，返回值（可 JSON 序列化）保存为任务结果摘要"""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(cursor, kind, params, created_by, team=None, max_attempts=3):
+    """登记任务，返回任务ID（调用方提交事务）"""
+    if kind not in JOB_KINDS:
+        raise ValueError(f'未知的任务类型：{kind}')
+    cursor.execute('''
+        INSERT INTO background_jobs (kind, params, status, max_attempts, created_by, team, run_after, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ''', (kind, json.dumps(params, ensure_ascii=False), STATUS_QUEUED, max_attempts, created_by, team,
+          datetime.now().replace(microsecond=0), datetime.now().replace(microsecond=0)))
+    return cursor.lastrowid
+
+
+def get_job(cursor, job_id):
+    cursor.execute('''
+        SELECT j.*, u.name AS creator_name FROM background_jobs j
+        LEFT JOIN users u ON j.created_by = u.id
+        WHERE j.id = %s
+    ''', (job_id,))
+    return cursor.fetchone()
+
+
+def list_jobs(cursor, created_by=None, limit=50):
+    """最近的任务；created_by 为 None 时返回所有人的任务"""
+    sql = '''
+        SELECT j.id, j.kind, j.status, j.progress, j.message, j.attempts, j.max_attempts, j.cancel_requested,
+               j.result_name, j.error, j.created_by, j.created_at, j.started_at, j.finished_at,
+               u.name AS creator_name
+        FROM background_jobs j
+        LEFT JOIN users u ON j.created_by = u.id
+    '''
+    params = []
+    if created_by is not None:
+        sql += ' WHERE j.created_by = %s'
+        params.append(created_by)
+    sql += ' ORDER BY j.id DESC LIMIT %s'
+    params.append(limit)
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+
+def request_cancel(cursor, job_id):
+    """取消任务：排队中的直接取消，执行中的设置取消标记；任务已结束时返回 False"""
+    now = datetime.now().replace(microsecond=0)
+    cursor.execute('''
+        UPDATE background_jobs SET status = %s, message = %s, finished_at = %s
+        WHERE id = %s AND status = %s
+    ''', (STATUS_CANCELLED, '已取消', now, job_id, STATUS_QUEUED))
+    if cursor.rowcount:
+        return True
+    cursor.execute('UPDATE background_jobs SET cancel_requested = 1 WHERE id = %s AND status = %s',
+                   (job_id, STATUS_RUNNING))
+    return bool(cursor.rowcount)
+
+
+def requeue_stale(queue_conn, stale_timeout):
+    """超过 stale_timeout 秒没有心跳的执行中任务（工作进程已退出）重新排队，次数用完的标记为失败"""
+    now = datetime.now().replace(microsecond=0)
+    cutoff = now - timedelta(seconds=stale_timeout)
+    cursor = queue_conn.cursor()
+    try:
+        cursor.execute('''
+            UPDATE background_jobs SET status = %s, error = %s, finished_at = %s
+            WHERE status = %s AND heartbeat_at < %s AND attempts >= max_attempts
+        ''', (STATUS_FAILED, '工作进程意外退出', now, STATUS_RUNNING, cutoff))
+        cursor.execute('''
+            UPDATE background_jobs SET status = %s, message = %s, locked_by = NULL, run_after = %s
+            WHERE status = %s AND heartbeat_at < %s
+        ''', (STATUS_QUEUED, '工作进程意外退出，等待重试', now, STATUS_RUNNING, cutoff))
+        queue_conn.commit()
+    finally:
+        cursor.close()
+
+
+def claim(queue_conn, worker_id):
+    """领取一个到期的排队任务，没有时返回 None"""
+    now = datetime.now().replace(microsecond=0)
+    cursor = queue_conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT id FROM background_jobs
+            WHERE status = %s AND run_after <= %s
+            ORDER BY id LIMIT 5
+        ''', (STATUS_QUEUED, now))
+        candidates = [row['id'] for row in cursor.fetchall()]
+        queue_conn.commit()
+
+        for job_id in candidates:
+            # 带状态条件更新，只有一个工作进程能抢到
+            cursor.execute('''
+                UPDATE background_jobs
+                SET status = %s, locked_by = %s, attempts = attempts + 1, cancel_requested = 0,
+                    started_at = %s, heartbeat_at = %s, message = %s, error = NULL
+                WHERE id = %s AND status = %s
+            ''', (STATUS_RUNNING, worker_id, now, now, '开始执行', job_id, STATUS_QUEUED))
+            claimed = cursor.rowcount == 1
+            queue_conn.commit()
+            if claimed:
+                return get_job(cursor, job_id)
+        return None
+    finally:
+        cursor.close()
+
+
+class JobContext:
+    """传给任务执行函数的上下文：报告进度、检查取消、获取结果文件路径"""
+
+    def __init__(self, queue_conn, job, result_folder):
+        self.queue_conn = queue_conn
+        self.job = job
+        self.result_folder = result_folder
+        self.result_name = None
+
+    def progress(self, percent, message=''):
+        """更新进度（0-100）和心跳；任务已被取消时抛出 JobCancelled"""
+        percent = max(0, min(100, int(percent)))
+        cursor = self.queue_conn.cursor()
+        try:
+            cursor.execute('''
+                UPDATE background_jobs SET progress = %s, message = %s, heartbeat_at = %s
+                WHERE id = %s
+            ''', (percent, message[:255], datetime.now().replace(microsecond=0), self.job['id']))
+            cursor.execute('SELECT cancel_requested FROM background_jobs WHERE id = %s', (self.job['id'],))
+            row = cursor.fetchone()
+            self.queue_conn.commit()
+        finally:
+            cursor.close()
+        if row and row['cancel_requested']:
+            raise JobCancelled()
+
+    def result_path(self, filename):
+        """结果文件的保存路径（每个任务一个目录），filename 同时作为下载时的文件名"""
+        directory = os.path.join(self.result_folder, str(self.job['id']))
+        os.makedirs(directory, exist_ok=True)
+        self.result_name = filename
+        return os.path.join(directory, 'result')
+
+
+def result_file(result_folder, job_id):
+    return os.path.join(result_folder, str(job_id), 'result')
+
+
+def run(queue_conn, job, result_folder):
+    """执行已领取的任务并记录结果；任务代码应在应用上下文中运行（使用 mysql.connection）"""
+    ctx = JobContext(queue_conn, job, result_folder)
+    func = _handlers.get(job['kind'])
+    status = STATUS_SUCCEEDED
+    message = '已完成'
+    error = None
+    summary = None
+    run_after = None
+    try:
+        if func is None:
+            raise ValueError(f"工作进程不支持任务类型：{job['kind']}")
+        summary = func(ctx, json.loads(job['params'] or '{}'))
+    except JobCancelled:
+        status = STATUS_CANCELLED
+        message = '已取消'
+    except Exception as e:
+        error = ''.join(traceback.format_exception_only(type(e), e)).strip()[:2000]
+        if job['attempts'] < job['max_attempts'] and func is not None:
+            delay = RETRY_DELAYS[min(job['attempts'], len(RETRY_DELAYS)) - 1]
+            status = STATUS_QUEUED
+            message = f'第 {job["attempts"]} 次执行出错，{delay} 秒后重试'
+            run_after = datetime.now().replace(microsecond=0) + timedelta(seconds=delay)
+        else:
+            status = STATUS_FAILED
+            message = '执行失败'
+
+    if status != STATUS_SUCCEEDED:
+        shutil.rmtree(os.path.join(result_folder, str(job['id'])), ignore_errors=True)
+        ctx.result_name = None
+
+    now = datetime.now().replace(microsecond=0)
+    cursor = queue_conn.cursor()
+    try:
+        cursor.execute('''
+            UPDATE background_jobs
+            SET status = %s, message = %s, error = %s, result_name = %s, summary = %s, locked_by = NULL,
+                progress = %s, run_after = COALESCE(%s, run_after), finished_at = %s
+            WHERE id = %s
+        ''', (status, message, error, ctx.result_name,
+              json.dumps(summary, ensure_ascii=False) if summary is not None else None,
+              100 if status == STATUS_SUCCEEDED else 0, run_after,
+              None if status == STATUS_QUEUED else now, job['id']))
+        queue_conn.commit()
+    finally:
+        cursor.close()
+    return status
+
+
+def purge_results(queue_conn, result_folder, retention_days):
+    """删除结束超过 retention_days 天的任务的结果文件，返回删除的个数"""
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    cursor = queue_conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT id FROM background_jobs
+            WHERE result_name IS NOT NULL AND finished_at < %s
+        ''', (cutoff,))
+        job_ids = [row['id'] for row in cursor.fetchall()]
+        for job_id in job_ids:
+            shutil.rmtree(os.path.join(result_folder, str(job_id)), ignore_errors=True)
+            cursor.execute('UPDATE background_jobs SET result_name = NULL, message = %s WHERE id = %s',
+                           ('结果文件已过期删除', job_id))
+        queue_conn.commit()
+        return len(job_ids)
+    finally:
+        cursor.close()
@@ -0,0 +1,157 @@
+# 后台任务队列测试：领取到期任务、执行结果、出错后延迟重试直到失败、取消，以及失去心跳的任务重新排队
+# 运行：python -m pytest jobs_test.py
+
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import jobs
+from db import PooledConnection
+
+
+@pytest.fixture
+def queue_conn(script_app, conn):
+    """任务队列使用的单独连接（同 run_jobs.py）"""
+    pool = script_app.extensions['mysql_pool'].pool
+    queue_conn = PooledConnection(pool, pool.acquire())
+    yield queue_conn
+    queue_conn.release()
+
+
+@pytest.fixture
+def task(monkeypatch):
+    """注册一个测试任务类型，calls 中记录每次执行收到的参数，behavior 决定执行结果"""
+    calls = []
+    behavior = {'raise': None}
+
+    def run_task(ctx, params):
+        calls.append(params)
+        ctx.progress(50, '执行到一半')
+        if behavior['raise']:
+            raise behavior['raise']
+        with open(ctx.result_path('结果.txt'), 'w') as f:
+            f.write('ok')
+        return {'rows': params['rows']}
+
+    monkeypatch.setitem(jobs.JOB_KINDS, 'test_task', '测试任务')
+    monkeypatch.setitem(jobs._handlers, 'test_task', run_task)
+    return calls, behavior
+
+
+def _enqueue(conn, **kwargs):
+    cursor = conn.cursor()
+    job_id = jobs.enqueue(cursor, 'test_task', {'rows': 3}, None, **kwargs)
+    conn.commit()
+    cursor.close()
+    return job_id
+
+
+def _job(queue_conn, job_id):
+    cursor = queue_conn.cursor()
+    job = jobs.get_job(cursor, job_id)
+    cursor.close()
+    return job
+
+
+def _make_due(queue_conn, job_id):
+    cursor = queue_conn.cursor()
+    cursor.execute('UPDATE background_jobs SET run_after = %s WHERE id = %s',
+                   (datetime.now().replace(microsecond=0) - timedelta(seconds=1), job_id))
+    queue_conn.commit()
+    cursor.close()
+
+
+def test_enqueue_rejects_unknown_kind(conn):
+    with pytest.raises(ValueError):
+        jobs.enqueue(conn.cursor(), 'no_such_kind', {}, None)
+
+
+def test_claim_takes_each_job_once_in_order(conn, queue_conn, task):
+    assert jobs.claim(queue_conn, 'w1') is None
+    first, second = _enqueue(conn), _enqueue(conn)
+
+    job = jobs.claim(queue_conn, 'w1')
+    assert (job['id'], job['status'], job['attempts'], job['locked_by']) == (first, jobs.STATUS_RUNNING, 1, 'w1')
+    assert jobs.claim(queue_conn, 'w2')['id'] == second
+    assert jobs.claim(queue_conn, 'w3') is None
+
+
+def test_run_saves_summary_and_result(script_app, conn, queue_conn, task):
+    job_id = _enqueue(conn)
+    folder = script_app.config['JOB_RESULT_FOLDER']
+
+    assert jobs.run(queue_conn, jobs.claim(queue_conn, 'w1'), folder) == jobs.STATUS_SUCCEEDED
+
+    job = _job(queue_conn, job_id)
+    assert (job['status'], job['progress'], job['result_name']) == (jobs.STATUS_SUCCEEDED, 100, '结果.txt')
+    assert json.loads(job['summary']) == {'rows': 3}
+    assert job['finished_at'] is not None
+    with open(jobs.result_file(folder, job_id)) as f:
+        assert f.read() == 'ok'
+
+
+def test_failures_are_retried_with_delay_then_marked_failed(script_app, conn, queue_conn, task):
+    calls, behavior = task
+    behavior['raise'] = RuntimeError('数据库暂时不可用')
+    job_id = _enqueue(conn, max_attempts=3)
+    folder = script_app.config['JOB_RESULT_FOLDER']
+
+    for attempt in (1, 2):
+        started = datetime.now().replace(microsecond=0)
+        job = jobs.claim(queue_conn, 'w1')
+        assert job['attempts'] == attempt
+        assert jobs.run(queue_conn, job, folder) == jobs.STATUS_QUEUED
+
+        job = _job(queue_conn, job_id)
+        assert 'RuntimeError: 数据库暂时不可用' in job['error']
+        assert job['finished_at'] is None
+        assert job['run_after'] >= started + timedelta(seconds=jobs.RETRY_DELAYS[attempt - 1])
+        # 重试时间未到时不会被领取
+        assert jobs.claim(queue_conn, 'w1') is None
+        _make_due(queue_conn, job_id)
+
+    assert jobs.run(queue_conn, jobs.claim(queue_conn, 'w1'), folder) == jobs.STATUS_FAILED
+    job = _job(queue_conn, job_id)
+    assert (job['status'], job['attempts'], job['result_name']) == (jobs.STATUS_FAILED, 3, None)
+    assert len(calls) == 3
+    assert not os.path.exists(os.path.join(folder, str(job_id)))
+
+
+def test_cancel(script_app, conn, queue_conn, task):
+    queued = _enqueue(conn)
+    cursor = conn.cursor()
+    assert jobs.request_cancel(cursor, queued)
+    conn.commit()
+    assert _job(queue_conn, queued)['status'] == jobs.STATUS_CANCELLED
+
+    running = _enqueue(conn)
+    job = jobs.claim(queue_conn, 'w1')
+    assert jobs.request_cancel(cursor, running)
+    conn.commit()
+    # 执行中的任务在下一次报告进度时停止
+    assert jobs.run(queue_conn, job, script_app.config['JOB_RESULT_FOLDER']) == jobs.STATUS_CANCELLED
+    assert not jobs.request_cancel(cursor, running)
+
+
+def test_requeue_stale(conn, queue_conn, task):
+    job_id = _enqueue(conn, max_attempts=2)
+    jobs.claim(queue_conn, 'w1')
+    cursor = queue_conn.cursor()
+    cursor.execute('UPDATE background_jobs SET heartbeat_at = %s WHERE id = %s',
+                   (datetime.now() - timedelta(hours=1), job_id))
+    queue_conn.commit()
+
+    jobs.requeue_stale(queue_conn, 600)
+    job = _job(queue_conn, job_id)
+    assert (job['status'], job['locked_by']) == (jobs.STATUS_QUEUED, None)
+
+    # 次数用完后标记为失败
+    jobs.claim(queue_conn, 'w1')
+    cursor.execute('UPDATE background_jobs SET heartbeat_at = %s WHERE id = %s',
+                   (datetime.now() - timedelta(hours=1), job_id))
+    queue_conn.commit()
+    jobs.requeue_stale(queue_conn, 600)
+    assert _job(queue_conn, job_id)['status'] == jobs.STATUS_FAILED
+    cursor.close()
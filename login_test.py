@@ -0,0 +1,49 @@
+# 登录限流测试：按 IP 计数的失败次数在反向代理之后按转发的客户端地址计算
+# 运行：python -m pytest login_test.py
+
+import pytest
+
+from app import create_app
+from benchmark import sqlite_backend
+from db import ConnectionPool
+
+
+def _app(tmp_path, hops):
+    path = str(tmp_path / 'test.sqlite3')
+    app = create_app({'SESSION_STORE_PATH': str(tmp_path / 'sessions.sqlite3'), 'PROXY_FIX_HOPS': hops,
+                      'LOGIN_MAX_FAILURES_PER_IP': 2})
+    app.extensions['mysql_pool'].pool = ConnectionPool(lambda: sqlite_backend.connect(path), max_size=2)
+    return app
+
+
+@pytest.fixture
+def apps(tmp_path):
+    apps = []
+
+    def make(hops):
+        apps.append(_app(tmp_path, hops))
+        return apps[-1]
+
+    yield make
+    for app in apps:
+        app.extensions['cluster_poller'].stop()
+
+
+def _login(client, employee_id, client_ip):
+    # 代理（127.0.0.1）转发的请求，X-Forwarded-For 中是客户端地址
+    return client.post('/login', data={'employee_id': employee_id, 'password': 'wrong'},
+                       headers={'X-Forwarded-For': client_ip}).status_code
+
+
+def test_ip_throttle_uses_forwarded_client_address(apps):
+    client = apps(1).test_client()
+    assert [_login(client, f'u{n}', '10.0.0.1') for n in range(3)] == [200, 200, 429]
+    # 同一代理之后的其他客户端不受影响
+    assert _login(client, 'u9', '10.0.0.2') == 200
+
+
+def test_forwarded_header_ignored_without_proxy(apps):
+    client = apps(0).test_client()
+    assert [_login(client, 'u1', '10.0.0.1'), _login(client, 'u2', '10.0.0.2')] == [200, 200]
+    # 伪造的 X-Forwarded-For 不能绕过限流
+    assert _login(client, 'u3', '10.0.0.3') == 429
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+把历史记录中内嵌的 base64 图片/文件迁移到附件存储的脚本
+
+使用方法：
+1. 确保Flask应用已经正确配置数据库连接和 ATTACHMENT_FOLDER
+2. 在命令行中运行：python migrate_attachments.py [--batch-size 200] [--dry-run]
+   也可以由超级管理员在“后台任务”页面启动（见 job_tasks.py）
+
+脚本按记录ID分批扫描 check_records，将 data 中的 data URL 单元格保存为附件，
+并替换为 "att:<sha256>" 引用，再按模板的列顺序重新编码保存。
+已压缩（record_codec 编码）的记录无法在 SQL 中按内容筛选，因此每条记录都解码后检查。
+每批单独提交，中途中断后重新运行即可继续。
+"""
+
+import argparse
+
+from extensions import mysql, script_app, template_cache
+from db import QUERIES
+import attachments
+import record_codec
+
+
+def migrate_attachments(batch_size=200, dry_run=False, progress=None):
+    app = script_app()
+    with app.app_context():
+        folder = app.config['ATTACHMENT_FOLDER']
+        cursor = mysql.connection.cursor()
+        last_id = 0
+        migrated_records = 0
+        migrated_cells = 0
+
+        try:
+            max_id = 0
+            if progress:
+                cursor.execute(QUERIES['max_record_id'])
+                max_id = cursor.fetchone()['max_id'] or 0
+            while True:
+                cursor.execute('''
+                    SELECT r.id, r.template_id, r.data, r.created_by, t.structure, t.updated_at AS template_updated_at
+                    FROM check_records r
+                    LEFT JOIN check_templates t ON r.template_id = t.id
+                    WHERE r.id > %s
+                    ORDER BY r.id LIMIT %s
+                ''', (last_id, batch_size))
+                records = cursor.fetchall()
+                if not records:
+                    break
+
+                for record in records:
+                    last_id = record['id']
+                    try:
+                        record_data = record_codec.decode_rows(record['data'])
+                    except ValueError:
+                        print(f"记录 {record['id']} 的数据无法解析，已跳过")
+                        continue
+
+                    store = attachments.data_url_store(cursor, folder, record['created_by'], dry_run)
+                    new_data, replaced = attachments.externalize_data_urls(record_data, store)
+                    if not replaced:
+                        continue
+
+                    column_names = ()
+                    if record['structure']:
+                        column_names = template_cache.get(record['template_id'], record['template_updated_at'],
+                                                          record['structure']).column_names
+                    new_value = record_codec.encode_rows(new_data, column_names)
+                    print(f"记录 {record['id']}: 迁移 {replaced} 个附件，"
+                          f"数据大小 {len(record['data'])} -> {len(new_value)}")
+                    if not dry_run:
+                        cursor.execute('UPDATE check_records SET data = %s, updated_at = updated_at WHERE id = %s',
+                                       (new_value, record['id']))
+                    migrated_records += 1
+                    migrated_cells += replaced
+
+                # 每批提交一次，避免长事务
+                if not dry_run:
+                    mysql.connection.commit()
+                if progress:
+                    progress(min(99, last_id * 100 // max(max_id, 1)), f"已处理到记录ID {last_id}，累计迁移 {migrated_cells} 个附件")
+
+            print(f"\n迁移完成：共处理 {migrated_records} 条记录，{migrated_cells} 个附件。")
+            if dry_run:
+                print("当前为试运行模式，数据库和附件目录均未修改。")
+            return {'records': migrated_records, 'attachments': migrated_cells}
+
+        except Exception as e:
+            print(f"迁移附件时出错: {str(e)}")
+            mysql.connection.rollback()
+            # 作为后台任务运行时把错误交给任务队列处理（重试或标记失败）
+            if progress:
+                raise
+        finally:
+            cursor.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='把记录中内嵌的 base64 图片/文件迁移到附件存储')
+    parser.add_argument('--batch-size', type=int, default=200, help='每批处理的记录数')
+    parser.add_argument('--dry-run', action='store_true', help='只统计不修改')
+    args = parser.parse_args()
+
+    print("正在迁移记录中的内嵌附件...\n")
+    migrate_attachments(args.batch_size, args.dry_run)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+执行数据库结构迁移的脚本
+
+使用方法：
+1. 备份数据库
+2. 在命令行中运行：python migrate_schema.py [--batch-size 2000] [--pause 0.1] [--target 版本号]
+   查看各迁移是否已执行：python migrate_schema.py --status
+3. 迁移在应用运行期间在线执行，完成后再部署（或 SIGHUP 重新加载，见 serve.py）依赖新结构的代码；
+   serve.py 检测到未执行的迁移时拒绝启动
+
+迁移列表和执行方式见 migrations.py。中途中断或失败后重新运行即可从中断处继续。
+
+部署检查记录 team 列（迁移 11~13）时，迁移完成到新代码上线之间由旧代码保存的记录没有 team，
+新代码上线后运行一次 python migrate_schema.py --backfill-team 补齐。
+"""
+
+import argparse
+
+from extensions import mysql, script_app
+import migrations
+
+
+def show_status():
+    app = script_app()
+    with app.app_context():
+        cursor = mysql.connection.cursor()
+        try:
+            migrations.ensure_table(cursor)
+            applied = migrations.applied_versions(cursor)
+            for migration in migrations.MIGRATIONS:
+                state = '已执行' if migration.version in applied else '未执行'
+                print(f"{migration.version:>4}  {state}  {migration.name}")
+        except Exception as e:
+            print(f"读取迁移状态时出错: {str(e)}")
+        finally:
+            cursor.close()
+
+
+def migrate_schema(target=None, batch_size=migrations.DEFAULT_BATCH_SIZE, pause=0):
+    app = script_app()
+    with app.app_context():
+        try:
+            done = migrations.migrate(mysql.connection, target=target, batch_size=batch_size, pause=pause)
+            if done:
+                print(f"\n迁移完成：本次执行 {len(done)} 个迁移，当前版本 {done[-1].version}。")
+            else:
+                print("没有需要执行的迁移。")
+        except Exception as e:
+            print(f"执行迁移时出错: {str(e)}")
+            mysql.connection.rollback()
+            print("修复问题后重新运行即可从中断处继续。")
+
+
+def backfill_team(batch_size=migrations.DEFAULT_BATCH_SIZE, pause=0):
+    app = script_app()
+    with app.app_context():
+        try:
+            migrations.backfill_record_team(mysql.connection, batch_size, pause, print)
+            print("\n检查记录的 team 列已补齐。")
+        except Exception as e:
+            print(f"回填 team 列时出错: {str(e)}")
+            mysql.connection.rollback()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='按版本顺序在线执行数据库结构迁移')
+    parser.add_argument('--status', action='store_true', help='只显示各迁移是否已执行')
+    parser.add_argument('--target', type=int, help='执行到该版本号为止（默认执行全部）')
+    parser.add_argument('--batch-size', type=int, default=migrations.DEFAULT_BATCH_SIZE, help='数据回填每批处理的ID范围')
+    parser.add_argument('--pause', type=float, default=0, help='数据回填每批之间暂停的秒数')
+    parser.add_argument('--backfill-team', action='store_true', help='只补齐检查记录中缺少的 team（新代码上线后运行）')
+    args = parser.parse_args()
+
+    if args.status:
+        show_status()
+    elif args.backfill_team:
+        print("正在补齐检查记录的 team 列...\n")
+        backfill_team(args.batch_size, args.pause)
+    else:
+        print("正在执行数据库迁移...\n")
+        migrate_schema(args.target, args.batch_size, args.pause)
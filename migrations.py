@@ -0,0 +1,616 @@
+"""
+数据库结构迁移模块
+
+迁移按版本号顺序执行，只向前、不回退。已执行的版本记录在 schema_migrations 表中，
+python migrate_schema.py 执行所有未执行的迁移；用 check_module_database.sql 新建的数据库已是最新结构，
+建表时即把全部版本记为已执行。
+
+迁移在应用运行期间执行，不需要停机：
+- 结构变更使用 ALGORITHM=INSTANT 或 ALGORITHM=INPLACE, LOCK=NONE，MySQL 不支持在线执行时直接报错，不会退化为锁表复制
+  （唯一的例外是迁移 8 修改记录数据列的类型，只能复制整表，见 change_record_data_to_blob）
+- 数据回填按主键范围分批，每批一个短事务，批与批之间可以暂停，避免长时间锁住在线表、拉大只读副本的复制延迟
+- 每个迁移都可以重复执行：变更前检查列和索引是否已存在，回填只处理尚未填写的行。
+  MySQL 的 DDL 会隐式提交，迁移中途失败后修复问题重新运行即可从失败处继续
+
+新增迁移：在 MIGRATIONS 末尾追加，版本号递增；同时修改 check_module_database.sql（最新结构和已执行版本）
+和 benchmark/schema_sqlite.sql。
+"""
+
+import time
+from collections import namedtuple
+
+import archive
+
+MIGRATIONS_TABLE = 'schema_migrations'
+
+# 同一时间只允许一个进程执行迁移（MySQL 命名锁）
+LOCK_NAME = 'electromechanical_schema_migrations'
+
+DEFAULT_BATCH_SIZE = 2000
+
+Migration = namedtuple('Migration', ['version', 'name', 'apply'])
+
+
+class MigrationError(Exception):
+    """迁移无法执行（如另一个进程正在执行迁移）"""
+
+
+def column_exists(cursor, table, column):
+    cursor.execute('''
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    ''', (table, column))
+    return cursor.fetchone() is not None
+
+
+def index_exists(cursor, table, index):
+    cursor.execute('''
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        LIMIT 1
+    ''', (table, index))
+    return cursor.fetchone() is not None
+
+
+def column_type(cursor, table, column):
+    """列的数据类型（如 text、mediumblob），列不存在时为 None"""
+    cursor.execute('''
+        SELECT DATA_TYPE AS data_type FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    ''', (table, column))
+    row = cursor.fetchone()
+    return row['data_type'].lower() if row else None
+
+
+def foreign_key_exists(cursor, table, name):
+    cursor.execute('''
+        SELECT 1 FROM information_schema.TABLE_CONSTRAINTS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_NAME = %s
+          AND CONSTRAINT_TYPE = 'FOREIGN KEY'
+    ''', (table, name))
+    return cursor.fetchone() is not None
+
+
+def alter_online(cursor, table, clause, algorithms=('INPLACE',)):
+    """在线执行 ALTER TABLE，依次尝试 algorithms 中的算法，全部不支持时抛出最后一个错误"""
+    error = None
+    for algorithm in algorithms:
+        # INSTANT 只修改元数据，不需要也不能指定 LOCK
+        lock = '' if algorithm == 'INSTANT' else ', LOCK=NONE'
+        try:
+            cursor.execute(f'ALTER TABLE `{table}` {clause}, ALGORITHM={algorithm}{lock}')
+            return algorithm
+        except Exception as e:
+            error = e
+    raise error
+
+
+# ----------------------------
+# 迁移
+# ----------------------------
+# 1~10 补齐 schema_migrations 之前各项功能新增的表、索引和列类型，
+# 已手工建过的表和索引跳过，按 README 旧说明手工升级过的数据库也可以直接执行
+
+RECORD_PAGE_INDEXES = [
+    ('idx_created_at_id', '(`created_at` DESC, `id` DESC)'),
+    ('idx_template_created_at_id', '(`template_id` ASC, `created_at` DESC, `id` DESC)'),
+    ('idx_created_by_created_at_id', '(`created_by` ASC, `created_at` DESC, `id` DESC)'),
+]
+
+
+def add_record_page_indexes(conn, batch_size, pause, log):
+    """记录列表按 (created_at, id) 游标分页使用的复合索引"""
+    cursor = conn.cursor()
+    try:
+        for index, columns in RECORD_PAGE_INDEXES:
+            if index_exists(cursor, 'check_records', index):
+                continue
+            alter_online(cursor, 'check_records', f'ADD INDEX `{index}`{columns}')
+            log(f"  check_records 增加索引 {index}")
+    finally:
+        cursor.close()
+
+
+def create_attachments(conn, batch_size, pause, log):
+    """附件元数据表（文件内容按 SHA-256 保存在 ATTACHMENT_FOLDER 目录下）"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS `check_attachments` (
+              `sha256` char(64) CHARACTER SET ascii COLLATE ascii_bin NOT NULL COMMENT '文件内容SHA-256摘要',
+              `size` bigint NOT NULL COMMENT '文件大小（字节）',
+              `mime_type` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '文件类型',
+              `original_name` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '首次上传时的文件名',
+              `created_by` int NULL DEFAULT NULL COMMENT '首次上传者ID',
+              `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+              PRIMARY KEY (`sha256`)
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = '附件表'
+        ''')
+        log("  创建 check_attachments 表")
+    finally:
+        cursor.close()
+
+
+def create_field_index(conn, batch_size, pause, log):
+    """记录字段索引表和全文索引表，建表后运行 python backfill_field_index.py 为已有记录建立索引"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS `check_record_fields` (
+              `id` bigint NOT NULL AUTO_INCREMENT COMMENT '自增ID',
+              `record_id` int NOT NULL COMMENT '记录ID',
+              `template_id` int NOT NULL COMMENT '模板ID',
+              `created_at` timestamp NULL DEFAULT NULL COMMENT '记录创建时间（冗余，便于按时间范围筛选）',
+              `row_no` smallint NOT NULL COMMENT '行号（从1开始）',
+              `field_name` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '列名',
+              `value_text` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '文本值',
+              `value_num` decimal(20, 6) NULL DEFAULT NULL COMMENT '数值（number类型列）',
+              `value_time` datetime NULL DEFAULT NULL COMMENT '时间值（datetime类型列）',
+              PRIMARY KEY (`id`),
+              INDEX `idx_record_id`(`record_id` ASC),
+              INDEX `idx_field_text`(`field_name` ASC, `value_text` ASC, `created_at` ASC),
+              INDEX `idx_template_field_text`(`template_id` ASC, `field_name` ASC, `value_text` ASC, `created_at` ASC),
+              INDEX `idx_template_field_num`(`template_id` ASC, `field_name` ASC, `value_num` ASC),
+              INDEX `idx_template_field_time`(`template_id` ASC, `field_name` ASC, `value_time` ASC),
+              CONSTRAINT `fk_check_record_fields_record_id` FOREIGN KEY (`record_id`) REFERENCES `check_records` (`id`) ON DELETE CASCADE ON UPDATE CASCADE
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = '记录字段索引表'
+        ''')
+        log("  创建 check_record_fields 表")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS `check_record_texts` (
+              `record_id` int NOT NULL COMMENT '记录ID',
+              `template_id` int NOT NULL COMMENT '模板ID',
+              `content` mediumtext CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '文本内容',
+              PRIMARY KEY (`record_id`),
+              INDEX `idx_template_id`(`template_id` ASC),
+              FULLTEXT INDEX `ft_content`(`content`) WITH PARSER `ngram`,
+              CONSTRAINT `fk_check_record_texts_record_id` FOREIGN KEY (`record_id`) REFERENCES `check_records` (`id`) ON DELETE CASCADE ON UPDATE CASCADE
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = '记录全文索引表'
+        ''')
+        log("  创建 check_record_texts 表")
+    finally:
+        cursor.close()
+
+
+def create_stat_rollups(conn, batch_size, pause, log):
+    """统计汇总表，建表后运行 python rebuild_stats.py 汇总已有记录"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS `stat_daily_templates` (
+              `team` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '所属区队',
+              `template_id` int NOT NULL COMMENT '模板ID',
+              `stat_date` date NOT NULL COMMENT '记录创建日期',
+              `record_count` int NOT NULL DEFAULT 0 COMMENT '记录数',
+              `row_count` int NOT NULL DEFAULT 0 COMMENT '数据行数',
+              `required_total` int NOT NULL DEFAULT 0 COMMENT '必填单元格总数',
+              `required_filled` int NOT NULL DEFAULT 0 COMMENT '已填写的必填单元格数',
+              PRIMARY KEY (`team`, `template_id`, `stat_date`),
+              INDEX `idx_team_date`(`team` ASC, `stat_date` ASC),
+              INDEX `idx_template_date`(`template_id` ASC, `stat_date` ASC),
+              INDEX `idx_stat_date`(`stat_date` ASC)
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = '每日模板统计表'
+        ''')
+        log("  创建 stat_daily_templates 表")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS `stat_daily_options` (
+              `team` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '所属区队',
+              `template_id` int NOT NULL COMMENT '模板ID',
+              `stat_date` date NOT NULL COMMENT '记录创建日期',
+              `field_name` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '列名',
+              `option_value` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '选项值',
+              `value_count` int NOT NULL DEFAULT 0 COMMENT '出现次数',
+              PRIMARY KEY (`team`, `template_id`, `stat_date`, `field_name`, `option_value`),
+              INDEX `idx_template_date`(`template_id` ASC, `stat_date` ASC),
+              INDEX `idx_stat_date`(`stat_date` ASC)
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = '每日选项统计表'
+        ''')
+        log("  创建 stat_daily_options 表")
+    finally:
+        cursor.close()
+
+
+def create_api_tables(conn, batch_size, pause, log):
+    """离线设备的API令牌表和批量提交的幂等键表"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS `api_tokens` (
+              `id` int NOT NULL AUTO_INCREMENT COMMENT '自增ID',
+              `user_id` int NOT NULL COMMENT '用户ID',
+              `token_hash` char(64) CHARACTER SET ascii COLLATE ascii_bin NOT NULL COMMENT '令牌SHA-256摘要',
+              `name` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '设备名称',
+              `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP COMMENT '签发时间',
+              `last_used_at` timestamp NULL DEFAULT NULL COMMENT '最后使用时间',
+              `revoked_at` timestamp NULL DEFAULT NULL COMMENT '吊销时间',
+              PRIMARY KEY (`id`),
+              UNIQUE INDEX `uk_token_hash`(`token_hash` ASC),
+              INDEX `idx_user_id`(`user_id` ASC),
+              CONSTRAINT `fk_api_tokens_user_id` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE ON UPDATE CASCADE
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = 'API令牌表'
+        ''')
+        log("  创建 api_tokens 表")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS `check_record_submissions` (
+              `user_id` int NOT NULL COMMENT '提交用户ID',
+              `idempotency_key` varchar(64) CHARACTER SET ascii COLLATE ascii_bin NOT NULL COMMENT '客户端生成的幂等键',
+              `record_id` int NULL DEFAULT NULL COMMENT '创建的记录ID',
+              `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP COMMENT '提交时间',
+              PRIMARY KEY (`user_id`, `idempotency_key`),
+              INDEX `idx_record_id`(`record_id` ASC),
+              INDEX `idx_created_at`(`created_at` ASC)
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = '批量提交幂等键表'
+        ''')
+        log("  创建 check_record_submissions 表")
+    finally:
+        cursor.close()
+
+
+USER_SEARCH_INDEXES = [
+    ('idx_team_role', '(`team` ASC, `role` ASC)'),
+    ('idx_name', '(`name` ASC)'),
+]
+
+
+def add_user_search_indexes(conn, batch_size, pause, log):
+    """用户管理页面按区队、角色筛选和按姓名搜索使用的索引"""
+    cursor = conn.cursor()
+    try:
+        for index, columns in USER_SEARCH_INDEXES:
+            if index_exists(cursor, 'users', index):
+                continue
+            alter_online(cursor, 'users', f'ADD INDEX `{index}`{columns}')
+            log(f"  users 增加索引 {index}")
+    finally:
+        cursor.close()
+
+
+def create_revisions(conn, batch_size, pause, log):
+    """记录修订历史表。不设外键，记录归档后修订历史仍然保留（早期版本建的外键在这里删除）"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS `check_record_revisions` (
+              `id` int NOT NULL AUTO_INCREMENT COMMENT '自增ID',
+              `record_id` int NOT NULL COMMENT '记录ID',
+              `revision_no` int NOT NULL COMMENT '修订号，0为原始提交',
+              `kind` varchar(10) CHARACTER SET ascii COLLATE ascii_bin NOT NULL COMMENT 'snapshot-完整快照，delta-与上一版的差异',
+              `data` mediumtext CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '快照或差异（JSON）',
+              `cells_changed` int NOT NULL DEFAULT 0 COMMENT '改动的单元格数',
+              `edited_by` int NULL DEFAULT NULL COMMENT '修改人ID',
+              `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP COMMENT '修改时间',
+              PRIMARY KEY (`id`),
+              UNIQUE INDEX `uk_record_revision`(`record_id` ASC, `revision_no` ASC)
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = '记录修订历史表'
+        ''')
+        log("  创建 check_record_revisions 表")
+        if foreign_key_exists(cursor, 'check_record_revisions', 'fk_check_record_revisions_record_id'):
+            alter_online(cursor, 'check_record_revisions', 'DROP FOREIGN KEY `fk_check_record_revisions_record_id`')
+            log("  check_record_revisions 删除外键 fk_check_record_revisions_record_id")
+    finally:
+        cursor.close()
+
+
+def change_record_data_to_blob(conn, batch_size, pause, log):
+    """
+    记录数据列改为 mediumblob，保存 record_codec 压缩后的数据；之后运行 python compress_records.py 转换历史记录。
+
+    修改列类型只能复制整表（ALGORITHM=COPY），执行期间记录表只读、保存记录的请求等待，记录较多时安排在低峰执行。
+    已有的 JSON 文本原样保留，读取时自动识别。
+    """
+    cursor = conn.cursor()
+    try:
+        if column_type(cursor, 'check_records', 'data') == 'mediumblob':
+            return
+        started = time.monotonic()
+        cursor.execute(
+            "ALTER TABLE `check_records` MODIFY `data` mediumblob NOT NULL "
+            "COMMENT '表格数据（record_codec 按列编码并压缩，旧数据为JSON文本）', ALGORITHM=COPY, LOCK=SHARED")
+        log(f"  check_records.data 改为 mediumblob（COPY，{time.monotonic() - started:.1f} 秒）")
+    finally:
+        cursor.close()
+
+
+def create_background_jobs(conn, batch_size, pause, log):
+    """后台任务队列表（见 jobs.py）"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS `background_jobs` (
+              `id` int NOT NULL AUTO_INCREMENT COMMENT '任务ID',
+              `kind` varchar(50) CHARACTER SET ascii COLLATE ascii_bin NOT NULL COMMENT '任务类型',
+              `params` text CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL COMMENT '任务参数（JSON）',
+              `status` varchar(20) CHARACTER SET ascii COLLATE ascii_bin NOT NULL DEFAULT 'queued' COMMENT 'queued/running/succeeded/failed/cancelled',
+              `progress` int NOT NULL DEFAULT 0 COMMENT '进度（0-100）',
+              `message` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '进度说明',
+              `attempts` int NOT NULL DEFAULT 0 COMMENT '已执行次数',
+              `max_attempts` int NOT NULL DEFAULT 3 COMMENT '最多执行次数',
+              `cancel_requested` tinyint(1) NOT NULL DEFAULT 0 COMMENT '执行中被要求取消',
+              `created_by` int NULL DEFAULT NULL COMMENT '提交人ID',
+              `team` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '相关区队',
+              `result_name` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '结果文件的下载文件名',
+              `summary` text CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL COMMENT '结果摘要（JSON）',
+              `error` text CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL COMMENT '最近一次的错误信息',
+              `locked_by` varchar(100) CHARACTER SET ascii COLLATE ascii_bin NULL DEFAULT NULL COMMENT '执行中的工作进程',
+              `run_after` datetime NOT NULL COMMENT '最早执行时间（重试时推后）',
+              `heartbeat_at` datetime NULL DEFAULT NULL COMMENT '最近一次报告进度的时间',
+              `created_at` datetime NOT NULL COMMENT '提交时间',
+              `started_at` datetime NULL DEFAULT NULL COMMENT '最近一次开始执行的时间',
+              `finished_at` datetime NULL DEFAULT NULL COMMENT '结束时间',
+              PRIMARY KEY (`id`),
+              INDEX `idx_status_run_after`(`status` ASC, `run_after` ASC),
+              INDEX `idx_created_by`(`created_by` ASC, `id` ASC)
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = '后台任务表'
+        ''')
+        log("  创建 background_jobs 表")
+    finally:
+        cursor.close()
+
+
+def create_records_archive(conn, batch_size, pause, log):
+    """归档记录表，按创建时间每月一个分区（月份分区由 archive.ensure_partitions 归档前从 p_future 拆出）"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS `check_records_archive` (
+              `id` int NOT NULL COMMENT '记录ID（与归档前相同）',
+              `template_id` int NOT NULL COMMENT '模板ID',
+              `team` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '所属区队（同 check_records.team）',
+              `data` mediumblob NOT NULL COMMENT '表格数据（原样搬移，格式同 check_records.data）',
+              `created_by` int NOT NULL COMMENT '创建者ID',
+              `created_at` datetime NOT NULL COMMENT '创建时间',
+              `updated_at` datetime NULL DEFAULT NULL COMMENT '归档前最后更新时间',
+              `archived_at` datetime NOT NULL COMMENT '归档时间',
+              PRIMARY KEY (`id`, `created_at`),
+              INDEX `idx_created_at_id`(`created_at` DESC, `id` DESC),
+              INDEX `idx_team_created_at_id`(`team` ASC, `created_at` DESC, `id` DESC),
+              INDEX `idx_template_created_at_id`(`template_id` ASC, `created_at` DESC, `id` DESC),
+              INDEX `idx_created_by_created_at_id`(`created_by` ASC, `created_at` DESC, `id` DESC)
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = '归档记录表'
+            PARTITION BY RANGE (TO_DAYS(`created_at`)) (
+              PARTITION p_history VALUES LESS THAN (TO_DAYS('2025-01-01')),
+              PARTITION p_future VALUES LESS THAN MAXVALUE
+            )
+        ''')
+        log("  创建 check_records_archive 表")
+    finally:
+        cursor.close()
+
+
+def add_record_team(conn, batch_size, pause, log):
+    """记录表增加 team 列（取自模板的区队），按区队查询记录时不再关联模板表"""
+    cursor = conn.cursor()
+    try:
+        for table in archive.record_tables(include_archive=True):
+            if column_exists(cursor, table, 'team'):
+                continue
+            algorithm = alter_online(
+                cursor, table,
+                "ADD COLUMN `team` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL "
+                "COMMENT '所属区队（与模板的区队相同，模板改到其他区队时随之更新）'",
+                algorithms=('INSTANT', 'INPLACE'))
+            log(f"  {table} 增加 team 列（{algorithm}）")
+    finally:
+        cursor.close()
+
+
+def backfill_record_team(conn, batch_size, pause, log):
+    """按模板的区队分批填写已有记录的 team 列"""
+    cursor = conn.cursor()
+    try:
+        for table in archive.record_tables(include_archive=True):
+            cursor.execute(f'SELECT MAX(id) AS max_id FROM {table}')
+            max_id = cursor.fetchone()['max_id'] or 0
+            updated = 0
+            last_id = 0
+            while last_id < max_id:
+                cursor.execute(f'''
+                    UPDATE {table}
+                    SET team = (SELECT t.team FROM check_templates t WHERE t.id = {table}.template_id)
+                    WHERE id > %s AND id <= %s AND team IS NULL
+                ''', (last_id, last_id + batch_size))
+                updated += cursor.rowcount
+                conn.commit()
+                last_id += batch_size
+                log(f"  {table}：已处理到 ID {min(last_id, max_id)} / {max_id}，填写 {updated} 条")
+                if pause:
+                    time.sleep(pause)
+    finally:
+        cursor.close()
+
+
+def add_team_indexes(conn, batch_size, pause, log):
+    """按区队分页查询记录的索引，回填完成后再建，只需构建一次"""
+    cursor = conn.cursor()
+    try:
+        for table in archive.record_tables(include_archive=True):
+            if index_exists(cursor, table, 'idx_team_created_at_id'):
+                continue
+            alter_online(cursor, table, 'ADD INDEX `idx_team_created_at_id`(`team` ASC, `created_at` DESC, `id` DESC)')
+            log(f"  {table} 增加索引 idx_team_created_at_id")
+    finally:
+        cursor.close()
+
+
+# 与其他索引重复的索引：(表, 索引, 覆盖它的索引)。唯一索引已覆盖同一列，或是复合索引的最左前缀（外键改用复合索引）
+REDUNDANT_INDEXES = [
+    ('users', 'idx_employee_id', 'employee_id'),
+    ('users', 'idx_phone', 'phone'),
+    ('check_records', 'idx_template_id', 'idx_template_created_at_id'),
+    ('check_records', 'idx_created_by', 'idx_created_by_created_at_id'),
+]
+
+
+def drop_redundant_indexes(conn, batch_size, pause, log):
+    """删除重复的索引，减少写入时维护索引的开销
+
+    只有覆盖它的索引已存在时才删除：外键列不能没有索引，MySQL 会拒绝删除外键唯一可用的索引
+    """
+    cursor = conn.cursor()
+    try:
+        for table, index, replacement in REDUNDANT_INDEXES:
+            if not index_exists(cursor, table, index):
+                continue
+            if not index_exists(cursor, table, replacement):
+                log(f"  {table} 没有索引 {replacement}，保留 {index}")
+                continue
+            alter_online(cursor, table, f'DROP INDEX `{index}`')
+            log(f"  {table} 删除索引 {index}")
+    finally:
+        cursor.close()
+
+
+def add_inspection_schedule(conn, batch_size, pause, log):
+    """模板增加检查周期和设备列（见 inspections.py）"""
+    cursor = conn.cursor()
+    try:
+        columns = [
+            ('inspection_frequency',
+             "ADD COLUMN `inspection_frequency` varchar(10) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL "
+             "COMMENT '检查周期：daily 每天、shift 每班、weekly 每周，NULL 不跟踪'"),
+            ('inspection_key_column',
+             "ADD COLUMN `inspection_key_column` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL "
+             "COMMENT '区分设备的列名，NULL 时按整个模板跟踪'"),
+        ]
+        for column, clause in columns:
+            if column_exists(cursor, 'check_templates', column):
+                continue
+            algorithm = alter_online(cursor, 'check_templates', clause, algorithms=('INSTANT', 'INPLACE'))
+            log(f"  check_templates 增加 {column} 列（{algorithm}）")
+    finally:
+        cursor.close()
+
+
+def create_inspection_status(conn, batch_size, pause, log):
+    """每个模板、设备最近一次完成检查的时间，逾期列表只读这张表"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS `inspection_status` (
+              `template_id` int NOT NULL COMMENT '模板ID',
+              `equipment_key` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL DEFAULT '' COMMENT '设备（设备列的值，按整个模板跟踪时为空）',
+              `team` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '所属区队（与模板的区队相同）',
+              `last_completed_at` datetime NOT NULL COMMENT '最近一次完成检查的时间（记录的创建时间）',
+              `last_record_id` int NOT NULL COMMENT '最近一次完成检查的记录ID',
+              PRIMARY KEY (`template_id`, `equipment_key`),
+              INDEX `idx_team_template`(`team` ASC, `template_id` ASC),
+              CONSTRAINT `fk_inspection_status_template_id` FOREIGN KEY (`template_id`) REFERENCES `check_templates` (`id`) ON DELETE CASCADE ON UPDATE CASCADE
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = '检查状态表'
+        ''')
+        log("  创建 inspection_status 表")
+    finally:
+        cursor.close()
+
+
+def create_record_events(conn, batch_size, pause, log):
+    """记录事件表，各工作进程从这里读取新保存的记录并推送给页面"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS `record_events` (
+              `id` bigint NOT NULL AUTO_INCREMENT COMMENT '自增ID（推送的事件ID）',
+              `team` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL COMMENT '所属区队',
+              `data` text CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '事件内容（JSON格式）',
+              `created_at` datetime NOT NULL COMMENT '创建时间',
+              PRIMARY KEY (`id`),
+              INDEX `idx_created_at`(`created_at` ASC)
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = '记录事件表'
+        ''')
+        log("  创建 record_events 表")
+    finally:
+        cursor.close()
+
+
+def create_cache_versions(conn, batch_size, pause, log):
+    """共享缓存版本表，各工作进程读到版本变化后清除本进程的缓存"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS `cache_versions` (
+              `name` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '缓存名称',
+              `version` bigint NOT NULL COMMENT '版本，缓存的数据每次修改加一',
+              PRIMARY KEY (`name`)
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = '缓存版本表'
+        ''')
+        log("  创建 cache_versions 表")
+    finally:
+        cursor.close()
+
+
+MIGRATIONS = [
+    Migration(1, '检查记录表增加 (created_at, id) 分页索引', add_record_page_indexes),
+    Migration(2, '创建附件表 check_attachments', create_attachments),
+    Migration(3, '创建记录字段索引表和全文索引表', create_field_index),
+    Migration(4, '创建统计汇总表 stat_daily_templates 和 stat_daily_options', create_stat_rollups),
+    Migration(5, '创建API令牌表和批量提交幂等键表', create_api_tables),
+    Migration(6, '用户表增加区队角色和姓名索引', add_user_search_indexes),
+    Migration(7, '创建记录修订历史表 check_record_revisions', create_revisions),
+    Migration(8, '检查记录数据列改为 mediumblob', change_record_data_to_blob),
+    Migration(9, '创建后台任务表 background_jobs', create_background_jobs),
+    Migration(10, '创建归档记录表 check_records_archive', create_records_archive),
+    Migration(11, '检查记录表增加 team 列', add_record_team),
+    Migration(12, '按模板区队回填检查记录的 team 列', backfill_record_team),
+    Migration(13, '检查记录表增加 (team, created_at, id) 索引', add_team_indexes),
+    Migration(14, '删除 users 和 check_records 的重复索引', drop_redundant_indexes),
+    Migration(15, '检查模板增加检查周期和设备列', add_inspection_schedule),
+    Migration(16, '创建检查状态表 inspection_status', create_inspection_status),
+    Migration(17, '创建记录事件表 record_events', create_record_events),
+    Migration(18, '创建缓存版本表 cache_versions', create_cache_versions),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# ----------------------------
+# 执行
+# ----------------------------
+
+def ensure_table(cursor):
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+          `version` int NOT NULL COMMENT '迁移版本号',
+          `name` varchar(255) NOT NULL COMMENT '迁移说明',
+          `applied_at` datetime NOT NULL COMMENT '执行完成时间',
+          PRIMARY KEY (`version`)
+        ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci
+    ''')
+
+
+def applied_versions(cursor):
+    cursor.execute(f'SELECT version FROM {MIGRATIONS_TABLE}')
+    return {row['version'] for row in cursor.fetchall()}
+
+
+def pending(cursor):
+    """尚未执行的迁移"""
+    applied = applied_versions(cursor)
+    return [migration for migration in MIGRATIONS if migration.version not in applied]
+
+
+def migrate(conn, target=None, batch_size=DEFAULT_BATCH_SIZE, pause=0, log=print):
+    """按顺序执行未执行的迁移（target 为执行到的版本号），返回本次执行的迁移"""
+    cursor = conn.cursor()
+    try:
+        ensure_table(cursor)
+        cursor.execute('SELECT GET_LOCK(%s, 0) AS locked', (LOCK_NAME,))
+        if not cursor.fetchone()['locked']:
+            raise MigrationError('另一个进程正在执行迁移，请稍后重试')
+        try:
+            done = []
+            for migration in pending(cursor):
+                if target is not None and migration.version > target:
+                    break
+                log(f"执行迁移 {migration.version}：{migration.name}")
+                started = time.monotonic()
+                migration.apply(conn, batch_size, pause, log)
+                cursor.execute(f'INSERT INTO {MIGRATIONS_TABLE} (version, name, applied_at) VALUES (%s, %s, NOW())',
+                               (migration.version, migration.name))
+                conn.commit()
+                log(f"迁移 {migration.version} 完成（{time.monotonic() - started:.1f} 秒）")
+                done.append(migration)
+            return done
+        finally:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', (LOCK_NAME,))
+            cursor.fetchall()
+    finally:
+        cursor.close()
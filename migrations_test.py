@@ -0,0 +1,102 @@
+# 数据库结构迁移测试：未执行迁移的判断、建表脚本与迁移列表保持一致，以及导出按复合索引的列分页
+# 运行：python -m pytest migrations_test.py
+
+import os
+import inspect
+import re
+
+import config
+import exporter
+import migrations
+import wsgi
+from app import create_app
+from benchmark import sqlite_backend
+from conftest import add_template, add_user
+from db import ConnectionPool
+
+
+def _recorded_versions(path):
+    """建表脚本中记为已执行的迁移 {版本: 说明}"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    insert = re.search(r'INSERT INTO `?schema_migrations`?[^;]*;', text).group(0)
+    return {int(version): name for version, name in re.findall(r"\((\d+), '([^']*)'", insert)}
+
+
+def test_versions_are_consecutive():
+    assert [migration.version for migration in migrations.MIGRATIONS] == list(range(1, migrations.LATEST_VERSION + 1))
+
+
+def test_schema_scripts_record_every_migration():
+    expected = {migration.version: migration.name for migration in migrations.MIGRATIONS}
+    assert _recorded_versions(os.path.join(config.ROOT_PATH, 'check_module_database.sql')) == expected
+    assert _recorded_versions(sqlite_backend.SCHEMA_PATH) == expected
+
+
+def test_every_table_has_a_migration():
+    # 建表脚本新增的表都要有迁移，已有数据库执行 migrate_schema.py 即可升级
+    with open(os.path.join(config.ROOT_PATH, 'check_module_database.sql'), encoding='utf-8') as f:
+        tables = set(re.findall(r'CREATE TABLE `(\w+)`', f.read()))
+    created = set(re.findall(r'CREATE TABLE IF NOT EXISTS `(\w+)`', inspect.getsource(migrations)))
+    assert tables - created == {'check_templates', 'check_records', migrations.MIGRATIONS_TABLE}
+
+
+def test_pending(conn):
+    cursor = conn.cursor()
+    assert migrations.pending(cursor) == []
+
+    cursor.execute('DELETE FROM schema_migrations WHERE version IN (%s, %s)', (2, migrations.LATEST_VERSION))
+    assert [migration.version for migration in migrations.pending(cursor)] == [2, migrations.LATEST_VERSION]
+    assert migrations.applied_versions(cursor) == set(range(1, migrations.LATEST_VERSION + 1)) - {2, migrations.LATEST_VERSION}
+
+
+def test_deploy_check_reports_pending_migrations(tmp_path):
+    path = str(tmp_path / 'test.sqlite3')
+    app = create_app({'SESSION_STORE_PATH': str(tmp_path / 'sessions.sqlite3')})
+    app.extensions['mysql_pool'].pool = ConnectionPool(lambda: sqlite_backend.connect(path), max_size=2)
+    assert wsgi.pending_migrations(app) == []
+
+    conn = sqlite_backend.connect(path)
+    conn.cursor().execute('DELETE FROM schema_migrations WHERE version = %s', (migrations.LATEST_VERSION,))
+    conn.commit()
+    conn.close()
+    assert wsgi.pending_migrations(app) == [migrations.MIGRATIONS[-1]]
+
+
+def test_export_pages_on_created_at_and_id(conn):
+    # 导出按 (created_at, id) 分页（与复合索引一致），同一时间的多条记录跨批也不会重复或遗漏
+    user_id = add_user(conn)
+    template_id = add_template(conn, user_id, [{'name': '设备', 'type': 'text'}])
+    cursor = conn.cursor()
+    times = ['2025-03-02 08:00:00', '2025-03-01 08:00:00', '2025-03-01 08:00:00', '2025-03-01 08:00:00',
+             '2025-03-03 08:00:00', '2025-03-01 08:00:00']
+    for created_at in times:
+        cursor.execute('INSERT INTO check_records (template_id, team, data, created_by, created_at) VALUES (%s, %s, %s, %s, %s)',
+                       (template_id, '一区队', '[]', user_id, created_at))
+    conn.commit()
+
+    batches = []
+    records = list(exporter.iter_records(conn, ['r.template_id = %s'], [template_id], batch_size=2,
+                                         on_batch=batches.append))
+    assert [record['id'] for record in records] == [2, 3, 4, 6, 1, 5]
+    assert batches == [2, 4, 6]
+
+
+def test_redundant_index_kept_until_replacement_exists(monkeypatch):
+    # 已有数据库缺少复合索引时，外键仍需要原来的单列索引
+    existing = {('users', 'idx_phone'), ('users', 'phone'), ('check_records', 'idx_template_id')}
+    dropped = []
+    monkeypatch.setattr(migrations, 'index_exists', lambda cursor, table, index: (table, index) in existing)
+    monkeypatch.setattr(migrations, 'alter_online', lambda cursor, table, clause: dropped.append((table, clause)))
+
+    class Conn:
+        def cursor(self):
+            return self
+
+        def close(self):
+            pass
+
+    logged = []
+    migrations.drop_redundant_indexes(Conn(), 100, 0, logged.append)
+    assert dropped == [('users', 'DROP INDEX `idx_phone`')]
+    assert any('保留 idx_template_id' in line for line in logged)
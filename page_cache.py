@@ -0,0 +1,137 @@
+"""
+记录查看页面缓存模块
+
+记录提交后很少再修改，检查时却会被反复打开。这里做两层缓存：
+
+1. 条件请求：ETag 和 Last-Modified 由记录和模板的 updated_at 生成，
+   浏览器再次打开同一条记录时带上 If-None-Match / If-Modified-Since，内容未变时直接返回 304。
+2. 片段缓存：渲染好的记录内容（HTML 片段）缓存在进程内（LRU），以同样的版本为键，
+   再次查看时不查询数据库，也不重新渲染模板。
+
+edit_check_record 和 edit_check_template 保存后主动调用 invalidate_record / invalidate_template，
+同时把共享的 record_views 缓存版本加一，其他工作进程读到新版本后调用 clear 清空本进程的缓存（见 cluster.py）。
+
+页面流式输出：外框（含提示消息）先输出，记录表格在服务端逐行渲染并分块发送，
+浏览器收到前面的行就可以开始显示，不用等整条记录渲染完。
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+
+
+class CachedView:
+    """一条记录渲染好的页面片段及其版本信息"""
+
+    __slots__ = ('record_id', 'template_id', 'etag', 'last_modified', 'title', 'html', 'stored_at')
+
+    def __init__(self, record_id, template_id, etag, last_modified, title, html):
+        self.record_id = record_id
+        self.template_id = template_id
+        self.etag = etag
+        self.last_modified = last_modified
+        self.title = title
+        self.html = html
+        self.stored_at = time.monotonic()
+
+
+def record_version(record_id, record_updated_at, template_updated_at):
+    """返回 (ETag, Last-Modified)；Last-Modified 为带时区的 UTC 时间，精确到秒"""
+    key = f'{record_id}:{record_updated_at}:{template_updated_at}'
+    etag = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+    # 数据库中的时间为服务器本地时间
+    last_modified = max(value for value in (record_updated_at, template_updated_at) if value is not None)
+    return etag, last_modified.replace(microsecond=0).astimezone(timezone.utc)
+
+
+def not_modified(request, etag, last_modified):
+    """请求带的条件与当前版本一致时返回 True（按 RFC 7232，有 If-None-Match 时忽略 If-Modified-Since）"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def buffered(chunks, size=16384):
+    """把模板流式渲染产生的大量小字符串合并成约 size 个字符的块再输出"""
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def split_chunks(text, size=16384):
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+class RecordViewCache:
+    """进程内 LRU 缓存：记录ID -> CachedView"""
+
+    def __init__(self, max_size=500, ttl=120):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        # 每次失效加一，渲染期间发生过失效的结果不写入缓存
+        self._generation = 0
+        # 最近一次失效的时间，从只读副本读到的结果在失效后 settle 秒内不写入缓存（副本可能还没有同步修改）
+        self._invalidated_at = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, record_id):
+        with self._lock:
+            entry = self._entries.get(record_id)
+            if entry is not None and time.monotonic() - entry.stored_at < self.ttl:
+                self._entries.move_to_end(record_id)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[record_id]
+            self.misses += 1
+            return None
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def put(self, entry, generation, settle=0):
+        with self._lock:
+            if generation != self._generation:
+                return
+            if settle and self._invalidated_at is not None and time.monotonic() - self._invalidated_at < settle:
+                return
+            self._entries[entry.record_id] = entry
+            self._entries.move_to_end(entry.record_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_record(self, record_id):
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at = time.monotonic()
+            self._entries.pop(record_id, None)
+
+    def invalidate_template(self, template_id):
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at = time.monotonic()
+            for record_id in [key for key, entry in self._entries.items() if entry.template_id == template_id]:
+                del self._entries[record_id]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at = time.monotonic()
+            self._entries.clear()
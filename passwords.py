@@ -0,0 +1,118 @@
+"""
+密码哈希与登录限流模块
+
+bcrypt 每次计算需要几百毫秒的 CPU。交接班时大量用户同时登录，或有人暴力尝试密码时，
+所有请求线程都会卡在 bcrypt 上。这里做两件事：
+
+1. PasswordHasher：bcrypt 计算交给固定大小的线程池执行（bcrypt 计算时释放 GIL），
+   同时计算的数量不超过 CPU 核数，排队数超过上限时直接拒绝（HasherBusy），
+   请求快速返回"系统繁忙"，而不是所有请求一起变慢。
+   成本因子可配置，用户用旧成本因子的哈希登录成功后自动按新成本因子重新哈希。
+
+2. LoginThrottle：按工号和按客户端IP统计一段时间内的登录失败次数，超过上限后暂时拒绝登录，
+   被拒绝的尝试不再计算 bcrypt。数据保存在进程内，多进程部署时每个 worker 各自计数。
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+
+_COST_RE = re.compile(r'^\$2[abxy]?\$(\d{2})\$')
+
+
+class HasherBusy(Exception):
+    """排队的密码计算过多或等待超时"""
+
+
+class PasswordHasher:
+    """在有上限的线程池中执行 bcrypt 计算"""
+
+    def __init__(self, rounds=12, max_workers=2, max_queue=32, timeout=10):
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bcrypt')
+        # 正在计算和排队的总数上限
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy('密码计算排队过多')
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy('密码计算等待超时')
+
+    def hash(self, password):
+        """返回密码哈希（字符串）；password 为 bytes"""
+        return self._run(lambda: bcrypt.hashpw(password, bcrypt.gensalt(self.rounds))).decode('utf-8')
+
+    def check(self, password, password_hash):
+        return self._run(bcrypt.checkpw, password, password_hash.encode('utf-8'))
+
+    def needs_rehash(self, password_hash):
+        """哈希的成本因子与当前配置不一致时返回 True"""
+        match = _COST_RE.match(password_hash or '')
+        return not match or int(match.group(1)) != self.rounds
+
+
+class LoginThrottle:
+    """滑动窗口内的登录失败计数，按键（工号、IP）分别统计"""
+
+    def __init__(self, window=900, max_keys=100000):
+        self.window = window
+        self.max_keys = max_keys
+        self._failures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _recent(self, key, now):
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def retry_after(self, key, limit):
+        """失败次数达到 limit 时返回需要等待的秒数，否则返回 0"""
+        now = time.monotonic()
+        with self._lock:
+            failures = self._recent(key, now)
+            if failures is None or len(failures) < limit:
+                return 0
+            return max(1, int(failures[-limit] + self.window - now) + 1)
+
+    def record_failure(self, key):
+        now = time.monotonic()
+        with self._lock:
+            failures = self._recent(key, now)
+            if failures is None:
+                failures = self._failures[key] = deque()
+            failures.append(now)
+            self._failures.move_to_end(key)
+            # 键过多时淘汰最久没有失败记录的键，限制内存占用
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+
+    def reset(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
@@ -0,0 +1,293 @@
+"""
+请求性能分析模块
+
+通过配置 PROFILING_ENABLED = True 开启，记录每个请求的：
+- 总耗时（按路由统计直方图）
+- SQL 条数和每条 SQL 的耗时（mysql.connection 创建的游标）
+- Jinja 模板渲染耗时
+- bcrypt 计算耗时（需要在调用处使用 profiler.timed('bcrypt_check')）
+
+统计结果以 Prometheus 文本格式在 /metrics 提供；超过 PROFILING_SLOW_REQUEST 秒的请求连同其 SQL 写入日志；
+同一请求中同一条 SQL 执行次数达到 PROFILING_REPEAT_THRESHOLD 时视为 N+1 查询，记录日志并计数。
+
+指标保存在进程内，多进程部署时每个 worker 各自统计，由 Prometheus 按实例汇总。
+
+相关配置：
+    PROFILING_ENABLED            是否开启（默认 False，关闭时不包装游标，没有额外开销）
+    PROFILING_SLOW_REQUEST       慢请求阈值（秒，默认 1.0）
+    PROFILING_REPEAT_THRESHOLD   同一 SQL 在一个请求中重复执行的告警次数（默认 3）
+    PROFILING_METRICS_TOKEN      /metrics 的访问令牌（Authorization: Bearer <令牌>），
+                                 未设置时只允许管理员登录后访问
+"""
+
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import Response, abort, before_render_template, g, request, session, template_rendered
+
+# 请求和 SQL 耗时直方图的分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 每个请求 SQL 条数的分桶
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# 慢请求日志中每条 SQL 显示的最大长度
+MAX_LOGGED_SQL = 300
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """压缩空白，作为判断"同一条 SQL"的依据（参数使用占位符，文本相同即为同一语句）"""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+class MetricsRegistry:
+    """线程安全的进程内指标：计数器和直方图，按标签分组"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 名称 -> (类型, 说明, 标签名, {标签值: 计数/直方图}, 分桶)
+        self._metrics = {}
+
+    def counter(self, name, help_text, label_names=()):
+        self._metrics[name] = ('counter', help_text, tuple(label_names), {}, None)
+
+    def histogram(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self._metrics[name] = ('histogram', help_text, tuple(label_names), {}, buckets)
+
+    def inc(self, name, labels=(), amount=1):
+        with self._lock:
+            series = self._metrics[name][3]
+            series[labels] = series.get(labels, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        with self._lock:
+            _, _, _, series, buckets = self._metrics[name]
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = Histogram(buckets)
+            histogram.observe(value)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, label_names, series, _) in self._metrics.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in sorted(series.items()):
+                    if kind == 'counter':
+                        lines.append(f'{name}{_format_labels(label_names, labels)} {_format_number(value)}')
+                        continue
+                    for bound, count in zip(value.buckets, value.counts):
+                        le = _format_labels(label_names, labels, f'le="{bound}"')
+                        lines.append(f'{name}_bucket{le} {count}')
+                    le = _format_labels(label_names, labels, 'le="+Inf"')
+                    lines.append(f'{name}_bucket{le} {value.count}')
+                    lines.append(f'{name}_sum{_format_labels(label_names, labels)} {_format_number(value.sum)}')
+                    lines.append(f'{name}_count{_format_labels(label_names, labels)} {value.count}')
+        return '\n'.join(lines) + '\n'
+
+
+class RequestProfile:
+    """一个请求的分析数据"""
+
+    __slots__ = ('started', 'queries', 'template_seconds', 'bcrypt_seconds', '_render_stack')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []          # [(SQL, 耗时, 行数)]
+        self.template_seconds = 0.0
+        self.bcrypt_seconds = 0.0
+        self._render_stack = []
+
+
+class Profiler:
+    """Flask 扩展：请求级性能分析和 Prometheus 指标"""
+
+    def __init__(self, app=None, mysql=None):
+        self.app = app
+        self.enabled = False
+        self.registry = MetricsRegistry()
+        self.mysql = mysql
+        if app is not None:
+            self.init_app(app, mysql)
+
+    def init_app(self, app, mysql=None):
+        app.config.setdefault('PROFILING_ENABLED', False)
+        app.config.setdefault('PROFILING_SLOW_REQUEST', 1.0)
+        app.config.setdefault('PROFILING_REPEAT_THRESHOLD', 3)
+        app.config.setdefault('PROFILING_METRICS_TOKEN', None)
+        self.mysql = mysql or self.mysql
+        self.enabled = bool(app.config['PROFILING_ENABLED'])
+        app.extensions['profiler'] = self
+        if not self.enabled:
+            return
+
+        self._register_metrics()
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        if self.mysql is not None:
+            self.mysql.query_listeners.append(self._on_query)
+        app.add_url_rule('/metrics', 'metrics', self._metrics_view)
+
+    def _register_metrics(self):
+        registry = self.registry
+        registry.histogram('http_request_duration_seconds', '请求耗时（秒）', ('route', 'method'))
+        registry.counter('http_requests_total', '请求数', ('route', 'method', 'status'))
+        registry.histogram('http_request_queries', '每个请求执行的 SQL 条数', ('route',), QUERY_COUNT_BUCKETS)
+        registry.histogram('db_query_duration_seconds', '单条 SQL 耗时（秒）', ('route',))
+        registry.histogram('template_render_duration_seconds', '模板渲染耗时（秒）', ('template',))
+        registry.histogram('bcrypt_duration_seconds', 'bcrypt 计算耗时（秒）', ('operation',))
+        registry.counter('slow_requests_total', '慢请求数', ('route',))
+        registry.counter('repeated_query_requests_total', '出现重复 SQL（疑似 N+1）的请求数', ('route',))
+
+    # ---- 请求生命周期 ----
+
+    def _before_request(self):
+        g._profile = RequestProfile()
+
+    def _after_request(self, response):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        method = request.method
+        # 流式响应在发送完毕、关闭时才统计，保证耗时包含生成响应内容的时间
+        response.call_on_close(lambda: self._finish(profile, route, method, response.status_code))
+        return response
+
+    def _finish(self, profile, route, method, status):
+        elapsed = time.perf_counter() - profile.started
+        registry = self.registry
+        registry.observe('http_request_duration_seconds', elapsed, (route, method))
+        registry.inc('http_requests_total', (route, method, str(status)))
+        registry.observe('http_request_queries', len(profile.queries), (route,))
+        for _, seconds, _ in profile.queries:
+            registry.observe('db_query_duration_seconds', seconds, (route,))
+
+        repeated = [(sql, count) for sql, count in Counter(sql for sql, _, _ in profile.queries).items()
+                    if count >= self.app.config['PROFILING_REPEAT_THRESHOLD']]
+        if repeated:
+            registry.inc('repeated_query_requests_total', (route,))
+            self.app.logger.warning('疑似 N+1 查询 %s %s：%s', method, route,
+                                    '；'.join(f'{count} 次 {sql[:MAX_LOGGED_SQL]}' for sql, count in repeated))
+
+        if elapsed >= self.app.config['PROFILING_SLOW_REQUEST']:
+            registry.inc('slow_requests_total', (route,))
+            sql_seconds = sum(seconds for _, seconds, _ in profile.queries)
+            lines = [f'慢请求 {method} {route} 耗时 {elapsed:.3f}s（SQL {len(profile.queries)} 条 {sql_seconds:.3f}s，'
+                     f'模板 {profile.template_seconds:.3f}s，bcrypt {profile.bcrypt_seconds:.3f}s）']
+            for sql, seconds, rows in profile.queries:
+                suffix = f' ×{rows}' if rows > 1 else ''
+                lines.append(f'  {seconds * 1000:.1f}ms{suffix} {sql[:MAX_LOGGED_SQL]}')
+            self.app.logger.warning('\n'.join(lines))
+
+    # ---- 数据来源 ----
+
+    def _on_query(self, sql, seconds, rows):
+        profile = g.get('_profile')
+        if profile is not None:
+            profile.queries.append((normalize_sql(sql), seconds, rows))
+
+    def _before_render(self, sender, template, context, **extra):
+        profile = g.get('_profile')
+        if profile is not None:
+            profile._render_stack.append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        profile = g.get('_profile')
+        if profile is None or not profile._render_stack:
+            return
+        elapsed = time.perf_counter() - profile._render_stack.pop()
+        if not profile._render_stack:
+            # 只累计最外层模板，继承/包含的模板耗时已包含在内
+            profile.template_seconds += elapsed
+        self.registry.observe('template_render_duration_seconds', elapsed, (template.name or '<string>',))
+
+    @contextmanager
+    def timed(self, operation):
+        """统计一段代码的耗时，目前用于 bcrypt：with profiler.timed('bcrypt_check'): ..."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.registry.observe('bcrypt_duration_seconds', elapsed, (operation,))
+            profile = g.get('_profile')
+            if profile is not None:
+                profile.bcrypt_seconds += elapsed
+
+    # ---- 指标输出 ----
+
+    def _metrics_view(self):
+        token = self.app.config['PROFILING_METRICS_TOKEN']
+        authorized = session.get('role') in ('super_admin', 'admin')
+        if token and request.headers.get('Authorization') == f'Bearer {token}':
+            authorized = True
+        if not authorized:
+            abort(403)
+
+        text = self.registry.render()
+        if self.mysql is not None:
+            text += self._pool_metrics()
+        return Response(text, mimetype='text/plain; version=0.0.4')
+
+    def _pool_metrics(self):
+        stats = self.mysql.stats()
+        lines = [
+            '# HELP db_pool_connections 连接池连接数',
+            '# TYPE db_pool_connections gauge',
+            f'db_pool_connections{{state="idle"}} {stats["idle"]}',
+            f'db_pool_connections{{state="in_use"}} {stats["in_use"]}',
+            f'db_pool_connections{{state="waiting"}} {stats["waiting"]}',
+            '# HELP db_pool_checkout_seconds_total 借出连接的累计等待时间（秒）',
+            '# TYPE db_pool_checkout_seconds_total counter',
+            f'db_pool_checkout_seconds_total {stats["checkout_seconds_total"]}',
+            '# HELP db_pool_timeouts_total 借出连接超时次数',
+            '# TYPE db_pool_timeouts_total counter',
+            f'db_pool_timeouts_total {stats["timeouts"]}',
+        ]
+        return '\n'.join(lines) + '\n'
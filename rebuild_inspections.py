@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+从最近的检查记录重建模板检查状态（inspection_status 表）的脚本
+
+使用方法：
+1. 确保已执行迁移 15、16（python migrate_schema.py）
+2. 在命令行中运行：python rebuild_inspections.py [--template-id 1] [--days 35] [--batch-size 500]
+   也可以由超级管理员在“后台任务”页面启动（见 job_tasks.py）；修改模板的设备列后自动提交该任务
+
+首次给已有模板设置检查周期、修改设备列或发现逾期列表不准确时运行。
+只读取最近 --days 天（默认 INSPECTION_REBUILD_DAYS）的在线记录：更早完成的检查早已逾期，
+结果与读取全部历史相同，只是更久没有检查的设备不再列出。每个模板一个事务，先清空该模板的旧状态再写入。
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+from extensions import mysql, script_app
+import inspections
+import record_codec
+
+
+def _recent_records(cursor, template_id, since, batch_size, counter):
+    """按ID分批读取模板最近的记录，解码后逐条返回"""
+    last_id = 0
+    while True:
+        cursor.execute('''
+            SELECT id, data, created_at FROM check_records
+            WHERE template_id = %s AND created_at >= %s AND id > %s
+            ORDER BY id LIMIT %s
+        ''', (template_id, since, last_id, batch_size))
+        batch = cursor.fetchall()
+        if not batch:
+            return
+        for record in batch:
+            try:
+                rows = record_codec.decode_rows(record['data'])
+            except ValueError:
+                print(f"记录 {record['id']} 的数据无法解析，已跳过")
+                continue
+            counter[0] += 1
+            yield {'id': record['id'], 'rows': rows, 'created_at': record['created_at']}
+        last_id = batch[-1]['id']
+
+
+def rebuild_inspections(template_id=None, days=None, batch_size=500, progress=None):
+    app = script_app()
+    with app.app_context():
+        days = days or app.config['INSPECTION_REBUILD_DAYS']
+        since = datetime.now().replace(microsecond=0) - timedelta(days=days)
+        cursor = mysql.connection.cursor()
+        try:
+            sql = 'SELECT id, name, team, inspection_frequency, inspection_key_column FROM check_templates'
+            if template_id:
+                cursor.execute(sql + ' WHERE id = %s', (template_id,))
+            else:
+                cursor.execute(sql + ' WHERE inspection_frequency IS NOT NULL')
+            templates = cursor.fetchall()
+
+            tracked = 0
+            for index, template in enumerate(templates):
+                # 没有设置检查周期的模板只清除旧状态
+                counter = [0]
+                records = _recent_records(cursor, template['id'], since, batch_size, counter) \
+                    if template['inspection_frequency'] else ()
+                count = inspections.rebuild_template(cursor, template, records)
+                mysql.connection.commit()
+                tracked += count
+                print(f"模板 {template['name']}：读取 {counter[0]} 条记录，跟踪 {count} 项")
+                if progress:
+                    progress(min(99, (index + 1) * 100 // len(templates)),
+                             f"已处理 {index + 1} / {len(templates)} 个模板，跟踪 {tracked} 项")
+
+            print(f"\n重建完成：{len(templates)} 个模板，共跟踪 {tracked} 项。")
+            return {'templates': len(templates), 'tracked': tracked}
+
+        except Exception as e:
+            print(f"重建检查状态时出错: {str(e)}")
+            mysql.connection.rollback()
+            # 作为后台任务运行时把错误交给任务队列处理（重试或标记失败）
+            if progress:
+                raise
+        finally:
+            cursor.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='从最近的检查记录重建模板检查状态')
+    parser.add_argument('--template-id', type=int, help='只重建指定模板的检查状态')
+    parser.add_argument('--days', type=int, help='读取最近多少天的记录（默认使用 INSPECTION_REBUILD_DAYS）')
+    parser.add_argument('--batch-size', type=int, default=500, help='每批读取的记录数')
+    args = parser.parse_args()
+
+    print("正在重建检查状态...\n")
+    rebuild_inspections(args.template_id, args.days, args.batch_size)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+从 check_records 全量重建统计汇总表的脚本
+
+使用方法：
+1. 确保已执行 check_module_database.sql 中 stat_daily_templates、stat_daily_options 两张表的建表语句
+2. 在命令行中运行：python rebuild_stats.py [--template-id 1] [--batch-size 500]
+   也可以由超级管理员在“后台任务”页面启动（见 job_tasks.py）
+
+首次启用统计功能、修改模板列定义或发现统计数据不一致时运行。
+按记录ID分批读取记录（包括已归档的记录），在内存中按 (区队, 模板, 日期) 累加，最后清空旧汇总并一次写入、提交，
+重建过程中统计页面仍显示旧数据。建议在业务低峰期运行，避免与正在保存的记录交错。
+"""
+
+import argparse
+
+from extensions import mysql, script_app, template_cache
+from db import QUERIES
+import archive
+import record_codec
+import stats
+
+
+def rebuild_stats(template_id=None, batch_size=500, progress=None):
+    app = script_app()
+    with app.app_context():
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute('SELECT id, team, structure, updated_at FROM check_templates')
+            templates = {row['id']: row for row in cursor.fetchall()}
+
+            builder = stats.RollupBuilder()
+            counted = 0
+            max_id = 0
+            if progress:
+                cursor.execute(QUERIES['max_record_id'])
+                max_id = cursor.fetchone()['max_id'] or 0
+            # 归档的历史记录也计入统计；归档的是较早的记录，按记录ID估算的进度大致连续
+            for table in archive.record_tables(include_archive=True):
+                last_id = 0
+                while True:
+                    sql = f'SELECT id, template_id, data, created_at FROM {table} WHERE id > %s'
+                    params = [last_id]
+                    if template_id:
+                        sql += ' AND template_id = %s'
+                        params.append(template_id)
+                    sql += ' ORDER BY id LIMIT %s'
+                    params.append(batch_size)
+                    cursor.execute(sql, params)
+                    records = cursor.fetchall()
+                    if not records:
+                        break
+
+                    for record in records:
+                        template = templates.get(record['template_id'])
+                        if not template or not record['created_at']:
+                            continue
+                        try:
+                            rows = record_codec.decode_rows(record['data'])
+                        except ValueError:
+                            print(f"记录 {record['id']} 的数据无法解析，已跳过")
+                            continue
+                        compiled = template_cache.get(template['id'], template['updated_at'], template['structure'])
+                        builder.add(template['team'], template['id'], record['created_at'], compiled.columns, rows)
+                        counted += 1
+
+                    last_id = records[-1]['id']
+                    print(f"已读取到记录ID {last_id}，累计统计 {counted} 条")
+                    if progress:
+                        progress(min(99, last_id * 100 // max(max_id, 1)), f"已读取到记录ID {last_id}，累计统计 {counted} 条")
+
+            if template_id:
+                cursor.execute('DELETE FROM stat_daily_templates WHERE template_id = %s', (template_id,))
+                cursor.execute('DELETE FROM stat_daily_options WHERE template_id = %s', (template_id,))
+            else:
+                cursor.execute('DELETE FROM stat_daily_templates')
+                cursor.execute('DELETE FROM stat_daily_options')
+            builder.write(cursor)
+            mysql.connection.commit()
+
+            print(f"\n重建完成：共统计 {counted} 条记录。")
+            return {'counted': counted}
+
+        except Exception as e:
+            print(f"重建统计数据时出错: {str(e)}")
+            mysql.connection.rollback()
+            # 作为后台任务运行时把错误交给任务队列处理（重试或标记失败）
+            if progress:
+                raise
+        finally:
+            cursor.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='从检查记录全量重建统计汇总表')
+    parser.add_argument('--template-id', type=int, help='只重建指定模板的统计数据')
+    parser.add_argument('--batch-size', type=int, default=500, help='每批读取的记录数')
+    args = parser.parse_args()
+
+    print("正在重建统计汇总数据...\n")
+    rebuild_stats(args.template_id, args.batch_size)
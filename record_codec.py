@@ -0,0 +1,81 @@
+"""
+记录数据存储编码模块
+
+check_records.data 原来保存行数组的 JSON 文本，每一行都重复一遍中文列名（如 "设备名称"、"运行状态"），
+几百行的记录大部分字节都是列名。这里把行数组转换为按列排列的形式：
+
+    {"c": [列名, ...], "r": [[第1行各列的值], [第2行各列的值], ...], "m": [[行号, [缺少的列序号]], ...]}
+
+列名只出现一次，顺序与模板列定义一致；再用 zlib 压缩，前面加 1 个字节的格式版本号，以 BLOB 保存。
+"m" 只在某些行缺少部分列时出现，用于还原时区分"没有这一列"和"值为 null"。
+
+读取时按第一个字节判断格式：FORMAT_COLUMNAR_ZLIB 为本模块编码的数据，
+否则按旧的 JSON 文本解析，因此新旧数据可以共存，用 compress_records.py 分批转换历史数据。
+"""
+
+import json
+import zlib
+
+# 格式版本号（编码结果的第一个字节）
+FORMAT_COLUMNAR_ZLIB = 1
+
+COMPRESS_LEVEL = 6
+
+
+def encode_rows(rows, column_names=()):
+    """把行数组编码为存储格式（bytes）；column_names 为模板的列顺序，行中多出的列排在后面"""
+    columns = list(column_names)
+    known = set(columns)
+    for row in rows:
+        for name in row:
+            if name not in known:
+                known.add(name)
+                columns.append(name)
+
+    matrix = []
+    missing = []
+    for row_no, row in enumerate(rows):
+        absent = [index for index, name in enumerate(columns) if name not in row]
+        matrix.append([row.get(name) for name in columns])
+        if absent:
+            missing.append([row_no, absent])
+
+    payload = {'c': columns, 'r': matrix}
+    if missing:
+        payload['m'] = missing
+    text = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+    return bytes([FORMAT_COLUMNAR_ZLIB]) + zlib.compress(text.encode('utf-8'), COMPRESS_LEVEL)
+
+
+def is_encoded(value):
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:1]) == bytes([FORMAT_COLUMNAR_ZLIB])
+
+
+def decode_rows(value):
+    """把数据库中的 data 字段还原为行数组；兼容旧的 JSON 文本，格式不正确时抛出 ValueError"""
+    if value is None:
+        return []
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        value = bytes(value)
+        if is_encoded(value):
+            try:
+                payload = json.loads(zlib.decompress(value[1:]).decode('utf-8'))
+            except zlib.error as e:
+                raise ValueError(f'记录数据解压失败：{e}')
+            return _from_columnar(payload)
+        value = value.decode('utf-8')
+
+    data = json.loads(value)
+    if isinstance(data, dict):
+        data = [data]
+    return data
+
+
+def _from_columnar(payload):
+    columns = payload['c']
+    absent = {row_no: set(indexes) for row_no, indexes in payload.get('m', [])}
+    rows = []
+    for row_no, values in enumerate(payload['r']):
+        skip = absent.get(row_no, ())
+        rows.append({name: value for index, (name, value) in enumerate(zip(columns, values)) if index not in skip})
+    return rows
@@ -0,0 +1,61 @@
+# 记录数据存储编码测试：按列编码压缩后能原样还原，兼容旧的 JSON 文本
+# 运行：python -m pytest record_codec_test.py
+
+import json
+
+import pytest
+
+import record_codec
+
+
+def test_round_trip_keeps_values_and_column_order():
+    rows = [{'设备名称': '1号泵', '运行状态': '正常', '温度': 36.5, '已检查': True},
+            {'设备名称': '2号泵', '运行状态': None, '温度': 0, '已检查': False}]
+    encoded = record_codec.encode_rows(rows, ['设备名称', '运行状态', '温度', '已检查'])
+    assert record_codec.is_encoded(encoded)
+    decoded = record_codec.decode_rows(encoded)
+    assert decoded == rows
+    assert list(decoded[0]) == ['设备名称', '运行状态', '温度', '已检查']
+
+
+def test_missing_column_differs_from_null():
+    rows = [{'a': 1, 'b': None}, {'a': 2}]
+    assert record_codec.decode_rows(record_codec.encode_rows(rows, ['a', 'b'])) == rows
+
+
+def test_columns_not_in_template_are_kept():
+    rows = [{'a': 1, '备注': '新增列'}]
+    decoded = record_codec.decode_rows(record_codec.encode_rows(rows, ['a']))
+    assert decoded == rows
+
+
+def test_empty_rows():
+    assert record_codec.decode_rows(record_codec.encode_rows([], ['a'])) == []
+    assert record_codec.decode_rows(None) == []
+
+
+def test_repeated_column_names_are_compressed():
+    rows = [{'设备名称': f'{n}号泵', '运行状态': '正常'} for n in range(200)]
+    encoded = record_codec.encode_rows(rows, ['设备名称', '运行状态'])
+    assert len(encoded) < len(json.dumps(rows, ensure_ascii=False).encode('utf-8')) / 4
+
+
+@pytest.mark.parametrize('legacy', [
+    json.dumps([{'a': 1}], ensure_ascii=False),
+    json.dumps([{'a': 1}], ensure_ascii=False).encode('utf-8'),
+    memoryview(json.dumps([{'a': 1}]).encode('utf-8')),
+])
+def test_legacy_json_text(legacy):
+    assert not record_codec.is_encoded(legacy)
+    assert record_codec.decode_rows(legacy) == [{'a': 1}]
+
+
+def test_legacy_single_object_becomes_one_row():
+    assert record_codec.decode_rows('{"a": 1}') == [{'a': 1}]
+
+
+def test_corrupt_data_raises_value_error():
+    with pytest.raises(ValueError):
+        record_codec.decode_rows(bytes([record_codec.FORMAT_COLUMNAR_ZLIB]) + b'not zlib')
+    with pytest.raises(ValueError):
+        record_codec.decode_rows('not json')
@@ -0,0 +1,38 @@
+"""
+记录写入后的后续处理
+
+与记录写入在同一事务内执行，网页应用（新建、编辑、导入、离线同步记录）和导入脚本共用：
+更新字段索引和统计汇总；新记录还要更新模板检查状态（编辑记录不算新的检查）。
+"""
+
+import field_index
+import inspections
+import record_codec
+import stats
+
+
+def after_record_saved(cursor, record_id, template_id, team, created_at, compiled, rows, old_rows=None):
+    """更新字段索引和统计汇总；编辑记录时传入 old_rows（修改前的行数组），统计汇总先减去旧数据再加上新数据"""
+    field_index.index_record(cursor, record_id, template_id, created_at, compiled.columns, rows)
+    stats.update_for_record(cursor, team, template_id, created_at, compiled.columns, rows, old_rows)
+
+
+def after_record_created(cursor, record_id, template, created_at, compiled, rows):
+    """新记录写入后：除字段索引和统计汇总外，更新模板检查状态"""
+    after_record_saved(cursor, record_id, template['id'], template['team'], created_at, compiled, rows)
+    inspections.record_completed(cursor, template, record_id, created_at, rows)
+
+
+def after_records_imported(cursor, template, created_by, compiled, floor_id):
+    """
+    批量导入的一批记录写入后，对其中每条记录执行同样的后续处理。
+    template 为 QUERIES['template_by_id'] 查询到的模板，floor_id 为导入前的最大记录ID。
+    """
+    cursor.execute('''
+        SELECT id, data, created_at FROM check_records
+        WHERE id > %s AND template_id = %s AND created_by = %s
+        ORDER BY id
+    ''', (floor_id, template['id'], created_by))
+    for record in cursor.fetchall():
+        after_record_created(cursor, record['id'], template, record['created_at'], compiled,
+                             record_codec.decode_rows(record['data']))
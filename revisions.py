@@ -0,0 +1,174 @@
+"""
+记录修订历史模块
+
+edit_check_record 直接覆盖 check_records.data，审核时看不到超级管理员改了什么。
+这里把每次修改保存为 check_record_revisions 中的一条修订：
+
+- 第 0 版是记录提交时的原始数据，在第一次修改时补存为完整快照
+- 之后每次修改只保存与上一版的差异（delta），大小与改动的单元格数量成正比
+- 每 SNAPSHOT_INTERVAL 版（或差异比完整数据还大时）保存一次完整快照，
+  任何版本都最多从一个快照加上 SNAPSHOT_INTERVAL - 1 个差异还原
+
+差异格式（按原数据的行号升序排列，应用时从后往前，前面的行号不受影响）：
+    ["s", i, j, [行, ...]]        用给出的行替换原数据的第 i 到 j-1 行（插入、删除行）
+    ["c", i, {列: 新值}, [列, ...]] 修改第 i 行的单元格，第二个列表是被清除的列
+"""
+
+import json
+from difflib import SequenceMatcher
+
+SNAPSHOT_INTERVAL = 10
+
+KIND_SNAPSHOT = 'snapshot'
+KIND_DELTA = 'delta'
+
+
+def _row_key(row):
+    return json.dumps(row, ensure_ascii=False, sort_keys=True)
+
+
+def _cell_change(old_row, new_row):
+    changed = {name: value for name, value in new_row.items() if name not in old_row or old_row[name] != value}
+    removed = [name for name in old_row if name not in new_row]
+    return changed, removed
+
+
+def diff_rows(old_rows, new_rows):
+    """计算从 old_rows 到 new_rows 的差异，没有变化时返回空列表"""
+    matcher = SequenceMatcher(None, [_row_key(row) for row in old_rows], [_row_key(row) for row in new_rows],
+                              autojunk=False)
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        if tag == 'replace' and i2 - i1 == j2 - j1:
+            # 行数不变的修改按单元格记录
+            for offset in range(i2 - i1):
+                changed, removed = _cell_change(old_rows[i1 + offset], new_rows[j1 + offset])
+                ops.append(['c', i1 + offset, changed, removed])
+        else:
+            ops.append(['s', i1, i2, new_rows[j1:j2]])
+    return ops
+
+
+def apply_delta(rows, ops):
+    """把差异应用到 rows 上，返回新的行数组（不修改传入的 rows）"""
+    rows = [dict(row) for row in rows]
+    for op in reversed(ops):
+        if op[0] == 's':
+            rows[op[1]:op[2]] = [dict(row) for row in op[3]]
+        else:
+            row = rows[op[1]]
+            row.update(op[2])
+            for name in op[3]:
+                row.pop(name, None)
+    return rows
+
+
+def describe(old_rows, new_rows):
+    """逐单元格列出两个版本的差别，供历史页面和差异接口显示"""
+    changes = []
+    for op in diff_rows(old_rows, new_rows):
+        if op[0] == 'c':
+            old_row = old_rows[op[1]]
+            for name, value in op[2].items():
+                changes.append({'type': 'changed', 'row': op[1] + 1, 'column': name,
+                                'old': old_row.get(name), 'new': value})
+            for name in op[3]:
+                changes.append({'type': 'changed', 'row': op[1] + 1, 'column': name,
+                                'old': old_row.get(name), 'new': None})
+        else:
+            for index in range(op[1], op[2]):
+                changes.append({'type': 'removed', 'row': index + 1, 'values': old_rows[index]})
+            for offset, row in enumerate(op[3]):
+                changes.append({'type': 'added', 'row': op[1] + offset + 1, 'values': row})
+    return changes
+
+
+def _latest_revision(cursor, record_id):
+    cursor.execute('''
+        SELECT revision_no FROM check_record_revisions
+        WHERE record_id = %s
+        ORDER BY revision_no DESC
+        LIMIT 1
+    ''', (record_id,))
+    row = cursor.fetchone()
+    return row['revision_no'] if row else None
+
+
+def _insert(cursor, record_id, revision_no, kind, payload, edited_by, created_at, cells_changed):
+    cursor.execute('''
+        INSERT INTO check_record_revisions (record_id, revision_no, kind, data, cells_changed, edited_by, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ''', (record_id, revision_no, kind, json.dumps(payload, ensure_ascii=False), cells_changed, edited_by, created_at))
+
+
+def _cells_changed(ops):
+    count = 0
+    for op in ops:
+        if op[0] == 'c':
+            count += len(op[2]) + len(op[3])
+        else:
+            count += max(op[2] - op[1], len(op[3]))
+    return count
+
+
+def record_edit(cursor, record_id, old_rows, new_rows, edited_by, edited_at, created_by, created_at):
+    """
+    在修改记录的事务中调用，保存一条修订，返回修订号；数据没有变化时返回 None。
+    调用方需已锁定 check_records 中的这条记录（SELECT ... FOR UPDATE），保证修订号连续。
+    """
+    ops = diff_rows(old_rows, new_rows)
+    if not ops:
+        return None
+
+    latest = _latest_revision(cursor, record_id)
+    if latest is None:
+        # 第一次修改：补存提交时的原始数据
+        _insert(cursor, record_id, 0, KIND_SNAPSHOT, old_rows, created_by, created_at, 0)
+        latest = 0
+
+    revision_no = latest + 1
+    if revision_no % SNAPSHOT_INTERVAL == 0 or len(json.dumps(ops, ensure_ascii=False)) >= len(json.dumps(new_rows, ensure_ascii=False)):
+        _insert(cursor, record_id, revision_no, KIND_SNAPSHOT, new_rows, edited_by, edited_at, _cells_changed(ops))
+    else:
+        _insert(cursor, record_id, revision_no, KIND_DELTA, ops, edited_by, edited_at, _cells_changed(ops))
+    return revision_no
+
+
+def history(cursor, record_id):
+    """修订列表（不含数据），按修订号升序"""
+    cursor.execute('''
+        SELECT v.revision_no, v.kind, v.cells_changed, v.edited_by, v.created_at, u.name AS editor_name
+        FROM check_record_revisions v
+        LEFT JOIN users u ON v.edited_by = u.id
+        WHERE v.record_id = %s
+        ORDER BY v.revision_no
+    ''', (record_id,))
+    return cursor.fetchall()
+
+
+def rebuild(cursor, record_id, revision_no):
+    """还原指定版本的行数组，版本不存在时返回 None"""
+    cursor.execute('''
+        SELECT MAX(revision_no) AS snapshot_no FROM check_record_revisions
+        WHERE record_id = %s AND revision_no <= %s AND kind = %s
+    ''', (record_id, revision_no, KIND_SNAPSHOT))
+    row = cursor.fetchone()
+    if not row or row['snapshot_no'] is None:
+        return None
+
+    cursor.execute('''
+        SELECT revision_no, kind, data FROM check_record_revisions
+        WHERE record_id = %s AND revision_no BETWEEN %s AND %s
+        ORDER BY revision_no
+    ''', (record_id, row['snapshot_no'], revision_no))
+    entries = cursor.fetchall()
+    if not entries or entries[-1]['revision_no'] != revision_no:
+        return None
+
+    rows = None
+    for entry in entries:
+        payload = json.loads(entry['data'])
+        rows = payload if entry['kind'] == KIND_SNAPSHOT else apply_delta(rows, payload)
+    return rows
@@ -0,0 +1,71 @@
+# 记录修订历史测试：差异计算与应用、修订保存（快照和差异）以及任意版本的还原
+# 运行：python -m pytest revisions_test.py
+
+import random
+from datetime import datetime
+
+import pytest
+
+import revisions
+
+ROWS = [{'设备': '1号泵', '状态': '正常'}, {'设备': '2号泵', '状态': '正常'}, {'设备': '3号泵', '状态': '停机'}]
+
+
+@pytest.mark.parametrize('new_rows', [
+    ROWS,
+    [{'设备': '1号泵', '状态': '故障'}, ROWS[1], ROWS[2]],
+    [ROWS[0], {'设备': '2号泵'}, ROWS[2]],
+    [ROWS[0], ROWS[2]],
+    [ROWS[0], {'设备': '新泵', '状态': '正常'}, ROWS[1], ROWS[2]],
+    [],
+    [{'设备': 'A'}, {'设备': 'B'}],
+])
+def test_apply_delta_reproduces_new_rows(new_rows):
+    ops = revisions.diff_rows(ROWS, new_rows)
+    assert revisions.apply_delta(ROWS, ops) == new_rows
+    assert (ops == []) == (new_rows == ROWS)
+
+
+def test_apply_delta_does_not_modify_input():
+    original = [dict(row) for row in ROWS]
+    revisions.apply_delta(ROWS, revisions.diff_rows(ROWS, [{'设备': '1号泵', '状态': '故障'}]))
+    assert ROWS == original
+
+
+def test_describe_lists_cell_changes():
+    new_rows = [{'设备': '1号泵', '状态': '故障'}, {'设备': '2号泵'}, ROWS[2], {'设备': '4号泵'}]
+    changes = revisions.describe(ROWS, new_rows)
+    assert {'type': 'changed', 'row': 1, 'column': '状态', 'old': '正常', 'new': '故障'} in changes
+    assert {'type': 'changed', 'row': 2, 'column': '状态', 'old': '正常', 'new': None} in changes
+    assert {'type': 'added', 'row': 4, 'values': {'设备': '4号泵'}} in changes
+
+
+def test_record_edit_and_rebuild_every_version(conn):
+    cursor = conn.cursor()
+    created_at = datetime(2025, 1, 1, 8, 0)
+    rng = random.Random(7)
+    versions = [ROWS]
+    for n in range(1, 2 * revisions.SNAPSHOT_INTERVAL + 3):
+        rows = [dict(row) for row in versions[-1]]
+        index = rng.randrange(len(rows))
+        rows[index]['状态'] = f'第{n}次检查'
+        if n % 4 == 0:
+            rows.append({'设备': f'{n}号泵', '状态': '新增'})
+        revision_no = revisions.record_edit(cursor, 1, versions[-1], rows, 2, created_at, 1, created_at)
+        assert revision_no == n
+        versions.append(rows)
+
+    for revision_no, rows in enumerate(versions):
+        assert revisions.rebuild(cursor, 1, revision_no) == rows
+    assert revisions.rebuild(cursor, 1, len(versions)) is None
+
+    kinds = {row['revision_no']: row['kind'] for row in revisions.history(cursor, 1)}
+    assert kinds[0] == kinds[revisions.SNAPSHOT_INTERVAL] == revisions.KIND_SNAPSHOT
+    assert kinds[1] == revisions.KIND_DELTA
+
+
+def test_unchanged_edit_saves_nothing(conn):
+    cursor = conn.cursor()
+    now = datetime(2025, 1, 1, 8, 0)
+    assert revisions.record_edit(cursor, 1, ROWS, [dict(row) for row in ROWS], 2, now, 1, now) is None
+    assert revisions.history(cursor, 1) == []
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+后台任务工作进程
+
+使用方法：
+1. 确保已执行 check_module_database.sql 中 background_jobs 表的建表语句
+2. 在命令行中运行：python run_jobs.py [--workers 2] [--once]
+   部署时与网页服务一起常驻运行（如 systemd、supervisor）；收到 Ctrl+C 或 SIGTERM 后，
+   各工作进程执行完当前任务再退出。--once 只启动一个进程，处理完已到期的任务后退出（适合定时运行）。
+
+每个工作进程循环领取并执行 background_jobs 中的排队任务（见 jobs.py，执行代码见 job_tasks.py），
+空闲时每 JOB_POLL_INTERVAL 秒查询一次新任务；每分钟把失去心跳的任务重新排队，并删除过期的结果文件。
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+import config
+from db import PooledConnection
+from extensions import script_app
+import job_tasks  # noqa: F401  注册任务的执行代码
+import jobs
+
+# 检查失去心跳的任务、清理过期结果文件的间隔（秒）
+MAINTENANCE_INTERVAL = 60
+
+
+def work(stop, once=False):
+    # Ctrl+C 由主进程处理；SIGTERM 时执行完当前任务再退出
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    app = script_app()
+    pool = app.extensions['mysql_pool'].pool
+    folder = app.config['JOB_RESULT_FOLDER']
+    maintained_at = 0
+
+    while not stop.is_set():
+        job = None
+        with app.app_context():
+            # 任务队列的状态更新使用单独的连接，任务代码使用 mysql.connection
+            queue_conn = PooledConnection(pool, pool.acquire())
+            discard = False
+            try:
+                if time.monotonic() - maintained_at >= MAINTENANCE_INTERVAL:
+                    jobs.requeue_stale(queue_conn, app.config['JOB_STALE_TIMEOUT'])
+                    jobs.purge_results(queue_conn, folder, app.config['JOB_RESULT_RETENTION_DAYS'])
+                    maintained_at = time.monotonic()
+
+                job = jobs.claim(queue_conn, worker_id)
+                if job is not None:
+                    print(f"[{worker_id}] 开始执行任务 {job['id']}（{jobs.JOB_KINDS.get(job['kind'], job['kind'])}）")
+                    status = jobs.run(queue_conn, job, folder)
+                    print(f"[{worker_id}] 任务 {job['id']} 结束：{jobs.STATUS_LABELS[status]}")
+            except Exception as e:
+                print(f"[{worker_id}] 任务队列出错: {str(e)}")
+                discard = True
+            finally:
+                queue_conn.release(discard=discard)
+
+        if job is None:
+            if once:
+                break
+            stop.wait(app.config['JOB_POLL_INTERVAL'])
+
+
+def run_workers(workers, once=False):
+    stop = multiprocessing.Event()
+    if once:
+        work(stop, once=True)
+        return
+
+    processes = [multiprocessing.Process(target=work, args=(stop,), name=f'job-worker-{n + 1}')
+                 for n in range(workers)]
+    for process in processes:
+        process.start()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print("\n正在等待当前任务执行完毕...")
+        stop.set()
+        for process in processes:
+            process.join()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='执行后台任务（导出、重建统计、补建索引、迁移附件）')
+    parser.add_argument('--workers', type=int, default=config.load()['JOB_WORKERS'], help='工作进程数')
+    parser.add_argument('--once', action='store_true', help='处理完已到期的任务后退出')
+    args = parser.parse_args()
+
+    print(f"后台任务工作进程已启动（{1 if args.once else args.workers} 个）...\n")
+    run_workers(args.workers, args.once)
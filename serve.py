@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+生产环境多进程启动脚本
+
+使用方法：
+1. 用环境变量设置数据库连接、SECRET_KEY 等配置（EMS_ 开头，见 config.py）
+2. 运行 python build_assets.py 构建静态资源
+3. 在命令行中运行：python serve.py [--bind 127.0.0.1:5000] [--workers 4] [--graceful-timeout 30]
+   只检查配置和加载应用（部署前验证）：python serve.py --check
+
+主进程监听端口、加载应用并预热缓存（见 wsgi.py），然后 fork 出 --workers 个工作进程，
+工作进程共享已加载的代码和缓存，各自预先建立数据库连接，由 SERVER_THREADS 个线程处理请求；
+线程全忙时工作进程暂停接受新连接，连接在监听队列中等待其他工作进程或空闲线程。
+记录实时推送的每个连接在断开前一直占用一个线程，SERVER_THREADS 需要大于同时在线的推送连接数。
+
+- SIGTERM、Ctrl+C：停止接受新连接，等待处理中的请求完成（最多 --graceful-timeout 秒）后退出
+- SIGHUP：重新加载代码和页面模板。先在子进程中检查新代码能否加载，通过后主进程重新执行自身，
+  监听端口不关闭，新的工作进程启动后再平滑停止旧的工作进程；检查不通过时继续使用旧代码
+- 工作进程意外退出时自动重新启动
+
+环境变量在主进程启动时读取，修改环境变量需要重新启动服务（SIGHUP 不会读取新的环境变量）。
+记录实时推送的事件经数据库传给每个工作进程（见 cluster.py），断线重连到其他工作进程也能补发错过的事件。
+"""
+
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+import config
+
+# 重新执行主进程时传递监听端口和旧工作进程的环境变量
+LISTEN_FD_ENV = 'SERVE_LISTEN_FD'
+OLD_WORKERS_ENV = 'SERVE_OLD_WORKERS'
+
+# 工作进程启动后不到该秒数就退出时，等待一段时间再重新启动，避免配置错误时反复 fork
+MIN_WORKER_LIFETIME = 5
+RESPAWN_DELAY = 2
+
+# 主进程检查信号和子进程状态的间隔（秒）
+SUPERVISE_INTERVAL = 0.5
+
+# 工作进程的请求处理线程全忙时，等待空闲线程的时间（秒），超过后把新连接留给其他工作进程
+ACCEPT_WAIT = 0.05
+
+
+def log(message):
+    print(f"[serve {os.getpid()}] {message}", flush=True)
+
+
+def listen(bind):
+    host, _, port = bind.rpartition(':')
+    host = host.strip('[]') or '0.0.0.0'
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, int(port)))
+    sock.listen(socket.SOMAXCONN)
+    return sock
+
+
+def run_worker(app, sock, warm_connections):
+    """工作进程：在继承的监听端口上处理请求，收到 SIGTERM 后平滑退出"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from werkzeug.serving import ThreadedWSGIServer
+
+    mysql = app.extensions['mysql_pool']
+    record_feed = app.extensions['record_feed']
+
+    class WorkerServer(ThreadedWSGIServer):
+        """请求由固定数量的线程处理；线程全忙时不再接受新连接，留在监听队列中由其他工作进程接受"""
+
+        executor = None
+
+        def __init__(self, *args, threads, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.slots = threading.BoundedSemaphore(threads)
+            self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='request')
+
+        def get_request(self):
+            # 先占用一个空闲线程再接受连接；短暂等待后仍没有空闲线程时放弃本次接受，serve_forever 稍后重试
+            if not self.slots.acquire(timeout=ACCEPT_WAIT):
+                raise OSError('没有空闲的请求处理线程')
+            try:
+                # 监听端口为非阻塞（多个工作进程同时等待新连接，没抢到的不会卡在 accept 上），接受的连接恢复为阻塞
+                conn, address = super().get_request()
+            except BaseException:
+                self.slots.release()
+                raise
+            conn.setblocking(True)
+            return conn, address
+
+        def process_request(self, request, client_address):
+            try:
+                self.executor.submit(self._process, request, client_address)
+            except BaseException:
+                self.slots.release()
+                raise
+
+        def _process(self, request, client_address):
+            try:
+                self.process_request_thread(request, client_address)
+            finally:
+                self.slots.release()
+
+        def server_close(self):
+            # serve_forever 退出时调用，等待处理中的请求（父类初始化时也会调用，此时还没有线程池）
+            super().server_close()
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+
+    # Ctrl+C 和 SIGHUP 由主进程处理
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    host, port = sock.getsockname()[:2]
+    server = WorkerServer(host, port, app, fd=sock.fileno(), threads=app.config['SERVER_THREADS'])
+    server.socket.setblocking(False)
+
+    stopping = threading.Event()
+
+    def shutdown():
+        # 先结束推送连接：serve_forever 退出时会等待所有处理中的请求
+        record_feed.close()
+        server.shutdown()
+
+    def stop(signum, frame):
+        if not stopping.is_set():
+            stopping.set()
+            # shutdown 会等待 serve_forever 退出，不能在运行 serve_forever 的线程中直接调用
+            threading.Thread(target=shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        mysql.pool.warm(warm_connections)
+    except Exception as e:
+        log(f"预先建立数据库连接失败（请求时再连接）: {str(e)}")
+
+    log(f"工作进程已启动，监听 {host}:{port}")
+    # 收到 SIGTERM 后停止接受新连接，等待处理中的请求完成后返回
+    server.serve_forever(poll_interval=SUPERVISE_INTERVAL)
+    mysql.close_idle()
+    log("工作进程已退出")
+
+
+class Master:
+    def __init__(self, app, sock, workers, graceful_timeout, warm_connections):
+        self.app = app
+        self.sock = sock
+        self.size = workers
+        self.graceful_timeout = graceful_timeout
+        self.warm_connections = warm_connections
+        # 工作进程 pid -> 启动时间
+        self.workers = {}
+        # 正在平滑退出的工作进程 pid -> 强制结束的时间
+        self.retiring = {}
+        self.signals = []
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.app, self.sock, self.warm_connections)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[pid] = time.monotonic()
+
+    def retire(self, pids):
+        deadline = time.monotonic() + self.graceful_timeout
+        for pid in pids:
+            self.workers.pop(pid, None)
+            self.retiring[pid] = deadline
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.retiring.pop(pid)
+
+    def reap(self):
+        """回收已退出的子进程，返回意外退出的工作进程的存活时间列表"""
+        crashed = []
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if pid in self.workers:
+                crashed.append(time.monotonic() - self.workers.pop(pid))
+                log(f"工作进程 {pid} 意外退出（状态 {status}）")
+            self.retiring.pop(pid, None)
+        return crashed
+
+    def kill_overdue(self):
+        now = time.monotonic()
+        for pid, deadline in list(self.retiring.items()):
+            if now >= deadline:
+                log(f"工作进程 {pid} 超过 {self.graceful_timeout} 秒仍未退出，强制结束")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                self.retiring[pid] = float('inf')
+
+    def reload(self):
+        """检查新代码能否加载，通过后重新执行主进程；当前工作进程由新的主进程停止"""
+        log("收到 SIGHUP，检查新代码...")
+        check = subprocess.run([sys.executable, os.path.abspath(__file__), '--check'])
+        if check.returncode != 0:
+            log("新代码加载失败，继续使用当前代码")
+            return
+        os.set_inheritable(self.sock.fileno(), True)
+        os.environ[LISTEN_FD_ENV] = str(self.sock.fileno())
+        os.environ[OLD_WORKERS_ENV] = ','.join(str(pid) for pid in list(self.workers) + list(self.retiring))
+        log("重新加载")
+        os.execv(sys.executable, [sys.executable, os.path.abspath(__file__)] + sys.argv[1:])
+
+    def stop(self):
+        log("正在停止，等待处理中的请求完成...")
+        self.retire(list(self.workers))
+        while self.retiring:
+            self.reap()
+            self.kill_overdue()
+            time.sleep(SUPERVISE_INTERVAL)
+        self.sock.close()
+        log("已停止")
+
+    def run(self, old_workers=()):
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, lambda signum, frame: self.signals.append(signum))
+
+        for _ in range(self.size):
+            self.spawn()
+        if old_workers:
+            # 新的工作进程已在接受连接，旧的工作进程处理完当前请求后退出
+            self.retire(old_workers)
+
+        while True:
+            while self.signals:
+                signum = self.signals.pop(0)
+                if signum == signal.SIGHUP:
+                    self.reload()
+                else:
+                    self.stop()
+                    return
+
+            crashed = self.reap()
+            if crashed and min(crashed) < MIN_WORKER_LIFETIME:
+                time.sleep(RESPAWN_DELAY)
+            while len(self.workers) < self.size:
+                self.spawn()
+            self.kill_overdue()
+            time.sleep(SUPERVISE_INTERVAL)
+
+
+def main():
+    settings = config.load()
+    parser = argparse.ArgumentParser(description='以多个工作进程运行网页服务（生产环境）')
+    parser.add_argument('--bind', default=settings['SERVER_BIND'], help='监听地址（默认使用 SERVER_BIND）')
+    parser.add_argument('--workers', type=int, default=settings['SERVER_WORKERS'],
+                        help='工作进程数（默认使用 SERVER_WORKERS）')
+    parser.add_argument('--graceful-timeout', type=int, default=settings['SERVER_GRACEFUL_TIMEOUT'],
+                        help='停止时等待处理中请求的最长秒数（默认使用 SERVER_GRACEFUL_TIMEOUT）')
+    parser.add_argument('--check', action='store_true', help='只检查配置和加载应用，不启动服务')
+    args = parser.parse_args()
+
+    # 延迟导入：加载应用的耗时只计入这里，--help 等不需要导入 Flask
+    from wsgi import create_app
+
+    if args.check:
+        try:
+            create_app()
+        except Exception as e:
+            print(f"加载应用失败: {str(e)}")
+            sys.exit(1)
+        return
+
+    inherited_fd = os.environ.pop(LISTEN_FD_ENV, None)
+    old_workers = [int(pid) for pid in os.environ.pop(OLD_WORKERS_ENV, '').split(',') if pid]
+    sock = socket.socket(fileno=int(inherited_fd)) if inherited_fd else listen(args.bind)
+
+    try:
+        app = create_app()
+    except Exception as e:
+        print(f"加载应用失败: {str(e)}")
+        sys.exit(1)
+
+    log(f"监听 {args.bind}，启动 {args.workers} 个工作进程")
+    Master(app, sock, args.workers, args.graceful_timeout, settings['SERVER_WARM_CONNECTIONS']).run(old_workers)
+
+
+if __name__ == '__main__':
+    main()
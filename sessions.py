@@ -0,0 +1,269 @@
+"""
+服务端会话与用户上下文缓存模块
+
+原来的会话保存在签名 Cookie 中，角色、区队在登录时写入，之后每个路由都直接读取 Cookie 中的值，
+超级管理员修改角色或区队后，用户要重新登录才生效，也无法让某个用户立即下线。这里改为：
+
+1. 服务端会话：Cookie 中只保存随机的会话ID，会话内容保存在服务端的会话存储中（默认 SQLite 文件）。
+   会话存储可替换，实现 SessionStore 的方法即可；吊销某个用户的全部会话后，该用户下一个请求即为未登录状态。
+2. 用户上下文缓存：每个请求开始时按会话中的用户ID取出用户的工号、姓名、角色、区队（进程内缓存，ttl 秒），
+   与会话中的值不同时更新会话，路由中的权限判断仍然读取 session['role']、session['team']。
+   修改角色、区队后主动调用 invalidate，本进程立即生效；同时把共享的 users 缓存版本加一，
+   其他工作进程读到新版本后清空本进程的缓存（见 cluster.py），一两秒内生效。
+
+会话内容只在被修改时写回存储；未修改的会话在剩余有效期不足一半时延长有效期。
+"""
+
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from werkzeug.datastructures import CallbackDict
+
+# 会话ID：secrets.token_urlsafe(32) 生成的 43 个字符
+SESSION_ID_RE = re.compile(r'^[A-Za-z0-9_-]{43}$')
+
+# 用户上下文中同步到会话的字段
+USER_CONTEXT_FIELDS = ('employee_id', 'name', 'role', 'team')
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """内容保存在服务端的会话，sid 为 None 表示尚未保存过"""
+
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.new = sid is None
+        self.modified = False
+        # 登录成功后更换会话ID（防止会话固定攻击），旧ID在保存时删除
+        self.replaced_sid = None
+
+    def regenerate(self):
+        if self.sid is not None:
+            self.replaced_sid = self.sid
+        self.sid = None
+        self.modified = True
+
+
+class SessionStore:
+    """会话存储接口；expires_at 为 time.time() 时间戳"""
+
+    def load(self, sid):
+        """返回 (会话内容, 过期时间)，不存在或已过期时返回 None"""
+        raise NotImplementedError
+
+    def save(self, sid, data, user_id, expires_at):
+        raise NotImplementedError
+
+    def touch(self, sid, expires_at):
+        """只延长有效期"""
+        raise NotImplementedError
+
+    def delete(self, sid):
+        raise NotImplementedError
+
+    def delete_user(self, user_id):
+        """删除某个用户的全部会话，返回删除的数量"""
+        raise NotImplementedError
+
+    def count_users(self, user_ids):
+        """{用户ID: 有效会话数}，没有会话的用户不出现"""
+        raise NotImplementedError
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    保存在本机 SQLite 文件中的会话，同一台服务器上的多个 worker 共用（WAL 模式）。
+    每个线程使用自己的连接；过期会话在写入时按 cleanup_interval 定期清理。
+    """
+
+    def __init__(self, path, cleanup_interval=600):
+        self.path = path
+        self.cleanup_interval = cleanup_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._cleaned_at = 0
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        with self._lock:
+            if not self._initialized:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS sessions (
+                        sid TEXT PRIMARY KEY,
+                        user_id INTEGER,
+                        data TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id)')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)')
+                self._initialized = True
+        self._local.conn = conn
+        return conn
+
+    def load(self, sid):
+        row = self._connect().execute('SELECT data, expires_at FROM sessions WHERE sid = ?', (sid,)).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return session_json_serializer.loads(row[0]), row[1]
+
+    def save(self, sid, data, user_id, expires_at):
+        conn = self._connect()
+        conn.execute('INSERT OR REPLACE INTO sessions (sid, user_id, data, expires_at) VALUES (?, ?, ?, ?)',
+                     (sid, user_id, session_json_serializer.dumps(data), expires_at))
+        self._maybe_cleanup(conn)
+
+    def touch(self, sid, expires_at):
+        self._connect().execute('UPDATE sessions SET expires_at = ? WHERE sid = ?', (expires_at, sid))
+
+    def delete(self, sid):
+        self._connect().execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def delete_user(self, user_id):
+        return self._connect().execute('DELETE FROM sessions WHERE user_id = ?', (user_id,)).rowcount
+
+    def count_users(self, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        rows = self._connect().execute(f'''
+            SELECT user_id, COUNT(*) FROM sessions
+            WHERE user_id IN ({', '.join(['?'] * len(user_ids))}) AND expires_at > ?
+            GROUP BY user_id
+        ''', user_ids + [time.time()]).fetchall()
+        return dict(rows)
+
+    def _maybe_cleanup(self, conn):
+        now = time.time()
+        if now - self._cleaned_at < self.cleanup_interval:
+            return
+        self._cleaned_at = now
+        conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (now,))
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask 会话接口：Cookie 中只有会话ID，内容读写 store"""
+
+    serializer = session_json_serializer
+    session_class = ServerSideSession
+
+    def __init__(self, store):
+        self.store = store
+
+    def _lifetime(self, app):
+        return app.permanent_session_lifetime.total_seconds()
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and SESSION_ID_RE.match(sid):
+            loaded = self.store.load(sid)
+            if loaded is not None:
+                data, expires_at = loaded
+                return self.session_class(data, sid=sid, expires_at=expires_at)
+        return self.session_class()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.replaced_sid is not None:
+            self.store.delete(session.replaced_sid)
+
+        if not session:
+            # 会话已清空（登出）：删除服务端内容和 Cookie
+            if session.sid is not None:
+                self.store.delete(session.sid)
+            if session.sid is not None or session.replaced_sid is not None:
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       httponly=self.get_cookie_httponly(app),
+                                       samesite=self.get_cookie_samesite(app))
+            return
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        lifetime = self._lifetime(app)
+        now = time.time()
+        if session.modified or session.sid is None:
+            if session.sid is None:
+                session.sid = secrets.token_urlsafe(32)
+            session.expires_at = now + lifetime
+            user_id = session.get('id') if session.get('loggedin') else None
+            self.store.save(session.sid, dict(session), user_id, session.expires_at)
+        elif session.expires_at - now < lifetime / 2:
+            session.expires_at = now + lifetime
+            self.store.touch(session.sid, session.expires_at)
+        else:
+            return
+
+        response.set_cookie(name, session.sid,
+                            expires=self.get_expiration_time(app, session),
+                            httponly=self.get_cookie_httponly(app),
+                            domain=domain, path=path,
+                            secure=self.get_cookie_secure(app),
+                            samesite=self.get_cookie_samesite(app),
+                            partitioned=self.get_cookie_partitioned(app))
+
+
+class UserContextCache:
+    """进程内缓存：用户ID -> {employee_id, name, role, team}"""
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        # 用户ID -> (加载时间, 上下文)
+        self._entries = {}
+        # 每次失效加一，查询期间发生过失效的结果不写入缓存
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id, load):
+        """load(user_id) 在缓存未命中时查询数据库，用户不存在时返回 None（不缓存）"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                return entry[1]
+            generation = self._generation
+
+        context = load(user_id)
+        if context is not None:
+            context = {field: context.get(field) for field in USER_CONTEXT_FIELDS}
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[user_id] = (time.monotonic(), context)
+        return context
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+def sync_session(session, context):
+    """用最新的用户上下文更新会话，只有值变化时才修改（会话才会写回存储）"""
+    for field in USER_CONTEXT_FIELDS:
+        if session.get(field) != context[field]:
+            session[field] = context[field]
@@ -142,15 +142,101 @@ class ExcelStyleForm {
         
         // 从数据中移除
         this.data.splice(rowIndex, 1);
+        this.updateHiddenDataField();
         
-        // 重新渲染表格
-        this.renderExcelTable();
+        // 重新渲染表格（服务端渲染的表格只重建只读行）
+        if (this.serverTable) {
+            this.renderStaticRows();
+        } else {
+            this.renderExcelTable();
+        }
+    }
+
+    // 接管服务端渲染的只读表格：只有被点击的行才替换为可编辑的输入控件
+    hydrateServerTable(table) {
+        this.serverTable = table;
+        const tbody = table.querySelector('tbody');
+        tbody.addEventListener('click', (e) => {
+            const row = e.target.closest('tr[data-index]');
+            if (row && !row.dataset.hydrated && !e.target.closest('a')) {
+                this.createDataRow(tbody, this.data[Number(row.dataset.index)], Number(row.dataset.index), row);
+            }
+        });
+        this.addAddRowButton(table.parentElement);
+    }
+
+    // 重建全部只读行（删除行后行号变化）
+    renderStaticRows() {
+        const tbody = this.serverTable.querySelector('tbody');
+        const fragment = document.createDocumentFragment();
+        this.data.forEach((rowData, index) => {
+            fragment.appendChild(this.createStaticRow(rowData, index));
+        });
+        tbody.replaceChildren(fragment);
+    }
+
+    // 创建只读行，与服务端 record_table.html 的输出一致
+    createStaticRow(rowData, rowIndex) {
+        const row = document.createElement('tr');
+        row.dataset.index = rowIndex;
+        row.className = 'cursor-pointer';
+        row.title = '点击编辑此行';
+        
+        const actionTd = document.createElement('td');
+        actionTd.className = 'px-3 py-2 whitespace-nowrap text-sm text-gray-400 border border-gray-200';
+        actionTd.innerHTML = '<i class="fas fa-pen"></i> 编辑';
+        row.appendChild(actionTd);
+        
+        const rowNumTd = document.createElement('td');
+        rowNumTd.className = 'px-3 py-2 whitespace-nowrap text-sm font-medium text-gray-900 border border-gray-200';
+        rowNumTd.textContent = (rowIndex + 1).toString();
+        row.appendChild(rowNumTd);
+        
+        this.templateStructure.columns.forEach(column => {
+            const td = document.createElement('td');
+            td.className = 'px-3 py-2 text-sm text-gray-700 border border-gray-200';
+            if (column.width) {
+                td.style.width = `${column.width}px`;
+            }
+            const value = rowData[column.name];
+            if (value === undefined || value === null || value === '' || value === false) {
+                // 空单元格
+            } else if (column.type === 'checkbox') {
+                td.innerHTML = '<div class="flex items-center justify-center text-green-600"><i class="fas fa-check"></i></div>';
+            } else if (column.type === 'image') {
+                const img = document.createElement('img');
+                img.src = attachmentUrl(value);
+                img.loading = 'lazy';
+                img.className = 'max-w-full max-h-full object-contain';
+                const preview = document.createElement('div');
+                preview.className = 'image-preview';
+                preview.appendChild(img);
+                td.appendChild(preview);
+            } else if (column.type === 'file') {
+                const link = document.createElement('a');
+                link.href = attachmentUrl(value);
+                link.target = '_blank';
+                link.className = 'text-blue-600 hover:underline';
+                link.textContent = '已上传文件';
+                td.appendChild(link);
+            } else {
+                td.textContent = column.type === 'datetime' ? String(value).replace('T', ' ') : value;
+                if (column.type === 'textarea') {
+                    td.classList.add('whitespace-pre-wrap');
+                } else if (column.type === 'number') {
+                    td.classList.add('text-right');
+                }
+            }
+            row.appendChild(td);
+        });
+        return row;
     }
 
-    // 创建数据行
-    createDataRow(tbody, rowData, rowIndex) {
+    // 创建数据行；replaceRow 为服务端渲染的只读行时原位替换
+    createDataRow(tbody, rowData, rowIndex, replaceRow = null) {
         const dataRow = document.createElement('tr');
         dataRow.dataset.index = rowIndex;
+        dataRow.dataset.hydrated = '1';
         
         // 添加操作单元格（删除按钮）
         const actionTd = document.createElement('td');
@@ -185,7 +271,11 @@ class ExcelStyleForm {
             dataRow.appendChild(td);
         });
         
-        tbody.appendChild(dataRow);
+        if (replaceRow) {
+            tbody.replaceChild(dataRow, replaceRow);
+        } else {
+            tbody.appendChild(dataRow);
+        }
     }
 
     // 创建输入控件
@@ -284,7 +374,7 @@ class ExcelStyleForm {
                 
                 if (currentValue) {
                     const img = document.createElement('img');
-                    img.src = currentValue;
+                    img.src = attachmentUrl(currentValue);
                     img.className = 'max-w-full max-h-full object-contain';
                     preview.appendChild(img);
                 } else {
@@ -310,17 +400,23 @@ class ExcelStyleForm {
                 // 监听文件上传
                 fileInput.addEventListener('change', (e) => {
                     if (e.target.files && e.target.files[0]) {
-                        const reader = new FileReader();
-                        reader.onload = (event) => {
-                            // 这里仅作预览，实际项目中应该上传到服务器
-                            preview.innerHTML = '';
-                            const img = document.createElement('img');
-                            img.src = event.target.result;
-                            img.className = 'max-w-full max-h-full object-contain';
-                            preview.appendChild(img);
-                            this.updateData(rowIndex, column.name, event.target.result);
-                        };
-                        reader.readAsDataURL(e.target.files[0]);
+                        // 上传到服务器，记录中只保存附件引用
+                        uploadBtn.disabled = true;
+                        uploadBtn.textContent = '上传中...';
+                        uploadAttachment(e.target.files[0])
+                            .then(result => {
+                                preview.innerHTML = '';
+                                const img = document.createElement('img');
+                                img.src = result.url;
+                                img.className = 'max-w-full max-h-full object-contain';
+                                preview.appendChild(img);
+                                this.updateData(rowIndex, column.name, result.ref);
+                            })
+                            .catch(error => alert(error.message))
+                            .finally(() => {
+                                uploadBtn.disabled = false;
+                                uploadBtn.textContent = '上传图片';
+                            });
                     }
                 });
                 
@@ -338,7 +434,16 @@ class ExcelStyleForm {
                 // 文件名显示
                 const fileNameDisplay = document.createElement('div');
                 fileNameDisplay.className = 'w-full text-center mb-2 text-sm text-gray-700 truncate';
-                fileNameDisplay.textContent = currentValue ? '已上传文件' : '未上传文件';
+                if (currentValue) {
+                    const fileLink = document.createElement('a');
+                    fileLink.href = attachmentUrl(currentValue);
+                    fileLink.target = '_blank';
+                    fileLink.className = 'text-blue-600 hover:underline';
+                    fileLink.textContent = '已上传文件';
+                    fileNameDisplay.appendChild(fileLink);
+                } else {
+                    fileNameDisplay.textContent = '未上传文件';
+                }
                 
                 // 文件上传控件
                 const fileInputEl = document.createElement('input');
@@ -355,13 +460,21 @@ class ExcelStyleForm {
                 // 监听文件上传
                 fileInputEl.addEventListener('change', (e) => {
                     if (e.target.files && e.target.files[0]) {
-                        // 这里仅作演示，实际项目中应该上传到服务器
-                        fileNameDisplay.textContent = e.target.files[0].name;
-                        const reader = new FileReader();
-                        reader.onload = (event) => {
-                            this.updateData(rowIndex, column.name, event.target.result);
-                        };
-                        reader.readAsDataURL(e.target.files[0]);
+                        const file = e.target.files[0];
+                        fileUploadBtn.disabled = true;
+                        fileNameDisplay.textContent = '上传中...';
+                        uploadAttachment(file)
+                            .then(result => {
+                                fileNameDisplay.textContent = file.name;
+                                this.updateData(rowIndex, column.name, result.ref);
+                            })
+                            .catch(error => {
+                                fileNameDisplay.textContent = '上传失败';
+                                alert(error.message);
+                            })
+                            .finally(() => {
+                                fileUploadBtn.disabled = false;
+                            });
                     }
                 });
                 
@@ -417,8 +530,13 @@ class ExcelStyleForm {
             }
         }
         
-        // 渲染Excel风格表格
-        this.renderExcelTable();
+        // 服务端已渲染只读表格时只接管交互，否则在浏览器中渲染Excel风格表格
+        const serverTable = this.container.querySelector('table[data-server-rendered]');
+        if (serverTable) {
+            this.hydrateServerTable(serverTable);
+        } else {
+            this.renderExcelTable();
+        }
         
         // 绑定表单提交事件
         if (this.form) {
@@ -432,6 +550,33 @@ class ExcelStyleForm {
     }
 }
 
+// 附件引用前缀，与服务端 attachments.ATTACHMENT_REF_PREFIX 保持一致
+const ATTACHMENT_REF_PREFIX = 'att:';
+
+// 将单元格中的值转换为可显示的地址（附件引用或旧数据中的 data URL）
+function attachmentUrl(value) {
+    if (typeof value === 'string' && value.startsWith(ATTACHMENT_REF_PREFIX)) {
+        return '/attachments/' + value.slice(ATTACHMENT_REF_PREFIX.length);
+    }
+    return value;
+}
+
+// 上传附件，返回 {ref, url, size}
+function uploadAttachment(file) {
+    const formData = new FormData();
+    formData.append('file', file);
+    return fetch('/attachments/upload', {
+        method: 'POST',
+        body: formData,
+        credentials: 'same-origin'
+    }).then(response => response.json().catch(() => ({})).then(result => {
+        if (!response.ok || !result.ref) {
+            throw new Error(result.error || (response.status === 413 ? '文件过大' : '上传失败'));
+        }
+        return result;
+    }));
+}
+
 // DOM加载完成后初始化Excel风格表单
 function initExcelStyleForm() {
     // 等待DOM完全加载
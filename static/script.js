@@ -160,101 +160,29 @@ function initTableInteractions() {
     });
 }
 
-// 搜索和过滤功能
+// 搜索和过滤功能：用户列表由服务端分页搜索，输入停顿或切换筛选条件后提交搜索表单
 function initSearchAndFilter() {
-    const searchInput = document.getElementById('search');
-    const roleFilter = document.getElementById('role-filter');
-    const userRows = document.querySelectorAll('.user-row');
+    const form = document.getElementById('user-search-form');
+    if (!form) return;
     
-    if (searchInput && roleFilter && userRows.length > 0) {
-        // 搜索输入动画
-        searchInput.addEventListener('focus', function() {
-            this.parentElement.classList.add('focused');
-            this.style.width = '100%';
-            this.style.transition = 'width 0.3s ease';
-        });
-        
-        searchInput.addEventListener('blur', function() {
-            this.parentElement.classList.remove('focused');
-            this.style.width = '';
-        });
-        
-        // 过滤功能
-        function filterUsers() {
-            const searchTerm = searchInput.value.toLowerCase();
-            const selectedRole = roleFilter.value;
-            let visibleCount = 0;
-            
-            userRows.forEach(row => {
-                const name = row.dataset.name || '';
-                const employeeId = row.dataset.employeeId || '';
-                const phone = row.dataset.phone || '';
-                const role = row.dataset.role || 'user';
-                
-                const matchesSearch = name.includes(searchTerm) || 
-                                    employeeId.includes(searchTerm) || 
-                                    phone.includes(searchTerm);
-                const matchesRole = !selectedRole || role === selectedRole;
-                
-                if (matchesSearch && matchesRole) {
-                    row.style.display = '';
-                    // 添加出现动画
-                    setTimeout(() => {
-                        row.style.opacity = '1';
-                        row.style.transform = 'translateY(0)';
-                        row.style.transition = 'opacity 0.3s ease, transform 0.3s ease';
-                    }, 50);
-                    visibleCount++;
-                } else {
-                    row.style.opacity = '0';
-                    row.style.transform = 'translateY(10px)';
-                    row.style.transition = 'opacity 0.3s ease, transform 0.3s ease';
-                    setTimeout(() => {
-                        row.style.display = 'none';
-                    }, 300);
-                }
-            });
-            
-            // 显示搜索结果数量
-            updateSearchResultCount(visibleCount);
-        }
-        
-        searchInput.addEventListener('input', debounce(filterUsers, 300));
-        roleFilter.addEventListener('change', filterUsers);
-        
-        // 初始化搜索结果计数显示
-        updateSearchResultCount(userRows.length);
+    const searchInput = form.querySelector('input[name="q"]');
+    
+    // 表单不带页码，条件变化后从第一页开始
+    function submitSearch() {
+        form.submit();
     }
     
-    function updateSearchResultCount(count) {
-        let resultCountElement = document.getElementById('search-result-count');
-        
-        if (!resultCountElement) {
-            // 创建结果计数元素
-            resultCountElement = document.createElement('div');
-            resultCountElement.id = 'search-result-count';
-            resultCountElement.style.fontSize = '0.875rem';
-            resultCountElement.style.color = 'var(--text-secondary)';
-            resultCountElement.style.marginTop = '0.5rem';
-            
-            // 插入到搜索框下方
-            const searchContainer = searchInput ? searchInput.closest('.search-filter') : null;
-            if (searchContainer) {
-                searchContainer.appendChild(resultCountElement);
-            }
+    if (searchInput) {
+        searchInput.addEventListener('input', debounce(submitSearch, 500));
+        // 页面重新加载后光标保持在搜索框末尾，便于继续输入
+        if (searchInput.value) {
+            searchInput.focus();
+            searchInput.setSelectionRange(searchInput.value.length, searchInput.value.length);
         }
-        
-        resultCountElement.textContent = `找到 ${count} 个用户`;
-        
-        // 计数动画
-        resultCountElement.style.opacity = '0';
-        resultCountElement.style.transform = 'translateY(-5px)';
-        setTimeout(() => {
-            resultCountElement.style.opacity = '1';
-            resultCountElement.style.transform = 'translateY(0)';
-            resultCountElement.style.transition = 'opacity 0.3s ease, transform 0.3s ease';
-        }, 100);
     }
+    form.querySelectorAll('select').forEach(select => {
+        select.addEventListener('change', submitSearch);
+    });
 }
 
 // 角色变更确认功能
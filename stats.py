@@ -0,0 +1,197 @@
+"""
+统计汇总模块
+
+按 (区队, 模板, 日期) 维护预先汇总好的统计数据，统计页面只读汇总表，从不扫描 check_records：
+
+- stat_daily_templates：记录数、数据行数、必填单元格总数和已填写数（用于计算完成率）
+- stat_daily_options：select 列每个选项值出现的次数（例如"运行状态=异常"的数量）
+
+创建记录时累加该记录的贡献值；编辑记录时先减去旧数据的贡献值再加上新数据的贡献值，
+都与记录写入在同一事务内完成。rebuild_stats.py 可从 check_records 全量重建。
+"""
+
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+# 选项值的最大长度（与 option_value 列长度一致）
+MAX_OPTION_LENGTH = 100
+
+
+class Contribution:
+    """一条记录对汇总数据的贡献值"""
+
+    __slots__ = ('records', 'rows', 'required_total', 'required_filled', 'options')
+
+    def __init__(self):
+        self.records = 0
+        self.rows = 0
+        self.required_total = 0
+        self.required_filled = 0
+        self.options = Counter()
+
+    def add(self, other, sign=1):
+        self.records += sign * other.records
+        self.rows += sign * other.rows
+        self.required_total += sign * other.required_total
+        self.required_filled += sign * other.required_filled
+        for key, count in other.options.items():
+            self.options[key] += sign * count
+
+
+def _is_filled(value, column_type):
+    """必填单元格是否已填写：勾选框只有勾选（True）才算填写，其他列非空即可"""
+    if column_type == 'checkbox':
+        return value is True
+    return value not in (None, '')
+
+
+def record_contribution(columns, rows):
+    contribution = Contribution()
+    contribution.records = 1
+    if isinstance(rows, dict):
+        rows = [rows]
+    required = [(column['name'], column.get('type', 'text')) for column in columns if column.get('required')]
+    option_columns = [column for column in columns if column.get('type') == 'select']
+
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        contribution.rows += 1
+        contribution.required_total += len(required)
+        contribution.required_filled += sum(1 for name, column_type in required if _is_filled(row.get(name), column_type))
+        for column in option_columns:
+            value = row.get(column['name'])
+            if value is None or value == '':
+                continue
+            contribution.options[(column['name'], str(value)[:MAX_OPTION_LENGTH])] += 1
+    return contribution
+
+
+def apply_contribution(cursor, team, template_id, stat_date, contribution):
+    """把贡献值（可以为负）累加到汇总表"""
+    cursor.execute('''
+        INSERT INTO stat_daily_templates
+            (team, template_id, stat_date, record_count, row_count, required_total, required_filled)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            record_count = record_count + VALUES(record_count),
+            row_count = row_count + VALUES(row_count),
+            required_total = required_total + VALUES(required_total),
+            required_filled = required_filled + VALUES(required_filled)
+    ''', (team, template_id, stat_date, contribution.records, contribution.rows,
+          contribution.required_total, contribution.required_filled))
+
+    options = [(team, template_id, stat_date, field, value, count)
+               for (field, value), count in contribution.options.items() if count]
+    if options:
+        cursor.executemany('''
+            INSERT INTO stat_daily_options (team, template_id, stat_date, field_name, option_value, value_count)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE value_count = value_count + VALUES(value_count)
+        ''', options)
+
+
+def update_for_record(cursor, team, template_id, created_at, columns, rows, old_rows=None):
+    """记录创建（old_rows 为 None）或编辑后更新汇总数据"""
+    contribution = record_contribution(columns, rows)
+    if old_rows is not None:
+        # 编辑不改变记录数，只更新行数、完成率和选项分布
+        contribution.add(record_contribution(columns, old_rows), sign=-1)
+    apply_contribution(cursor, team, template_id, created_at.date(), contribution)
+
+
+def move_template(cursor, template_id, team):
+    """模板改到其他区队时，把该模板的汇总数据归入新区队"""
+    cursor.execute('UPDATE stat_daily_templates SET team = %s WHERE template_id = %s', (team, template_id))
+    cursor.execute('UPDATE stat_daily_options SET team = %s WHERE template_id = %s', (team, template_id))
+
+
+class RollupBuilder:
+    """全量重建时在内存中累加各 (区队, 模板, 日期) 的贡献值"""
+
+    def __init__(self):
+        self.totals = defaultdict(Contribution)
+
+    def add(self, team, template_id, created_at, columns, rows):
+        self.totals[(team, template_id, created_at.date())].add(record_contribution(columns, rows))
+
+    def write(self, cursor):
+        for (team, template_id, stat_date), contribution in self.totals.items():
+            apply_contribution(cursor, team, template_id, stat_date, contribution)
+        self.totals.clear()
+
+
+def _scope(team, template_id, since):
+    conditions = ['s.stat_date >= %s']
+    params = [since]
+    if team is not None:
+        conditions.append('s.team = %s')
+        params.append(team)
+    if template_id:
+        conditions.append('s.template_id = %s')
+        params.append(template_id)
+    return ' AND '.join(conditions), params
+
+
+def dashboard(cursor, team=None, template_id=None, days=30, today=None):
+    """汇总最近 days 天的统计数据，只查询汇总表；team 为 None 时统计全部区队"""
+    today = today or date.today()
+    since = today - timedelta(days=days - 1)
+    where, params = _scope(team, template_id, since)
+
+    cursor.execute(f'''
+        SELECT s.stat_date, SUM(s.record_count) AS record_count
+        FROM stat_daily_templates s
+        WHERE {where}
+        GROUP BY s.stat_date
+    ''', params)
+    counts_by_date = {row['stat_date']: int(row['record_count']) for row in cursor.fetchall()}
+    daily = [{'date': (since + timedelta(days=offset)).isoformat(),
+              'record_count': counts_by_date.get(since + timedelta(days=offset), 0)}
+             for offset in range(days)]
+
+    cursor.execute(f'''
+        SELECT s.template_id, t.name AS template_name, s.team,
+               SUM(s.record_count) AS record_count, SUM(s.row_count) AS row_count,
+               SUM(s.required_total) AS required_total, SUM(s.required_filled) AS required_filled
+        FROM stat_daily_templates s
+        LEFT JOIN check_templates t ON s.template_id = t.id
+        WHERE {where}
+        GROUP BY s.template_id, t.name, s.team
+        ORDER BY record_count DESC
+    ''', params)
+    templates = []
+    for row in cursor.fetchall():
+        required_total = int(row['required_total'] or 0)
+        templates.append({
+            'template_id': row['template_id'],
+            'template_name': row['template_name'] or f"模板{row['template_id']}",
+            'team': row['team'],
+            'record_count': int(row['record_count'] or 0),
+            'row_count': int(row['row_count'] or 0),
+            'completion_rate': round(int(row['required_filled'] or 0) / required_total, 4) if required_total else None,
+            'options': {},
+        })
+
+    cursor.execute(f'''
+        SELECT s.template_id, s.field_name, s.option_value, SUM(s.value_count) AS value_count
+        FROM stat_daily_options s
+        WHERE {where}
+        GROUP BY s.template_id, s.field_name, s.option_value
+        HAVING value_count > 0
+        ORDER BY s.template_id, s.field_name, value_count DESC
+    ''', params)
+    by_template = {item['template_id']: item for item in templates}
+    for row in cursor.fetchall():
+        item = by_template.get(row['template_id'])
+        if item is not None:
+            item['options'].setdefault(row['field_name'], {})[row['option_value']] = int(row['value_count'])
+
+    return {
+        'since': since.isoformat(),
+        'until': today.isoformat(),
+        'total_records': sum(item['record_count'] for item in daily),
+        'today_records': daily[-1]['record_count'] if daily else 0,
+        'daily': daily,
+        'templates': templates,
+    }
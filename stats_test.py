@@ -0,0 +1,87 @@
+# 统计汇总测试：单条记录的贡献值（必填完成率、选项分布）、创建和编辑时的增量更新与全量重建结果一致
+# 运行：python -m pytest stats_test.py
+
+from datetime import date, datetime
+
+import stats
+from conftest import add_template, add_user
+
+COLUMNS = [
+    {'name': '设备', 'type': 'text', 'required': True},
+    {'name': '已检查', 'type': 'checkbox', 'required': True},
+    {'name': '状态', 'type': 'select', 'options': ['正常', '异常']},
+    {'name': '备注', 'type': 'text'},
+]
+
+
+def test_required_checkbox_counts_only_when_checked():
+    rows = [{'设备': '1号泵', '已检查': True}, {'设备': '2号泵', '已检查': False}, {'设备': '', '已检查': None}]
+    contribution = stats.record_contribution(COLUMNS, rows)
+    assert (contribution.records, contribution.rows) == (1, 3)
+    assert contribution.required_total == 6
+    assert contribution.required_filled == 3
+
+
+def test_option_counts_skip_empty_values():
+    rows = [{'状态': '正常'}, {'状态': '异常'}, {'状态': '正常'}, {'状态': ''}, {}]
+    assert stats.record_contribution(COLUMNS, rows).options == {('状态', '正常'): 2, ('状态', '异常'): 1}
+
+
+def test_single_object_is_one_row():
+    assert stats.record_contribution(COLUMNS, {'设备': '1号泵'}).rows == 1
+
+
+def _summary(cursor):
+    cursor.execute('SELECT record_count, row_count, required_total, required_filled FROM stat_daily_templates')
+    templates = cursor.fetchall()
+    cursor.execute('SELECT field_name, option_value, value_count FROM stat_daily_options WHERE value_count <> 0 '
+                   'ORDER BY field_name, option_value')
+    return templates, cursor.fetchall()
+
+
+def test_incremental_updates_match_rebuild(conn):
+    user_id = add_user(conn)
+    template_id = add_template(conn, user_id, COLUMNS)
+    cursor = conn.cursor()
+    created_at = datetime(2025, 3, 1, 9, 0)
+    first = [{'设备': '1号泵', '已检查': False, '状态': '异常'}]
+    edited = [{'设备': '1号泵', '已检查': True, '状态': '正常'}, {'设备': '2号泵', '已检查': True, '状态': '正常'}]
+    second = [{'设备': '3号泵', '已检查': True, '状态': '异常'}]
+
+    stats.update_for_record(cursor, '一区队', template_id, created_at, COLUMNS, first)
+    stats.update_for_record(cursor, '一区队', template_id, created_at, COLUMNS, second)
+    stats.update_for_record(cursor, '一区队', template_id, created_at, COLUMNS, edited, old_rows=first)
+    incremental = _summary(cursor)
+
+    cursor.execute('DELETE FROM stat_daily_templates')
+    cursor.execute('DELETE FROM stat_daily_options')
+    builder = stats.RollupBuilder()
+    builder.add('一区队', template_id, created_at, COLUMNS, edited)
+    builder.add('一区队', template_id, created_at, COLUMNS, second)
+    builder.write(cursor)
+
+    assert _summary(cursor) == incremental
+    assert incremental[0] == [{'record_count': 2, 'row_count': 3, 'required_total': 6, 'required_filled': 6}]
+    assert incremental[1] == [{'field_name': '状态', 'option_value': '异常', 'value_count': 1},
+                              {'field_name': '状态', 'option_value': '正常', 'value_count': 2}]
+
+
+def test_dashboard(conn):
+    user_id = add_user(conn)
+    template_id = add_template(conn, user_id, COLUMNS)
+    other_id = add_template(conn, user_id, COLUMNS, team='二区队', name='其他区队')
+    cursor = conn.cursor()
+    rows = [{'设备': '1号泵', '已检查': True, '状态': '正常'}, {'设备': '2号泵', '已检查': False, '状态': '异常'}]
+    stats.update_for_record(cursor, '一区队', template_id, datetime(2025, 3, 1, 9, 0), COLUMNS, rows)
+    stats.update_for_record(cursor, '一区队', template_id, datetime(2025, 3, 3, 9, 0), COLUMNS, rows)
+    stats.update_for_record(cursor, '二区队', other_id, datetime(2025, 3, 3, 9, 0), COLUMNS, rows)
+
+    result = stats.dashboard(cursor, team='一区队', days=3, today=date(2025, 3, 3))
+    assert [day['record_count'] for day in result['daily']] == [1, 0, 1]
+    assert (result['total_records'], result['today_records']) == (2, 1)
+    [template] = result['templates']
+    assert template['template_id'] == template_id
+    assert template['completion_rate'] == 0.75
+    assert template['options'] == {'状态': {'正常': 2, '异常': 2}}
+
+    assert stats.dashboard(cursor, days=3, today=date(2025, 3, 3))['total_records'] == 3
@@ -0,0 +1,210 @@
+"""
+表格模板缓存与记录校验模块
+
+模板的 structure 字段是 JSON 文本，创建、查看、编辑记录时都要用到。
+这里把解析后的列定义和为每一列预先生成的校验函数缓存在进程内（LRU），
+缓存以 (模板ID, updated_at) 为键，模板被修改后自动失效；
+edit_check_template 保存时也会主动调用 invalidate，避免同一秒内的修改读到旧结构。
+
+校验在服务端一次遍历完成，拦截格式错误或过大的提交，不再只依赖 excel_style_form.js。
+"""
+
+import json
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from attachments import parse_ref
+
+# 单条记录数据（JSON 文本）的最大字节数，保存时由 record_codec 按列编码并压缩
+DEFAULT_MAX_BYTES = 65535
+# 单条记录允许的最大行数
+DEFAULT_MAX_ROWS = 500
+# 各类型单元格的最大字符数
+MAX_TEXT_LENGTH = 500
+MAX_TEXTAREA_LENGTH = 5000
+# 一次最多返回的错误条数
+MAX_ERRORS = 20
+
+DATETIME_FORMATS = ('%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d')
+NUMBER_RE = re.compile(r'^-?\d+(\.\d+)?$')
+
+
+def _is_empty(value):
+    return value is None or value == '' or value is False
+
+
+def _check_text(max_length):
+    def check(value):
+        if not isinstance(value, str):
+            return '必须是文本'
+        if len(value) > max_length:
+            return f'长度不能超过{max_length}个字符'
+        return None
+    return check
+
+
+def _check_number(value):
+    if isinstance(value, bool):
+        return '必须是数字'
+    if isinstance(value, (int, float)):
+        return None
+    if isinstance(value, str) and NUMBER_RE.match(value.strip()):
+        return None
+    return '必须是数字'
+
+
+def _check_datetime(value):
+    if isinstance(value, str):
+        for fmt in DATETIME_FORMATS:
+            try:
+                datetime.strptime(value, fmt)
+                return None
+            except ValueError:
+                continue
+    return '日期时间格式不正确'
+
+
+def _check_select(options):
+    allowed = set(options)
+
+    def check(value):
+        if value not in allowed:
+            return '不是有效的选项'
+        return None
+    return check
+
+
+def _check_checkbox(value):
+    if not isinstance(value, bool):
+        return '必须是勾选值'
+    return None
+
+
+def _check_attachment(value):
+    if parse_ref(value) is None:
+        return '附件引用无效，请重新上传'
+    return None
+
+
+def _compile_column(column):
+    column_type = column.get('type', 'text')
+    if column_type == 'textarea':
+        return _check_text(MAX_TEXTAREA_LENGTH)
+    if column_type == 'number':
+        return _check_number
+    if column_type == 'datetime':
+        return _check_datetime
+    if column_type == 'select':
+        return _check_select(column.get('options') or [])
+    if column_type == 'checkbox':
+        return _check_checkbox
+    if column_type in ('image', 'file'):
+        return _check_attachment
+    return _check_text(MAX_TEXT_LENGTH)
+
+
+class CompiledTemplate:
+    """解析后的模板结构，以及按列预先生成的校验函数"""
+
+    def __init__(self, template_id, updated_at, structure_text):
+        self.template_id = template_id
+        self.updated_at = updated_at
+        self.structure = compile_structure(structure_text)
+        self.columns = self.structure['columns']
+        self.column_names = [column['name'] for column in self.columns]
+        self._checks = [(column['name'], bool(column.get('required')), _compile_column(column))
+                        for column in self.columns]
+
+    def validate(self, data_text, max_bytes=DEFAULT_MAX_BYTES, max_rows=DEFAULT_MAX_ROWS):
+        """
+        校验提交的记录数据，返回 (行数组, 错误列表)。
+        完全空白的行会被去掉；没有错误时返回的行数组可以直接保存。
+        """
+        if len(data_text.encode('utf-8')) > max_bytes:
+            return None, [f'表格数据过大（超过{max_bytes // 1024}KB），请减少行数或改用附件上传图片']
+
+        try:
+            data = json.loads(data_text)
+        except ValueError:
+            return None, ['表格数据格式不正确']
+
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            return None, ['表格数据格式不正确']
+
+        return self.validate_rows(data, max_rows)
+
+    def validate_rows(self, data, max_rows=DEFAULT_MAX_ROWS):
+        """校验已解析的行数组，返回值同 validate"""
+        rows = [row for row in data if any(not _is_empty(value) for value in row.values())]
+        if not rows:
+            return rows, ['请至少填写一行数据']
+        if len(rows) > max_rows:
+            return rows, [f'表格行数不能超过{max_rows}行']
+
+        errors = []
+        for index, row in enumerate(rows, start=1):
+            for name, required, check in self._checks:
+                value = row.get(name)
+                if _is_empty(value):
+                    if required:
+                        errors.append(f'第{index}行「{name}」为必填项')
+                    continue
+                message = check(value)
+                if message:
+                    errors.append(f'第{index}行「{name}」{message}')
+            if len(errors) >= MAX_ERRORS:
+                break
+        return rows, errors[:MAX_ERRORS]
+
+
+def compile_structure(structure_text):
+    """解析并检查模板结构 JSON，格式不正确时抛出 ValueError"""
+    structure = json.loads(structure_text)
+    if not isinstance(structure, dict) or not isinstance(structure.get('columns'), list):
+        raise ValueError('模板结构缺少 columns 列表')
+    for column in structure['columns']:
+        if not isinstance(column, dict) or not column.get('name'):
+            raise ValueError('模板列缺少名称')
+    return structure
+
+
+class TemplateCache:
+    """进程内 LRU 缓存：模板ID -> CompiledTemplate"""
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, template_id, updated_at, structure_text):
+        """返回模板的编译结果；缓存中的版本与 updated_at 不一致时重新解析"""
+        with self._lock:
+            compiled = self._entries.get(template_id)
+            if compiled is not None and compiled.updated_at == updated_at:
+                self._entries.move_to_end(template_id)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        # 在锁外解析，避免大模板阻塞其他线程
+        compiled = CompiledTemplate(template_id, updated_at, structure_text)
+        with self._lock:
+            self._entries[template_id] = compiled
+            self._entries.move_to_end(template_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def invalidate(self, template_id):
+        with self._lock:
+            self._entries.pop(template_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
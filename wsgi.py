@@ -0,0 +1,85 @@
+"""
+生产环境入口
+
+serve.py 在主进程中调用 create_app 加载并预热应用，然后 fork 出工作进程；
+也可以交给其他 WSGI 服务器，如 gunicorn --preload -w 4 'wsgi:create_app()'。
+
+create_app 调用 app.create_app 新建应用（配置、连接池、缓存、路由），并负责部署前的检查和预热：
+- 检查生产环境配置（如 SECRET_KEY）和未执行的数据库迁移，有问题时抛出 RuntimeError
+- 编译全部页面模板，读取并编译最近修改的表格模板结构，读取静态资源清单
+  预热在 fork 之前完成，工作进程共享这些内存（写时复制），第一个请求不需要再编译
+- 预热用到的数据库连接在返回前关闭，工作进程不会继承主进程的连接
+
+导入本模块不会导入网页应用，只有调用 create_app 时才导入。
+"""
+
+import time
+
+import config
+import migrations
+
+
+def pending_migrations(app):
+    """尚未执行的数据库迁移（见 migrations.py）"""
+    mysql = app.extensions['mysql_pool']
+    with app.app_context():
+        cursor = mysql.connection.cursor()
+        try:
+            return migrations.pending(cursor)
+        finally:
+            cursor.close()
+
+
+def warm_up(app):
+    """预热进程内缓存，返回各项预热的数量"""
+    mysql = app.extensions['mysql_pool']
+    template_cache = app.extensions['template_cache']
+
+    counts = {}
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    counts['page_templates'] = len(app.jinja_env.list_templates())
+
+    with app.app_context():
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute('SELECT id, structure, updated_at FROM check_templates ORDER BY updated_at DESC LIMIT %s',
+                           (template_cache.max_size,))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        # 最近修改的模板最后放入，LRU 中优先保留
+        counts['check_templates'] = 0
+        for row in reversed(rows):
+            try:
+                template_cache.get(row['id'], row['updated_at'], row['structure'])
+                counts['check_templates'] += 1
+            except ValueError:
+                # 结构无效的模板在使用时报错，不影响启动
+                pass
+    mysql.close_idle()
+
+    counts['assets'] = len(app.extensions['asset_manifest'].bundles())
+    return counts
+
+
+def create_app(check=True, warm=True, settings=None):
+    """新建应用（settings 覆盖默认配置和环境变量）；check 时检查生产环境配置，warm 时预热缓存"""
+    started = time.monotonic()
+    import app as web
+
+    app = web.create_app(settings)
+
+    if check:
+        problems = config.production_problems(app.config)
+        if problems:
+            raise RuntimeError('配置不能用于生产环境：' + '；'.join(problems))
+        pending = pending_migrations(app)
+        if pending:
+            raise RuntimeError(f"有 {len(pending)} 个数据库迁移尚未执行（版本 {', '.join(str(m.version) for m in pending)}），"
+                               f"请先运行 python migrate_schema.py")
+    if warm:
+        counts = warm_up(app)
+        print(f"应用已加载（{time.monotonic() - started:.2f} 秒）：页面模板 {counts['page_templates']} 个，"
+              f"表格模板 {counts['check_templates']} 个，静态资源 {counts['assets']} 个", flush=True)
+    return app